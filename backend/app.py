@@ -16,15 +16,17 @@ from datetime import datetime
 from routes.sensor_routes import sensor_bp
 from routes.device_control import device_bp
 from routes.led_routes import led_bp
+from routes.stream_routes import stream_bp
+from routes.forwarding import install_forwarding
 
 # Import services
-from services import (
-    HeartRateService, BreathingService, GyroscopeService, 
-    WeightService, SnoreService, FanService, LEDService
-)
+from services import get_registry
 
 # Import database initialization
 from database_init import init_all_databases
+from database.writer import get_writer
+from database.executor import get_read_executor
+from realtime import get_hub, get_ring_stats, get_shared_state
 
 # Configure clean logging
 logging.basicConfig(
@@ -46,23 +48,19 @@ logging.getLogger('services.led').setLevel(logging.INFO)  # Keep LED logs
 # Create Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-CORS(app, origins=["http://localhost:5173", "http://localhost:3000"])
-
-# Initialize services
-services = {
-    'heart_rate': HeartRateService(),
-    'breathing': BreathingService(),
-    'gyroscope': GyroscopeService(),
-    'weight': WeightService(),
-    'snore': SnoreService(),
-    'fan': FanService(),
-    'led': LEDService()
-}
+CORS(app, origins=["http://localhost:5173", "http://localhost:3000"], expose_headers=["ETag", "Retry-After"])
+
+# Shared service instances (the blueprints use the same ones)
+services = get_registry()
 
 # Register blueprints
 app.register_blueprint(sensor_bp)
 app.register_blueprint(device_bp)
 app.register_blueprint(led_bp)
+app.register_blueprint(stream_bp)
+
+# With several workers (serve.py), only the ingest owner takes writes; readers forward them
+install_forwarding(app)
 
 def init_database():
     """Initialize database for all services"""
@@ -138,11 +136,17 @@ def simulate_sensor_data():
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
+    shared_state = get_shared_state()
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'services_count': len(services),
-        'all_services_ok': True
+        'all_services_ok': True,
+        'write_queue': get_writer().get_stats(),
+        'read_executor': get_read_executor().get_stats(),
+        'push_hub': get_hub().get_stats(),
+        'ring_buffers': get_ring_stats(),
+        'shared_state': shared_state.get_stats() if shared_state else None
     })
 
 # Status summary endpoint
@@ -151,9 +155,9 @@ def status_summary():
     """Get a clean summary of all systems"""
     try:
         # Get current data from services
-        heart_rate = services['heart_rate'].get_current_data()
-        weight = services['weight'].get_current_data()
-        snore = services['snore'].get_current_data()
+        heart_rate = services['heart_rate'].json_cache.data()
+        weight = services['weight'].json_cache.data()
+        snore = services['snore'].json_cache.data()
         
         return jsonify({
             'timestamp': datetime.now().strftime('%H:%M:%S'),
@@ -200,4 +204,7 @@ if __name__ == '__main__':
     except KeyboardInterrupt:
         logger.info("🛑 Server stopped by user")
     except Exception as e:
-        logger.error(f"❌ Server error: {e}")
\ No newline at end of file
+        logger.error(f"❌ Server error: {e}")
+    finally:
+        # Drain queued readings to disk before exiting
+        get_writer().stop()
\ No newline at end of file
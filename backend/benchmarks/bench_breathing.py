@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_breathing.py - Breathing Estimator Benchmark
+Streams a synthetic piezo night (breathing with drift, noise and scripted apneas)
+through BreathingEstimator at several sample rates, reporting CPU per second of
+signal, rate error and how many of the apneas were caught
+
+Run from the backend directory:
+python -m benchmarks.bench_breathing --minutes 30 --rates 25,50,100,250
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from dsp.breathing import BreathingEstimator
+
+def synthetic_piezo(minutes, sample_rate, seed=1):
+    """Piezo waveform at a wandering 12-18 breaths/min, one 20 s apnea every 5 minutes"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(minutes * 60 * sample_rate)) / sample_rate
+    breaths_per_min = 15 + 3 * np.sin(2 * np.pi * t / 600)
+    phase = 2 * np.pi * np.cumsum(breaths_per_min / 60) / sample_rate
+    amplitude = np.ones_like(t)
+    apneas = np.arange(120, minutes * 60 - 30, 300)
+    for start in apneas:
+        amplitude[(t >= start) & (t < start + 20)] = 0.05
+    signal = amplitude * np.sin(phase) + 0.5 * np.sin(2 * np.pi * t / 900) + 0.1 * rng.normal(size=len(t))
+    return signal, breaths_per_min, len(apneas)
+
+def main():
+    parser = argparse.ArgumentParser(description='Breathing estimator benchmark')
+    parser.add_argument('--minutes', type=float, default=30)
+    parser.add_argument('--rates', default='25,50,100,250', help='comma-separated piezo sample rates, Hz')
+    parser.add_argument('--block', type=float, default=1.0, help='seconds of samples per upload')
+    args = parser.parse_args()
+
+    print(f"{args.minutes:g} min of signal, {args.block:g} s uploads, "
+          f"{Config.BREATHING_WINDOW_SECONDS}s window, {Config.BREATHING_HOP_SECONDS:g}s hop")
+    print(f"{'rate Hz':>8} {'µs per s':>9} {'beds per core':>14} {'rate err':>9} {'apneas':>8}")
+    for sample_rate in (float(rate) for rate in args.rates.split(',')):
+        signal, truth, apneas = synthetic_piezo(args.minutes, sample_rate)
+        estimator = BreathingEstimator(
+            sample_rate,
+            window_seconds=Config.BREATHING_WINDOW_SECONDS,
+            hop_seconds=Config.BREATHING_HOP_SECONDS,
+            apnea_ratio=Config.APNEA_AMPLITUDE_RATIO,
+            apnea_seconds=Config.APNEA_MIN_SECONDS
+        )
+        block = int(args.block * sample_rate)
+        errors = []
+        elapsed = 0.0
+        for offset in range(0, len(signal), block):
+            end = min(offset + block, len(signal))
+            started = time.perf_counter()
+            estimator.add(signal[offset:end], int((end - 1) * 1000 / sample_rate))
+            elapsed += time.perf_counter() - started
+            estimate = estimator.estimate()
+            if estimate and not estimate['apnea']['active'] and estimate['rate']:
+                # The estimate describes the window, so compare with the window's mean rate
+                window = truth[max(0, end - int(Config.BREATHING_WINDOW_SECONDS * sample_rate)):end]
+                errors.append(abs(estimate['rate'] - window.mean()))
+
+        per_second = elapsed / (args.minutes * 60)
+        print(f"{sample_rate:>8g} {per_second * 1e6:>9.0f} {1 / per_second:>14.0f} "
+              f"{np.median(errors):>9.2f} {estimator.apnea_events:>4}/{apneas:<3}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_db_inserts.py - SQLite Insert Throughput Benchmark
+Compares the old connect/insert/commit/close pattern with the shared connection layer
+
+Run from the backend directory:
+python -m benchmarks.bench_db_inserts --rows 2000
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import ConnectionManager
+
+INSERT_SQL = '''
+    INSERT INTO heart_rate (rate, status, min_rate, max_rate, average_rate, variability)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS heart_rate (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rate INTEGER,
+        status TEXT,
+        min_rate INTEGER,
+        max_rate INTEGER,
+        average_rate REAL,
+        variability REAL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+ROW = (72, 'Normal', 60, 90, 75.0, 12.0)
+
+def bench_connect_per_insert(db_path, rows):
+    """Legacy pattern: new connection, insert, commit and close for every row"""
+    start = time.perf_counter()
+    for _ in range(rows):
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        cursor.execute(INSERT_SQL, ROW)
+        conn.commit()
+        conn.close()
+    return time.perf_counter() - start
+
+def bench_shared_connection(db_path, rows, synchronous):
+    """Shared layer: one long-lived WAL connection, one autocommit insert per row"""
+    manager = ConnectionManager(db_path, journal_mode='WAL', synchronous=synchronous)
+    manager.execute('SELECT 1')  # open outside the timed section
+    start = time.perf_counter()
+    for _ in range(rows):
+        manager.execute(INSERT_SQL, ROW)
+    elapsed = time.perf_counter() - start
+    manager.close_all()
+    return elapsed
+
+def _fresh_database(directory, name):
+    db_path = os.path.join(directory, name)
+    conn = sqlite3.connect(db_path)
+    conn.execute(SCHEMA_SQL)
+    conn.commit()
+    conn.close()
+    return db_path
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite insert throughput benchmark')
+    parser.add_argument('--rows', type=int, default=2000, help='rows inserted per scenario')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        scenarios = [
+            ('connect/commit/close per insert (before)',
+             lambda path: bench_connect_per_insert(path, args.rows)),
+            ('shared connection, WAL, synchronous=FULL',
+             lambda path: bench_shared_connection(path, args.rows, 'FULL')),
+            ('shared connection, WAL, synchronous=NORMAL (default)',
+             lambda path: bench_shared_connection(path, args.rows, 'NORMAL')),
+        ]
+
+        print(f"Inserting {args.rows} heart_rate rows per scenario")
+        baseline = None
+        for index, (label, run) in enumerate(scenarios):
+            db_path = _fresh_database(directory, f'bench_{index}.db')
+            elapsed = run(db_path)
+            rate = args.rows / elapsed
+            baseline = baseline or rate
+            print(f"{label:<55} {rate:>10.0f} inserts/s  ({rate / baseline:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_devices.py - Multi-Device Ingest Scaling Benchmark
+Ingests readings from N beds at once, each on its own thread, and compares
+one shared database (every bed feeding the default device) with per-device
+partitions (one SQLite file and writer per bed)
+
+Besides total throughput it measures how long a quiet bed waits for one reading
+to reach disk while the busy beds ingest: with a shared database that reading
+queues behind everyone else's rows, with partitions it does not.
+
+Run from the backend directory:
+python -m benchmarks.bench_devices --frames 2000 --devices 1,2,4,8
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from database.connection import configure_database
+from database.devices import DEFAULT_DEVICE
+from database_init import init_all_databases
+from services import get_registry
+
+FRAME = {
+    'heart_rate': {'rate': 72, 'min': 60, 'max': 90, 'average': 75, 'variability': 12},
+    'breathing': {'rate': 16, 'rhythm': 'Normal', 'apneaEvents': 0},
+    'gyroscope': {'pitch': 12.5, 'roll': -4.0},
+    'weight': {'weight': 71.3},
+    'snore': {'isDetected': False, 'frequency': 0, 'duration_minutes': 0},
+}
+
+def ingest(registry, frames, batch_frames=50):
+    """Apply frames the way the batch endpoint does: one writer batch per upload"""
+    start = datetime.now() - timedelta(seconds=frames)
+    for offset in range(0, frames, batch_frames):
+        with registry.store.writer.batch():
+            for index in range(offset, min(offset + batch_frames, frames)):
+                timestamp = start + timedelta(seconds=index)
+                for sensor, reading in FRAME.items():
+                    registry[sensor].update_data(reading, timestamp)
+
+def probe(registry, busy, latencies):
+    """Write one reading at a time from a quiet bed and time until it is on disk"""
+    while any(thread.is_alive() for thread in busy):
+        started = time.perf_counter()
+        registry['heart_rate'].update_data(FRAME['heart_rate'])
+        registry.store.writer.flush()
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.02)
+
+def run(device_ids, probe_id, frames):
+    """Ingest `frames` frames per device concurrently
+
+    Returns (readings/s until all are on disk, median quiet-bed write latency in ms)
+    """
+    registries = [get_registry(device_id) for device_id in device_ids]
+    threads = [threading.Thread(target=ingest, args=(registry, frames)) for registry in registries]
+    latencies = []
+    prober = threading.Thread(target=probe, args=(get_registry(probe_id), threads, latencies))
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    prober.start()
+    for thread in threads:
+        thread.join()
+    for store in {id(registry.store): registry.store for registry in registries}.values():
+        store.writer.flush()
+    elapsed = time.perf_counter() - started
+    prober.join()
+
+    readings = len(device_ids) * frames * len(FRAME)
+    return readings / elapsed, statistics.median(latencies) * 1000 if latencies else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-device ingest scaling benchmark')
+    parser.add_argument('--frames', type=int, default=2000, help='frames ingested per device')
+    parser.add_argument('--devices', default='1,2,4,8', help='comma-separated device counts')
+    args = parser.parse_args()
+    counts = [int(count) for count in args.devices.split(',')]
+
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as directory:
+        Config.DEVICE_DATA_DIR = os.path.join(directory, 'devices')
+        Config.MAX_DEVICES = max(Config.MAX_DEVICES, sum(counts) + len(counts))  # + one quiet bed per round
+        configure_database(os.path.join(directory, 'shared.db'))
+        init_all_databases()
+
+        print(f"Ingesting {args.frames} frames x {len(FRAME)} sensors per busy device")
+        print(f"{'devices':>8} {'shared database':>30} {'per-device partitions':>36}")
+        for round_index, count in enumerate(counts):
+            shared = run([DEFAULT_DEVICE] * count, DEFAULT_DEVICE, args.frames)
+            partitioned = run([f'bench-{round_index}-{index}' for index in range(count)],
+                              f'probe-{round_index}', args.frames)
+            print(f"{count:>8} " + '   '.join(
+                f"{rate:>10.0f} rows/s, quiet bed {latency:>6.1f} ms" for rate, latency in (shared, partitioned)
+            ))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_hrv.py - HRV Engine Benchmark
+Streams a synthetic night of beats through HRVEngine in device-sized blocks and
+compares it with recomputing the window's metrics from scratch on every block,
+then times the vectorized whole-night report
+
+Run from the backend directory:
+python -m benchmarks.bench_hrv --hours 8 --block 3
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dsp.hrv import HRVEngine, beat_times, hrv_report
+
+def synthetic_night(hours, seed=1):
+    """RR intervals (ms) with respiratory and slow variability, noise and a few artifacts"""
+    rng = np.random.default_rng(seed)
+    beats = int(hours * 3600 * 1000 / 900)
+    index = np.arange(beats)
+    rr = 900 + 40 * np.sin(index / 4) + 60 * np.sin(index / 900) + rng.normal(0, 20, beats)
+    rr[rng.integers(0, beats, beats // 500)] = 2500  # missed beats
+    return beat_times(rr, int(time.time() * 1000)), rr
+
+def rescan_metrics(ts, rr, window_ms):
+    """Window metrics recomputed from every beat in the window (the baseline)"""
+    cutoff = ts[-1] - window_ms
+    window = [(t, r) for t, r in zip(ts, rr) if t > cutoff and 300 <= r <= 2000]
+    intervals = [r for _, r in window]
+    mean = sum(intervals) / len(intervals)
+    sdnn = math.sqrt(sum((r - mean) ** 2 for r in intervals) / (len(intervals) - 1))
+    diffs = [b[1] - a[1] for a, b in zip(window, window[1:]) if 0 < b[0] - a[0] <= 1.5 * b[1]]
+    rmssd = math.sqrt(sum(d * d for d in diffs) / len(diffs))
+    return mean, sdnn, rmssd
+
+def main():
+    parser = argparse.ArgumentParser(description='HRV engine benchmark')
+    parser.add_argument('--hours', type=float, default=8)
+    parser.add_argument('--block', type=int, default=3, help='beats per upload')
+    parser.add_argument('--window', type=int, default=300, help='HRV window, seconds')
+    args = parser.parse_args()
+
+    ts, rr = synthetic_night(args.hours)
+    blocks = range(0, len(rr), args.block)
+    print(f"{len(rr)} beats ({args.hours:g} h), {len(blocks)} uploads of {args.block} beats, "
+          f"{args.window}s window")
+
+    engine = HRVEngine(args.window)
+    started = time.perf_counter()
+    for offset in blocks:
+        engine.add_beats(ts[offset:offset + args.block], rr[offset:offset + args.block])
+        engine.metrics()
+    streaming = time.perf_counter() - started
+
+    # The rescan baseline is slow; time a sample of uploads and scale up
+    window_ms = args.window * 1000
+    sample = list(blocks)[::max(len(blocks) // 200, 1)]
+    ts_list, rr_list = ts.tolist(), rr.tolist()
+    started = time.perf_counter()
+    for offset in sample:
+        end = offset + args.block
+        first = max(0, end - 2 * args.window)  # enough beats to cover the window
+        rescan_metrics(ts_list[first:end], rr_list[first:end], window_ms)
+    rescan = (time.perf_counter() - started) / len(sample) * len(blocks)
+
+    print(f"{'streaming engine':>18}: {streaming:7.2f} s for the night ({streaming / len(blocks) * 1e6:6.1f} µs per upload)")
+    print(f"{'rescan per upload':>18}: {rescan:7.2f} s for the night ({rescan / len(blocks) * 1e6:6.1f} µs per upload)")
+
+    started = time.perf_counter()
+    report = hrv_report(ts, rr, args.window)
+    elapsed = time.perf_counter() - started
+    print(f"{'night report':>18}: {elapsed * 1000:7.1f} ms ({len(report['windows'])} windows), "
+          f"overall {report['overall']}")
+
+if __name__ == '__main__':
+    main()
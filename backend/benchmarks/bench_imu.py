@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_imu.py - IMU Fusion Benchmark
+Feeds the same synthetic 100 Hz IMU recording (a sleeper on their back, turning to
+the right side, then onto the stomach) through GyroscopeService two ways:
+
+    per-sample  every sample's accelerometer pitch/roll sent as its own reading
+    fused       raw accelerometer + gyro batches, fused and downsampled server-side
+
+and compares ingest time, rows written, position changes and roll noise.
+
+Run from the backend directory:
+python -m benchmarks.bench_imu --minutes 10 --rate 100
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from database.connection import configure_database
+from database_init import init_all_databases
+from dsp.imu import accel_angles
+from services import get_registry
+
+def synthetic_imu(minutes, sample_rate, seed=1):
+    """Accelerometer (g) and gyro (deg/s) samples with noise, gyro bias and two turns"""
+    rng = np.random.default_rng(seed)
+    seconds = minutes * 60
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    roll = np.zeros_like(t)
+    for at, before, after in ((seconds / 3, 0, 90), (2 * seconds / 3, 90, 178)):
+        turning = (t >= at) & (t < at + 2)
+        roll[turning] = before + (after - before) * (t[turning] - at) / 2
+        roll[t >= at + 2] = after
+    pitch = np.full_like(t, 12.0)
+    r, p = np.radians(roll), np.radians(pitch)
+    gravity = np.column_stack((-np.sin(p), np.cos(p) * np.sin(r), np.cos(p) * np.cos(r)))
+    accel = gravity + 0.08 * rng.normal(size=gravity.shape)
+    gyro = np.column_stack((np.gradient(roll, 1 / sample_rate), np.zeros_like(t), np.zeros_like(t)))
+    gyro += 0.5 + 0.8 * rng.normal(size=gyro.shape)
+    return accel, gyro, seconds / 3
+
+def stored(registry):
+    registry.store.writer.flush()
+    return registry.store.db.query('SELECT roll, position, ts_ms FROM gyroscope ORDER BY ts_ms')
+
+def summarize(label, elapsed, rows, turn_ms):
+    positions = [row[1] for row in rows]
+    changes = sum(1 for before, after in zip(positions, positions[1:]) if before != after)
+    on_back = [row[0] for row in rows if row[2] < turn_ms]
+    print(f"{label:>11} {elapsed * 1000:>9.0f} {len(rows):>8} {changes:>10} {np.std(on_back):>14.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='IMU fusion benchmark')
+    parser.add_argument('--minutes', type=float, default=10)
+    parser.add_argument('--rate', type=float, default=100, help='IMU sample rate, Hz')
+    parser.add_argument('--block', type=float, default=1.0, help='seconds of samples per upload')
+    args = parser.parse_args()
+
+    accel, gyro, turn_seconds = synthetic_imu(args.minutes, args.rate)
+    block = int(args.block * args.rate)
+    start_ms = int(time.time() * 1000) - int(args.minutes * 60 * 1000) - 1000
+    sample_ms = start_ms + np.arange(len(accel)) * 1000 / args.rate
+    turn_ms = start_ms + turn_seconds * 1000
+
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as directory:
+        Config.DEVICE_DATA_DIR = os.path.join(directory, 'devices')
+        configure_database(os.path.join(directory, 'imu.db'))
+        init_all_databases()
+
+        print(f"{args.minutes:g} min of {args.rate:g} Hz IMU, {args.block:g} s uploads, "
+              f"{Config.IMU_OUTPUT_RATE:g} Hz output")
+        print(f"{'path':>11} {'ingest ms':>9} {'rows':>8} {'pos changes':>10} {'roll std on back':>14}")
+
+        registry = get_registry('imu-per-sample', create=True)
+        angles = accel_angles(accel)
+        started = time.perf_counter()
+        for offset in range(0, len(accel), block):
+            with registry.store.writer.batch():
+                for index in range(offset, min(offset + block, len(accel))):
+                    registry['gyroscope'].update_data(
+                        {'pitch': float(angles[index, 0]), 'roll': float(angles[index, 1])},
+                        datetime.fromtimestamp(sample_ms[index] / 1000))
+        summarize('per-sample', time.perf_counter() - started, stored(registry), turn_ms)
+
+        registry = get_registry('imu-fused', create=True)
+        started = time.perf_counter()
+        for offset in range(0, len(accel), block):
+            end = min(offset + block, len(accel))
+            with registry.store.writer.batch():
+                registry['gyroscope'].update_data(
+                    {'accel': accel[offset:end].ravel(), 'gyro': gyro[offset:end].ravel(), 'imuRate': args.rate},
+                    datetime.fromtimestamp(sample_ms[end - 1] / 1000))
+        summarize('fused', time.perf_counter() - started, stored(registry), turn_ms)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_ingest_decode.py - Ingest Decode Cost Benchmark
+Compares JSON parsing + validation against the binary frame format
+
+Run from the backend directory:
+python -m benchmarks.bench_ingest_decode --frames 50 --repeat 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest.frames import validate_frames
+from ingest.binary import decode_frames, encode_frames, validate_decoded
+
+def make_frames(count):
+    """Build frames with every sensor present, one second apart"""
+    start_ms = int(time.time() * 1000) - count * 1000
+    frames = []
+    for i in range(count):
+        frames.append({
+            'timestamp': start_ms + i * 1000,
+            'heart_rate': {'rate': random.randint(55, 90), 'min': 55, 'max': 90,
+                           'average': 70.5, 'variability': 11.25},
+            'breathing': {'rate': random.randint(12, 20), 'rhythm': 'Normal', 'apneaEvents': 0},
+            'gyroscope': {'pitch': random.uniform(-30, 30), 'roll': random.uniform(-45, 45)},
+            'weight': {'weight': random.uniform(60, 90), 'movement': 2.0},
+            'snore': {'isDetected': random.random() > 0.8, 'frequency': 30.0,
+                      'duration_minutes': 0, 'intensity': 40},
+        })
+    return frames
+
+def timed(label, fn, repeat, frame_count, payload_size):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = time.perf_counter() - start
+    per_frame_us = elapsed / (repeat * frame_count) * 1e6
+    print(f"{label:<32} {per_frame_us:>8.2f} us/frame  {payload_size:>7} bytes/request")
+    return per_frame_us
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest decode cost benchmark')
+    parser.add_argument('--frames', type=int, default=50, help='frames per request')
+    parser.add_argument('--repeat', type=int, default=2000, help='requests decoded per scenario')
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames)
+    json_payload = json.dumps({'frames': frames}).encode()
+    binary_payload = encode_frames([(f['timestamp'], {k: v for k, v in f.items() if k != 'timestamp'})
+                                    for f in frames])
+
+    print(f"{args.frames} frames per request, {args.repeat} requests")
+    json_cost = timed('JSON parse + validate', lambda: validate_frames(json.loads(json_payload)['frames']),
+                      args.repeat, args.frames, len(json_payload))
+    binary_cost = timed('binary decode + validate', lambda: validate_decoded(decode_frames(binary_payload)),
+                        args.repeat, args.frames, len(binary_payload))
+    timed('JSON parse only', lambda: json.loads(json_payload),
+          args.repeat, args.frames, len(json_payload))
+    timed('binary decode only', lambda: decode_frames(binary_payload),
+          args.repeat, args.frames, len(binary_payload))
+    print(f"binary path is {json_cost / binary_cost:.1f}x cheaper per frame, "
+          f"{len(json_payload) / len(binary_payload):.1f}x smaller on the wire")
+
+if __name__ == '__main__':
+    main()
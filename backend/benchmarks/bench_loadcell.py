@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_loadcell.py - Load-Cell Engine Benchmark
+Streams a synthetic night of bed load samples (empty bed, sitting on the edge near
+the threshold, lying still with periods of tossing, a bathroom trip, leaving in the
+morning) through LoadCellEngine in device-sized blocks and reports the cost per
+second of signal, the engine's memory, and occupancy transitions compared with
+thresholding each second's mean the way a single weight reading is judged
+
+Run from the backend directory:
+python -m benchmarks.bench_loadcell --hours 8 --rate 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from dsp.loadcell import LoadCellEngine, stability_label
+
+def synthetic_night(hours, sample_rate, seed=1):
+    """Load samples (kg) and the number of true in/out-of-bed transitions"""
+    rng = np.random.default_rng(seed)
+    seconds = int(hours * 3600)
+    t = np.arange(seconds * sample_rate) / sample_rate
+    level = np.full(seconds, 2.0)  # empty bed: bedding on the cells
+    level[300:360] = 18 + 6 * rng.random(60)  # sitting on the edge, around the threshold
+    level[360:seconds - 600] = 74.0
+    trip = seconds // 2
+    level[trip:trip + 240] = 2.0  # bathroom trip
+    load = np.repeat(level, sample_rate) + 0.05 * rng.normal(size=len(t))
+    for start in rng.integers(400, seconds - 700, size=int(hours * 6)):
+        tossing = (t >= start) & (t < start + 20)
+        load[tossing] += 4 * np.sin(2 * np.pi * 0.6 * t[tossing]) * (1 + rng.random())
+    return load, 4
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-cell engine benchmark')
+    parser.add_argument('--hours', type=float, default=8)
+    parser.add_argument('--rate', type=int, default=int(Config.LOADCELL_SAMPLE_RATE), help='load sample rate, Hz')
+    parser.add_argument('--block', type=float, default=1.0, help='seconds of samples per upload')
+    args = parser.parse_args()
+
+    load, true_transitions = synthetic_night(args.hours, args.rate)
+    seconds = len(load) / args.rate
+    block = int(args.block * args.rate)
+    engine = LoadCellEngine(window_seconds=Config.RESTLESSNESS_WINDOW_SECONDS,
+                            debounce_seconds=Config.BED_DEBOUNCE_SECONDS,
+                            movement_kg=Config.MOVEMENT_THRESHOLD_KG)
+    memory = sum(a.nbytes for a in (engine._second, engine._n, engine._mean, engine._m2))
+
+    transitions = []
+    labels = {}
+    elapsed = 0.0
+    for offset in range(0, len(load), block):
+        end = min(offset + block, len(load))
+        started = time.perf_counter()
+        transitions += engine.add(load[offset:end], int((end - 1) * 1000 / args.rate), args.rate)
+        restlessness = engine.stats()['restlessness']
+        elapsed += time.perf_counter() - started
+        if engine.in_bed and restlessness is not None:
+            label = stability_label(restlessness)
+            labels[label] = labels.get(label, 0) + 1
+
+    means = load[:int(seconds) * args.rate].reshape(-1, args.rate).mean(axis=1)
+    naive = np.count_nonzero(np.diff(means > engine.threshold_kg))
+
+    print(f"{args.hours:g} h of {args.rate} Hz load samples in {args.block:g} s blocks")
+    print(f"engine: {elapsed * 1000:.0f} ms total, {elapsed / seconds * 1e6:.0f} µs per second of signal, "
+          f"{memory} bytes of window state at any night length")
+    print(f"transitions: {len(transitions)} debounced, {naive} from per-second thresholding, "
+          f"{true_transitions} real")
+    print('in bed:      ' + ', '.join(f"{label} {count / 60:.0f} min" for label, count in labels.items()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_pressure.py - Pressure Map Benchmark
+Streams a synthetic night of pressure mat frames (a sleeper turning between their
+left and right side every hour, with one trip out of bed) through PressureMap in
+device-sized batches and reports the processing time, the rows left to store, and
+the turns found against the real ones
+
+Run from the backend directory:
+python -m benchmarks.bench_pressure --hours 8 --rate 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from dsp.pressure import PressureMap
+
+def body_frames(positions, rows, cols, rng):
+    """Frames of a lying body (Gaussian load) centered at the given x positions, plus cell noise"""
+    x = (np.arange(cols) + 0.5) / cols
+    y = (np.arange(rows) + 0.5) / rows
+    across = np.exp(-(x[None, :] - positions[:, None]) ** 2 / (2 * 0.12 ** 2))
+    along = np.exp(-(y - 0.5) ** 2 / (2 * 0.25 ** 2))
+    frames = 100 * along[None, :, None] * across[:, None, :]
+    return frames + 2 * rng.normal(size=frames.shape)
+
+def synthetic_positions(hours, sample_rate):
+    """Body x position per frame (NaN out of bed) and the number of real turns"""
+    seconds = int(hours * 3600)
+    count = int(seconds * sample_rate)
+    positions = np.full(count, 0.35)
+    turns = 0
+    for start in range(600, seconds - 60, 3600):
+        i, j = int(start * sample_rate), int((start + 3) * sample_rate)  # a 3 s roll
+        before, after = positions[i - 1], 1.0 - positions[i - 1]
+        positions[i:j] = np.linspace(before, after, j - i)
+        positions[j:] = after
+        turns += 1
+    trip = int((seconds // 2 + 1200) * sample_rate)
+    positions[trip:trip + int(300 * sample_rate)] = np.nan
+    return positions, turns
+
+def main():
+    parser = argparse.ArgumentParser(description='Pressure map benchmark')
+    parser.add_argument('--hours', type=float, default=8)
+    parser.add_argument('--rate', type=float, default=Config.PRESSURE_SAMPLE_RATE, help='frames per second')
+    parser.add_argument('--rows', type=int, default=Config.PRESSURE_GRID_ROWS)
+    parser.add_argument('--cols', type=int, default=Config.PRESSURE_GRID_COLS)
+    parser.add_argument('--block', type=float, default=1.0, help='seconds of frames per upload')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    positions, real_turns = synthetic_positions(args.hours, args.rate)
+    block = max(1, int(args.block * args.rate))
+    engine = PressureMap(args.rows, args.cols, args.rate, Config.PRESSURE_OUTPUT_RATE,
+                         Config.PRESSURE_HEATMAP_ROWS, Config.PRESSURE_HEATMAP_COLS,
+                         Config.PRESSURE_CONTACT_LEVEL, Config.TURN_SHIFT)
+
+    rows = 0
+    found = 0
+    elapsed = 0.0
+    for offset in range(0, len(positions), block):
+        end = min(offset + block, len(positions))
+        frames = body_frames(np.nan_to_num(positions[offset:end], nan=0.5), args.rows, args.cols, rng)
+        frames[np.isnan(positions[offset:end])] = rng.normal(size=(args.rows, args.cols))  # empty mat
+        started = time.perf_counter()
+        outputs = engine.add(frames, int((end - 1) * 1000 / args.rate))
+        elapsed += time.perf_counter() - started
+        rows += len(outputs)
+        found += sum(1 for output in outputs if output[4])
+
+    print(f"{args.hours:g} h of {args.rate:g} Hz {args.rows}x{args.cols} frames in {args.block:g} s uploads")
+    print(f"engine: {elapsed:.1f} s total, {elapsed / len(positions) * 1e6:.1f} µs per frame, "
+          f"{len(positions)} frames -> {rows} stored rows")
+    print(f"turns: {found} found, {real_turns} real")
+
+if __name__ == '__main__':
+    main()
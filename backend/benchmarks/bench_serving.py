@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_serving.py - Serving Mode Load Test
+Starts the backend under each serving mode (serve.py) and drives it with a mix of
+ESP32 ingest and dashboard traffic, reporting requests/s and latency percentiles
+
+Traffic per client connection (keep-alive), drawn at random:
+    40%  POST /api/sensor-data          (ingest)
+    40%  GET  latest-reading endpoints  (dashboard polls)
+    10%  GET  /api/snapshot
+    10%  GET  /api/history/heart_rate?hours=1
+while a few SSE streams stay open, as dashboards do.
+
+Run from the backend directory:
+python -m benchmarks.bench_serving --modes dev,waitress,gunicorn --clients 16 --seconds 10
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LATEST = ['/api/heart-rate', '/api/breathing-data', '/api/gyroscope-data', '/api/weight-data', '/api/snore-data']
+MIX = (
+    ('ingest', 0.4),
+    ('latest', 0.4),
+    ('snapshot', 0.1),
+    ('history', 0.1),
+)
+
+def ingest_body(rng):
+    return json.dumps({
+        'heart_rate': {'rate': rng.randint(55, 95), 'min': 55, 'max': 95, 'average': 72, 'variability': 10},
+        'breathing': {'rate': rng.randint(12, 18), 'rhythm': 'Normal', 'apneaEvents': 0},
+        'gyroscope': {'pitch': rng.uniform(-30, 30), 'roll': rng.uniform(-30, 30)},
+        'weight': {'weight': 70.0 + rng.random()},
+    })
+
+def request_for(kind, rng):
+    if kind == 'ingest':
+        return 'POST', '/api/sensor-data', ingest_body(rng)
+    if kind == 'latest':
+        return 'GET', rng.choice(LATEST), None
+    if kind == 'snapshot':
+        return 'GET', '/api/snapshot', None
+    return 'GET', '/api/history/heart_rate?hours=1', None
+
+def client(port, seconds, seed, results):
+    """One keep-alive connection sending the traffic mix until time is up"""
+    rng = random.Random(seed)
+    kinds, weights = zip(*MIX)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies = {kind: [] for kind in kinds}
+    errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        method, path, body = request_for(kind, rng)
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencies[kind].append(time.perf_counter() - started)
+    conn.close()
+    results.append((latencies, errors))
+
+def client_process(port, seconds, clients, seed, queue):
+    """Several client threads in one process (client CPU shouldn't share one GIL)"""
+    results = []
+    threads = [threading.Thread(target=client, args=(port, seconds, seed * 1000 + index, results))
+               for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put(results)
+
+def hold_stream(port, stop):
+    """An open dashboard SSE stream, read until the run ends"""
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        conn.request('GET', '/api/stream')
+        response = conn.getresponse()
+        while not stop.is_set():
+            response.fp.readline()
+    except (OSError, http.client.HTTPException):
+        pass
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run_mode(mode, args, directory):
+    port = args.port
+    command = [sys.executable, 'serve.py', '--server', mode, '--port', str(port), '--host', '127.0.0.1']
+    if mode in ('gunicorn', 'waitress'):
+        command += ['--threads', str(args.threads)]
+    env = dict(os.environ,
+               DATABASE_PATH=os.path.join(directory, f'{mode}.db'),
+               DEVICE_DATA_DIR=os.path.join(directory, f'{mode}-devices'),
+               SHARED_STATE_NAME=f'sleepmonitor_bench_{mode}_{os.getpid()}',
+               SIMULATION_MODE='False')
+    server = subprocess.Popen(command, cwd=BACKEND, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_up(port):
+            raise RuntimeError(f'{mode} server did not start')
+
+        stop = threading.Event()
+        streams = [threading.Thread(target=hold_stream, args=(port, stop), daemon=True)
+                   for _ in range(args.streams)]
+        for stream in streams:
+            stream.start()
+
+        processes = max(1, min(args.processes, args.clients))
+        queue = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=client_process,
+                                           args=(port, args.seconds, args.clients // processes, index, queue))
+                   for index in range(processes)]
+        for worker in workers:
+            worker.start()
+        results = [result for _ in workers for result in queue.get()]
+        for worker in workers:
+            worker.join()
+        stop.set()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    merged = {kind: [] for kind, _ in MIX}
+    errors = 0
+    for latencies, client_errors in results:
+        errors += client_errors
+        for kind, values in latencies.items():
+            merged[kind].extend(values)
+    return merged, errors
+
+def main():
+    parser = argparse.ArgumentParser(description='Serving mode load test (mixed ingest + dashboard traffic)')
+    parser.add_argument('--modes', default='dev,waitress,gunicorn', help='comma-separated serve.py modes')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent keep-alive connections')
+    parser.add_argument('--processes', type=int, default=2, help='client processes the connections are spread over')
+    parser.add_argument('--streams', type=int, default=4, help='SSE streams held open during the run')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--threads', type=int, default=48, help='request threads')
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    print(f"{args.clients} connections, {args.streams} SSE streams, {args.seconds:.0f}s per mode")
+    print(f"{'mode':>10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'ingest p99':>11} {'latest p99':>11} {'history p99':>12} {'errors':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in args.modes.split(','):
+            merged, errors = run_mode(mode, args, directory)
+            every = [value for values in merged.values() for value in values]
+            print(f"{mode:>10} {len(every) / args.seconds:>8.0f} "
+                  f"{percentile(every, 0.5) * 1000:>8.1f} {percentile(every, 0.99) * 1000:>8.1f} "
+                  f"{percentile(merged['ingest'], 0.99) * 1000:>11.1f} "
+                  f"{percentile(merged['latest'], 0.99) * 1000:>11.1f} "
+                  f"{percentile(merged['history'], 0.99) * 1000:>12.1f} {errors:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_shared_state.py - Shared-Memory Latest State Benchmark
+Compares reading a service's latest JSON body from its process-local cache with
+reading it from the seqlocked shared-memory slot, then checks consistency across
+processes: writer processes rewrite the slot continuously while this process
+reads it, and every body read must be one that was actually written
+
+Run from the backend directory:
+python -m benchmarks.bench_shared_state --seconds 2 --writers 2
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from realtime.shared_state import SharedStateStore
+from services.json_cache import CachedJSON
+
+STATE = {'rate': 72, 'status': 'Normal', 'min': 60, 'max': 90, 'average': 75.0,
+         'variability': 12.0, 'timestamp': '2026-10-17T02:00:00'}
+
+def body_for(writer, sequence):
+    """Self-checking body: its length varies with the sequence, and `check` repeats it"""
+    return json.dumps({'writer': writer, 'n': sequence, 'pad': 'x' * (sequence % 300),
+                       'check': sequence * 7}).encode()
+
+def write_loop(name, writer, seconds, counter):
+    store = SharedStateStore(name=name, max_devices=1)
+    slot = store.slot('default', 'heart_rate')
+    deadline = time.monotonic() + seconds
+    sequence = 0
+    while time.monotonic() < deadline:
+        sequence += 1
+        slot.write(body_for(writer, sequence))
+    counter.value = sequence
+    store.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared-memory latest state benchmark')
+    parser.add_argument('--seconds', type=float, default=2.0, help='length of the consistency run')
+    parser.add_argument('--writers', type=int, default=2, help='concurrent writer processes')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    name = f'sleepmonitor_bench_{os.getpid()}'
+    store = SharedStateStore(name=name, max_devices=1)
+    try:
+        slot = store.slot('default', 'heart_rate')
+        local = CachedJSON(lambda: STATE)
+        shared = CachedJSON(lambda: STATE, slot)
+        local.invalidate()
+        shared.invalidate()
+        assert local.get() == shared.get()
+
+        runs = 100000
+        for label, cache in (('process-local cache', local), ('shared memory slot', shared)):
+            seconds = timeit.timeit(cache.get, number=runs)
+            print(f"{label:>20}: {seconds / runs * 1e6:6.2f} µs per read")
+        seconds = timeit.timeit(shared.invalidate, number=runs // 10)
+        print(f"{'shared write':>20}: {seconds / (runs // 10) * 1e6:6.2f} µs per update (serialize + seqlock)")
+
+        counters = [multiprocessing.Value('q', 0) for _ in range(args.writers)]
+        writers = [multiprocessing.Process(target=write_loop, args=(name, index, args.seconds, counters[index]))
+                   for index in range(args.writers)]
+        for process in writers:
+            process.start()
+
+        reads = torn = 0
+        retries = store.stats['read_retries']
+        while any(process.is_alive() for process in writers):
+            state = slot.read()
+            reads += 1
+            if state is None or state[1] is None:
+                continue
+            value = json.loads(state[1])
+            if 'writer' in value and value['check'] != value['n'] * 7:
+                torn += 1
+        for process in writers:
+            process.join()
+
+        written = sum(counter.value for counter in counters)
+        print(f"{args.writers} writer process(es): {written / args.seconds:,.0f} writes/s, "
+              f"reader: {reads / args.seconds:,.0f} reads/s, "
+              f"{store.stats['read_retries'] - retries} retries, {torn} inconsistent bodies")
+    finally:
+        store.close()
+        store.unlink()
+
+if __name__ == '__main__':
+    main()
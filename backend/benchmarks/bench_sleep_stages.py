@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_sleep_stages.py - Sleep Stage Benchmark
+Streams synthetic nights (a hypnogram of sleep cycles with deep sleep early, REM
+late and short awakenings) through SleepStager at one reading per second per
+sensor, and reports the cost per reading, the beds one core can stage, and the
+epoch agreement with the generating hypnogram
+
+Run from the backend directory:
+python -m benchmarks.bench_sleep_stages --beds 4 --hours 8
+"""
+
+import argparse
+import collections
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from dsp.stages import STAGES, SleepStager
+
+# Per stage: heart mean, heart spread, breath mean, breath spread, P(moving), P(snoring)
+PROFILES = {
+    'Wake': (72, 3, 16, 2, 0.5, 0.0),
+    'Light': (60, 2, 14, 1, 0.06, 0.2),
+    'Deep': (55, 1, 12, 0.4, 0.01, 0.4),
+    'REM': (64, 5, 16, 2.5, 0.02, 0.02),
+}
+
+def synthetic_hypnogram(hours, epoch_seconds, rng):
+    """Stage per epoch: falling asleep, then cycles whose deep share shrinks and REM share grows"""
+    count = int(hours * 3600 / epoch_seconds)
+    scale = 30 / epoch_seconds
+    stages = ['Wake'] * int(20 * scale)
+    while len(stages) < count:
+        night = len(stages) / count
+        stages += ['Light'] * int(30 * scale) + ['Deep'] * int(max(0, 50 * (1 - 1.6 * night)) * scale)
+        stages += ['Light'] * int(20 * scale) + ['REM'] * int((10 + 40 * night) * scale)
+        if rng.random() < 0.5:
+            stages += ['Wake'] * int(rng.integers(2, 8))
+    return stages[:count]
+
+def run_bed(hypnogram, epoch_seconds, rng, start_ms=1_700_000_000_000):
+    """Feed one bed's readings; returns (scored stages, readings, seconds in the stager)"""
+    stager = SleepStager(epoch_seconds)
+    scored = []
+    readings = 0
+    elapsed = 0.0
+    for epoch, stage in enumerate(hypnogram):
+        heart, heart_spread, breath, breath_spread, moving, snoring = PROFILES[stage]
+        for second in range(epoch_seconds):
+            reading = {'heart_rate': heart + heart_spread * rng.normal(),
+                       'moving': rng.random() < moving, 'in_bed': True}
+            if second % 2 == 0:
+                reading['breathing_rate'] = breath + breath_spread * rng.normal()
+            if second % 3 == 0:
+                reading['snoring'] = rng.random() < snoring
+            time_ms = start_ms + (epoch * epoch_seconds + second) * 1000
+            started = time.perf_counter()
+            result = stager.add(time_ms, **reading)
+            elapsed += time.perf_counter() - started
+            readings += 1
+            if result is not None:
+                scored.append(result['stage'])
+    return scored, readings, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Sleep stage benchmark')
+    parser.add_argument('--beds', type=int, default=4)
+    parser.add_argument('--hours', type=float, default=8)
+    parser.add_argument('--epoch', type=int, default=Config.SLEEP_EPOCH_SECONDS, help='epoch length in seconds')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    readings = 0
+    elapsed = 0.0
+    matches = 0
+    scored_count = 0
+    confusion = {stage: collections.Counter() for stage in STAGES}
+    for _ in range(args.beds):
+        hypnogram = synthetic_hypnogram(args.hours, args.epoch, rng)
+        scored, bed_readings, bed_elapsed = run_bed(hypnogram, args.epoch, rng)
+        readings += bed_readings
+        elapsed += bed_elapsed
+        for predicted, real in zip(scored, hypnogram):
+            confusion[real][predicted] += 1
+            matches += predicted == real
+        scored_count += len(scored)
+
+    per_reading = elapsed / readings
+    print(f"{args.beds} beds x {args.hours:g} h, {args.epoch} s epochs, {readings} readings")
+    # A bed publishes about five readings a second (heart, breathing, IMU, weight, snore)
+    print(f"stager: {per_reading * 1e6:.2f} µs per reading, ~{1 / (per_reading * 5):.0f} beds per core "
+          f"at five readings/s")
+    print(f"agreement: {matches / scored_count:.1%} of {scored_count} epochs")
+    for real in STAGES:
+        row = ', '.join(f"{predicted} {confusion[real][predicted]}" for predicted in STAGES)
+        print(f"  {real:<5} -> {row}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_snore.py - Snore Detector Benchmark
+Streams a synthetic bedroom recording (quiet, snoring, talking, quiet) through
+SnoreDetector in device-sized PCM blocks and reports the real-time factor on one
+core and when the snoring state switched
+
+Run from the backend directory:
+python -m benchmarks.bench_snore --rate 16000 --block 0.5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from dsp.snore import SnoreDetector
+
+def synthetic_night(sample_rate, seed=1):
+    """int16 PCM: 60 s quiet, 120 s snoring (one 1.2 s snore per 4 s breath), 30 s talking, 60 s quiet"""
+    rng = np.random.default_rng(seed)
+
+    def room(seconds):
+        return 0.003 * rng.normal(size=int(seconds * sample_rate))
+
+    def snore(count):
+        t = np.arange(count) / sample_rate
+        pitch = 90 + 10 * rng.random()
+        harmonics = sum((0.6 / k) * np.sin(2 * np.pi * k * pitch * t + 6 * rng.random()) for k in range(1, 6))
+        return 0.15 * np.sin(np.pi * np.arange(count) / count) ** 2 * harmonics * (1 + 0.3 * rng.normal(size=count))
+
+    def talking(seconds):
+        count = int(seconds * sample_rate)
+        spectrum = np.fft.rfft(rng.normal(size=count))
+        freqs = np.fft.rfftfreq(count, 1 / sample_rate)
+        spectrum[(freqs < 600) | (freqs > 3500)] = 0
+        voice = np.fft.irfft(spectrum, count)
+        syllables = np.sin(2 * np.pi * 4 * np.arange(count) / sample_rate) > 0
+        return 0.1 * voice / voice.std() * syllables
+
+    snoring = room(120)
+    for breath in range(30):
+        start, count = int((breath * 4 + 1.5) * sample_rate), int(1.2 * sample_rate)
+        snoring[start:start + count] += snore(count)
+    audio = np.concatenate((room(60), snoring, room(30) + talking(30), room(60)))
+    scenes = [(0, 'quiet'), (60, 'snoring'), (180, 'talking'), (210, 'quiet')]
+    return (audio * 32767).clip(-32768, 32767).astype(np.int16), scenes
+
+def main():
+    parser = argparse.ArgumentParser(description='Snore detector benchmark')
+    parser.add_argument('--rate', type=int, default=Config.SNORE_SAMPLE_RATE, help='PCM sample rate, Hz')
+    parser.add_argument('--block', type=float, default=0.5, help='seconds of audio per upload')
+    args = parser.parse_args()
+
+    pcm, scenes = synthetic_night(args.rate)
+    seconds = len(pcm) / args.rate
+    block = int(args.block * args.rate)
+    detector = SnoreDetector(args.rate, on_db=Config.SNORE_ON_DB)
+
+    switches = []
+    elapsed = 0.0
+    for offset in range(0, len(pcm), block):
+        end = min(offset + block, len(pcm))
+        started = time.perf_counter()
+        reading = detector.add(pcm[offset:end], int((end - 1) * 1000 / args.rate))
+        elapsed += time.perf_counter() - started
+        if reading['isDetected'] != (switches[-1][1] if switches else False):
+            switches.append((end / args.rate, reading['isDetected'], reading['rate']))
+
+    print(f"{seconds:.0f} s of {args.rate} Hz audio in {args.block:g} s blocks")
+    print(f"detector: {elapsed * 1000:.0f} ms total, {elapsed / seconds * 1e6:.0f} µs per audio second, "
+          f"{seconds / elapsed:.0f}x real time on one core")
+    print('scenes:   ' + ', '.join(f"{start}s {name}" for start, name in scenes))
+    print('switches: ' + (', '.join(f"{at:.0f}s {'snoring' if on else 'quiet'} ({rate:g}/min)"
+                                   for at, on, rate in switches) or 'none'))
+
+if __name__ == '__main__':
+    main()
@@ -19,8 +19,93 @@ class Config:
     HOST = os.getenv('HOST', '0.0.0.0')
     PORT = int(os.getenv('PORT', 5000))
     
+    # Production serving (serve.py)
+    SERVER = os.getenv('SERVER', 'waitress')  # waitress, gunicorn or dev
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', 48))  # per worker; every SSE stream / long-poll holds one
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', 1))  # gunicorn only; must be 1 (ingest has one owner process)
+    SERVER_CONNECTION_LIMIT = int(os.getenv('SERVER_CONNECTION_LIMIT', 200))
+    
     # Database settings
     DATABASE_PATH = os.getenv('DATABASE_PATH', 'sensor_data.db')
+    DB_JOURNAL_MODE = os.getenv('DB_JOURNAL_MODE', 'WAL')
+    DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')  # OFF, NORMAL, FULL
+    DB_CACHED_STATEMENTS = int(os.getenv('DB_CACHED_STATEMENTS', 128))
+    DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000))
+    
+    # History reads run on a bounded pool of reader threads
+    DB_READ_WORKERS = int(os.getenv('DB_READ_WORKERS', 4))
+    DB_READ_MAX_PENDING = int(os.getenv('DB_READ_MAX_PENDING', 32))  # more waiting reads get 503
+    DB_READ_TIMEOUT = float(os.getenv('DB_READ_TIMEOUT', 10))  # seconds
+    
+    # Write-behind ingest queue
+    WRITE_QUEUE_SIZE = int(os.getenv('WRITE_QUEUE_SIZE', 5000))
+    WRITE_BATCH_SIZE = int(os.getenv('WRITE_BATCH_SIZE', 200))
+    WRITE_FLUSH_INTERVAL = float(os.getenv('WRITE_FLUSH_INTERVAL', 0.5))  # seconds
+    WRITE_ENQUEUE_TIMEOUT = float(os.getenv('WRITE_ENQUEUE_TIMEOUT', 0.5))  # seconds
+    
+    # Batch ingest
+    MAX_BATCH_FRAMES = int(os.getenv('MAX_BATCH_FRAMES', 1000))
+    MAX_CLOCK_SKEW_SECONDS = int(os.getenv('MAX_CLOCK_SKEW_SECONDS', 300))
+    
+    # History rollups
+    ROLLUP_RAW_MAX_SECONDS = int(os.getenv('ROLLUP_RAW_MAX_SECONDS', 900))  # ranges up to this read raw rows
+    ROLLUP_MAX_POINTS = int(os.getenv('ROLLUP_MAX_POINTS', 1500))  # max minute buckets before switching to hours
+    HISTORY_RAW_LIMIT = int(os.getenv('HISTORY_RAW_LIMIT', 1000))
+    HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', 500))  # default rows per cursor page
+    HISTORY_PAGE_MAX = int(os.getenv('HISTORY_PAGE_MAX', 5000))
+    EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', 1000))  # rows fetched per step while streaming
+    
+    # Live push stream (SSE)
+    STREAM_MAX_SUBSCRIBERS = int(os.getenv('STREAM_MAX_SUBSCRIBERS', 16))
+    STREAM_MIN_INTERVAL = float(os.getenv('STREAM_MIN_INTERVAL', 0.25))  # seconds between updates of one topic
+    STREAM_HEARTBEAT_SECONDS = float(os.getenv('STREAM_HEARTBEAT_SECONDS', 15))
+    SNAPSHOT_MAX_WAIT = float(os.getenv('SNAPSHOT_MAX_WAIT', 30))  # longest ?wait= long-poll, seconds
+    SNAPSHOT_MAX_WAITERS = int(os.getenv('SNAPSHOT_MAX_WAITERS', 16))
+    
+    # In-memory recent history (ring buffers)
+    RING_BUFFER_MEMORY_MB = float(os.getenv('RING_BUFFER_MEMORY_MB', 4))  # total, split across the beds in use
+    
+    # Multi-bed: one SQLite file per extra device
+    DEVICE_DATA_DIR = os.getenv('DEVICE_DATA_DIR', 'devices')
+    MAX_DEVICES = int(os.getenv('MAX_DEVICES', 32))
+    
+    # Multi-worker: latest state of every sensor in shared memory
+    SHARED_STATE_ENABLED = os.getenv('SHARED_STATE_ENABLED', 'False').lower() == 'true'  # needed for --workers > 1
+    SHARED_STATE_NAME = os.getenv('SHARED_STATE_NAME', 'sleepmonitor_state')
+    SHARED_STATE_SLOT_BYTES = int(os.getenv('SHARED_STATE_SLOT_BYTES', 1024))  # per sensor per device
+    SHARED_STATE_POLL_INTERVAL = float(os.getenv('SHARED_STATE_POLL_INTERVAL', 0.05))  # seconds
+    INGEST_PORT = int(os.getenv('INGEST_PORT', 0))  # local port of the ingest owner process (0: PORT + 1)
+    INGEST_OWNER_URL = os.getenv('INGEST_OWNER_URL', '')  # set by serve.py in reader workers
+    INGEST_FORWARD_TIMEOUT = float(os.getenv('INGEST_FORWARD_TIMEOUT', 30))  # seconds
+    
+    # Signal processing of raw sensor arrays (dsp/)
+    MAX_RAW_SAMPLES = int(os.getenv('MAX_RAW_SAMPLES', 16000))  # longest sample array in one reading
+    HRV_WINDOW_SECONDS = int(os.getenv('HRV_WINDOW_SECONDS', 300))
+    PPG_SAMPLE_RATE = float(os.getenv('PPG_SAMPLE_RATE', 50))  # Hz, when a reading has no ppgRate
+    PIEZO_SAMPLE_RATE = float(os.getenv('PIEZO_SAMPLE_RATE', 50))  # Hz, when a reading has no piezoRate
+    BREATHING_WINDOW_SECONDS = int(os.getenv('BREATHING_WINDOW_SECONDS', 30))
+    BREATHING_HOP_SECONDS = float(os.getenv('BREATHING_HOP_SECONDS', 2))  # one estimate per hop
+    APNEA_AMPLITUDE_RATIO = float(os.getenv('APNEA_AMPLITUDE_RATIO', 0.25))  # x normal breathing amplitude
+    APNEA_MIN_SECONDS = int(os.getenv('APNEA_MIN_SECONDS', 10))
+    SNORE_SAMPLE_RATE = int(os.getenv('SNORE_SAMPLE_RATE', 16000))  # Hz, when an audio upload has no rate
+    SNORE_ON_DB = float(os.getenv('SNORE_ON_DB', 12))  # loudness above the noise floor of a snore
+    SNORE_REPORT_SECONDS = int(os.getenv('SNORE_REPORT_SECONDS', 10))  # stored reading interval from audio
+    AUDIO_MAX_SECONDS = int(os.getenv('AUDIO_MAX_SECONDS', 10))  # longest audio upload
+    IMU_SAMPLE_RATE = float(os.getenv('IMU_SAMPLE_RATE', 100))  # Hz, when a reading has no imuRate
+    IMU_OUTPUT_RATE = float(os.getenv('IMU_OUTPUT_RATE', 1))  # fused orientations stored/pushed per second
+    IMU_TIME_CONSTANT = float(os.getenv('IMU_TIME_CONSTANT', 0.5))  # seconds the gyro is trusted over
+    LOADCELL_SAMPLE_RATE = float(os.getenv('LOADCELL_SAMPLE_RATE', 50))  # Hz, when a reading has no loadRate
+    RESTLESSNESS_WINDOW_SECONDS = int(os.getenv('RESTLESSNESS_WINDOW_SECONDS', 60))
+    BED_DEBOUNCE_SECONDS = float(os.getenv('BED_DEBOUNCE_SECONDS', 5))  # an occupancy change must hold this long
+    MOVEMENT_THRESHOLD_KG = float(os.getenv('MOVEMENT_THRESHOLD_KG', 1.0))  # load std of a restless second
+    PRESSURE_GRID_ROWS = int(os.getenv('PRESSURE_GRID_ROWS', 16))  # mat cells head to foot, when a reading has no pressureRows
+    PRESSURE_GRID_COLS = int(os.getenv('PRESSURE_GRID_COLS', 8))  # mat cells across, when a reading has no pressureCols
+    PRESSURE_SAMPLE_RATE = float(os.getenv('PRESSURE_SAMPLE_RATE', 10))  # frames/s, when a reading has no pressureRate
+    PRESSURE_OUTPUT_RATE = float(os.getenv('PRESSURE_OUTPUT_RATE', 1))  # pressure map rows stored per second
+    PRESSURE_HEATMAP_ROWS = int(os.getenv('PRESSURE_HEATMAP_ROWS', 8))
+    PRESSURE_HEATMAP_COLS = int(os.getenv('PRESSURE_HEATMAP_COLS', 4))
+    PRESSURE_CONTACT_LEVEL = float(os.getenv('PRESSURE_CONTACT_LEVEL', 5))  # cell reading below this is no contact
+    TURN_SHIFT = float(os.getenv('TURN_SHIFT', 0.1))  # settled COP move of a turn, fraction of the mat
     
     # ESP32 Communication
     SERIAL_PORT = os.getenv('SERIAL_PORT', '/dev/ttyUSB0')
@@ -62,13 +147,26 @@ class Config:
     
     BAD_POSTURE_ANGLE = float(os.getenv('BAD_POSTURE_ANGLE', 30))
     POOR_POSTURE_ANGLE = float(os.getenv('POOR_POSTURE_ANGLE', 15))
+    NECK_ALERT_ANGLE = float(os.getenv('NECK_ALERT_ANGLE', 40))
+    LOUD_SNORE_INTENSITY = float(os.getenv('LOUD_SNORE_INTENSITY', 80))  # %
+    MODERATE_SNORE_INTENSITY = float(os.getenv('MODERATE_SNORE_INTENSITY', 60))  # %
+    HIGH_SNORE_FREQUENCY = float(os.getenv('HIGH_SNORE_FREQUENCY', 50))  # Hz (the snore `frequency` field)
+    HIGH_SNORE_RATE = float(os.getenv('HIGH_SNORE_RATE', 15))  # snores per minute (the snore `rate` field)
+    EXTENDED_SNORING_MINUTES = int(os.getenv('EXTENDED_SNORING_MINUTES', 30))
+    ALERT_HYSTERESIS = float(os.getenv('ALERT_HYSTERESIS', 0.05))  # clear this fraction back past the threshold
+    ALERT_MIN_SECONDS = int(os.getenv('ALERT_MIN_SECONDS', 30))  # condition must hold this long to raise
+    ALERT_COOLDOWN_SECONDS = int(os.getenv('ALERT_COOLDOWN_SECONDS', 300))  # no re-raise this soon after clearing
     
     # Sleep session settings
-    SLEEP_DETECTION_WEIGHT_THRESHOLD = float(os.getenv('SLEEP_DETECTION_WEIGHT_THRESHOLD', 30))
+    SLEEP_DETECTION_WEIGHT_THRESHOLD = float(os.getenv('SLEEP_DETECTION_WEIGHT_THRESHOLD', 30))  # kg: in bed, for occupancy and sessions
     INACTIVITY_SLEEP_THRESHOLD = int(os.getenv('INACTIVITY_SLEEP_THRESHOLD', 900))  # 15 minutes
+    SLEEP_SESSION_EXIT_SECONDS = int(os.getenv('SLEEP_SESSION_EXIT_SECONDS', 600))  # out of bed this long ends the session
+    SLEEP_EPOCH_SECONDS = int(os.getenv('SLEEP_EPOCH_SECONDS', 30))  # sleep stage scoring interval
+    SLEEP_MOTION_THRESHOLD = float(os.getenv('SLEEP_MOTION_THRESHOLD', 10))  # deg/s (or roll change) that counts as moving
     
     # Data retention (days)
     DATA_RETENTION_DAYS = int(os.getenv('DATA_RETENTION_DAYS', 90))
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')  # cold storage for rows past retention
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -81,8 +179,11 @@ class ProductionConfig(Config):
     SIMULATION_MODE = False
     SECRET_KEY = os.getenv('SECRET_KEY')  # Must be set in production
     
-    if not SECRET_KEY:
-        raise ValueError("SECRET_KEY must be set in production environment")
+    @classmethod
+    def validate(cls):
+        """Fail fast when production settings are incomplete"""
+        if not cls.SECRET_KEY:
+            raise ValueError("SECRET_KEY must be set in production environment")
 
 class TestingConfig(Config):
     """Testing configuration"""
@@ -0,0 +1,17 @@
+# database/__init__.py
+"""
+Database module for Sleep Monitoring Backend
+Shared SQLite connection layer and maintenance helpers
+"""
+
+from .connection import ConnectionManager, get_db, configure_database, db_timestamp
+from .writer import WriteBehindWriter, WriteQueueFull, get_writer
+from .rollups import record_rollup, choose_resolution, get_rollup_history
+from .executor import ReadExecutor, ReadPoolBusy, get_read_executor
+
+__all__ = [
+    'ConnectionManager', 'get_db', 'configure_database', 'db_timestamp',
+    'WriteBehindWriter', 'WriteQueueFull', 'get_writer',
+    'record_rollup', 'choose_resolution', 'get_rollup_history',
+    'ReadExecutor', 'ReadPoolBusy', 'get_read_executor'
+]
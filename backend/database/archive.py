@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+database/archive.py - Tiered Cold Storage for Sensor Data
+Moves expired rows into per-day columnar segment files and reads them memory-mapped
+
+Segment layout:
+    <ARCHIVE_DIR>/<table>/<YYYY-MM-DD>/            default bed
+    <ARCHIVE_DIR>/devices/<id>/<table>/<YYYY-MM-DD>/ every other bed
+        meta.json          row count, column dtypes, dictionaries for dictionary-encoded columns
+        <column>.npy       one uncompressed NumPy array per column (memory-mappable)
+
+Columns are stored with the narrowest dtype that holds them and repetitive text
+columns are dictionary-encoded, so segments stay small without losing the ability to
+mmap them. Free text (alert messages and details) is stored as fixed-width strings.
+"""
+
+import json
+import os
+import shutil
+import logging
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from config import Config
+from database.connection import get_db, db_timestamp
+
+logger = logging.getLogger(__name__)
+
+# table -> [(column, dtype)]; dtype 'dict' means dictionary-encoded text, 'text' plain strings
+ARCHIVE_TABLES = {
+    'heart_rate': [
+        ('rate', 'int16'), ('status', 'dict'), ('min_rate', 'int16'), ('max_rate', 'int16'),
+        ('average_rate', 'float32'), ('variability', 'float32'),
+    ],
+    'heart_beats': [
+        ('rr_ms', 'float32'),
+    ],
+    'breathing': [
+        ('rate', 'int16'), ('rhythm', 'dict'), ('apnea_events', 'int16'),
+    ],
+    'gyroscope': [
+        ('pitch', 'float32'), ('roll', 'float32'), ('neck_angle', 'float32'),
+        ('position', 'dict'), ('posture_severity', 'dict'),
+    ],
+    'weight': [
+        ('weight', 'float32'), ('is_in_bed', 'uint8'),
+    ],
+    'pressure_map': [
+        ('cop_x', 'float32'), ('cop_y', 'float32'), ('load', 'float32'), ('turned', 'uint8'),
+    ],
+    'snore_detection': [
+        ('is_detected', 'uint8'), ('frequency', 'float32'), ('rate', 'float32'), ('duration_minutes', 'int16'),
+    ],
+    'sleep_stages': [
+        ('stage', 'dict'), ('confidence', 'float32'), ('in_bed', 'uint8'), ('heart_rate', 'float32'),
+        ('breathing_rate', 'float32'), ('activity', 'float32'),
+    ],
+    'system_events': [
+        ('event_type', 'dict'), ('description', 'text'), ('severity', 'dict'), ('data', 'text'),
+    ],
+}
+
+META_FILE = 'meta.json'
+
+def _column_array(values, dtype):
+    """Build a column array; returns (array, dictionary or None)"""
+    if dtype == 'dict':
+        dictionary = sorted({value for value in values if value is not None})
+        codes = {value: index for index, value in enumerate(dictionary)}
+        # -1 marks NULL
+        code_dtype = np.int16 if len(dictionary) < np.iinfo(np.int16).max else np.int32
+        return np.array([codes.get(value, -1) for value in values], dtype=code_dtype), dictionary
+    if dtype == 'text':
+        # '' marks NULL
+        return np.array(['' if value is None else value for value in values], dtype=np.str_), None
+
+    np_dtype = np.dtype(dtype)
+    missing = np.nan if np_dtype.kind == 'f' else 0
+    return np.array([missing if value is None else value for value in values], dtype=np_dtype), None
+
+def _write_segment(path, table, columns):
+    """Write a segment directory; merges with an existing segment for the same day"""
+    if os.path.exists(os.path.join(path, META_FILE)):
+        # Merge with the day already on disk, skipping ids it holds
+        # (a previous run may have written the segment but died before deleting)
+        existing = SegmentReader(path)
+        old = {name: existing.decoded(name).tolist() for name in columns}
+        seen = set(old['id'])
+        fresh = [i for i, row_id in enumerate(columns['id']) if row_id not in seen]
+        merged = {name: old[name] + [columns[name][i] for i in fresh] for name in columns}
+        order = sorted(range(len(merged['id'])), key=lambda i: (merged['timestamp_ms'][i], merged['id'][i]))
+        columns = {name: [values[i] for i in order] for name, values in merged.items()}
+
+    staging = path + '.new'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    meta = {'table': table, 'rows': int(len(columns['id'])), 'columns': {}, 'dictionaries': {}}
+    specs = [('id', 'int64'), ('timestamp_ms', 'int64')] + ARCHIVE_TABLES[table]
+    for name, dtype in specs:
+        array, dictionary = _column_array(columns[name], dtype)
+        np.save(os.path.join(staging, f'{name}.npy'), array)
+        meta['columns'][name] = str(array.dtype)
+        if dictionary is not None:
+            meta['dictionaries'][name] = dictionary
+
+    # meta.json is written last; readers ignore directories without it
+    with open(os.path.join(staging, META_FILE), 'w') as f:
+        json.dump(meta, f)
+
+    retired = path + '.old'
+    if os.path.exists(path):
+        os.replace(path, retired)
+    os.replace(staging, path)
+    shutil.rmtree(retired, ignore_errors=True)
+    return meta['rows']
+
+def device_archive_dir(device_id, archive_dir=None):
+    """Archive directory of one bed (the default bed keeps the top level)"""
+    from database.devices import DEFAULT_DEVICE, validate_device_id
+    archive_dir = archive_dir or Config.ARCHIVE_DIR
+    if device_id == DEFAULT_DEVICE:
+        return archive_dir
+    return os.path.join(archive_dir, 'devices', validate_device_id(device_id))
+
+def archive_all_devices(days_to_keep=None, archive_dir=None):
+    """archive_old_data for every bed, each into its own directory"""
+    from database.devices import get_device_store, list_devices
+    return {
+        device_id: archive_old_data(days_to_keep, device_archive_dir(device_id, archive_dir),
+                                    db=get_device_store(device_id, create=False).db)
+        for device_id in list_devices()
+    }
+
+def archive_old_data(days_to_keep=None, archive_dir=None, db=None):
+    """Move rows older than days_to_keep into day segments, then delete them from SQLite"""
+    days_to_keep = Config.DATA_RETENTION_DAYS if days_to_keep is None else days_to_keep
+    archive_dir = archive_dir or Config.ARCHIVE_DIR
+    db = db or get_db()
+    cutoff = db_timestamp(datetime.now(timezone.utc) - timedelta(days=days_to_keep))
+
+    archived_counts = {}
+    try:
+        for table, spec in ARCHIVE_TABLES.items():
+            names = ['id', 'timestamp'] + [name for name, _ in spec]
+            days = [row[0] for row in db.query(
+                f'SELECT DISTINCT date(timestamp) FROM {table} WHERE timestamp < ? ORDER BY 1', (cutoff,)
+            )]
+
+            archived_counts[table] = 0
+            for day in days:
+                start = f'{day} 00:00:00'
+                end = db_timestamp(datetime.fromisoformat(start).replace(tzinfo=timezone.utc) + timedelta(days=1))
+
+                # One transaction per day: rows only leave SQLite once their segment is on disk
+                with db.transaction() as conn:
+                    rows = conn.execute(f'''
+                        SELECT {', '.join(names)} FROM {table}
+                        WHERE timestamp >= ? AND timestamp < ? AND timestamp < ?
+                        ORDER BY timestamp, id
+                    ''', (start, end, cutoff)).fetchall()
+                    if not rows:
+                        continue
+
+                    columns = {name: [row[i] for row in rows] for i, name in enumerate(names)}
+                    columns['timestamp_ms'] = [
+                        int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp() * 1000)
+                        for value in columns.pop('timestamp')
+                    ]
+                    _write_segment(os.path.join(archive_dir, table, day), table, columns)
+
+                    conn.execute(f'''
+                        DELETE FROM {table}
+                        WHERE timestamp >= ? AND timestamp < ? AND timestamp < ?
+                    ''', (start, end, cutoff))
+                archived_counts[table] += len(rows)
+
+        total = sum(archived_counts.values())
+        logger.info(f"🧊 Archived {total} rows older than {days_to_keep} days to {archive_dir}")
+        return {
+            'success': True,
+            'days_kept': days_to_keep,
+            'archive_dir': archive_dir,
+            'archived_counts': archived_counts,
+            'total_archived': total
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Archiving failed: {e}")
+        return {'success': False, 'error': str(e), 'archived_counts': archived_counts}
+
+class SegmentReader:
+    """One archived day of one table, opened memory-mapped"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.table = meta['table']
+        self.rows = meta['rows']
+        self.column_names = list(meta['columns'])
+        self.dictionaries = meta['dictionaries']
+        self._arrays = {}
+
+    def column(self, name):
+        """Raw column array (memory-mapped; dictionary columns hold integer codes)"""
+        array = self._arrays.get(name)
+        if array is None:
+            array = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+            self._arrays[name] = array
+        return array
+
+    def decoded(self, name, rows=slice(None)):
+        """Column values with dictionary codes mapped back to text"""
+        if name not in self.column_names:
+            # Columns added after this segment was written read as NULL
+            return np.full(len(range(self.rows)[rows]), None, dtype=object)
+        array = self.column(name)[rows]
+        dictionary = self.dictionaries.get(name)
+        if dictionary is None:
+            if array.dtype.kind == 'U':
+                return np.array([value or None for value in array.tolist()], dtype=object)
+            return np.asarray(array)
+        lookup = np.array(dictionary + [None], dtype=object)
+        return lookup[np.asarray(array)]
+
+    def time_slice(self, start_ms=None, end_ms=None):
+        """Row slice covering [start_ms, end_ms) using the sorted timestamp column"""
+        timestamps = self.column('timestamp_ms')
+        lo = 0 if start_ms is None else int(np.searchsorted(timestamps, start_ms, 'left'))
+        hi = self.rows if end_ms is None else int(np.searchsorted(timestamps, end_ms, 'left'))
+        return slice(lo, hi)
+
+class ArchiveReader:
+    """Read-only access to the archive without loading it into RAM"""
+
+    def __init__(self, archive_dir=None):
+        self.archive_dir = archive_dir or Config.ARCHIVE_DIR
+
+    def list_days(self, table):
+        table_dir = os.path.join(self.archive_dir, table)
+        if not os.path.isdir(table_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(table_dir)
+            if os.path.exists(os.path.join(table_dir, name, META_FILE))
+        )
+
+    def open_segment(self, table, day):
+        return SegmentReader(os.path.join(self.archive_dir, table, day))
+
+    def scan(self, table, start_ms=None, end_ms=None, columns=None):
+        """Yield {column: array} chunks (one per day) for rows in [start_ms, end_ms)"""
+        start_day = _day_of(start_ms) if start_ms is not None else None
+        end_day = _day_of(end_ms) if end_ms is not None else None
+
+        for day in self.list_days(table):
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            segment = self.open_segment(table, day)
+            rows = segment.time_slice(start_ms, end_ms)
+            if rows.start >= rows.stop:
+                continue
+            names = columns or segment.column_names
+            yield {name: segment.decoded(name, rows) for name in names}
+
+    def summary(self):
+        """Row counts and on-disk size per table"""
+        tables = {}
+        for table in ARCHIVE_TABLES:
+            days = self.list_days(table)
+            rows, size = 0, 0
+            for day in days:
+                segment_dir = os.path.join(self.archive_dir, table, day)
+                rows += self.open_segment(table, day).rows
+                size += sum(entry.stat().st_size for entry in os.scandir(segment_dir))
+            tables[table] = {'days': len(days), 'rows': rows, 'size_bytes': size}
+        return tables
+
+def _day_of(epoch_ms):
+    return datetime.fromtimestamp(epoch_ms / 1000, timezone.utc).strftime('%Y-%m-%d')
+
+__all__ = [
+    'ARCHIVE_TABLES',
+    'archive_old_data',
+    'archive_all_devices',
+    'device_archive_dir',
+    'SegmentReader',
+    'ArchiveReader',
+]
+
+if __name__ == '__main__':
+    import argparse
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Archive old sensor rows to columnar segments')
+    parser.add_argument('--days', type=int, default=Config.DATA_RETENTION_DAYS, help='days to keep in SQLite')
+    parser.add_argument('--archive-dir', default=Config.ARCHIVE_DIR)
+    args = parser.parse_args()
+    print(json.dumps(archive_all_devices(args.days, args.archive_dir), indent=2))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+database/connection.py - Shared SQLite Connection Layer
+Keeps one long-lived, tuned connection per thread for every service
+"""
+
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class ConnectionManager:
+    """Per-thread SQLite connections with WAL journaling and a statement cache"""
+
+    def __init__(self, db_path=None, journal_mode=None, synchronous=None,
+                 cached_statements=None, busy_timeout_ms=None):
+        self.db_path = db_path or Config.DATABASE_PATH
+        self.journal_mode = (journal_mode or Config.DB_JOURNAL_MODE).upper()
+        self.synchronous = (synchronous or Config.DB_SYNCHRONOUS).upper()
+        self.cached_statements = cached_statements or Config.DB_CACHED_STATEMENTS
+        self.busy_timeout_ms = busy_timeout_ms or Config.DB_BUSY_TIMEOUT_MS
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def _connect(self):
+        """Open and tune a new connection for the calling thread"""
+        database, uri = self.db_path, False
+        if database == ':memory:':
+            # Let every thread see the same in-memory database
+            database, uri = 'file:sensor_data_memdb?mode=memory&cache=shared', True
+
+        # isolation_level=None keeps single statements in autocommit mode;
+        # multi-statement work goes through transaction()
+        conn = sqlite3.connect(
+            database,
+            uri=uri,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            cached_statements=self.cached_statements,
+            check_same_thread=False
+        )
+        if not uri:
+            conn.execute(f'PRAGMA journal_mode={self.journal_mode}')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+
+        with self._lock:
+            self._connections.append(conn)
+
+        logger.debug(f"🗄️ Opened SQLite connection ({self.journal_mode}, synchronous={self.synchronous})")
+        return conn
+
+    def connection(self):
+        """Get the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql, params=()):
+        """Run one statement (committed immediately unless inside transaction())"""
+        return self.connection().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        """Run one statement for many parameter sets in a single transaction"""
+        with self.transaction() as conn:
+            return conn.executemany(sql, seq_of_params)
+
+    def query(self, sql, params=()):
+        """Run a SELECT and return all rows"""
+        return self.connection().execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        """Run a SELECT and return the first row (or None)"""
+        return self.connection().execute(sql, params).fetchone()
+
+    @contextmanager
+    def transaction(self):
+        """Group statements into one transaction; nested calls join the outer one"""
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def close(self):
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+
+    def close_all(self):
+        """Close every connection opened by this manager"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.error(f"❌ Error closing database connection: {e}")
+        self._local = threading.local()
+
+def db_timestamp(when=None):
+    """Format a datetime the way SQLite's CURRENT_TIMESTAMP does (UTC, whole seconds)"""
+    when = when or datetime.now(timezone.utc)
+    return when.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_db():
+    """Get the process-wide connection manager"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ConnectionManager()
+    return _manager
+
+def configure_database(db_path=None, **options):
+    """Replace the process-wide connection manager (e.g. for another database file)"""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close_all()
+        _manager = ConnectionManager(db_path, **options)
+    return _manager
+
+__all__ = [
+    'ConnectionManager',
+    'get_db',
+    'configure_database',
+    'db_timestamp',
+]
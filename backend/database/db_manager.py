@@ -193,46 +193,38 @@ def get_database_info(db_name='sensor_data.db'):
         logger.error(f"❌ Database info error: {e}")
         return {'error': str(e)}
 
-def cleanup_old_data(days_to_keep=30, db_name='sensor_data.db'):
-    """Clean up old data from database (keep only recent data)"""
+def cleanup_old_data(days_to_keep=30, db_name=None, archive=True):
+    """Clean up old data from every bed's database (keep only recent data)
+
+    With archive=True, sensor readings are moved to columnar segment files
+    (see database/archive.py) before they are removed from SQLite. Each bed
+    archives into its own directory, so their row ids never mix. The default
+    bed's file is DATABASE_PATH unless db_name names one under database/.
+    """
     try:
-        db_path = os.path.join('database', db_name)
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Delete old records from each table
-        tables_to_clean = [
-            'heart_rate', 'breathing', 'gyroscope', 
-            'weight', 'snore_detection', 'device_logs', 
-            'led_logs', 'system_events'
-        ]
-        
-        deleted_counts = {}
-        
-        for table in tables_to_clean:
-            cursor.execute(f'''
-                DELETE FROM {table} 
-                WHERE timestamp < datetime('now', '-{days_to_keep} days')
-            ''')
-            deleted_counts[table] = cursor.rowcount
-        
-        # Keep sleep sessions for longer (90 days)
-        cursor.execute('''
-            DELETE FROM sleep_sessions 
-            WHERE timestamp < datetime('now', '-90 days')
-        ''')
-        deleted_counts['sleep_sessions'] = cursor.rowcount
-        
-        conn.commit()
-        conn.close()
-        
-        total_deleted = sum(deleted_counts.values())
-        logger.info(f"🧹 Database cleanup completed: {total_deleted} old records deleted")
+        from database.archive import device_archive_dir
+        from database.connection import get_db
+        from database.devices import DEFAULT_DEVICE, device_db_path, list_devices
+        
+        devices = {}
+        for device_id in list_devices():
+            if device_id != DEFAULT_DEVICE:
+                db_path = device_db_path(device_id)
+            else:
+                db_path = os.path.join('database', db_name) if db_name else get_db().db_path
+            if not os.path.exists(db_path):
+                continue
+            archived_counts, deleted_counts = _cleanup_database(db_path, days_to_keep, archive,
+                                                                device_archive_dir(device_id))
+            devices[device_id] = {'archived_counts': archived_counts, 'deleted_counts': deleted_counts}
+        
+        total_deleted = sum(sum(device['deleted_counts'].values()) for device in devices.values())
+        logger.info(f"🧹 Database cleanup completed: {total_deleted} old records deleted ({len(devices)} beds)")
         
         return {
             'success': True,
             'days_kept': days_to_keep,
-            'deleted_counts': deleted_counts,
+            'devices': devices,
             'total_deleted': total_deleted
         }
         
@@ -240,6 +232,58 @@ def cleanup_old_data(days_to_keep=30, db_name='sensor_data.db'):
         logger.error(f"❌ Database cleanup failed: {e}")
         return {'success': False, 'error': str(e)}
 
+def _cleanup_database(db_path, days_to_keep, archive, archive_dir):
+    """Archive and delete old rows of one database file; returns (archived, deleted) counts"""
+    archived_counts = {}
+    if archive:
+        from database.archive import archive_old_data
+        from database.connection import ConnectionManager
+        
+        archive_db = ConnectionManager(db_path)
+        try:
+            result = archive_old_data(days_to_keep, archive_dir, db=archive_db)
+        finally:
+            archive_db.close_all()
+        if not result['success']:
+            # Never delete readings that could not be archived
+            raise RuntimeError(f"archiving {db_path} failed: {result['error']}")
+        archived_counts = result['archived_counts']
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    # Delete old records from each table
+    tables_to_clean = [
+        'heart_rate', 'breathing', 'gyroscope', 
+        'weight', 'snore_detection', 'device_logs', 
+        'led_logs', 'system_events'
+    ]
+    
+    # Bed partitions use the database_init schema, which has no device/LED logs
+    existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    
+    deleted_counts = {}
+    
+    for table in tables_to_clean:
+        if table not in existing:
+            continue
+        cursor.execute(f'''
+            DELETE FROM {table} 
+            WHERE timestamp < datetime('now', '-{days_to_keep} days')
+        ''')
+        deleted_counts[table] = cursor.rowcount
+    
+    # Keep sleep sessions for longer (90 days)
+    cursor.execute('''
+        DELETE FROM sleep_sessions 
+        WHERE timestamp < datetime('now', '-90 days')
+    ''')
+    deleted_counts['sleep_sessions'] = cursor.rowcount
+    
+    conn.commit()
+    conn.close()
+    return archived_counts, deleted_counts
+
 def backup_database(db_name='sensor_data.db'):
     """Create a backup of the database"""
     try:
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+database/devices.py - Per-Device Storage Partitions
+Each bed (device) gets its own SQLite file, write-behind writer and rollup
+accumulator, so ingest for one bed never waits on another bed's write lock
+
+The default device is the original single-bed setup: it uses DATABASE_PATH and
+the process-wide get_db()/get_writer()/get_rollups(). Every other device lives in
+DEVICE_DATA_DIR/<device_id>.db with the same schema.
+"""
+
+import atexit
+import os
+import re
+import threading
+import logging
+
+from config import Config
+from database.connection import ConnectionManager, get_db
+from database.writer import WriteBehindWriter, get_writer
+from database.rollups import RollupAccumulator, get_rollups
+from database_init import init_all_databases
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEVICE = 'default'
+DEVICE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+class UnknownDevice(Exception):
+    """Raised for a device id that is malformed, not registered, or over MAX_DEVICES"""
+
+def validate_device_id(device_id):
+    """Raise UnknownDevice unless device_id is safe to use as a file name"""
+    if not isinstance(device_id, str) or not DEVICE_ID_PATTERN.match(device_id):
+        raise UnknownDevice(f'Invalid device id: {device_id!r} (use 1-32 letters, digits, _ or -)')
+    return device_id
+
+def device_db_path(device_id, data_dir=None):
+    """SQLite file holding one (non-default) device's readings"""
+    return os.path.join(data_dir or Config.DEVICE_DATA_DIR, f'{validate_device_id(device_id)}.db')
+
+class DeviceStore:
+    """Storage of one device: connection manager, writer and rollups bound to its file"""
+
+    def __init__(self, device_id, db=None, writer=None, rollups=None):
+        self.device_id = device_id
+        # None means the process-wide default, looked up on use so that
+        # configure_database() still takes effect for the default device
+        self._db = db
+        self._writer = writer
+        self._rollups = rollups
+
+    @property
+    def db(self):
+        return self._db or get_db()
+
+    @property
+    def writer(self):
+        return self._writer or get_writer()
+
+    @property
+    def rollups(self):
+        return self._rollups or get_rollups()
+
+    @classmethod
+    def open(cls, device_id, data_dir=None):
+        """Open (creating if needed) the partition of a non-default device"""
+        path = device_db_path(device_id, data_dir)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        is_new = not os.path.exists(path)
+
+        db = ConnectionManager(path)
+        writer = WriteBehindWriter(db=db)
+        rollups = RollupAccumulator()
+        writer.add_flush_hook(rollups.flush)
+        atexit.register(writer.stop)
+
+        init_all_databases(db)
+        if is_new:
+            logger.info(f"🛏️ Created storage for device {device_id} ({path})")
+        return cls(device_id, db, writer, rollups)
+
+    def get_stats(self):
+        stats = self.writer.get_stats()
+        stats['path'] = self.db.db_path
+        return stats
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_device_store(device_id=None, create=True):
+    """Get a device's storage; create=False only opens devices that already have data"""
+    device_id = device_id or DEFAULT_DEVICE
+    store = _stores.get(device_id)
+    if store is not None:
+        return store
+
+    with _stores_lock:
+        store = _stores.get(device_id)
+        if store is not None:
+            return store
+        if device_id == DEFAULT_DEVICE:
+            store = DeviceStore(DEFAULT_DEVICE)
+        else:
+            if not create and not os.path.exists(device_db_path(device_id)):
+                raise UnknownDevice(f'Unknown device: {device_id}')
+            if len([d for d in _stores if d != DEFAULT_DEVICE]) >= Config.MAX_DEVICES:
+                raise UnknownDevice(f'Device limit reached ({Config.MAX_DEVICES} devices)')
+            store = DeviceStore.open(device_id)
+        _stores[device_id] = store
+    return store
+
+def list_devices(data_dir=None):
+    """Ids of the default device plus every device with a partition on disk"""
+    data_dir = data_dir or Config.DEVICE_DATA_DIR
+    devices = {DEFAULT_DEVICE} | set(_stores)
+    if os.path.isdir(data_dir):
+        for name in os.listdir(data_dir):
+            device_id, ext = os.path.splitext(name)
+            if ext == '.db' and DEVICE_ID_PATTERN.match(device_id):
+                devices.add(device_id)
+    return sorted(devices)
+
+__all__ = [
+    'DEFAULT_DEVICE',
+    'UnknownDevice',
+    'validate_device_id',
+    'device_db_path',
+    'DeviceStore',
+    'get_device_store',
+    'list_devices',
+]
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+database/executor.py - Database Read Executor
+Runs history queries on a small fixed pool of reader threads instead of the
+request threads, with a bounded backlog
+
+The server's request threads stay free for ingest and cheap dashboard reads: at
+most DB_READ_WORKERS queries run at once, at most DB_READ_MAX_PENDING wait, and
+anything beyond that is refused straight away (503) instead of queueing up behind
+a burst of long-range history requests. Reader threads keep their long-lived
+connections (one per thread, see connection.py).
+"""
+
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class ReadPoolBusy(Exception):
+    """Raised when a read can't be queued (backlog full) or doesn't finish in time"""
+
+class ReadExecutor:
+    """Fixed pool of reader threads with a bounded number of waiting reads"""
+
+    def __init__(self, workers=None, max_pending=None, timeout=None):
+        self.workers = workers or Config.DB_READ_WORKERS
+        self.max_pending = max_pending if max_pending is not None else Config.DB_READ_MAX_PENDING
+        self.timeout = timeout or Config.DB_READ_TIMEOUT
+
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='db-read')
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+        self.stats = {'completed': 0, 'failed': 0, 'rejected': 0, 'timeouts': 0}
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue a read; returns its concurrent.futures.Future
+
+        Async callers can await it with asyncio.wrap_future().
+        """
+        if not self._slots.acquire(blocking=False):
+            self.stats['rejected'] += 1
+            raise ReadPoolBusy(f"Read pool busy ({self.workers} running, {self.max_pending} waiting)")
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """Run a read on the pool and wait for its result (up to DB_READ_TIMEOUT)"""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            self.stats['timeouts'] += 1
+            raise ReadPoolBusy(f"Read did not finish within {self.timeout}s")
+
+    def _done(self, future):
+        self._slots.release()
+        if future.cancelled() or future.exception() is not None:
+            self.stats['failed'] += 1
+        else:
+            self.stats['completed'] += 1
+
+    def get_stats(self):
+        return dict(self.stats, workers=self.workers, maxPending=self.max_pending)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_read_executor():
+    """Get the process-wide database read executor"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ReadExecutor()
+                logger.info(f"🗄️ Read executor ready ({_executor.workers} reader threads)")
+    return _executor
+
+__all__ = [
+    'ReadExecutor',
+    'ReadPoolBusy',
+    'get_read_executor',
+]
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+database/queries.py - Time-Range Queries for Sensor Tables
+Every sensor table carries an integer ts_ms column (epoch milliseconds, UTC) with its
+own index; all history/stats reads go through range_scan so they stay index range scans
+"""
+
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+
+from database.connection import get_db
+
+logger = logging.getLogger(__name__)
+
+TIME_KEY = 'ts_ms'
+SENSOR_TABLES = ('heart_rate', 'heart_beats', 'breathing', 'gyroscope', 'weight', 'pressure_map', 'snore_detection',
+                 'sleep_stages', 'system_events')
+
+# API sensor name -> (table, ((api field, column), ...)) for raw history pages and exports
+HISTORY_FIELDS = {
+    'heart_rate': ('heart_rate', (
+        ('rate', 'rate'), ('status', 'status'), ('min', 'min_rate'), ('max', 'max_rate'),
+        ('average', 'average_rate'), ('variability', 'variability'),
+    )),
+    'breathing': ('breathing', (
+        ('rate', 'rate'), ('rhythm', 'rhythm'), ('apneaEvents', 'apnea_events'),
+    )),
+    'gyroscope': ('gyroscope', (
+        ('pitch', 'pitch'), ('roll', 'roll'), ('neckAngle', 'neck_angle'),
+        ('position', 'position'), ('postureSeverity', 'posture_severity'),
+    )),
+    'weight': ('weight', (
+        ('weight', 'weight'), ('is_in_bed', 'is_in_bed'),
+    )),
+    'pressure': ('pressure_map', (
+        ('copX', 'cop_x'), ('copY', 'cop_y'), ('load', 'load'), ('turned', 'turned'),
+    )),
+    'snore': ('snore_detection', (
+        ('isDetected', 'is_detected'), ('frequency', 'frequency'), ('duration_minutes', 'duration_minutes'),
+    )),
+    'sleep': ('sleep_stages', (
+        ('stage', 'stage'), ('confidence', 'confidence'), ('inBed', 'in_bed'), ('heartRate', 'heart_rate'),
+        ('breathingRate', 'breathing_rate'), ('activity', 'activity'),
+    )),
+}
+
+def epoch_ms(when=None):
+    """Epoch milliseconds for a datetime (naive = local time) or now"""
+    if when is None:
+        return int(time.time() * 1000)
+    return int(when.timestamp() * 1000)
+
+def hours_ago_ms(hours):
+    """Epoch milliseconds `hours` before now"""
+    return int((time.time() - hours * 3600) * 1000)
+
+def day_range_ms(day=None):
+    """[start, end) epoch milliseconds of a UTC day ('YYYY-MM-DD', default today)"""
+    if day is None:
+        start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        start = datetime.strptime(day, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    end = start + timedelta(days=1)
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+def build_range_query(table, columns, start_ms=None, end_ms=None, order='DESC',
+                      limit=None, group_by=None, after=None, where=None):
+    """Build (sql, params) for a ts_ms range over one sensor table
+
+    start_ms is inclusive, end_ms exclusive. after is a (ts_ms, id) keyset
+    cursor: only rows past it in the requested order are returned. Columns,
+    group_by and where (an extra condition) are trusted identifiers/expressions
+    from the caller; all values are bound parameters.
+    """
+    if table not in SENSOR_TABLES:
+        raise ValueError(f'unknown sensor table: {table}')
+    if order not in ('ASC', 'DESC', None):
+        raise ValueError(f'invalid order: {order}')
+
+    conditions, params = [], []
+    if where:
+        conditions.append(where)
+    if start_ms is not None:
+        conditions.append(f'{TIME_KEY} >= ?')
+        params.append(int(start_ms))
+    if end_ms is not None:
+        conditions.append(f'{TIME_KEY} < ?')
+        params.append(int(end_ms))
+    if after is not None:
+        # Row-value comparison; id is the rowid, which every index already carries
+        conditions.append(f"({TIME_KEY}, id) {'<' if order == 'DESC' else '>'} (?, ?)")
+        params.extend(int(value) for value in after)
+
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    if group_by:
+        sql += f' GROUP BY {group_by}'
+    elif order:
+        sql += f' ORDER BY {TIME_KEY} {order}, id {order}'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(int(limit))
+    return sql, tuple(params)
+
+def range_scan(table, columns, start_ms=None, end_ms=None, order='DESC', limit=None,
+               group_by=None, after=None, where=None, db=None):
+    """Run a ts_ms range query and return all rows"""
+    sql, params = build_range_query(table, columns, start_ms, end_ms, order, limit, group_by, after, where)
+    return (db or get_db()).query(sql, params)
+
+def explain_range(table, columns, start_ms=None, end_ms=None, order='DESC', limit=None,
+                  group_by=None, after=None, where=None, db=None):
+    """EXPLAIN QUERY PLAN details for a range query (used to check index usage)"""
+    sql, params = build_range_query(table, columns, start_ms, end_ms, order, limit, group_by, after, where)
+    return [row[-1] for row in (db or get_db()).query(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+def encode_cursor(ts_ms, row_id):
+    """Opaque keyset cursor for the row a page ended on"""
+    return f'{ts_ms}.{row_id}'
+
+def decode_cursor(cursor):
+    """Parse a cursor from encode_cursor; raises ValueError when malformed"""
+    ts_ms, _, row_id = cursor.partition('.')
+    return int(ts_ms), int(row_id)
+
+def fetch_page(sensor, start_ms=None, end_ms=None, cursor=None, limit=500, order='DESC', db=None):
+    """One keyset page of raw rows; returns (rows as dicts, next cursor or None)"""
+    table, fields = HISTORY_FIELDS[sensor]
+    columns = [column for _, column in fields] + ['timestamp', TIME_KEY, 'id']
+    after = decode_cursor(cursor) if cursor else None
+
+    # Ask for one extra row to know whether another page exists
+    rows = range_scan(table, columns, start_ms, end_ms, order, limit + 1, after=after, db=db)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+
+    names = [name for name, _ in fields] + ['timestamp', TIME_KEY]
+    return [dict(zip(names, row)) for row in rows], next_cursor
+
+def iter_rows(sensor, start_ms=None, end_ms=None, order='ASC', page_size=1000, db=None):
+    """Yield raw rows as dicts, one keyset page at a time (memory stays at one page)"""
+    cursor = None
+    while True:
+        rows, cursor = fetch_page(sensor, start_ms, end_ms, cursor, page_size, order, db)
+        yield from rows
+        if cursor is None:
+            return
+
+def ensure_time_keys(cursor):
+    """Add, backfill and index ts_ms on sensor tables created before it existed"""
+    for table in SENSOR_TABLES:
+        columns = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+        if TIME_KEY not in columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {TIME_KEY} INTEGER')
+            cursor.execute(f'''
+                UPDATE {table}
+                SET {TIME_KEY} = CAST(strftime('%s', timestamp) AS INTEGER) * 1000
+                WHERE {TIME_KEY} IS NULL
+            ''')
+            logger.info(f"🗄️ Added {TIME_KEY} to {table} ({cursor.rowcount} rows backfilled)")
+
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{TIME_KEY} ON {table} ({TIME_KEY})')
+
+        # Rows inserted without ts_ms (older code paths) get it from their timestamp
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS fill_{table}_{TIME_KEY}
+            AFTER INSERT ON {table} WHEN NEW.{TIME_KEY} IS NULL
+            BEGIN
+                UPDATE {table}
+                SET {TIME_KEY} = CAST(strftime('%s', NEW.timestamp) AS INTEGER) * 1000
+                WHERE id = NEW.id;
+            END
+        ''')
+
+__all__ = [
+    'TIME_KEY',
+    'SENSOR_TABLES',
+    'HISTORY_FIELDS',
+    'epoch_ms',
+    'hours_ago_ms',
+    'day_range_ms',
+    'build_range_query',
+    'range_scan',
+    'explain_range',
+    'encode_cursor',
+    'decode_cursor',
+    'fetch_page',
+    'iter_rows',
+    'ensure_time_keys',
+]
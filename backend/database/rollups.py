@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+database/rollups.py - Minute/Hour Rollups for Sensor Series
+Keeps count/min/max/sum/sum-of-squares per bucket, updated as readings arrive
+"""
+
+import math
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+
+from config import Config
+from database.connection import get_db
+from database.writer import get_writer
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 3600
+RESOLUTIONS = {'minute': MINUTE, 'hour': HOUR}
+
+# series -> (raw table, {api field: raw column})
+ROLLUP_SERIES = {
+    'heart_rate': ('heart_rate', {'rate': 'rate', 'variability': 'variability'}),
+    'breathing': ('breathing', {'rate': 'rate', 'apneaEvents': 'apnea_events'}),
+    'gyroscope': ('gyroscope', {'pitch': 'pitch', 'roll': 'roll', 'neckAngle': 'neck_angle'}),
+    'weight': ('weight', {'weight': 'weight'}),
+    'pressure': ('pressure_map', {'copX': 'cop_x', 'copY': 'cop_y', 'turned': 'turned'}),
+    'snore': ('snore_detection', {'frequency': 'frequency', 'isDetected': 'is_detected'}),
+}
+
+# Fields where 0 means "no signal" rather than a measurement
+NO_SIGNAL_ZERO = {('heart_rate', 'rate'), ('breathing', 'rate')}
+
+CREATE_ROLLUPS_SQL = '''
+    CREATE TABLE IF NOT EXISTS sensor_rollups (
+        series TEXT NOT NULL,
+        field TEXT NOT NULL,
+        resolution INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        min_value REAL,
+        max_value REAL,
+        sum_value REAL,
+        sum_squares REAL,
+        PRIMARY KEY (series, field, resolution, bucket)
+    ) WITHOUT ROWID
+'''
+
+UPSERT_ROLLUP_SQL = '''
+    INSERT INTO sensor_rollups (series, field, resolution, bucket, count, min_value, max_value, sum_value, sum_squares)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (series, field, resolution, bucket) DO UPDATE SET
+        count = count + excluded.count,
+        min_value = MIN(min_value, excluded.min_value),
+        max_value = MAX(max_value, excluded.max_value),
+        sum_value = sum_value + excluded.sum_value,
+        sum_squares = sum_squares + excluded.sum_squares
+'''
+
+class RollupAccumulator:
+    """Pre-aggregates readings in memory and upserts them with each writer flush"""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def record(self, series, timestamp, values):
+        """Add one reading; timestamp is a datetime (naive = local) or epoch seconds"""
+        epoch = timestamp.timestamp() if isinstance(timestamp, datetime) else (timestamp or time.time())
+        with self._lock:
+            for field, value in values.items():
+                if value is None:
+                    continue
+                value = float(value)
+                for resolution in (MINUTE, HOUR):
+                    key = (series, field, resolution, int(epoch // resolution) * resolution)
+                    stats = self._pending.get(key)
+                    if stats is None:
+                        self._pending[key] = [1, value, value, value, value * value]
+                    else:
+                        stats[0] += 1
+                        stats[1] = min(stats[1], value)
+                        stats[2] = max(stats[2], value)
+                        stats[3] += value
+                        stats[4] += value * value
+
+    def flush(self, conn):
+        """Writer flush hook: upsert pending buckets inside the batch transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        try:
+            conn.executemany(UPSERT_ROLLUP_SQL, [key + tuple(stats) for key, stats in pending.items()])
+        except Exception:
+            # Put the aggregates back so the next flush retries them
+            with self._lock:
+                for key, stats in pending.items():
+                    current = self._pending.get(key)
+                    if current is None:
+                        self._pending[key] = stats
+                    else:
+                        self._pending[key] = [
+                            current[0] + stats[0], min(current[1], stats[1]), max(current[2], stats[2]),
+                            current[3] + stats[3], current[4] + stats[4]
+                        ]
+            raise
+
+_accumulator = None
+_accumulator_lock = threading.Lock()
+
+def get_rollups():
+    """Get the process-wide rollup accumulator (registered with the writer)"""
+    global _accumulator
+    if _accumulator is None:
+        with _accumulator_lock:
+            if _accumulator is None:
+                _accumulator = RollupAccumulator()
+                get_writer().add_flush_hook(_accumulator.flush)
+    return _accumulator
+
+def record_rollup(series, timestamp, values):
+    """Feed one reading into the minute/hour rollups"""
+    get_rollups().record(series, timestamp, values)
+
+def choose_resolution(hours):
+    """Pick raw/minute/hour so a chart of the requested range stays a few hundred rows"""
+    seconds = hours * 3600
+    if seconds <= Config.ROLLUP_RAW_MAX_SECONDS:
+        return 'raw'
+    if seconds / MINUTE <= Config.ROLLUP_MAX_POINTS:
+        return 'minute'
+    return 'hour'
+
+def get_rollup_history(series, hours, resolution=None, db=None):
+    """Read rollup buckets for the last `hours`, newest first, one dict per bucket"""
+    resolution = resolution or choose_resolution(hours)
+    if resolution == 'raw':
+        resolution = 'minute'
+    step = RESOLUTIONS[resolution]
+    since = int((time.time() - hours * 3600) // step) * step
+
+    try:
+        rows = (db or get_db()).query('''
+            SELECT bucket, field, count, min_value, max_value, sum_value, sum_squares
+            FROM sensor_rollups
+            WHERE series = ? AND resolution = ? AND bucket >= ?
+            ORDER BY bucket DESC
+        ''', (series, step, since))
+    except Exception as e:
+        logger.error(f"❌ Rollup history error ({series}): {e}")
+        return []
+
+    history = []
+    by_bucket = {}
+    for bucket, field, count, min_value, max_value, sum_value, sum_squares in rows:
+        entry = by_bucket.get(bucket)
+        if entry is None:
+            entry = {
+                'timestamp': datetime.fromtimestamp(bucket, timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                'resolution': resolution,
+                'count': count
+            }
+            by_bucket[bucket] = entry
+            history.append(entry)
+
+        mean = sum_value / count if count else 0
+        variance = max(sum_squares / count - mean * mean, 0) if count else 0
+        entry[field] = round(mean, 3)
+        entry[f'{field}_min'] = min_value
+        entry[f'{field}_max'] = max_value
+        entry[f'{field}_stddev'] = round(math.sqrt(variance), 3)
+        entry['count'] = max(entry['count'], count)
+
+    return history
+
+def backfill_rollups(db=None):
+    """Rebuild all rollups from the raw tables (used once when the rollup table is new)"""
+    db = db or get_db()
+    with db.transaction() as conn:
+        conn.execute('DELETE FROM sensor_rollups')
+        for series, (table, fields) in ROLLUP_SERIES.items():
+            for field, column in fields.items():
+                condition = f'{column} IS NOT NULL'
+                if (series, field) in NO_SIGNAL_ZERO:
+                    condition += f' AND {column} != 0'
+                for step in (MINUTE, HOUR):
+                    conn.execute(f'''
+                        INSERT INTO sensor_rollups
+                            (series, field, resolution, bucket, count, min_value, max_value, sum_value, sum_squares)
+                        SELECT ?, ?, ?, (CAST(strftime('%s', timestamp) AS INTEGER) / ?) * ? AS bucket,
+                               COUNT({column}), MIN({column}), MAX({column}),
+                               SUM({column}), SUM({column} * {column})
+                        FROM {table}
+                        WHERE {condition}
+                        GROUP BY bucket
+                    ''', (series, field, step, step, step))
+    logger.info("✅ Sensor rollups rebuilt from raw data")
+
+__all__ = [
+    'ROLLUP_SERIES',
+    'CREATE_ROLLUPS_SQL',
+    'RollupAccumulator',
+    'get_rollups',
+    'record_rollup',
+    'choose_resolution',
+    'get_rollup_history',
+    'backfill_rollups',
+]
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+database/writer.py - Write-Behind Ingest Queue
+Background thread that batches queued INSERTs into single transactions
+"""
+
+import atexit
+import queue
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+from config import Config
+from database.connection import get_db
+
+logger = logging.getLogger(__name__)
+
+class WriteQueueFull(Exception):
+    """Raised when a write cannot be queued before the enqueue timeout"""
+
+class _FlushRequest:
+    """Queue marker asking the writer to flush and signal completion"""
+    def __init__(self):
+        self.done = threading.Event()
+
+class _Batch:
+    """Queue item holding writes that must land in the same transaction"""
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+_STOP = object()
+
+class WriteBehindWriter:
+    """Bounded queue of (sql, params) writes flushed with executemany in batches"""
+
+    def __init__(self, db=None, max_queue=None, batch_size=None,
+                 flush_interval=None, enqueue_timeout=None):
+        self.db = db
+        self.max_queue = max_queue or Config.WRITE_QUEUE_SIZE
+        self.batch_size = batch_size or Config.WRITE_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else Config.WRITE_FLUSH_INTERVAL
+        self.enqueue_timeout = enqueue_timeout if enqueue_timeout is not None else Config.WRITE_ENQUEUE_TIMEOUT
+
+        # Unbounded; _acquire enforces max_queue so a batch can hold its slot while it fills
+        self._queue = queue.Queue()
+        self._space = threading.Condition()
+        self._used = 0  # queued writes plus slots held by open batches
+        self._thread = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._flush_hooks = []
+        self.stats = {
+            'queued': 0,
+            'written': 0,
+            'rejected': 0,
+            'failed': 0,
+            'batches': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    def start(self):
+        """Start the background writer thread (idempotent)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+                logger.info(f"🗄️ Write-behind writer started (batch={self.batch_size}, interval={self.flush_interval}s)")
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, sql, params=(), timeout=None):
+        """Queue one write; blocks up to the enqueue timeout when the queue is full"""
+        pending = getattr(self._local, 'batch', None)
+        if pending is not None:
+            pending.append((sql, params))
+            return
+        self._put((sql, params), 1, timeout)
+
+    @contextmanager
+    def batch(self, timeout=None):
+        """Collect writes made on this thread and queue them as one transaction
+
+        The batch's queue slot is taken on entry, so a full queue raises WriteQueueFull
+        before the caller changes any state, and the batch can't be refused after it.
+        """
+        if getattr(self._local, 'batch', None) is not None:
+            yield  # nested batch joins the outer one
+            return
+
+        self._acquire(timeout)
+        self._local.batch = []
+        try:
+            yield
+            items = self._local.batch
+        except BaseException:
+            self._release()
+            raise
+        finally:
+            self._local.batch = None
+
+        if items:
+            self._enqueue(_Batch(items), len(items))
+        else:
+            self._release()
+
+    def _put(self, item, count, timeout):
+        try:
+            self._acquire(timeout)
+        except WriteQueueFull:
+            self._count('rejected', count)
+            raise
+        self._enqueue(item, count)
+
+    def _acquire(self, timeout):
+        """Take one queue slot, waiting up to the enqueue timeout"""
+        if not self.is_running():
+            self.start()
+        with self._space:
+            if not self._space.wait_for(lambda: self._used < self.max_queue,
+                                        self.enqueue_timeout if timeout is None else timeout):
+                raise WriteQueueFull(f"Write queue full ({self.max_queue} pending writes)")
+            self._used += 1
+
+    def _release(self):
+        with self._space:
+            self._used -= 1
+            self._space.notify()
+
+    def _enqueue(self, item, count):
+        """Queue an item into a slot already taken"""
+        self._queue.put(item)
+        self._count('queued', count)
+
+    def _count(self, name, count):
+        # Request threads and the writer thread update the counters
+        with self._lock:
+            self.stats[name] += count
+
+    def add_flush_hook(self, hook):
+        """Run hook(conn) inside every batch transaction, after the queued rows"""
+        self._flush_hooks.append(hook)
+
+    def has_capacity(self):
+        """True when the queue can accept more writes without blocking"""
+        return self._used < self.max_queue
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written"""
+        if not self.is_running():
+            return True
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+
+    def stop(self, timeout=10):
+        """Drain the queue, write everything and stop the writer thread"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error(f"❌ Write-behind writer did not stop within {timeout}s ({self.pending()} writes pending)")
+        else:
+            logger.info(f"🗄️ Write-behind writer stopped ({self.stats['written']} rows written)")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['pending'] = self.pending()
+        stats['capacity'] = self.max_queue
+        return stats
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, markers, stopping = [], [], False
+
+            # Collect until the batch is full or the flush interval elapses
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, _FlushRequest):
+                    markers.append(item)
+                elif isinstance(item, _Batch):
+                    batch.extend(item.items)
+                    self._release()
+                else:
+                    batch.append(item)
+                    self._release()
+
+                if stopping or markers or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if stopping:
+                batch.extend(self._drain())
+
+            if batch:
+                self._write_batch(batch)
+            for marker in markers:
+                marker.done.set()
+            if stopping:
+                return
+
+    def _drain(self):
+        """Take everything still queued (used on shutdown)"""
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+            elif isinstance(item, _Batch):
+                items.extend(item.items)
+                self._release()
+            elif item is not _STOP:
+                items.append(item)
+                self._release()
+
+    def _write_batch(self, batch):
+        """Write a batch in one transaction, grouping rows by statement"""
+        grouped = {}
+        for sql, params in batch:
+            grouped.setdefault(sql, []).append(params)
+
+        db = self.db or get_db()
+        try:
+            with db.transaction() as conn:
+                for sql, rows in grouped.items():
+                    conn.executemany(sql, rows)
+                for hook in self._flush_hooks:
+                    hook(conn)
+            self._count('written', len(batch))
+            self._count('batches', 1)
+        except Exception as e:
+            # Retry statement by statement so one bad group doesn't lose the rest
+            logger.error(f"❌ Batch write failed ({len(batch)} rows), retrying per statement: {e}")
+            for sql, rows in grouped.items():
+                try:
+                    with db.transaction() as conn:
+                        conn.executemany(sql, rows)
+                    self._count('written', len(rows))
+                except Exception as group_error:
+                    self._count('failed', len(rows))
+                    logger.error(f"❌ Dropped {len(rows)} rows: {group_error}")
+            for hook in self._flush_hooks:
+                try:
+                    with db.transaction() as conn:
+                        hook(conn)
+                except Exception as hook_error:
+                    logger.error(f"❌ Flush hook failed: {hook_error}")
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """Get the process-wide write-behind writer"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = WriteBehindWriter()
+                atexit.register(_writer.stop)
+    return _writer
+
+__all__ = [
+    'WriteBehindWriter',
+    'WriteQueueFull',
+    'get_writer',
+]
@@ -3,16 +3,19 @@
 Database initialization for all services
 """
 
-import sqlite3
 import logging
 
+from database.connection import get_db
+from database.rollups import CREATE_ROLLUPS_SQL, backfill_rollups
+from database.queries import ensure_time_keys
+
 logger = logging.getLogger(__name__)
 
-def init_all_databases():
-    """Initialize all database tables for the services"""
+def init_all_databases(db=None):
+    """Initialize all database tables for the services (db: another device's partition)"""
     try:
-        conn = sqlite3.connect('sensor_data.db')
-        cursor = conn.cursor()
+        db = db or get_db()
+        cursor = db.connection().cursor()
         
         # Heart rate table
         cursor.execute('''
@@ -24,7 +27,18 @@ def init_all_databases():
                 max_rate INTEGER,
                 average_rate REAL,
                 variability REAL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ts_ms INTEGER
+            )
+        ''')
+        
+        # Beat-to-beat intervals behind the HRV metrics (raw RR / PPG uploads)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS heart_beats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                rr_ms REAL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ts_ms INTEGER
             )
         ''')
         
@@ -35,7 +49,8 @@ def init_all_databases():
                 rate INTEGER,
                 rhythm TEXT,
                 apnea_events INTEGER,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ts_ms INTEGER
             )
         ''')
         
@@ -48,7 +63,8 @@ def init_all_databases():
                 neck_angle REAL,
                 position TEXT,
                 posture_severity TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ts_ms INTEGER
             )
         ''')
         
@@ -58,7 +74,21 @@ def init_all_databases():
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 weight REAL,
                 is_in_bed BOOLEAN DEFAULT 0,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ts_ms INTEGER
+            )
+        ''')
+        
+        # Center of pressure per output bucket of the pressure mat
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pressure_map (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cop_x REAL,
+                cop_y REAL,
+                load REAL,
+                turned BOOLEAN DEFAULT 0,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ts_ms INTEGER
             )
         ''')
         
@@ -67,9 +97,82 @@ def init_all_databases():
             CREATE TABLE IF NOT EXISTS snore_detection (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 is_detected BOOLEAN,
-                frequency REAL,
+                frequency REAL,  -- snore pitch, Hz
+                rate REAL,  -- snores per minute
                 duration_minutes INTEGER,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ts_ms INTEGER
+            )
+        ''')
+        
+        # Snore rate column, added after the table first shipped
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(snore_detection)')}
+        if 'rate' not in columns:
+            cursor.execute('ALTER TABLE snore_detection ADD COLUMN rate REAL')
+        
+        # Running snore statistics per day, checkpointed by SnoreService
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS snore_stats_checkpoints (
+                day TEXT PRIMARY KEY,
+                samples INTEGER NOT NULL,
+                snore_events INTEGER NOT NULL,
+                snore_minutes REAL NOT NULL,
+                frequency_sum REAL NOT NULL,
+                frequency_count INTEGER NOT NULL,
+                last_detected INTEGER NOT NULL,
+                snore_start REAL,
+                last_epoch REAL,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Checkpoints written before last_epoch existed restore with it unset
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(snore_stats_checkpoints)')}
+        if 'last_epoch' not in columns:
+            cursor.execute('ALTER TABLE snore_stats_checkpoints ADD COLUMN last_epoch REAL')
+        
+        # The open sleep session (at most one row), checkpointed by SleepSessionService
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sleep_session_checkpoint (
+                start_ms INTEGER NOT NULL,
+                last_ms INTEGER NOT NULL,
+                occupied_ms INTEGER NOT NULL,
+                motion_ms INTEGER NOT NULL,
+                asleep_since INTEGER,
+                asleep_ms INTEGER NOT NULL,
+                heart_sum REAL NOT NULL,
+                heart_count INTEGER NOT NULL,
+                snore_events INTEGER NOT NULL,
+                snoring INTEGER NOT NULL,
+                last_roll REAL,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Scored 30-second epochs of the sleep stage classifier
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sleep_stages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                stage TEXT,
+                confidence REAL,
+                in_bed BOOLEAN,
+                heart_rate REAL,
+                breathing_rate REAL,
+                activity REAL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ts_ms INTEGER
+            )
+        ''')
+        
+        # Raised and cleared alerts (and other system events)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS system_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_type TEXT NOT NULL,
+                description TEXT,
+                severity TEXT DEFAULT 'info',
+                data JSON,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ts_ms INTEGER
             )
         ''')
         
@@ -87,9 +190,21 @@ def init_all_databases():
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sleep_sessions_start ON sleep_sessions(start_time)')
+        
+        # Integer epoch-ms time keys + indexes (migrates older databases)
+        ensure_time_keys(cursor)
+        # Turn times of the pressure map: only the few turned rows are indexed
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pressure_map_ts_ms_turned ON pressure_map(ts_ms) WHERE turned = 1')
+        
+        # Minute/hour rollups; rebuild from raw rows the first time
+        has_rollups = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sensor_rollups'"
+        ).fetchone()
+        cursor.execute(CREATE_ROLLUPS_SQL)
+        if not has_rollups:
+            backfill_rollups(db)
         
-        conn.commit()
-        conn.close()
         logger.info("✅ All database tables initialized successfully")
         
     except Exception as e:
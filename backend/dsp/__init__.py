@@ -0,0 +1,20 @@
+# dsp/__init__.py
+"""
+Signal processing module for Sleep Monitoring Backend
+Vectorized NumPy engines that turn raw sensor samples into the readings the
+services store and push
+"""
+
+from .hrv import HRVEngine, PPGBeatDetector, hrv_report
+from .breathing import BreathingEstimator
+from .snore import SnoreDetector
+from .imu import ImuFusion
+from .loadcell import LoadCellEngine
+from .pressure import PressureMap
+from .stages import STAGES, SleepStager
+
+__all__ = [
+    'HRVEngine', 'PPGBeatDetector', 'hrv_report',
+    'BreathingEstimator', 'SnoreDetector', 'ImuFusion', 'LoadCellEngine',
+    'PressureMap', 'STAGES', 'SleepStager',
+]
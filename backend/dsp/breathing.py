@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+dsp/breathing.py - Breathing Rate and Apnea Estimator
+Turns a streamed raw piezo waveform into breathing rate, rhythm and apnea events
+
+Raw samples are block-averaged down to ANALYSIS_RATE (breathing is far below 1 Hz)
+into a preallocated ring holding one analysis window. Every hop the window is
+detrended and band-passed in the frequency domain, the rate is the dominant
+in-band FFT peak, and the amplitude of the newest hop is compared with the
+amplitude of normal breathing. Each second of signal costs one pass over its raw
+samples plus a fixed-size FFT per hop, whatever the input sample rate.
+"""
+
+import numpy as np
+
+ANALYSIS_RATE = 10.0  # Hz the waveform is analysed at
+GAP_MS = 1000  # a stream gap longer than this restarts the window
+SHALLOW_RATIO = 0.5  # amplitude below this x normal (but above apnea) is shallow breathing
+REGULAR_FRACTION = 0.5  # share of in-band power near the peak for a regular rhythm
+BASELINE_SECONDS = 60  # time constant of the normal-breathing amplitude
+
+class BreathingEstimator:
+    """Sliding-window breathing rate with amplitude-based apnea detection"""
+
+    def __init__(self, sample_rate, window_seconds=30, hop_seconds=2, min_rate=5, max_rate=60,
+                 apnea_ratio=0.25, apnea_seconds=10):
+        self.sample_rate = float(sample_rate)
+        self._factor = max(int(round(self.sample_rate / ANALYSIS_RATE)), 1)
+        self.rate = self.sample_rate / self._factor  # analysis rate, Hz
+        self._window = max(int(window_seconds * self.rate), 8)
+        self._hop = max(int(hop_seconds * self.rate), 1)
+        self.hop_seconds = self._hop / self.rate
+        self.apnea_ratio = apnea_ratio
+        self._apnea_hops = max(int(np.ceil(apnea_seconds / self.hop_seconds)), 1)
+        self._alpha = min(self.hop_seconds / BASELINE_SECONDS, 1.0)
+
+        # Zero-padded FFT: finer bins for the rate and no wrap-around when filtering
+        self._nfft = 1 << int(np.ceil(np.log2(2 * self._window)))
+        self._taper = np.hanning(self._window)
+        self._freqs = np.fft.rfftfreq(self._nfft, 1 / self.rate)
+        low, high = min_rate / 60, max_rate / 60
+        self._band = (self._freqs >= low) & (self._freqs <= high)
+        # Band-pass response with cosine edges (a brick wall rings at the window ends)
+        edge = 2 * (self._freqs[1] - self._freqs[0])
+        self._response = np.clip(np.minimum((self._freqs - low) / edge, (high - self._freqs) / edge) + 0.5, 0, 1)
+        self._response = 0.5 - 0.5 * np.cos(np.pi * self._response)
+        self._ramp = np.arange(self._window) - (self._window - 1) / 2
+
+        self._ring = np.zeros(self._window)
+        self._expected_ms = None
+        self.apnea_events = 0
+        self._reset()
+
+    def _reset(self):
+        self._pos = self._filled = self._pending = 0
+        self._carry = np.zeros(0)
+        self._baseline = None
+        self._quiet_hops = 0
+        self._estimate = None
+
+    def add(self, samples, end_ms):
+        """Add a block of raw samples ending at end_ms; returns apnea events that began in it"""
+        block = np.asarray(samples, dtype=np.float64).ravel()
+        step = 1000 / self.sample_rate
+        if self._expected_ms is not None and abs(end_ms - (len(block) - 1) * step - self._expected_ms) > GAP_MS:
+            self._reset()  # don't measure a rate or silence across a gap in the stream
+        self._expected_ms = end_ms + step
+
+        raw = np.concatenate((self._carry, block))
+        usable = len(raw) - len(raw) % self._factor
+        self._carry = raw[usable:]
+        decimated = raw[:usable].reshape(-1, self._factor).mean(axis=1)
+
+        started = self.apnea_events
+        offset = 0
+        while offset < len(decimated):
+            # Feed up to the next hop boundary, then analyse; long blocks analyse every hop
+            take = min(self._hop - self._pending, len(decimated) - offset)
+            self._write(decimated[offset:offset + take])
+            offset += take
+            self._pending += take
+            if self._pending >= self._hop:
+                self._pending = 0
+                if self._filled >= self._window:
+                    self._analyse()
+        return self.apnea_events - started
+
+    def _write(self, values):
+        end = self._pos + len(values)
+        if end <= self._window:
+            self._ring[self._pos:end] = values
+        else:
+            split = self._window - self._pos
+            self._ring[self._pos:] = values[:split]
+            self._ring[:end - self._window] = values[split:]
+        self._pos = end % self._window
+        self._filled = min(self._filled + len(values), self._window)
+
+    def _analyse(self):
+        window = np.roll(self._ring, -self._pos)  # oldest sample first
+        # Remove offset and linear drift, which would otherwise leak into the lowest bins
+        slope = np.dot(self._ramp, window) / np.dot(self._ramp, self._ramp)
+        window = window - window.mean() - slope * self._ramp
+
+        power = np.abs(np.fft.rfft(window * self._taper, self._nfft)) ** 2
+        in_band = np.where(self._band, power, 0.0)
+        peak = int(np.argmax(in_band))
+        band_power = in_band.sum()
+
+        filtered = np.fft.irfft(np.fft.rfft(window, self._nfft) * self._response, self._nfft)[:self._window]
+        amplitude = float(np.sqrt(np.mean(filtered[-self._hop:] ** 2)))
+        if self._baseline is None:
+            # Normal amplitude from the first full window: median over its hops
+            hops = filtered[len(filtered) % self._hop:].reshape(-1, self._hop)
+            self._baseline = float(np.median(np.sqrt(np.mean(hops ** 2, axis=1))))
+
+        quiet = amplitude < self.apnea_ratio * self._baseline
+        if quiet:
+            self._quiet_hops += 1
+            if self._quiet_hops == self._apnea_hops:
+                self.apnea_events += 1
+        else:
+            self._quiet_hops = 0
+            self._baseline += self._alpha * (amplitude - self._baseline)
+        in_apnea = self._quiet_hops >= self._apnea_hops
+
+        if band_power <= 0 or peak == 0 or peak >= len(in_band) - 1:
+            frequency, regular = 0.0, False
+        else:
+            # Sub-bin peak position from a parabola through the log power around it
+            y0, y1, y2 = np.log(power[peak - 1:peak + 2] + 1e-12)
+            denominator = y0 - 2 * y1 + y2
+            shift = 0.5 * (y0 - y2) / denominator if denominator else 0.0
+            frequency = (peak + shift) * self.rate / self._nfft
+            near = np.abs(self._freqs - self._freqs[peak]) <= 0.05  # ±3 breaths/min
+            regular = in_band[near].sum() >= REGULAR_FRACTION * band_power
+
+        if in_apnea:
+            rhythm = 'Apnea'
+        elif amplitude < SHALLOW_RATIO * self._baseline:
+            rhythm = 'Shallow'
+        else:
+            rhythm = 'Normal' if regular else 'Irregular'
+
+        self._estimate = {
+            'rate': 0 if in_apnea else int(round(frequency * 60)),
+            'rhythm': rhythm,
+            'apnea': {
+                'active': in_apnea,
+                'seconds': round(self._quiet_hops * self.hop_seconds, 1),
+                'events': self.apnea_events
+            }
+        }
+
+    def estimate(self):
+        """Latest rate, rhythm and apnea state (None until a full window has been seen)"""
+        return self._estimate
+
+__all__ = [
+    'ANALYSIS_RATE',
+    'BreathingEstimator',
+]
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+dsp/buckets.py - Output Buckets
+Shared bucketing of the streaming engines: samples are grouped into fixed output
+periods, summed per period, and the newest period stays open across blocks until a
+later sample falls past it
+
+A bucket is a list [bucket id, sums..., last ms]; the engines choose the sums.
+"""
+
+import numpy as np
+
+def bucket_starts(times, period_ms):
+    """Bucket id of every sample and the index where each bucket's run starts"""
+    ids = np.floor(times / period_ms).astype(np.int64)
+    starts = np.flatnonzero(np.diff(ids, prepend=ids[0] - 1))
+    return ids, starts
+
+def close_buckets(buckets, open_bucket):
+    """Merge the bucket left open by the previous block; returns (completed, newest open)
+
+    The sums of a continued bucket add up and its newest last ms wins. A late block
+    (older than the open bucket) completes its own buckets and leaves the open one open.
+    """
+    if open_bucket is not None:
+        same = next((bucket for bucket in buckets if bucket[0] == open_bucket[0]), None)
+        if same is not None:
+            # The block continues the bucket left open by the previous block
+            for field in range(1, len(same) - 1):
+                same[field] = same[field] + open_bucket[field]
+            same[-1] = max(same[-1], open_bucket[-1])
+        else:
+            buckets.append(open_bucket)
+            buckets.sort(key=lambda bucket: bucket[0])
+    return buckets[:-1], buckets[-1]  # the newest bucket may still receive samples
+
+__all__ = [
+    'bucket_starts',
+    'close_buckets',
+]
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+dsp/hrv.py - Heart Rate Variability Engine
+Turns raw beat-to-beat (RR) intervals or PPG samples into heart rate, RMSSD, SDNN
+and pNN50 over a sliding time window
+
+HRVEngine keeps the window's beats in preallocated NumPy arrays plus running sums
+(count, sum and sum of squares of RR, squared successive differences, NN50 count).
+A new block of beats adds its sums and expired beats subtract theirs, so each
+update costs O(block), never a rescan. hrv_report() computes the same metrics for
+a whole night of stored beats in one vectorized pass.
+"""
+
+import math
+
+import numpy as np
+
+RR_MIN_MS = 300   # 200 BPM
+RR_MAX_MS = 2000  # 30 BPM
+NN50_MS = 50
+PAIR_GAP_FACTOR = 1.5  # beats further apart than this x RR aren't successive (a beat was dropped)
+
+def beat_times(rr_ms, end_ms):
+    """Epoch-ms time of each beat, the last one at end_ms (rr[i] ends at beat i)"""
+    rr = np.asarray(rr_ms, dtype=np.float64)
+    return end_ms - (rr.sum() - np.cumsum(rr))
+
+def clean_beats(ts_ms, rr_ms):
+    """Drop non-physiological intervals (artifacts, missed or doubled beats)"""
+    ts = np.asarray(ts_ms, dtype=np.float64).ravel()
+    rr = np.asarray(rr_ms, dtype=np.float64).ravel()
+    valid = np.isfinite(rr) & (rr >= RR_MIN_MS) & (rr <= RR_MAX_MS)
+    return np.rint(ts[valid]).astype(np.int64), rr[valid]
+
+def successive(ts, rr, prev_ts=None, prev_rr=None):
+    """Squared successive differences and whether each beat pairs with the one before it
+
+    The first beat pairs with (prev_ts, prev_rr), the last beat of the previous block.
+    """
+    if prev_ts is not None:
+        ts = np.concatenate(([prev_ts], ts))
+        rr = np.concatenate(([prev_rr], rr))
+        gap, diff = np.diff(ts), np.diff(rr)
+        paired = (gap > 0) & (gap <= PAIR_GAP_FACTOR * rr[1:])
+    else:
+        gap, diff = np.diff(ts), np.diff(rr)
+        paired = np.concatenate(([False], (gap > 0) & (gap <= PAIR_GAP_FACTOR * rr[1:])))
+        diff = np.concatenate(([0.0], diff))
+    sd2 = np.where(paired, diff * diff, 0.0)
+    return sd2, paired
+
+def summarize(n, sum_rr, sum_rr2, pairs, sum_sd2, nn50):
+    """HRV metrics from window sums (None when there are too few beats)"""
+    if n < 2:
+        return None
+    mean = sum_rr / n
+    variance = max(sum_rr2 - n * mean * mean, 0.0) / (n - 1)
+    return {
+        'rate': round(60000 / mean, 1),
+        'rmssd': round(math.sqrt(sum_sd2 / pairs), 1) if pairs else None,
+        'sdnn': round(math.sqrt(variance), 1),
+        'pnn50': round(100 * nn50 / pairs, 1) if pairs else None,
+        'beats': int(n)
+    }
+
+class HRVEngine:
+    """Sliding-window HRV over a stream of beats"""
+
+    def __init__(self, window_seconds=300):
+        self.window_ms = int(window_seconds * 1000)
+        capacity = 2 * (self.window_ms // RR_MIN_MS + 1)  # room for a full window, compacted when full
+        self._ts = np.zeros(capacity, dtype=np.int64)
+        self._rr = np.zeros(capacity, dtype=np.float64)
+        self._sd2 = np.zeros(capacity, dtype=np.float64)
+        self._paired = np.zeros(capacity, dtype=bool)
+        self._start = self._end = 0
+        self._last = None  # (ts, rr) of the newest beat, for the next block's first difference
+        self._reset_sums()
+
+    def _reset_sums(self):
+        live = slice(self._start, self._end)
+        rr, paired = self._rr[live], self._paired[live]
+        self._n = self._end - self._start
+        self._sum_rr = float(rr.sum())
+        self._sum_rr2 = float(np.dot(rr, rr))
+        self._pairs = int(paired.sum())
+        self._sum_sd2 = float(self._sd2[live].sum())
+        self._nn50 = int(np.count_nonzero(self._sd2[live] > NN50_MS * NN50_MS))
+
+    def add_rr(self, rr_ms, end_ms):
+        """Add RR intervals (ms) measured up to end_ms; returns the accepted (ts, rr)"""
+        rr = np.asarray(rr_ms, dtype=np.float64).ravel()
+        return self.add_beats(beat_times(rr, end_ms), rr)
+
+    def add_beats(self, ts_ms, rr_ms):
+        """Add beats with their times; returns the accepted (ts, rr) after artifact removal"""
+        ts, rr = clean_beats(ts_ms, rr_ms)
+        if self._last is not None:
+            newer = ts > self._last[0]  # a re-sent block must not count twice
+            ts, rr = ts[newer], rr[newer]
+        if not len(ts):
+            return ts, rr
+
+        prev_ts, prev_rr = self._last if self._last is not None else (None, None)
+        sd2, paired = successive(ts, rr, prev_ts, prev_rr)
+        self._last = (int(ts[-1]), float(rr[-1]))
+
+        keep = len(self._ts) // 2
+        if len(ts) > keep:
+            # A block longer than the window: only its newest part can stay in it
+            ts, rr, sd2, paired = (array[-keep:] for array in (ts, rr, sd2, paired))
+        if self._end + len(ts) > len(self._ts):
+            self._compact()
+
+        end = self._end + len(ts)
+        self._ts[self._end:end] = ts
+        self._rr[self._end:end] = rr
+        self._sd2[self._end:end] = sd2
+        self._paired[self._end:end] = paired
+        self._end = end
+
+        self._n += len(ts)
+        self._sum_rr += float(rr.sum())
+        self._sum_rr2 += float(np.dot(rr, rr))
+        self._pairs += int(paired.sum())
+        self._sum_sd2 += float(sd2.sum())
+        self._nn50 += int(np.count_nonzero(sd2 > NN50_MS * NN50_MS))
+
+        self._expire(int(ts[-1]) - self.window_ms)
+        return ts, rr
+
+    def _expire(self, cutoff_ms):
+        count = int(np.searchsorted(self._ts[self._start:self._end], cutoff_ms, side='right'))
+        if self._end - self._start - count > len(self._ts) // 2:
+            count = self._end - self._start - len(self._ts) // 2
+        if count <= 0:
+            return
+        gone = slice(self._start, self._start + count)
+        rr, sd2 = self._rr[gone], self._sd2[gone]
+        self._n -= count
+        self._sum_rr -= float(rr.sum())
+        self._sum_rr2 -= float(np.dot(rr, rr))
+        self._pairs -= int(self._paired[gone].sum())
+        self._sum_sd2 -= float(sd2.sum())
+        self._nn50 -= int(np.count_nonzero(sd2 > NN50_MS * NN50_MS))
+        self._start += count
+
+    def _compact(self):
+        # Move the live window to the front; also resets the running sums exactly
+        count = self._end - self._start
+        for array in (self._ts, self._rr, self._sd2, self._paired):
+            array[:count] = array[self._start:self._end]
+        self._start, self._end = 0, count
+        self._reset_sums()
+
+    def metrics(self):
+        """rate, rmssd, sdnn, pnn50, beats, minRate, maxRate for the current window (or None)"""
+        result = summarize(self._n, self._sum_rr, self._sum_rr2, self._pairs, self._sum_sd2, self._nn50)
+        if result is not None:
+            rr = self._rr[self._start:self._end]
+            result['minRate'] = round(60000 / float(rr.max()), 1)
+            result['maxRate'] = round(60000 / float(rr.min()), 1)
+        return result
+
+class PPGBeatDetector:
+    """Finds heartbeats in streamed PPG sample blocks (peak detection with a refractory period)"""
+
+    def __init__(self, sample_rate=50.0, max_rate=200):
+        self.sample_rate = float(sample_rate)
+        self.refractory_ms = 60000 / max_rate
+        self._baseline = max(int(0.75 * self.sample_rate), 3)  # detrending window, samples
+        self._smooth = max(int(0.1 * self.sample_rate), 1)
+        self._keep = int(2 * self.sample_rate) + self._baseline  # samples carried into the next block
+        self._tail = np.zeros(0)
+        self._tail_end_ms = None
+        self._last_peak_ms = None
+
+    def add(self, samples, end_ms):
+        """Add a block ending at end_ms; returns (beat times, RR intervals) found so far"""
+        block = np.asarray(samples, dtype=np.float64).ravel()
+        step = 1000 / self.sample_rate
+        if self._tail_end_ms is not None:
+            expected_start = self._tail_end_ms + step
+            if abs(end_ms - (len(block) - 1) * step - expected_start) > 500:
+                # Gap in the stream: don't stitch the filter or an RR interval across it
+                self._tail = np.zeros(0)
+                self._last_peak_ms = None
+        signal = np.concatenate((self._tail, block))
+        times = end_ms - (len(signal) - 1 - np.arange(len(signal))) * step
+
+        self._tail = signal[-self._keep:]
+        self._tail_end_ms = end_ms
+        if len(signal) < self._baseline + 3:
+            return np.zeros(0), np.zeros(0)
+
+        # Band-limit: remove the slow baseline, then smooth out sensor noise
+        detrended = signal - np.convolve(signal, np.ones(self._baseline) / self._baseline, mode='same')
+        smoothed = np.convolve(detrended, np.ones(self._smooth) / self._smooth, mode='same')
+
+        edge = self._baseline // 2 + 1  # filter output is unreliable this close to either end
+        core = smoothed[edge:len(smoothed) - edge]
+        if not len(core):
+            return np.zeros(0), np.zeros(0)
+        threshold = core.mean() + 0.5 * core.std()
+        middle = core[1:-1]
+        peaks = np.flatnonzero((middle > core[:-2]) & (middle >= core[2:]) & (middle > threshold)) + 1 + edge
+
+        found = []
+        last = self._last_peak_ms
+        for index in peaks:
+            # Sub-sample peak position from a parabola through the three samples around it
+            y0, y1, y2 = smoothed[index - 1:index + 2]
+            denominator = y0 - 2 * y1 + y2
+            offset = 0.5 * (y0 - y2) / denominator if denominator else 0.0
+            peak_ms = times[index] + offset * step
+            if last is not None and peak_ms - last < self.refractory_ms:
+                continue
+            found.append(peak_ms)
+            last = peak_ms
+
+        if not found:
+            return np.zeros(0), np.zeros(0)
+        peak_times = np.array(found)
+        previous = self._last_peak_ms
+        self._last_peak_ms = last
+        if previous is None:
+            if len(peak_times) < 2:
+                return np.zeros(0), np.zeros(0)
+            return peak_times[1:], np.diff(peak_times)
+        return peak_times, np.diff(np.concatenate(([previous], peak_times)))
+
+def hrv_report(ts_ms, rr_ms, window_seconds=300):
+    """Per-window and whole-range HRV of stored beats (sorted by time), vectorized
+
+    Returns {'windows': [{start, rate, rmssd, sdnn, pnn50, beats}], 'overall': {...}}.
+    """
+    ts, rr = clean_beats(ts_ms, rr_ms)
+    if len(ts) < 2:
+        return {'windows': [], 'overall': None}
+
+    sd2, paired = successive(ts, rr)
+    window_ms = int(window_seconds * 1000)
+    start = ts[0] - ts[0] % window_ms
+    index = (ts - start) // window_ms
+    count = int(index[-1]) + 1
+
+    n = np.bincount(index, minlength=count)
+    sum_rr = np.bincount(index, weights=rr, minlength=count)
+    sum_rr2 = np.bincount(index, weights=rr * rr, minlength=count)
+    pairs = np.bincount(index, weights=paired, minlength=count)
+    sum_sd2 = np.bincount(index, weights=sd2, minlength=count)
+    nn50 = np.bincount(index, weights=sd2 > NN50_MS * NN50_MS, minlength=count)
+
+    windows = []
+    for window in np.flatnonzero(n >= 2):
+        metrics = summarize(n[window], sum_rr[window], sum_rr2[window], pairs[window],
+                            sum_sd2[window], nn50[window])
+        metrics['start'] = int(start + window * window_ms)
+        windows.append(metrics)
+
+    overall = summarize(len(rr), float(rr.sum()), float(np.dot(rr, rr)), int(paired.sum()),
+                        float(sd2.sum()), int(np.count_nonzero(sd2 > NN50_MS * NN50_MS)))
+    return {'windows': windows, 'overall': overall}
+
+__all__ = [
+    'RR_MIN_MS',
+    'RR_MAX_MS',
+    'beat_times',
+    'clean_beats',
+    'HRVEngine',
+    'PPGBeatDetector',
+    'hrv_report',
+]
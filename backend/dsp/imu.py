@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+dsp/imu.py - IMU Orientation Fusion
+Fuses raw accelerometer and gyroscope batches into smoothed pitch/roll at a low
+output rate
+
+A complementary filter trusts the gyro over short spans (it has no noise from
+turning or bumping the pillow) and the accelerometer's gravity direction over long
+ones (the gyro drifts). The filter is a first-order recursion,
+    angle[n] = alpha * (angle[n-1] + rate[n] * dt) + (1 - alpha) * accel_angle[n]
+which is evaluated in closed form over chunks of samples (scaled cumulative sums)
+instead of a Python loop per sample. The fused angles are then averaged into
+output buckets; only the bucket means leave the pipeline.
+"""
+
+import math
+
+import numpy as np
+
+from .buckets import bucket_starts, close_buckets
+
+GAP_MS = 1000  # a stream gap longer than this restarts the filter from the accelerometer
+
+def accel_angles(accel):
+    """Pitch and roll (degrees) of the gravity vector, one row per (x, y, z) sample"""
+    x, y, z = accel[:, 0], accel[:, 1], accel[:, 2]
+    pitch = np.degrees(np.arctan2(-x, np.hypot(y, z)))
+    roll = np.degrees(np.arctan2(y, z))
+    return np.column_stack((pitch, roll))
+
+def wrap_degrees(angle):
+    """Map angles to [-180, 180)"""
+    return (np.asarray(angle) + 180) % 360 - 180
+
+class ImuFusion:
+    """Complementary-filter orientation from streamed IMU batches, downsampled to output_rate"""
+
+    def __init__(self, sample_rate, output_rate=1.0, time_constant=0.5):
+        self.sample_rate = float(sample_rate)
+        self.dt = 1 / self.sample_rate
+        self.period_ms = 1000 / output_rate
+        self.alpha = time_constant / (time_constant + self.dt)
+        # Chunk length keeping alpha ** -chunk well inside float64 range
+        self._chunk = max(1, min(1024, int(100 / -math.log10(self.alpha)))) if self.alpha < 1 else 1024
+        self._powers = self.alpha ** np.arange(1, self._chunk + 1)[:, None]
+        self._state = None  # last fused (pitch, roll); roll kept unwrapped so it stays continuous
+        self._expected_ms = None
+        self._bucket = None  # [bucket id, angle sums (2,), motion sum, count, last ms] of the open bucket
+
+    def add(self, accel, gyro, end_ms):
+        """Add samples ending at end_ms (accel: (n, 3) any unit, gyro: (n, 3) deg/s or None)
+
+        Returns completed output buckets as a list of (ms, pitch, roll, motion deg/s).
+        """
+        accel = np.asarray(accel, dtype=np.float64).reshape(-1, 3)
+        count = len(accel)
+        times = end_ms - (count - 1 - np.arange(count)) * (1000 * self.dt)
+        if self._expected_ms is not None and abs(times[0] - self._expected_ms) > GAP_MS:
+            self._state = None  # don't integrate the gyro across a gap
+        self._expected_ms = end_ms + 1000 * self.dt
+
+        measured = accel_angles(accel)
+        if self._state is not None:
+            # Unwrap the accelerometer roll next to the fused roll (rolling onto the stomach crosses ±180)
+            measured[:, 1] = np.degrees(np.unwrap(np.radians(np.concatenate(([self._state[1]], measured[:, 1])))))[1:]
+        else:
+            measured[:, 1] = np.degrees(np.unwrap(np.radians(measured[:, 1])))
+
+        if gyro is None:
+            rates = np.zeros((count, 2))
+            motion = np.zeros(count)
+        else:
+            gyro = np.asarray(gyro, dtype=np.float64).reshape(-1, 3)
+            rates = np.column_stack((gyro[:, 1], gyro[:, 0]))  # pitch rate about y, roll rate about x
+            motion = np.linalg.norm(gyro, axis=1)
+
+        fused = self._filter(measured, rates)
+        return self._downsample(times, fused, motion)
+
+    def _filter(self, measured, rates):
+        drive = self.alpha * self.dt * rates + (1 - self.alpha) * measured
+        fused = np.empty_like(drive)
+        state = measured[0] if self._state is None else self._state
+        for start in range(0, len(drive), self._chunk):
+            segment = drive[start:start + self._chunk]
+            powers = self._powers[:len(segment)]
+            # angle[j] = alpha^(j+1) * state + sum_i alpha^(j-i) * drive[i]
+            fused[start:start + len(segment)] = powers * (state + np.cumsum(segment / powers, axis=0))
+            state = fused[start + len(segment) - 1]
+        self._state = state.copy()
+        return fused
+
+    def _downsample(self, times, fused, motion):
+        ids, starts = bucket_starts(times, self.period_ms)
+        sums = np.add.reduceat(fused, starts, axis=0)
+        motion_sums = np.add.reduceat(motion, starts)
+        counts = np.diff(np.append(starts, len(ids)))
+        last_ms = times[np.append(starts[1:], len(ids)) - 1]
+
+        buckets = [[ids[s], sums[i], motion_sums[i], counts[i], last_ms[i]] for i, s in enumerate(starts)]
+        buckets, self._bucket = close_buckets(buckets, self._bucket)
+
+        outputs = []
+        for _, angle_sum, motion_sum, bucket_count, bucket_ms in buckets:
+            pitch, roll = angle_sum / bucket_count
+            outputs.append((int(bucket_ms), round(float(pitch), 1), round(float(wrap_degrees(roll)), 1),
+                            round(float(motion_sum / bucket_count), 1)))
+        return outputs
+
+__all__ = [
+    'accel_angles',
+    'wrap_degrees',
+    'ImuFusion',
+]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+dsp/loadcell.py - Load-Cell Occupancy and Restlessness Engine
+Turns streamed bed load samples (kg) into occupancy with debounced in/out-of-bed
+transitions, windowed load statistics and restlessness
+
+Samples are summarized per second into a fixed ring of window_seconds slots
+(count, mean, M2). A block's samples are reduced with NumPy and merged into their
+slot with the parallel form of Welford's update, and the window's mean and variance
+merge the live slots the same way. Memory per bed is therefore fixed, whatever
+the sample rate or night length. A second's movement energy is its load variance:
+lying still barely moves the load, while turning over swings it by kilograms.
+"""
+
+import numpy as np
+
+EXIT_RATIO = 0.75  # leave the bed below this x the entry threshold (hysteresis)
+STABILITY_LEVELS = ((5, 'Stable'), (20, 'Minor Movement'), (50, 'Restless'))  # restless % upper bounds
+
+def merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """Combine (count, mean, M2) summaries of two sample sets (Chan et al.)"""
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(n > 0, mean_a + delta * n_b / np.maximum(n, 1), 0.0)
+        m2 = m2_a + m2_b + delta * delta * n_a * n_b / np.maximum(n, 1)
+    return n, mean, m2
+
+class LoadCellEngine:
+    """Sliding-window load statistics, restlessness and debounced occupancy for one bed"""
+
+    def __init__(self, threshold_kg=20, window_seconds=60, debounce_seconds=5, movement_kg=1.0):
+        self.threshold_kg = threshold_kg
+        self.window_seconds = int(window_seconds)
+        self.debounce_ms = debounce_seconds * 1000
+        self.movement_kg = movement_kg
+        size = self.window_seconds
+        self._second = np.full(size, -1, dtype=np.int64)  # epoch second held by each slot
+        self._n = np.zeros(size)
+        self._mean = np.zeros(size)
+        self._m2 = np.zeros(size)
+        self._latest = None  # newest epoch second seen
+        self.in_bed = False
+        self.since_ms = None  # time of the last transition
+        self._pending_ms = None  # when the load started disagreeing with the state
+
+    def add(self, samples, end_ms, sample_rate=None):
+        """Add load samples (kg) ending at end_ms; returns transitions as (ms, in_bed) tuples"""
+        load = np.asarray(samples, dtype=np.float64).ravel()
+        if not len(load):
+            return []
+        step = 1000 / sample_rate if sample_rate else 0
+        times = end_ms - (len(load) - 1 - np.arange(len(load))) * step
+        seconds = (times // 1000).astype(np.int64)
+
+        # Per-second summaries of the block, then one Welford merge per touched slot
+        starts = np.flatnonzero(np.diff(seconds, prepend=seconds[0] - 1))
+        counts = np.diff(np.append(starts, len(load))).astype(np.float64)
+        means = np.add.reduceat(load, starts) / counts
+        m2s = np.add.reduceat((load - np.repeat(means, counts.astype(np.int64))) ** 2, starts)
+
+        transitions = []
+        for index, start in enumerate(starts):
+            second = int(seconds[start])
+            if self._latest is not None and second <= self._latest - self.window_seconds:
+                continue  # older than the window
+            slot = second % self.window_seconds
+            if self._second[slot] != second:
+                self._second[slot] = second
+                self._n[slot] = self._mean[slot] = self._m2[slot] = 0.0
+            self._n[slot], self._mean[slot], self._m2[slot] = merge_moments(
+                self._n[slot], self._mean[slot], self._m2[slot], counts[index], means[index], m2s[index])
+            self._latest = second if self._latest is None else max(self._latest, second)
+
+            change = self._debounce(float(times[start]), means[index])
+            if change is not None:
+                transitions.append(change)
+        return transitions
+
+    def _debounce(self, time_ms, level):
+        """Occupancy from one second's mean load; a change must hold for debounce_ms"""
+        occupied = bool(level >= (self.threshold_kg * EXIT_RATIO if self.in_bed else self.threshold_kg))
+        if self.since_ms is None:
+            # The first reading sets the state at once
+            self.in_bed, self.since_ms = occupied, int(time_ms)
+            return None
+        if occupied == self.in_bed:
+            self._pending_ms = None
+            return None
+        if self._pending_ms is None:
+            self._pending_ms = time_ms
+        if time_ms - self._pending_ms < self.debounce_ms:
+            return None
+        # Date the transition from when the load first changed
+        self.in_bed = occupied
+        self.since_ms = int(self._pending_ms)
+        self._pending_ms = None
+        return self.since_ms, occupied
+
+    def stats(self):
+        """Window load mean/std, the newest second's movement and restlessness (% restless seconds)"""
+        if self._latest is None:
+            return None
+        live = self._second > self._latest - self.window_seconds
+        n, mean, m2 = self._n[live], self._mean[live], self._m2[live]
+        total = n.sum()
+        window_mean = float(np.dot(n, mean) / total)
+        window_m2 = float(m2.sum() + np.dot(n, (mean - window_mean) ** 2))
+
+        # Movement needs several samples in a second; sparse readings only give the window spread
+        measured = n >= 2
+        energy = np.where(measured, m2 / np.maximum(n, 1), 0.0)  # load variance per second, kg^2
+        newest = (self._second[live] == self._latest) & measured
+        restless = energy[measured] > self.movement_kg ** 2
+        return {
+            'mean': round(window_mean, 2),
+            'std': round(float(np.sqrt(window_m2 / (total - 1))), 3) if total > 1 else 0.0,
+            'movement': round(float(np.sqrt(energy[newest][0])), 3) if newest.any() else None,
+            'restlessness': round(100 * float(restless.mean()), 1) if measured.any() else None,
+            'seconds': int(live.sum())
+        }
+
+def stability_label(restlessness):
+    """Bed stability from the share of restless seconds in the window"""
+    for bound, label in STABILITY_LEVELS:
+        if restlessness < bound:
+            return label
+    return 'Very Restless'
+
+__all__ = [
+    'merge_moments',
+    'stability_label',
+    'LoadCellEngine',
+]
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+dsp/pressure.py - Pressure Map Engine
+Turns streamed frames of a multi-cell bed pressure mat into center of pressure,
+a coarse heatmap and turn detection, at a low output rate
+
+Each frame is a rows x cols grid of cell readings (row 0 at the head end, column 0
+at the left edge). A whole batch of frames is processed at once: cells below the
+contact level are zeroed, and the center of pressure (COP) of every frame comes from
+two matrix products of its row and column sums with the cell positions. COP is given
+in bed fractions, 0-1 across (x) and along (y) the mat. Frames are averaged into
+output buckets, and the summed bucket frames are block-reduced to the coarse
+heatmap, so only a few numbers per bucket leave the pipeline.
+
+A turn is a move of the settled COP by at least turn_shift. The COP has settled
+when the last settle_seconds of buckets all lie within a third of turn_shift of
+their mean, so the sliding COP during the roll itself is never counted twice.
+"""
+
+import numpy as np
+
+from .buckets import bucket_starts, close_buckets
+
+class PressureMap:
+    """Center of pressure, coarse heatmap and turns from streamed pressure-mat frames"""
+
+    def __init__(self, rows, cols, sample_rate, output_rate=1.0, heatmap_rows=8, heatmap_cols=4,
+                 contact_level=0, turn_shift=0.1, settle_seconds=3):
+        self.rows = int(rows)
+        self.cols = int(cols)
+        self.sample_rate = float(sample_rate)
+        self.period_ms = 1000 / output_rate
+        self.contact_level = contact_level
+        self.turn_shift = turn_shift
+        self._x = (np.arange(self.cols) + 0.5) / self.cols
+        self._y = (np.arange(self.rows) + 0.5) / self.rows
+        # Heatmap blocks: first grid row/column of each coarse cell
+        self._row_edges = np.linspace(0, self.rows, min(heatmap_rows, self.rows) + 1).astype(np.int64)[:-1]
+        self._col_edges = np.linspace(0, self.cols, min(heatmap_cols, self.cols) + 1).astype(np.int64)[:-1]
+
+        self._bucket = None  # [bucket id, COP sum (2,), occupied frames, load sum, frames, grid sum, last ms]
+        self._recent = np.full((max(1, int(settle_seconds * output_rate)), 2), np.nan)  # last bucket COPs
+        self._recent_count = 0
+        self._reference = None  # settled COP the next turn is measured from
+        self.cop = None  # (x, y) of the newest bucket
+        self.heatmap = None  # coarse grid of the newest bucket, % of its pressure
+        self.turns = 0
+        self._night = np.zeros((len(self._row_edges), len(self._col_edges)))  # coarse pressure since reset
+
+    def reset(self):
+        """Start a new night: clear the turn count and the accumulated heatmap"""
+        self.turns = 0
+        self._night[:] = 0
+        self._reference = None
+        self._recent_count = 0
+
+    def add(self, cells, end_ms):
+        """Add frames (flat or (n, rows, cols)) whose last frame is at end_ms
+
+        Returns completed output buckets as a list of (ms, cop x, cop y, load, turned);
+        cop is None for buckets without contact.
+        """
+        frames = np.asarray(cells, dtype=np.float64).reshape(-1, self.rows, self.cols)
+        frames = np.where(frames > self.contact_level, frames, 0.0)
+        count = len(frames)
+        times = end_ms - (count - 1 - np.arange(count)) * (1000 / self.sample_rate)
+
+        load = frames.sum(axis=(1, 2))
+        occupied = load > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cop = np.column_stack((frames.sum(axis=1) @ self._x, frames.sum(axis=2) @ self._y)) / load[:, None]
+        cop[~occupied] = 0.0
+
+        ids, starts = bucket_starts(times, self.period_ms)
+        ends = np.append(starts[1:], count)
+        buckets = [
+            [ids[s], sums, occupied_count, load_sum, frame_count, grid, times[e - 1]]
+            for s, e, sums, occupied_count, load_sum, frame_count, grid in zip(
+                starts, ends, np.add.reduceat(cop, starts, axis=0), np.add.reduceat(occupied, starts),
+                np.add.reduceat(load, starts), ends - starts, np.add.reduceat(frames, starts, axis=0))
+        ]
+        buckets, self._bucket = close_buckets(buckets, self._bucket)
+
+        return [self._emit(bucket) for bucket in buckets]
+
+    def _emit(self, bucket):
+        _, cop_sum, occupied_count, load_sum, frame_count, grid, bucket_ms = bucket
+        coarse = np.add.reduceat(np.add.reduceat(grid, self._row_edges, axis=0), self._col_edges, axis=1)
+        self._night += coarse
+        total = coarse.sum()
+        self.heatmap = np.round(100 * coarse / total, 1).tolist() if total > 0 else None
+
+        if not occupied_count:
+            self.cop = None
+            self._reference = None
+            self._recent_count = 0
+            return int(bucket_ms), None, None, round(float(load_sum / frame_count), 2), False
+
+        cop = cop_sum / occupied_count
+        self.cop = (round(float(cop[0]), 3), round(float(cop[1]), 3))
+        return int(bucket_ms), self.cop[0], self.cop[1], round(float(load_sum / frame_count), 2), self._turned(cop)
+
+    def _turned(self, cop):
+        """Track settled positions; True when this bucket settles at least turn_shift away"""
+        self._recent[self._recent_count % len(self._recent)] = cop
+        self._recent_count += 1
+        if self._recent_count < len(self._recent):
+            return False
+        settled = self._recent.mean(axis=0)
+        if np.max(np.hypot(*(self._recent - settled).T)) > self.turn_shift / 3:
+            return False  # still moving
+        if self._reference is None:
+            self._reference = settled
+            return False
+        if np.hypot(*(settled - self._reference)) < self.turn_shift:
+            return False
+        self._reference = settled
+        self.turns += 1
+        return True
+
+    def night_heatmap(self):
+        """Coarse grid of all pressure since the last reset, % of the total"""
+        total = self._night.sum()
+        return np.round(100 * self._night / total, 1).tolist() if total > 0 else None
+
+__all__ = [
+    'PressureMap',
+]
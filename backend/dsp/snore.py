@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+dsp/snore.py - Spectral Snore Detector
+Decides snoring / not snoring from streamed microphone PCM
+
+Audio is copied into one preallocated buffer. Each block runs a short-time Fourier
+transform over every complete frame at once (strided views, no per-frame copies),
+so the per-frame work is a few scalar updates. A frame is snore-like when it is
+well above the adaptive noise floor and its energy is concentrated in the low
+snore band. Runs of snore-like frames are counted as snores, and a smoothed
+snore activity level switches the snoring state with hysteresis, so one cough or
+a quiet breath does not toggle it. A snore frame's pitch is its strongest snore band
+bin; the reading's `frequency` is the mean pitch (Hz) of the latest snore frames, and
+`rate` the snores per minute.
+"""
+
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SNORE_BAND_HZ = (60, 500)  # snore energy: soft palate / tongue vibration and low harmonics
+FULL_BAND_HZ = (60, 4000)  # speech, rustling and TV sit mostly above the snore band
+SNORE_RATIO = 0.6  # share of the frame's energy in the snore band
+FLOOR_RISE_DB = 0.5  # per second the noise floor may rise (it falls immediately)
+MIN_SNORE_SECONDS = 0.2  # shorter runs of snore-like frames are clicks, not snores
+RATE_WINDOW_SECONDS = 60  # snores per minute are counted over this span
+INTENSITY_RANGE_DB = 40  # loudness above the floor that maps to intensity 100
+GAP_MS = 1000  # a stream gap longer than this restarts framing
+
+class SnoreDetector:
+    """Incremental STFT snore detector with hysteresis"""
+
+    def __init__(self, sample_rate=16000, frame_size=1024, hop_size=512, on_db=12, on_activity=0.12,
+                 off_activity=0.04, activity_seconds=8, block_seconds=1.0):
+        self.sample_rate = int(sample_rate)
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.on_db = on_db
+        self.on_activity = on_activity
+        self.off_activity = off_activity
+        self.frame_seconds = hop_size / self.sample_rate
+        self._alpha = min(self.frame_seconds / activity_seconds, 1.0)
+        self._floor_rise = FLOOR_RISE_DB * self.frame_seconds
+        self._min_run = max(int(round(MIN_SNORE_SECONDS / self.frame_seconds)), 1)
+
+        # Preallocated audio: the unconsumed tail of the last block plus room for a new chunk
+        self._chunk = max(int(block_seconds * self.sample_rate), hop_size)
+        self._buffer = np.zeros(frame_size + self._chunk, dtype=np.float32)
+        self._taper = np.hanning(frame_size).astype(np.float32)
+        freqs = np.fft.rfftfreq(frame_size, 1 / self.sample_rate)
+        self._snore_bins = (freqs >= SNORE_BAND_HZ[0]) & (freqs < SNORE_BAND_HZ[1])
+        self._snore_freqs = freqs[self._snore_bins]
+        self._full_bins = (freqs >= FULL_BAND_HZ[0]) & (freqs < min(FULL_BAND_HZ[1], self.sample_rate / 2))
+
+        self._expected_ms = None
+        self._clock = 0.0  # stream seconds at the next frame
+        self._floor = None
+        self.activity = 0.0
+        self.is_snoring = False
+        self._snoring_since = None
+        self._run = 0  # consecutive snore-like frames
+        self._fill = 0  # samples waiting in the buffer
+        self._snores = deque()  # stream time of each snore within RATE_WINDOW_SECONDS
+        self._pitch = 0  # mean pitch of the last block with snore frames, Hz
+
+    def add(self, samples, end_ms):
+        """Add a PCM block (int16 or float in [-1, 1]) ending at end_ms; returns the reading"""
+        block = np.asarray(samples)
+        scale = 1 / 32768 if block.dtype.kind in 'iu' else 1.0
+        step = 1000 / self.sample_rate
+        if self._expected_ms is not None and abs(end_ms - (len(block) - 1) * step - self._expected_ms) > GAP_MS:
+            self._fill = self._run = 0  # don't frame audio across a gap in the stream
+        self._expected_ms = end_ms + step
+
+        loud = []
+        for offset in range(0, len(block), self._chunk):
+            chunk = block[offset:offset + self._chunk]
+            end = self._fill + len(chunk)
+            np.multiply(chunk, scale, out=self._buffer[self._fill:end], casting='unsafe')
+            self._fill = end
+            loud.extend(self._process())
+        return self.reading(loud)
+
+    def _process(self):
+        """Run the STFT over every complete frame in the buffer; returns (dB above floor, pitch Hz) of snore frames"""
+        if self._fill < self.frame_size:
+            return []
+        frames = sliding_window_view(self._buffer[:self._fill], self.frame_size)[::self.hop_size]
+        consumed = len(frames) * self.hop_size
+        power = np.abs(np.fft.rfft(frames * self._taper, axis=1)) ** 2
+        band = power[:, self._snore_bins]
+        full = power[:, self._full_bins].sum(axis=1)
+        ratio = band.sum(axis=1) / (full + 1e-20)
+        pitch = self._snore_freqs[np.argmax(band, axis=1)]
+        level = 10 * np.log10(full + 1e-20)
+
+        # Keep the samples the next frame still needs
+        remaining = self._fill - consumed
+        self._buffer[:remaining] = self._buffer[consumed:self._fill]
+        self._fill = remaining
+
+        loud = []
+        for frame_level, frame_ratio, frame_pitch in zip(level.tolist(), ratio.tolist(), pitch.tolist()):
+            # Noise floor: follows quiet frames down at once, creeps up through loud ones
+            floor = frame_level if self._floor is None else min(frame_level, self._floor + self._floor_rise)
+            self._floor = floor
+            above = frame_level - floor
+            snore_like = above >= self.on_db and frame_ratio >= SNORE_RATIO
+            if snore_like:
+                self._run += 1
+                loud.append((above, frame_pitch))
+                if self._run == self._min_run:
+                    self._snores.append(self._clock)
+            else:
+                self._run = 0
+
+            self.activity += self._alpha * ((1.0 if snore_like else 0.0) - self.activity)
+            if not self.is_snoring and self.activity >= self.on_activity:
+                self.is_snoring = True
+                self._snoring_since = self._clock
+            elif self.is_snoring and self.activity < self.off_activity:
+                self.is_snoring = False
+                self._snoring_since = None
+            self._clock += self.frame_seconds
+        return loud
+
+    def reading(self, loud=()):
+        """Snore reading in the service's fields (frequency: snore pitch in Hz, rate: snores per minute)"""
+        cutoff = self._clock - RATE_WINDOW_SECONDS
+        while self._snores and self._snores[0] < cutoff:
+            self._snores.popleft()
+        seconds = min(self._clock, RATE_WINDOW_SECONDS)
+        snoring_for = self._clock - self._snoring_since if self.is_snoring else 0
+        loud_db, pitch = zip(*loud) if loud else ((), ())
+        if pitch:
+            self._pitch = round(float(np.mean(pitch)), 1)
+        return {
+            'isDetected': self.is_snoring,
+            'frequency': self._pitch if self.is_snoring or pitch else 0,
+            'rate': round(len(self._snores) * 60 / seconds, 1) if seconds else 0,
+            'intensity': int(min(100, 100 * np.mean(loud_db) / INTENSITY_RANGE_DB)) if loud_db else 0,
+            'duration_minutes': int(snoring_for // 60)
+        }
+
+__all__ = [
+    'SNORE_BAND_HZ',
+    'SnoreDetector',
+]
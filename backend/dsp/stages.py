@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+dsp/stages.py - Sleep Stage Classifier
+Scores 30-second epochs as Wake, Light, Deep or REM from the heart rate, breathing,
+movement and snore readings that arrive during each epoch
+
+Readings only update running sums for the open epoch (count, sum, sum of squares per
+signal, and counts of moving and snoring readings), so adding one costs a few
+additions. When a reading opens the next epoch, the last one is reduced to a small
+feature vector and scored by a linear model, one row of weights per stage:
+
+    activity   share of movement readings that moved (load cells or IMU)
+    recent     activity smoothed over the last few epochs
+    heart      epoch heart rate against the sleeper's running night baseline
+    heart_var  spread of the heart rate within the epoch
+    breath_var spread of the breathing rate within the epoch
+    snoring    share of snore readings that detected snoring
+    night      hours since the first scored epoch (deep sleep comes early, REM late)
+
+The weights encode the textbook signatures. Wake moves, and its heart rate rises.
+Deep sleep is still, slow and regular, and it comes in the first half of the night.
+REM is still but has an irregular heart and breathing rhythm, rarely snores, and
+grows toward morning. Light sleep is the default. A bonus for the previous stage
+keeps single noisy epochs from flipping the hypnogram. The softmax of the scores
+gives the confidence.
+"""
+
+import math
+
+import numpy as np
+
+STAGES = ('Wake', 'Light', 'Deep', 'REM')
+SIGNALS = ('heart', 'breath')  # signals with running moments in an epoch
+
+# Weights per stage over (bias, activity, recent, heart, heart_var, breath_var, snoring, night)
+WEIGHTS = np.array([
+    [-1.5, 7.0, 2.0, 0.8, 0.2, 0.0, -1.0, 0.0],    # Wake
+    [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],      # Light (reference)
+    [0.2, -4.0, -2.0, -0.8, -0.8, -1.2, 0.6, -1.2],  # Deep
+    [-1.6, -4.0, -1.0, 0.5, 1.2, 1.4, -1.2, 0.8],  # REM
+])
+STAY_BONUS = 0.8  # score added to the previous epoch's stage
+BASELINE_EPOCHS = 40  # time constant (epochs) of the night heart-rate baseline
+RECENT_EPOCHS = 4  # time constant (epochs) of the smoothed activity
+MAX_GAP_EPOCHS = 10  # a longer gap in the readings starts the context over
+
+class SleepStager:
+    """Streaming 30-second-epoch sleep stage classifier for one sleeper"""
+
+    def __init__(self, epoch_seconds=30):
+        self.epoch_ms = int(epoch_seconds * 1000)
+        self._epoch = None  # id (start ms // epoch_ms) of the open epoch
+        self._sums = [[0, 0.0, 0.0] for _ in SIGNALS]  # count, sum, sum of squares per signal
+        self._moves = [0, 0]  # movement readings, of which moving
+        self._snores = [0, 0]  # snore readings, of which snoring
+        self._in_bed = None
+        self.reset()
+
+    def reset(self):
+        """Forget the night context (baseline, smoothed activity, previous stage)"""
+        self._baseline = None  # [mean, variance] of epoch heart rates
+        self._recent = 0.0
+        self._previous = None
+        self._first_ms = None
+
+    def add(self, time_ms, heart_rate=None, breathing_rate=None, moving=None, snoring=None, in_bed=None):
+        """Add one reading; returns the epoch it completed as a dict, or None"""
+        epoch = int(time_ms // self.epoch_ms)
+        result = None
+        if self._epoch is None:
+            self._epoch = epoch
+        elif epoch > self._epoch:
+            result = self._close()
+            if epoch - self._epoch > MAX_GAP_EPOCHS:
+                self.reset()
+            self._epoch = epoch
+        elif epoch < self._epoch:
+            return None  # belongs to an epoch already scored
+
+        for index, value in enumerate((heart_rate, breathing_rate)):
+            if value:  # 0 means no signal
+                sums = self._sums[index]
+                sums[0] += 1
+                sums[1] += value
+                sums[2] += value * value
+        if moving is not None:
+            self._moves[0] += 1
+            self._moves[1] += bool(moving)
+        if snoring is not None:
+            self._snores[0] += 1
+            self._snores[1] += bool(snoring)
+        if in_bed is not None:
+            self._in_bed = in_bed
+        return result
+
+    def _close(self):
+        """Score the open epoch and clear its sums"""
+        start_ms = self._epoch * self.epoch_ms
+        means, spreads = [], []
+        for count, total, squares in self._sums:
+            mean = total / count if count else math.nan
+            means.append(mean)
+            spreads.append(math.sqrt(max(squares / count - mean * mean, 0.0)) if count > 1 else 0.0)
+        heart, breath = means
+        activity = self._moves[1] / self._moves[0] if self._moves[0] else 0.0
+        snoring = self._snores[1] / self._snores[0] if self._snores[0] else 0.0
+        self._sums = [[0, 0.0, 0.0] for _ in SIGNALS]
+        self._moves = [0, 0]
+        self._snores = [0, 0]
+
+        reading = {
+            'epochStart': start_ms,
+            'heartRate': None if math.isnan(heart) else round(heart, 1),
+            'breathingRate': None if math.isnan(breath) else round(breath, 1),
+            'activity': round(activity, 2),
+            'snoring': round(snoring, 2),
+        }
+        if self._in_bed is False:
+            # Nobody to score; the next night starts from scratch
+            self.reset()
+            return dict(reading, stage='Wake', confidence=1.0, inBed=False)
+
+        if self._first_ms is None:
+            self._first_ms = start_ms
+        self._recent += (activity - self._recent) / RECENT_EPOCHS
+        features = np.array([
+            1.0,
+            activity,
+            self._recent,
+            self._heart_deviation(heart),
+            0.0 if math.isnan(heart) else min(spreads[0] / 5, 3.0),
+            0.0 if math.isnan(breath) else min(spreads[1] / 2, 3.0),
+            snoring,
+            (start_ms - self._first_ms) / 3.6e6 / 8,
+        ])
+        scores = WEIGHTS @ features
+        if self._previous is not None:
+            scores[self._previous] += STAY_BONUS
+        probabilities = np.exp(scores - scores.max())
+        probabilities /= probabilities.sum()
+        stage = int(np.argmax(probabilities))
+        self._previous = stage
+        return dict(reading, stage=STAGES[stage], confidence=round(float(probabilities[stage]), 2), inBed=True)
+
+    def _heart_deviation(self, heart):
+        """Epoch heart rate in baseline standard deviations (at least 3 bpm), then track it"""
+        if math.isnan(heart):
+            return 0.0
+        if self._baseline is None:
+            self._baseline = [heart, 25.0]
+            return 0.0
+        mean, variance = self._baseline
+        deviation = (heart - mean) / max(math.sqrt(variance), 3.0)
+        delta = heart - mean
+        self._baseline[0] += delta / BASELINE_EPOCHS
+        self._baseline[1] += (delta * delta - variance) / BASELINE_EPOCHS
+        return min(max(deviation, -3.0), 3.0)
+
+__all__ = [
+    'STAGES',
+    'SleepStager',
+]
@@ -0,0 +1,15 @@
+# ingest/__init__.py
+"""
+Ingest module for Sleep Monitoring Backend
+Validation and decoding of data uploaded by the ESP32 devices
+"""
+
+from .frames import SENSOR_KEYS, FrameValidationError, validate_frame, validate_frames, validate_readings
+from .binary import CONTENT_TYPE as BINARY_CONTENT_TYPE, FrameDecodeError, decode_frames, encode_frames, validate_decoded
+from .audio import CONTENT_TYPE as AUDIO_CONTENT_TYPE, AudioDecodeError, decode_pcm
+
+__all__ = [
+    'SENSOR_KEYS', 'FrameValidationError', 'validate_frame', 'validate_frames', 'validate_readings',
+    'BINARY_CONTENT_TYPE', 'FrameDecodeError', 'decode_frames', 'encode_frames', 'validate_decoded',
+    'AUDIO_CONTENT_TYPE', 'AudioDecodeError', 'decode_pcm'
+]
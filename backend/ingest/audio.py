@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+ingest/audio.py - Raw Microphone PCM Uploads
+Decodes audio/L16 request bodies (16-bit little-endian mono PCM) for the snore detector
+
+The sample rate comes from the Content-Type parameter (audio/L16;rate=16000) and the
+time of the last sample from the X-Timestamp header (epoch ms or ISO-8601, default now).
+The body is viewed in place as int16; nothing is parsed sample by sample.
+"""
+
+import numpy as np
+
+from config import Config
+from ingest.frames import parse_frame_timestamp
+
+CONTENT_TYPE = 'audio/L16'
+SAMPLE_RATES = (8000, 48000)  # accepted range, Hz
+
+class AudioDecodeError(ValueError):
+    """Raised when a PCM upload is malformed"""
+
+def decode_pcm(payload, rate=None, timestamp=None, now=None):
+    """Decode one PCM upload; returns (samples as int16, sample rate, datetime of the last sample)"""
+    try:
+        sample_rate = int(rate) if rate else Config.SNORE_SAMPLE_RATE
+    except ValueError:
+        raise AudioDecodeError(f'invalid sample rate: {rate!r}')
+    if not SAMPLE_RATES[0] <= sample_rate <= SAMPLE_RATES[1]:
+        raise AudioDecodeError(f'sample rate must be {SAMPLE_RATES[0]}-{SAMPLE_RATES[1]} Hz')
+
+    if not payload or len(payload) % 2:
+        raise AudioDecodeError('body must be a non-empty run of 16-bit samples')
+    if len(payload) // 2 > Config.AUDIO_MAX_SECONDS * sample_rate:
+        raise AudioDecodeError(f'more than {Config.AUDIO_MAX_SECONDS} seconds of audio')
+
+    if isinstance(timestamp, str) and timestamp.isdigit():
+        timestamp = int(timestamp)
+    try:
+        end = parse_frame_timestamp(timestamp, now)
+    except ValueError as e:
+        raise AudioDecodeError(str(e))
+    return np.frombuffer(payload, dtype='<i2'), sample_rate, end
+
+__all__ = [
+    'CONTENT_TYPE',
+    'AudioDecodeError',
+    'decode_pcm',
+]
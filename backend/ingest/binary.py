@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+ingest/binary.py - Compact Binary Frame Encoding
+Fixed struct-packed layout for ESP32 uploads, selected by Content-Type
+
+Layout (little endian, version 1):
+    header   <BH    version, frame count
+    frame    <qB    timestamp in epoch ms (0 = use server time), sensor bitmask
+    sections        one per set bit, in bit order:
+      bit 0  heart_rate  <HHHff  rate, min, max, average, variability
+      bit 1  breathing   <HBH    rate, rhythm code, apneaEvents
+      bit 2  gyroscope   <ff     pitch, roll
+      bit 3  weight      <ff     weight, movement
+      bit 4  snore       <?fHB   isDetected, frequency, duration_minutes, intensity
+"""
+
+import struct
+import time
+
+from ingest.frames import NUMERIC_FIELDS, parse_frame_timestamp
+
+CONTENT_TYPE = 'application/vnd.sleepmonitor.frames'
+FORMAT_VERSION = 1
+
+RHYTHMS = ('Normal', 'Irregular', 'Shallow', 'Apnea')
+
+_HEADER = struct.Struct('<BH')
+_FRAME_HEADER = struct.Struct('<qB')
+_SECTIONS = (
+    ('heart_rate', struct.Struct('<HHHff'), ('rate', 'min', 'max', 'average', 'variability')),
+    ('breathing', struct.Struct('<HBH'), ('rate', 'rhythm', 'apneaEvents')),
+    ('gyroscope', struct.Struct('<ff'), ('pitch', 'roll')),
+    ('weight', struct.Struct('<ff'), ('weight', 'movement')),
+    ('snore', struct.Struct('<?fHB'), ('isDetected', 'frequency', 'duration_minutes', 'intensity')),
+)
+
+# Struct fields are always numeric, so only the range checks remain: sensor -> (field, low, high)
+_RANGES = {
+    sensor: tuple(
+        (field, float('-inf') if low is None else low, float('inf') if high is None else high)
+        for field, (low, high) in NUMERIC_FIELDS[sensor].items() if field in fields
+    )
+    for sensor, _, fields in _SECTIONS
+}
+
+class FrameDecodeError(ValueError):
+    """Raised when a binary payload is malformed"""
+
+def decode_frames(payload):
+    """Decode a binary payload into a list of (timestamp_ms or None, {sensor: reading})"""
+    view = memoryview(payload)
+    try:
+        version, count = _HEADER.unpack_from(view, 0)
+        if version != FORMAT_VERSION:
+            raise FrameDecodeError(f'unsupported format version {version}')
+
+        offset = _HEADER.size
+        frames = []
+        for _ in range(count):
+            timestamp_ms, mask = _FRAME_HEADER.unpack_from(view, offset)
+            offset += _FRAME_HEADER.size
+
+            readings = {}
+            for bit, (sensor, layout, fields) in enumerate(_SECTIONS):
+                if mask & (1 << bit):
+                    readings[sensor] = dict(zip(fields, layout.unpack_from(view, offset)))
+                    offset += layout.size
+
+            breathing = readings.get('breathing')
+            if breathing is not None:
+                code = breathing['rhythm']
+                breathing['rhythm'] = RHYTHMS[code] if code < len(RHYTHMS) else 'Normal'
+
+            frames.append((timestamp_ms or None, readings))
+    except struct.error as e:
+        raise FrameDecodeError(f'truncated payload: {e}')
+
+    if offset != len(view):
+        raise FrameDecodeError(f'{len(view) - offset} trailing bytes after {count} frames')
+    return frames
+
+def encode_frames(frames):
+    """Encode [(timestamp_ms or None, {sensor: reading})] - mirror of the ESP32 encoder"""
+    parts = [_HEADER.pack(FORMAT_VERSION, len(frames))]
+    for timestamp_ms, readings in frames:
+        mask = 0
+        sections = []
+        for bit, (sensor, layout, fields) in enumerate(_SECTIONS):
+            reading = readings.get(sensor)
+            if reading is None:
+                continue
+            mask |= 1 << bit
+            values = []
+            for field in fields:
+                value = reading.get(field, 0)
+                if field == 'rhythm':
+                    value = RHYTHMS.index(value) if value in RHYTHMS else 0
+                values.append(value)
+            sections.append(layout.pack(*values))
+        parts.append(_FRAME_HEADER.pack(int(timestamp_ms or 0), mask))
+        parts.extend(sections)
+    return b''.join(parts)
+
+def validate_decoded(frames, now=None):
+    """Validate decoded frames; same (valid, results) contract as validate_frames"""
+    now = now or time.time()
+    valid, results = [], []
+
+    for index, (timestamp_ms, readings) in enumerate(frames):
+        errors = []
+        try:
+            timestamp = parse_frame_timestamp(timestamp_ms, now)
+        except ValueError as e:
+            errors.append(str(e))
+        for sensor, reading in readings.items():
+            for field, low, high in _RANGES[sensor]:
+                value = reading[field]
+                if not low <= value <= high:
+                    errors.append(f'{sensor}.{field}: {value} out of range')
+        if not readings:
+            errors.append('frame contains no sensor readings')
+
+        if errors:
+            results.append({'index': index, 'status': 'error', 'errors': errors})
+            continue
+        valid.append((index, timestamp, readings))
+        results.append({'index': index, 'status': 'ok', 'timestamp': timestamp.isoformat(),
+                        'sensors': list(readings)})
+
+    valid.sort(key=lambda entry: entry[1])
+    return valid, results
+
+__all__ = [
+    'CONTENT_TYPE',
+    'FORMAT_VERSION',
+    'FrameDecodeError',
+    'decode_frames',
+    'encode_frames',
+    'validate_decoded',
+]
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+ingest/frames.py - Multi-Sensor Frame Validation
+Parses timestamped ESP32 frames before they reach the sensor services
+"""
+
+import math
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config import Config
+
+# Sensor keys accepted in a frame, in the order they are applied
+SENSOR_KEYS = ('heart_rate', 'breathing', 'gyroscope', 'weight', 'snore')
+
+# Numeric fields per sensor and their allowed (min, max) range (None = unbounded)
+NUMERIC_FIELDS = {
+    'heart_rate': {
+        'rate': (0, Config.HEART_RATE_MAX),
+        'min': (0, Config.HEART_RATE_MAX),
+        'max': (0, Config.HEART_RATE_MAX),
+        'average': (0, Config.HEART_RATE_MAX),
+        'variability': (0, None),
+        'ppgRate': (1, 1000),
+    },
+    'breathing': {
+        'rate': (0, Config.BREATHING_RATE_MAX),
+        'apneaEvents': (0, None),
+        'piezoRate': (1, 10000),
+    },
+    'gyroscope': {
+        'pitch': (-180, 180),
+        'roll': (-180, 180),
+        'imuRate': (1, 2000),
+    },
+    'weight': {
+        'weight': (0, Config.WEIGHT_MAX),
+        'movement': (0, None),
+        'loadRate': (1, 10000),
+        'pressureRows': (1, 256),
+        'pressureCols': (1, 256),
+        'pressureRate': (1, 1000),
+    },
+    'snore': {
+        'frequency': (0, None),  # Hz
+        'rate': (0, None),  # snores per minute
+        'duration_minutes': (0, None),
+        'intensity': (0, 100),
+    },
+}
+
+# Numeric fields that count things (grid dimensions) and must be whole numbers
+INTEGER_FIELDS = {
+    'weight': {'pressureRows', 'pressureCols'},
+}
+
+# Raw sample arrays per sensor, processed server-side (dsp/): field -> allowed (min, max) per sample
+ARRAY_FIELDS = {
+    'heart_rate': {
+        'rr': (0, 5000),  # beat-to-beat intervals, ms
+        'ppg': (None, None),
+    },
+    'breathing': {
+        'piezo': (None, None),
+    },
+    'gyroscope': {
+        'accel': (None, None),  # interleaved x, y, z
+        'gyro': (-2000, 2000),  # interleaved x, y, z, deg/s
+    },
+    'weight': {
+        'load': (None, Config.WEIGHT_MAX),  # kg
+        'pressure': (None, None),  # frames of rows x cols mat cells, row by row
+    },
+}
+
+class FrameValidationError(ValueError):
+    """Raised when a frame cannot be accepted; carries every problem found"""
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+def parse_frame_timestamp(value, now=None):
+    """Convert a device timestamp (epoch seconds/ms or ISO-8601) to a local datetime"""
+    now = now or time.time()
+    if value is None:
+        return datetime.fromtimestamp(now)
+
+    if isinstance(value, bool):
+        raise ValueError('timestamp must be a number or ISO-8601 string')
+
+    if isinstance(value, (int, float)):
+        # ESP32 clocks report epoch milliseconds; accept seconds as well
+        seconds = value / 1000 if value > 1e11 else value
+    elif isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f'invalid timestamp: {value!r}')
+        seconds = parsed.timestamp()
+    else:
+        raise ValueError('timestamp must be a number or ISO-8601 string')
+
+    if seconds > now + Config.MAX_CLOCK_SKEW_SECONDS:
+        raise ValueError('timestamp is in the future')
+    if seconds <= 0:
+        raise ValueError('timestamp must be positive')
+    return datetime.fromtimestamp(seconds)
+
+def validate_readings(sensor, reading):
+    """Return a list of problems with one sensor reading (empty when valid)"""
+    if not isinstance(reading, dict):
+        return [f'{sensor}: reading must be an object']
+
+    errors = []
+    for field, (low, high) in NUMERIC_FIELDS[sensor].items():
+        if field not in reading:
+            continue
+        value = reading[field]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            errors.append(f'{sensor}.{field}: must be a number')
+        elif field in INTEGER_FIELDS.get(sensor, ()) and not isinstance(value, int):
+            errors.append(f'{sensor}.{field}: must be an integer')
+        elif (low is not None and value < low) or (high is not None and value > high):
+            errors.append(f'{sensor}.{field}: {value} out of range')
+
+    for field, (low, high) in ARRAY_FIELDS.get(sensor, {}).items():
+        if field in reading:
+            errors.extend(validate_samples(f'{sensor}.{field}', reading[field], low, high))
+
+    if sensor == 'gyroscope' and not errors and ('accel' in reading or 'gyro' in reading):
+        if 'accel' not in reading:
+            errors.append('gyroscope.gyro: requires accel')
+        elif len(reading['accel']) % 3:
+            errors.append('gyroscope.accel: must hold x, y, z triples')
+        elif 'gyro' in reading and len(reading['gyro']) != len(reading['accel']):
+            errors.append('gyroscope.gyro: must match accel sample for sample')
+
+    if sensor == 'weight' and not errors and 'pressure' in reading:
+        cells = (reading.get('pressureRows', Config.PRESSURE_GRID_ROWS)
+                 * reading.get('pressureCols', Config.PRESSURE_GRID_COLS))
+        if len(reading['pressure']) % cells:
+            errors.append(f'weight.pressure: must hold whole frames of {cells} cells')
+
+    if sensor == 'snore' and not isinstance(reading.get('isDetected', False), bool):
+        errors.append('snore.isDetected: must be a boolean')
+    return errors
+
+def validate_samples(name, value, low=None, high=None):
+    """Return a list of problems with a raw sample array (empty when valid)"""
+    if not isinstance(value, list) or not value:
+        return [f'{name}: must be a non-empty list of numbers']
+    if len(value) > Config.MAX_RAW_SAMPLES:
+        return [f'{name}: more than {Config.MAX_RAW_SAMPLES} samples']
+    try:
+        samples = np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        return [f'{name}: must be a non-empty list of numbers']
+    if samples.ndim != 1 or not np.isfinite(samples).all():
+        return [f'{name}: must be a non-empty list of numbers']
+    if (low is not None and samples.min() < low) or (high is not None and samples.max() > high):
+        return [f'{name}: samples out of range']
+    return []
+
+def validate_frame(frame, now=None):
+    """Validate one frame; returns (datetime, {sensor: reading}) or raises FrameValidationError"""
+    if not isinstance(frame, dict):
+        raise FrameValidationError(['frame must be an object'])
+
+    errors = []
+    try:
+        timestamp = parse_frame_timestamp(frame.get('timestamp'), now)
+    except ValueError as e:
+        errors.append(str(e))
+        timestamp = None
+
+    readings = {}
+    for sensor in SENSOR_KEYS:
+        if sensor in frame:
+            problems = validate_readings(sensor, frame[sensor])
+            if problems:
+                errors.extend(problems)
+            else:
+                readings[sensor] = frame[sensor]
+
+    unknown = set(frame) - set(SENSOR_KEYS) - {'timestamp'}
+    if unknown:
+        errors.append(f"unknown keys: {', '.join(sorted(unknown))}")
+    if not readings and not errors:
+        errors.append('frame contains no sensor readings')
+
+    if errors:
+        raise FrameValidationError(errors)
+    return timestamp, readings
+
+def validate_frames(frames, now=None):
+    """Validate a batch together; returns (valid, results) with per-frame outcomes
+
+    valid is a list of (index, timestamp, readings) sorted by timestamp so the
+    newest reading ends up as each service's current state.
+    """
+    now = now or time.time()
+    valid, results = [], []
+
+    for index, frame in enumerate(frames):
+        try:
+            timestamp, readings = validate_frame(frame, now)
+        except FrameValidationError as e:
+            results.append({'index': index, 'status': 'error', 'errors': e.errors})
+            continue
+        valid.append((index, timestamp, readings))
+        results.append({'index': index, 'status': 'ok', 'timestamp': timestamp.isoformat(),
+                        'sensors': list(readings)})
+
+    valid.sort(key=lambda entry: entry[1])
+    return valid, results
+
+__all__ = [
+    'SENSOR_KEYS',
+    'FrameValidationError',
+    'parse_frame_timestamp',
+    'validate_readings',
+    'validate_samples',
+    'validate_frame',
+    'validate_frames',
+]
@@ -0,0 +1,17 @@
+# realtime/__init__.py
+"""
+Realtime module for Sleep Monitoring Backend
+Push hub that streams live sensor updates to dashboards, in-memory ring
+buffers of recent readings for short-range history, and the shared-memory
+latest state that lets several worker processes serve the same readings
+"""
+
+from .hub import SENSOR_TOPICS, HubFull, Subscription, PushHub, get_hub
+from .ring import RING_FIELDS, SensorRing, get_ring, get_ring_stats
+from .shared_state import SharedStateStore, get_shared_state, shared_slot
+
+__all__ = [
+    'SENSOR_TOPICS', 'HubFull', 'Subscription', 'PushHub', 'get_hub',
+    'RING_FIELDS', 'SensorRing', 'get_ring', 'get_ring_stats',
+    'SharedStateStore', 'get_shared_state', 'shared_slot',
+]
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+realtime/hub.py - Push Hub for Live Sensor Updates
+Services publish their latest state per topic; subscribers receive it as it arrives
+
+Each subscriber has a coalescing mailbox holding only the newest payload per
+topic, so a slow consumer skips stale readings instead of building a backlog,
+and a per-subscriber minimum interval throttles how often a topic is sent.
+"""
+
+import threading
+import time
+import logging
+
+from config import Config
+from database.devices import DEFAULT_DEVICE
+
+logger = logging.getLogger(__name__)
+
+SENSOR_TOPICS = ('heart_rate', 'breathing', 'gyroscope', 'weight', 'snore', 'sleep', 'alerts')
+
+class HubFull(Exception):
+    """Raised when the hub already has the maximum number of subscribers"""
+
+class Subscription:
+    """One consumer's view of the hub: topics, throttle and a coalescing mailbox"""
+
+    def __init__(self, hub, topics, min_interval):
+        self.hub = hub
+        self.topics = frozenset(topics)
+        self.min_interval = min_interval
+        self.dropped = 0  # payloads replaced before they were sent
+
+        self._mailbox = {}
+        self._last_sent = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def offer(self, topic, payload):
+        """Called by the hub on publish; replaces any unsent payload for the topic"""
+        with self._cond:
+            if topic in self._mailbox:
+                self.dropped += 1
+            self._mailbox[topic] = payload
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Wait for updates that are due; returns [(topic, payload)] ([] on timeout/close)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                ready, next_due = [], None
+                for topic in list(self._mailbox):
+                    due = self._last_sent.get(topic, 0) + self.min_interval
+                    if due <= now:
+                        ready.append((topic, self._mailbox.pop(topic)))
+                        self._last_sent[topic] = now
+                    elif next_due is None or due < next_due:
+                        next_due = due
+                if ready:
+                    return ready
+
+                wait = None if deadline is None else deadline - now
+                if next_due is not None:
+                    wait = next_due - now if wait is None else min(wait, next_due - now)
+                if wait is not None and wait <= 0:
+                    return []
+                self._cond.wait(wait)
+            return []
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.hub.unsubscribe(self)
+
+class PushHub:
+    """Topic-based fan-out of the latest sensor state to live subscribers"""
+
+    def __init__(self, max_subscribers=None, max_waiters=None):
+        self.max_subscribers = max_subscribers or Config.STREAM_MAX_SUBSCRIBERS
+        self.max_waiters = max_waiters or Config.SNAPSHOT_MAX_WAITERS
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._subscribers = set()
+        self._listeners = []  # in-process consumers of every local publish (e.g. the sleep stager)
+        self._latest = {}
+        self._waiters = 0
+        self.version = 0
+        self.boot_id = format(int(time.time() * 1000), 'x')  # keeps versions unique across restarts
+        self.stats = {'published': 0, 'delivered': 0}
+
+    def publish(self, topic, payload, local=True):
+        """Record the newest payload for a topic and hand it to every subscriber of it
+
+        local=False marks a payload republished from another worker; listeners only
+        see payloads ingested by this process, so nothing is processed twice.
+        """
+        with self._lock:
+            self.version += 1
+            self._latest[topic] = payload
+            targets = [sub for sub in self._subscribers if topic in sub.topics]
+            self.stats['published'] += 1
+            self.stats['delivered'] += len(targets)
+            if self._waiters:
+                self._changed.notify_all()
+
+        for sub in targets:
+            sub.offer(topic, payload)
+        if local:
+            for listener in self._listeners:
+                try:
+                    listener(topic, payload)
+                except Exception as e:
+                    logger.error(f"❌ Hub listener error ({topic}): {e}")
+
+    def listen(self, callback):
+        """Call callback(topic, payload) after every local publish, in the publishing thread"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def latest(self, topic=None):
+        """Latest payload for one topic, or a copy of all of them"""
+        with self._lock:
+            if topic is not None:
+                return self._latest.get(topic)
+            return dict(self._latest)
+
+    def snapshot(self):
+        """(version, {topic: latest payload}) read together"""
+        with self._lock:
+            return self.version, dict(self._latest)
+
+    def wait_for_change(self, version, timeout):
+        """Block until the hub moves past `version` or timeout; returns the current version
+
+        Returns immediately when too many clients are already waiting, so long-polls
+        can never tie up every request thread.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            if self._waiters >= self.max_waiters:
+                return self.version
+            self._waiters += 1
+            try:
+                while self.version == version:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._changed.wait(remaining)
+                return self.version
+            finally:
+                self._waiters -= 1
+
+    def subscribe(self, topics=None, min_interval=None):
+        """Register a subscriber; it starts with the latest payload of each topic"""
+        topics = topics or SENSOR_TOPICS
+        min_interval = Config.STREAM_MIN_INTERVAL if min_interval is None else min_interval
+        sub = Subscription(self, topics, min_interval)
+
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise HubFull(f"Push hub full ({self.max_subscribers} subscribers)")
+            self._subscribers.add(sub)
+            initial = [(topic, self._latest[topic]) for topic in sub.topics if topic in self._latest]
+
+        for topic, payload in initial:
+            sub.offer(topic, payload)
+        logger.info(f"📡 Stream subscriber added ({len(self._subscribers)} active, topics: {', '.join(sorted(sub.topics))})")
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            if sub not in self._subscribers:
+                return
+            self._subscribers.discard(sub)
+            remaining = len(self._subscribers)
+        logger.info(f"📡 Stream subscriber removed ({remaining} active)")
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, subscribers=len(self._subscribers), waiters=self._waiters,
+                        version=self.version)
+
+_hubs = {}
+_hub_lock = threading.Lock()
+
+def get_hub(device_id=None):
+    """Get the push hub of one device (default: the default device's, which /api/stream serves)"""
+    device_id = device_id or DEFAULT_DEVICE
+    hub = _hubs.get(device_id)
+    if hub is None:
+        with _hub_lock:
+            hub = _hubs.get(device_id)
+            if hub is None:
+                hub = _hubs[device_id] = PushHub()
+    return hub
+
+__all__ = [
+    'SENSOR_TOPICS',
+    'HubFull',
+    'Subscription',
+    'PushHub',
+    'get_hub',
+]
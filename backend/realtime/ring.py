@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+realtime/ring.py - In-Memory Recent History
+Fixed-capacity NumPy ring buffers per sensor, filled on ingest, so short-range
+history and live charts are answered from memory instead of SQLite
+
+Each sensor gets one int64 array of epoch-ms timestamps plus one array per history
+field (float32, small ints, or int16 codes for text labels). RING_BUFFER_MEMORY_MB is
+the total for the process: it is split evenly across the beds that have buffers, then
+across each bed's sensors, and existing buffers shrink when another bed appears. A
+full buffer drops its oldest reading by time, so a late frame doesn't push out newer
+ones. A query is only answered from the buffer when the buffer is known to hold every
+row of the range; otherwise the caller falls back to SQLite.
+"""
+
+import threading
+import logging
+import numpy as np
+
+from database.queries import epoch_ms
+from database.devices import DEFAULT_DEVICE
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Storage per field kind; 'label' is a text value stored as a dictionary code
+FIELD_DTYPES = {
+    'float': np.float32,
+    'int': np.int32,
+    'flag': np.int8,
+    'bool': np.bool_,
+    'label': np.int16,
+}
+
+# Sensor -> ((history field, kind), ...) matching the raw history each service returns
+RING_FIELDS = {
+    'heart_rate': (('rate', 'int'), ('status', 'label')),
+    'breathing': (('rate', 'int'), ('rhythm', 'label'), ('apneaEvents', 'int')),
+    'gyroscope': (('pitch', 'float'), ('roll', 'float'), ('neckAngle', 'float'),
+                  ('position', 'label'), ('postureSeverity', 'label')),
+    'weight': (('weight', 'float'), ('is_in_bed', 'flag')),
+    'snore': (('isDetected', 'bool'), ('frequency', 'float'), ('duration_minutes', 'int')),
+}
+
+def row_bytes(fields):
+    """Bytes one buffered reading takes (timestamp + insert order + fields)"""
+    return 2 * np.dtype(np.int64).itemsize + sum(np.dtype(FIELD_DTYPES[kind]).itemsize for _, kind in fields)
+
+class SensorRing:
+    """Ring buffer of the most recent readings of one sensor"""
+
+    def __init__(self, sensor, fields, capacity, exclusive=True):
+        self.sensor = sensor
+        self.fields = tuple(fields)
+        self.capacity = max(int(capacity), 1)
+        # False in reader workers (serve.py --workers > 1): the ingest owner fills its
+        # own buffers, so this one stays empty and never answers queries
+        self.exclusive = exclusive
+
+        self._ts = np.zeros(self.capacity, dtype=np.int64)
+        self._seq = np.zeros(self.capacity, dtype=np.int64)  # insert order, for ties on ts
+        self._columns = {name: np.zeros(self.capacity, dtype=FIELD_DTYPES[kind]) for name, kind in self.fields}
+        self._labels = {name: [] for name, kind in self.fields if kind == 'label'}
+        self._codes = {name: {} for name in self._labels}
+        self._count = 0  # slots [0, count) are in use
+        self._next_seq = 0
+        self._lock = threading.Lock()
+
+        # Every reading at or after this time is in the buffer. Older ones may only be
+        # in SQLite (written before startup, or overwritten since).
+        self.complete_since_ms = epoch_ms()
+
+    @property
+    def nbytes(self):
+        return self._ts.nbytes + self._seq.nbytes + sum(column.nbytes for column in self._columns.values())
+
+    def _encode(self, name, value):
+        codes = self._codes[name]
+        code = codes.get(value)
+        if code is None:
+            if len(codes) >= np.iinfo(np.int16).max:
+                return -1
+            code = codes[value] = len(self._labels[name])
+            self._labels[name].append(value)
+        return code
+
+    def append(self, ts_ms, record):
+        """Add one reading; record maps history field -> value"""
+        with self._lock:
+            if self._count < self.capacity:
+                slot = self._count
+                self._count += 1
+            else:
+                # Full: the oldest reading by time goes, and is then only in SQLite
+                slot = int(np.argmin(self._ts))
+                oldest = int(self._ts[slot])
+                if ts_ms <= oldest:
+                    # A late frame older than everything held: keep the newer readings
+                    self.complete_since_ms = max(self.complete_since_ms, int(ts_ms) + 1)
+                    return
+                self.complete_since_ms = max(self.complete_since_ms, oldest + 1)
+
+            self._ts[slot] = ts_ms
+            self._seq[slot] = self._next_seq
+            self._next_seq += 1
+            for name, kind in self.fields:
+                value = record.get(name)
+                if kind == 'label':
+                    self._columns[name][slot] = self._encode(name, value)
+                else:
+                    self._columns[name][slot] = value or 0
+
+    def resize(self, capacity):
+        """Change the capacity, keeping the newest readings by time"""
+        capacity = max(int(capacity), 1)
+        with self._lock:
+            count = self._count
+            by_time = np.lexsort((self._seq[:count], self._ts[:count]))
+            if count > capacity:
+                dropped = by_time[:count - capacity]
+                self.complete_since_ms = max(self.complete_since_ms, int(self._ts[dropped].max()) + 1)
+            kept = by_time[-capacity:]
+
+            def moved(array):
+                resized = np.zeros(capacity, dtype=array.dtype)
+                resized[:len(kept)] = array[kept]
+                return resized
+
+            self._ts = moved(self._ts)
+            self._seq = moved(self._seq)
+            self._columns = {name: moved(column) for name, column in self._columns.items()}
+            self._count = len(kept)
+            self.capacity = capacity
+
+    def query(self, start_ms=None, end_ms=None, limit=None):
+        """Readings in [start_ms, end_ms) as history dicts, newest first
+
+        Returns None when the buffer can't prove it holds the answer (range
+        reaches back before complete_since_ms and the newest `limit` rows
+        aren't all inside the buffer); callers then read SQLite instead.
+        """
+        if not self.exclusive:
+            return None
+        with self._lock:
+            count = self._count
+            slots = np.arange(count)
+            ts = self._ts[:count]
+
+            lower = self.complete_since_ms if start_ms is None else max(start_ms, self.complete_since_ms)
+            mask = ts >= lower
+            if end_ms is not None:
+                mask &= ts < end_ms
+            covered = start_ms is not None and start_ms >= self.complete_since_ms
+            if not covered and (limit is None or np.count_nonzero(mask) < limit):
+                return None
+
+            # Newest first; ties on ts newest-inserted first, like id DESC
+            order = np.lexsort((-self._seq[:count][mask], -ts[mask]))
+            selected = slots[mask][order][:limit]
+            columns = {name: self._columns[name][selected] for name, _ in self.fields}
+            labels = {name: list(values) for name, values in self._labels.items()}
+            ts = self._ts[selected]
+
+        return self._to_dicts(ts, columns, labels)
+
+    def _to_dicts(self, ts, columns, labels):
+        values = []
+        for name, kind in self.fields:
+            column = columns[name]
+            if kind == 'label':
+                names = labels[name]
+                values.append([names[code] if code >= 0 else None for code in column.tolist()])
+            elif kind == 'float':
+                # float32 -> shortest decimal that round-trips what the sensor sent
+                values.append(np.round(column.astype(np.float64), 4).tolist())
+            else:
+                values.append(column.tolist())
+
+        # Same 'YYYY-MM-DD HH:MM:SS' UTC text as the timestamp column in SQLite
+        stamps = np.datetime_as_string(ts.astype('datetime64[ms]').astype('datetime64[s]'))
+        names = [name for name, _ in self.fields] + ['timestamp']
+        values.append([stamp.replace('T', ' ') for stamp in stamps.tolist()])
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'rows': self._count,
+                'capacity': self.capacity,
+                'bytes': self.nbytes,
+                'completeSinceMs': self.complete_since_ms,
+                'exclusive': self.exclusive
+            }
+
+def ring_capacity(sensor, memory_mb):
+    """Readings one sensor's ring holds in its share of memory_mb (one bed's memory)"""
+    share = memory_mb * 1024 * 1024 / len(RING_FIELDS)
+    return share // row_bytes(RING_FIELDS[sensor])
+
+def create_ring(sensor, memory_mb=None):
+    """Ring for one sensor sized to its share of memory_mb (default: all of RING_BUFFER_MEMORY_MB)"""
+    memory_mb = Config.RING_BUFFER_MEMORY_MB if memory_mb is None else memory_mb
+    ring = SensorRing(sensor, RING_FIELDS[sensor], ring_capacity(sensor, memory_mb),
+                      exclusive=not Config.INGEST_OWNER_URL)
+    logger.info(f"🧠 {sensor} ring buffer: {ring.capacity} readings ({ring.nbytes / 1024:.0f} KB)")
+    return ring
+
+_rings = {}
+_rings_lock = threading.Lock()
+
+def get_ring(sensor, device_id=None):
+    """Get the ring buffer of a sensor on one device (default: the default device)"""
+    key = (device_id or DEFAULT_DEVICE, sensor)
+    ring = _rings.get(key)
+    if ring is None:
+        with _rings_lock:
+            ring = _rings.get(key)
+            if ring is None:
+                devices = {device for device, _ in _rings}
+                memory_mb = Config.RING_BUFFER_MEMORY_MB / len(devices | {key[0]})
+                if key[0] not in devices and devices:
+                    # Another bed: every bed's buffers shrink to keep the total in budget
+                    for (_, other), existing in _rings.items():
+                        existing.resize(ring_capacity(other, memory_mb))
+                    logger.info(f"🧠 Ring buffers split across {len(devices) + 1} beds")
+                ring = _rings[key] = create_ring(sensor, memory_mb)
+    return ring
+
+def get_ring_stats(device_id=None):
+    """Stats of every ring created so far on one device"""
+    device_id = device_id or DEFAULT_DEVICE
+    with _rings_lock:
+        rings = dict(_rings)
+    return {sensor: ring.get_stats() for (device, sensor), ring in rings.items() if device == device_id}
+
+__all__ = [
+    'RING_FIELDS',
+    'row_bytes',
+    'SensorRing',
+    'ring_capacity',
+    'create_ring',
+    'get_ring',
+    'get_ring_stats',
+]
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+realtime/shared_state.py - Shared-Memory Latest State
+Keeps the latest JSON state of every sensor of every device in one fixed-layout
+multiprocessing.shared_memory segment, so several worker processes serve the same,
+current readings without any IPC round trips
+
+Layout (little-endian):
+    header     64 bytes   magic, slot size, device and sensor counts
+    directory  32 bytes   per device: its id, NUL-padded ('' = free)
+    slots      SHARED_STATE_SLOT_BYTES per (device, sensor):
+               seq u64 | length u32 | crc32 u32 | writer pid u32 | pad | ts_ms i64 | JSON body
+
+Each slot is a seqlock. A writer makes seq odd, writes the body, then makes it even
+again; a reader copies the body and retries while seq was odd or moved meanwhile.
+The body's crc32 is checked as well, which also serves as the ETag. Writers from
+different processes take an flock on a lock file in the temp directory; readers
+never lock.
+"""
+
+import fcntl
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+import logging
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+from config import Config
+from database.devices import DEFAULT_DEVICE
+from .hub import SENSOR_TOPICS, get_hub
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SLPSTAT1'
+HEADER = struct.Struct('<8sIII')  # magic, slot bytes, devices, sensors
+HEADER_BYTES = 64
+DEVICE_ID_BYTES = 32
+SLOT_HEADER = struct.Struct('<QIIIxxxxq')  # seq, length, crc32, pid, ts_ms
+SEQ = struct.Struct('<Q')
+READ_RETRIES = 100
+
+class SharedSlot:
+    """One (device, sensor) slot of the segment"""
+
+    def __init__(self, store, index, device_id, sensor):
+        self.store = store
+        self.index = index
+        self.device_id = device_id
+        self.sensor = sensor
+
+    def write(self, body, ts_ms=None):
+        return self.store.write(self.index, body, ts_ms)
+
+    def read(self):
+        return self.store.read(self.index)
+
+class SharedStateStore:
+    """Seqlocked latest-state slots in a named shared memory segment"""
+
+    def __init__(self, name=None, max_devices=None, slot_bytes=None, sensors=SENSOR_TOPICS):
+        self.name = name or Config.SHARED_STATE_NAME
+        self.max_devices = max_devices or Config.MAX_DEVICES + 1  # extra beds + the default one
+        self.slot_bytes = slot_bytes or Config.SHARED_STATE_SLOT_BYTES
+        self.sensors = tuple(sensors)
+        self.capacity = self.slot_bytes - SLOT_HEADER.size
+        self.size = (HEADER_BYTES + self.max_devices * DEVICE_ID_BYTES
+                     + self.max_devices * len(self.sensors) * self.slot_bytes)
+        self._slots_offset = HEADER_BYTES + self.max_devices * DEVICE_ID_BYTES
+
+        self._pid = os.getpid()
+        self._lock = threading.Lock()  # threads of this process; the flock covers other processes
+        self._lock_file = open(os.path.join(tempfile.gettempdir(), f'{self.name}.lock'), 'a+b')
+        self._devices = {}  # device id -> directory index, cached (entries are never freed)
+        self.stats = {'writes': 0, 'reads': 0, 'read_retries': 0, 'oversized': 0}
+
+        with self._exclusive():
+            self._shm = self._open_segment()
+        self._buf = self._shm.buf
+        self._watcher = None
+
+    @contextmanager
+    def _exclusive(self):
+        with self._lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _open_segment(self):
+        """Attach to the segment, creating (or recreating, if its layout is stale) it"""
+        expected = HEADER.pack(MAGIC, self.slot_bytes, self.max_devices, len(self.sensors))
+        try:
+            shm = shared_memory.SharedMemory(self.name)
+            if shm.size >= self.size and bytes(shm.buf[:HEADER.size]) == expected:
+                _untrack(shm)
+                logger.info(f"🧩 Attached to shared state {self.name} ({self.size / 1024:.0f} KB)")
+                return shm
+            logger.warning(f"⚠️ Shared state {self.name} has another layout, recreating it")
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+        shm = shared_memory.SharedMemory(self.name, create=True, size=self.size)
+        _untrack(shm)
+        shm.buf[:self.size] = bytes(self.size)
+        shm.buf[:HEADER.size] = expected
+        logger.info(f"🧩 Created shared state {self.name} ({self.size / 1024:.0f} KB)")
+        return shm
+
+    def _slot_offset(self, index):
+        return self._slots_offset + index * self.slot_bytes
+
+    def _read_directory(self):
+        directory = {}
+        for index in range(self.max_devices):
+            offset = HEADER_BYTES + index * DEVICE_ID_BYTES
+            raw = bytes(self._buf[offset:offset + DEVICE_ID_BYTES]).rstrip(b'\0')
+            if raw:
+                directory[raw.decode()] = index
+        return directory
+
+    def device_index(self, device_id):
+        """Directory index of a device, claiming a free entry the first time; None when full"""
+        index = self._devices.get(device_id)
+        if index is not None:
+            return index
+
+        with self._exclusive():
+            directory = self._read_directory()
+            index = directory.get(device_id)
+            if index is None:
+                free = sorted(set(range(self.max_devices)) - set(directory.values()))
+                if not free:
+                    logger.warning(f"⚠️ Shared state full, {device_id} stays local to this worker")
+                    return None
+                index = free[0]
+                offset = HEADER_BYTES + index * DEVICE_ID_BYTES
+                self._buf[offset:offset + DEVICE_ID_BYTES] = device_id.encode().ljust(DEVICE_ID_BYTES, b'\0')
+            self._devices[device_id] = index
+        return index
+
+    def slot(self, device_id, sensor):
+        """SharedSlot of one sensor of one device (None if the directory is full)"""
+        device_index = self.device_index(device_id)
+        if device_index is None:
+            return None
+        index = device_index * len(self.sensors) + self.sensors.index(sensor)
+        return SharedSlot(self, index, device_id, sensor)
+
+    def write(self, index, body, ts_ms=None):
+        """Publish a new body for a slot; returns its sequence number (None if too large)"""
+        if len(body) > self.capacity:
+            self.stats['oversized'] += 1
+            logger.warning(f"⚠️ Shared state body of {len(body)} bytes exceeds the {self.capacity}-byte slot")
+            return None
+
+        offset = self._slot_offset(index)
+        buf = self._buf
+        ts_ms = int(time.time() * 1000) if ts_ms is None else ts_ms
+        with self._exclusive():
+            seq = SEQ.unpack_from(buf, offset)[0] + 1
+            SEQ.pack_into(buf, offset, seq)  # odd: write in progress
+            buf[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(body)] = body
+            SLOT_HEADER.pack_into(buf, offset, seq, len(body), zlib.crc32(body), self._pid, ts_ms)
+            SEQ.pack_into(buf, offset, seq + 1)  # even: consistent again
+            self.stats['writes'] += 1
+        return seq + 1
+
+    def read(self, index):
+        """(seq, body, crc32, writer pid) of a slot; body is None if it was never written
+
+        Returns None only if a writer kept the slot busy for every retry.
+        """
+        offset = self._slot_offset(index)
+        start = offset + SLOT_HEADER.size
+        buf = self._buf
+        self.stats['reads'] += 1
+        for _ in range(READ_RETRIES):
+            seq, length, crc, pid, _ts = SLOT_HEADER.unpack_from(buf, offset)
+            if seq == 0:
+                return 0, None, 0, 0
+            if not seq & 1 and length <= self.capacity:
+                body = bytes(buf[start:start + length])
+                if SEQ.unpack_from(buf, offset)[0] == seq and zlib.crc32(body) == crc:
+                    return seq, body, crc, pid
+            self.stats['read_retries'] += 1
+            time.sleep(0)  # let the writer finish
+        return None
+
+    def sequence(self, index):
+        return SEQ.unpack_from(self._buf, self._slot_offset(index))[0]
+
+    def start_watcher(self, interval=None):
+        """Republish other workers' updates into this process's push hubs
+
+        SSE streams and /api/snapshot long-polls are served from the local hub, so
+        without this a client would only see readings ingested by its own worker.
+        """
+        if self._watcher is not None:
+            return
+        interval = interval or Config.SHARED_STATE_POLL_INTERVAL
+        self._watcher = threading.Thread(target=self._watch, args=(interval,),
+                                         name='shared-state-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval):
+        seen = {}
+        while True:
+            try:
+                for device_id, device_index in self._read_directory().items():
+                    for offset, sensor in enumerate(self.sensors):
+                        index = device_index * len(self.sensors) + offset
+                        seq = self.sequence(index)
+                        if seq == seen.get(index) or seq & 1:
+                            continue
+                        seen[index] = seq
+                        state = self.read(index)
+                        if state is None or state[1] is None or state[3] == self._pid:
+                            continue
+                        get_hub(device_id).publish(sensor, json.loads(state[1]), local=False)
+            except Exception as e:
+                logger.error(f"❌ Shared state watcher error: {e}")
+            time.sleep(interval)
+
+    def get_stats(self):
+        return dict(self.stats, name=self.name, sizeBytes=self.size,
+                    devices=len(self._read_directory()), slotBytes=self.slot_bytes)
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+
+    def unlink(self):
+        """Remove the segment (e.g. after the last worker has stopped)"""
+        resource_tracker.register(self._shm._name, 'shared_memory')  # unlink() unregisters it again
+        self._shm.unlink()
+
+def _untrack(shm):
+    # The segment must outlive whichever worker created it: the server restarts
+    # workers independently, and the resource tracker would unlink it on exit
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_shared_state():
+    """The process's shared state store, or None unless SHARED_STATE_ENABLED"""
+    global _store
+    if not Config.SHARED_STATE_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SharedStateStore()
+                _store.start_watcher()
+    return _store
+
+def shared_slot(device_id, sensor):
+    """Shared slot for a service's state, or None when state is process-local"""
+    store = get_shared_state()
+    return store.slot(device_id or DEFAULT_DEVICE, sensor) if store else None
+
+__all__ = [
+    'SharedSlot',
+    'SharedStateStore',
+    'get_shared_state',
+    'shared_slot',
+]
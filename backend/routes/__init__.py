@@ -7,5 +7,6 @@ Contains all API route definitions
 from .sensor_routes import sensor_bp
 from .device_control import device_bp
 from .led_routes import led_bp
+from .stream_routes import stream_bp
 
-__all__ = ['sensor_bp', 'device_bp', 'led_bp']
\ No newline at end of file
+__all__ = ['sensor_bp', 'device_bp', 'led_bp', 'stream_bp']
\ No newline at end of file
@@ -6,13 +6,13 @@ Handles all device control endpoints (fan, pillow, speaker, etc.)
 
 from flask import Blueprint, jsonify, request
 import logging
-from services import FanService
+from services import get_service
 
 logger = logging.getLogger(__name__)
 device_bp = Blueprint('device', __name__, url_prefix='/api/control')
 
-# Initialize services
-fan_service = FanService()
+# Shared service instance
+fan_service = get_service('fan')
 
 @device_bp.route('/fan', methods=['POST'])
 def control_fan():
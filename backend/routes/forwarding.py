@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Forwarding - Reader Workers Pass Writes to the Ingest Owner
+With several worker processes (serve.py --workers N), one process owns ingest: it
+keeps the derived state (snore day stats, HRV windows, sleep stages and sessions,
+alerts) and writes every row. The other workers are readers. They answer the latest
+state from shared memory, history from SQLite and live pushes from their own hub,
+and forward every other request to the owner over local HTTP.
+"""
+
+import http.client
+import logging
+from urllib.parse import urlsplit
+
+from flask import Response, request
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Endpoints a reader answers itself; everything else goes to the ingest owner
+READER_ENDPOINTS = {
+    'root',
+    'static',
+    'health_check',
+    'status_summary',
+    'sensor.get_heart_rate',
+    'sensor.get_breathing_data',
+    'sensor.get_gyroscope_data',
+    'sensor.get_weight_data',
+    'sensor.get_snore_data',
+    'sensor.get_sleep_stage',
+    'sensor.get_alerts',
+    'sensor.get_alert_history',
+    'sensor.get_sleep_history',
+    'sensor.get_sensor_history',
+    'sensor.export_sensor_history',
+    'sensor.get_hrv_report',
+    'sensor.get_devices',
+    'sensor.get_device_sensor_data',
+    'sensor.get_device_sleep_stage',
+    'sensor.get_device_alerts',
+    'sensor.get_device_alert_history',
+    'sensor.get_device_sleep_history',
+    'sensor.get_device_sensor_history',
+    'sensor.export_device_sensor_history',
+    'sensor.get_device_hrv_report',
+    'stream.stream_sensor_data',
+    'stream.get_snapshot',
+    'stream.stream_stats',
+}
+
+# Request headers passed on to the owner (the rest describe this hop)
+FORWARDED_HEADERS = ('Content-Type', 'Content-Encoding', 'Accept', 'Accept-Encoding', 'If-None-Match')
+HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'content-length', 'server', 'date'}
+
+def forward_to_owner():
+    """before_request hook of reader workers: answer non-reader endpoints from the owner"""
+    if request.endpoint in READER_ENDPOINTS or request.method == 'OPTIONS':
+        return None
+
+    owner = urlsplit(Config.INGEST_OWNER_URL)
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    headers['X-Forwarded-For'] = request.remote_addr or ''
+    connection = http.client.HTTPConnection(owner.hostname, owner.port, timeout=Config.INGEST_FORWARD_TIMEOUT)
+    try:
+        connection.request(request.method, request.full_path.rstrip('?'), body=request.get_data(), headers=headers)
+        answer = connection.getresponse()
+        body = answer.read()
+    except OSError as e:
+        logger.error(f"❌ Ingest owner unreachable: {e}")
+        return Response('{"status":"error","message":"Ingest owner unavailable, retry later"}', status=503,
+                        mimetype='application/json', headers={'Retry-After': '1'})
+    finally:
+        connection.close()
+
+    response = Response(body, status=answer.status)
+    for name, value in answer.getheaders():
+        if name.lower() not in HOP_HEADERS:
+            response.headers[name] = value
+    return response
+
+def install_forwarding(app):
+    """Make this process a reader when serve.py has set INGEST_OWNER_URL"""
+    if not Config.INGEST_OWNER_URL:
+        return False
+    app.before_request(forward_to_owner)
+    logger.info(f"📮 Reader worker: writes go to the ingest owner at {Config.INGEST_OWNER_URL}")
+    return True
+
+__all__ = [
+    'READER_ENDPOINTS',
+    'forward_to_owner',
+    'install_forwarding',
+]
@@ -6,11 +6,11 @@ Handles WS2812B LED strip control endpoints
 
 from flask import Blueprint, jsonify, request
 import logging
-from services import LEDService
+from services import get_service
 
 logger = logging.getLogger(__name__)
 led_bp = Blueprint('led', __name__, url_prefix='/api')
-led_service = LEDService()
+led_service = get_service('led')
 
 @led_bp.route('/led-control', methods=['POST'])
 def led_control():
@@ -3,8 +3,19 @@
 Sensor Routes - API endpoints for sensor data
 """
 
-from flask import Blueprint, jsonify, request
-from services import HeartRateService, BreathingService, GyroscopeService, WeightService, SnoreService
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from services import SENSOR_SERVICES, get_service, get_registry
+from database.devices import DEFAULT_DEVICE, UnknownDevice, list_devices
+from database.writer import WriteQueueFull
+from database.executor import ReadPoolBusy, get_read_executor
+from database.rollups import choose_resolution
+from database.queries import HISTORY_FIELDS, fetch_page, iter_rows, hours_ago_ms, epoch_ms
+from ingest import validate_frames, validate_readings, BINARY_CONTENT_TYPE, FrameDecodeError, decode_frames, validate_decoded
+from ingest import AUDIO_CONTENT_TYPE, AudioDecodeError, decode_pcm
+from config import Config
+import csv
+import io
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,77 +23,525 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 sensor_bp = Blueprint('sensor', __name__, url_prefix='/api')
 
-# Initialize services
-heart_rate_service = HeartRateService()
-breathing_service = BreathingService()
-gyroscope_service = GyroscopeService()
-weight_service = WeightService()
-snore_service = SnoreService()
+# Shared service instances (same ones the simulator and app.py use)
+heart_rate_service = get_service('heart_rate')
+breathing_service = get_service('breathing')
+gyroscope_service = get_service('gyroscope')
+weight_service = get_service('weight')
+snore_service = get_service('snore')
+sleep_stage_service = get_service('sleep')
+alert_service = get_service('alerts')
+
+def _cached_json(service):
+    """Service state from its pre-serialized body; 304 when If-None-Match matches"""
+    body, etag = service.json_cache.get()
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype='application/json', headers=headers)
 
 @sensor_bp.route('/heart-rate')
 def get_heart_rate():
     """Get latest heart rate data"""
-    return jsonify(heart_rate_service.get_data())
+    return _cached_json(heart_rate_service)
 
 @sensor_bp.route('/breathing-data')
 def get_breathing_data():
     """Get latest breathing data"""
-    return jsonify(breathing_service.get_data())
+    return _cached_json(breathing_service)
 
 @sensor_bp.route('/gyroscope-data')
 def get_gyroscope_data():
     """Get latest gyroscope/posture data"""
-    return jsonify(gyroscope_service.get_data())
+    return _cached_json(gyroscope_service)
 
 @sensor_bp.route('/weight-data')
 def get_weight_data():
     """Get latest weight data"""
-    return jsonify(weight_service.get_data())
+    return _cached_json(weight_service)
 
 @sensor_bp.route('/snore-data')
 def get_snore_data():
     """Get latest snore detection data"""
-    return jsonify(snore_service.get_data())
+    return _cached_json(snore_service)
+
+@sensor_bp.route('/sleep-stage')
+def get_sleep_stage():
+    """Get the latest scored sleep stage epoch"""
+    return _cached_json(sleep_stage_service)
 
 @sensor_bp.route('/sleep-history')
 def get_sleep_history():
-    """Get historical sleep session data"""
-    # This could be handled by a separate SleepHistoryService
-    # For now, return from any service that has this method
-    return jsonify(heart_rate_service.get_sleep_history())
+    """Finished sleep sessions, newest first"""
+    return _sleep_history(get_registry())
+
+def _sleep_history(registry):
+    try:
+        sessions = get_read_executor().run(registry['session'].get_sleep_history)
+    except ReadPoolBusy as e:
+        return _read_busy(e)
+    return jsonify(sessions)
+
+@sensor_bp.route('/alerts')
+def get_alerts():
+    """Active alerts, most severe first"""
+    return _cached_json(alert_service)
+
+@sensor_bp.route('/alerts/history')
+def get_alert_history():
+    """Raised and cleared alerts, newest first
+
+    Query: hours=24
+    """
+    return _alert_history(get_registry())
+
+def _alert_history(registry):
+    hours, error = _history_hours()
+    if error:
+        return error
+    try:
+        history = get_read_executor().run(registry['alerts'].get_alert_history, hours)
+    except ReadPoolBusy as e:
+        return _read_busy(e)
+    return jsonify({'hours': hours, 'history': history})
+
+def _history_hours(default=24):
+    """Parse ?hours= (up to 90 days); returns (hours, error response)"""
+    try:
+        hours = float(request.args.get('hours', default))
+    except ValueError:
+        return None, (jsonify({'status': 'error', 'message': 'hours must be a number'}), 400)
+    if not 0 < hours <= 24 * 90:
+        return None, (jsonify({'status': 'error', 'message': 'hours must be between 0 and 2160'}), 400)
+    return hours, None
+
+@sensor_bp.route('/history/<sensor>')
+def get_sensor_history(sensor):
+    """Get sensor history; resolution (raw/minute/hour) follows the requested range
+
+    Passing cursor and/or limit switches to raw keyset pages: follow nextCursor
+    until it is null to walk a whole night without skipping or repeating rows.
+    """
+    return _sensor_history(get_registry(), sensor)
+
+def _sensor_history(registry, sensor):
+    """History response for one sensor of one device"""
+    history_sources = {
+        'heart_rate': registry['heart_rate'].get_heart_rate_history,
+        'breathing': registry['breathing'].get_breathing_history,
+        'gyroscope': registry['gyroscope'].get_gyroscope_history,
+        'weight': registry['weight'].get_weight_history,
+        'pressure': registry['weight'].get_pressure_history,
+        'snore': registry['snore'].get_snore_history,
+        'sleep': registry['sleep'].get_stage_history
+    }
+    if sensor not in history_sources:
+        return jsonify({'status': 'error', 'message': f'Unknown sensor: {sensor}'}), 404
+    
+    hours, error = _history_hours()
+    if error:
+        return error
+    
+    # Queries run on the read executor so a burst of history requests can't tie up
+    # every request thread
+    executor = get_read_executor()
+    if 'cursor' not in request.args and 'limit' not in request.args:
+        try:
+            history = executor.run(history_sources[sensor], hours)
+        except ReadPoolBusy as e:
+            return _read_busy(e)
+        return jsonify({
+            'sensor': sensor,
+            'hours': hours,
+            'resolution': choose_resolution(hours),
+            'history': history
+        })
+    
+    order = request.args.get('order', 'desc').upper()
+    try:
+        limit = int(request.args.get('limit', Config.HISTORY_PAGE_SIZE))
+        if not 0 < limit <= Config.HISTORY_PAGE_MAX or order not in ('ASC', 'DESC'):
+            raise ValueError
+        rows, next_cursor = executor.run(fetch_page, sensor, start_ms=hours_ago_ms(hours), end_ms=epoch_ms() + 1,
+                                         cursor=request.args.get('cursor'), limit=limit, order=order,
+                                         db=registry.store.db)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': f'invalid cursor, order (asc/desc) or limit (1-{Config.HISTORY_PAGE_MAX})'
+        }), 400
+    except ReadPoolBusy as e:
+        return _read_busy(e)
+    
+    return jsonify({
+        'sensor': sensor,
+        'hours': hours,
+        'resolution': 'raw',
+        'history': rows,
+        'nextCursor': next_cursor
+    })
+
+@sensor_bp.route('/hrv/report')
+def get_hrv_report():
+    """HRV (rate, RMSSD, SDNN, pNN50) per window and overall, from stored beats
+
+    Query: hours=8 (range), window=seconds per window (default HRV_WINDOW_SECONDS)
+    """
+    return _hrv_report(get_registry())
+
+def _hrv_report(registry):
+    hours, error = _history_hours(8)
+    if error:
+        return error
+    try:
+        window = int(request.args.get('window', Config.HRV_WINDOW_SECONDS))
+        if not 30 <= window <= 24 * 3600:
+            raise ValueError
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'window must be 30-86400 seconds'}), 400
+    
+    try:
+        report = get_read_executor().run(registry['heart_rate'].get_hrv_report, hours, window)
+    except ReadPoolBusy as e:
+        return _read_busy(e)
+    return jsonify(dict(report, hours=hours, windowSeconds=window))
+
+@sensor_bp.route('/pressure-map')
+def get_pressure_map():
+    """Pressure mat heatmaps (latest output bucket and since getting into bed), center of
+    pressure, turn count, and the times of stored turns
+
+    Query: hours=8 (range of turnTimes)
+    """
+    return _pressure_map(get_registry())
+
+def _pressure_map(registry):
+    hours, error = _history_hours(8)
+    if error:
+        return error
+    try:
+        pressure = get_read_executor().run(registry['weight'].get_pressure_map, hours)
+    except ReadPoolBusy as e:
+        return _read_busy(e)
+    return jsonify(dict(pressure, hours=hours))
+
+def _read_busy(error):
+    logger.warning(f"⚠️ {error}")
+    return jsonify({'status': 'error', 'message': 'Too many history requests, retry later'}), 503, {'Retry-After': '1'}
+
+@sensor_bp.route('/history/<sensor>/export')
+def export_sensor_history(sensor):
+    """Stream raw history as NDJSON (default) or CSV, oldest first"""
+    return _export_history(get_registry(), sensor)
+
+def _export_history(registry, sensor):
+    """Stream one device's raw history of a sensor"""
+    if sensor not in HISTORY_FIELDS:
+        return jsonify({'status': 'error', 'message': f'Unknown sensor: {sensor}'}), 404
+    
+    hours, error = _history_hours()
+    if error:
+        return error
+    
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'status': 'error', 'message': 'format must be ndjson or csv'}), 400
+    
+    # Fix the window up front so rows arriving mid-export don't extend it
+    start_ms, end_ms = hours_ago_ms(hours), epoch_ms() + 1
+    rows = iter_rows(sensor, start_ms, end_ms, order='ASC', page_size=Config.EXPORT_PAGE_SIZE,
+                     db=registry.store.db)
+    
+    if export_format == 'csv':
+        names = [name for name, _ in HISTORY_FIELDS[sensor][1]] + ['timestamp', 'ts_ms']
+        body, mimetype = _csv_chunks(rows, names), 'text/csv'
+    else:
+        body, mimetype = _ndjson_chunks(rows), 'application/x-ndjson'
+    
+    name = sensor if registry.device_id == DEFAULT_DEVICE else f'{registry.device_id}-{sensor}'
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={name}-history.{export_format}'
+    })
+
+def _ndjson_chunks(rows, chunk_rows=500):
+    """Yield NDJSON text a few hundred rows at a time"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, separators=(',', ':')))
+        if len(lines) >= chunk_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def _csv_chunks(rows, names, chunk_rows=500):
+    """Yield CSV text (header first) a few hundred rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=names)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
 
 @sensor_bp.route('/sensor-data', methods=['POST'])
 def receive_sensor_data():
     """Receive sensor data from ESP32"""
+    return _receive_sensor_data(get_registry())
+
+def _receive_sensor_data(registry):
+    """Apply one multi-sensor reading to a device's services"""
     try:
+        # Backpressure: refuse new readings while the write queue is saturated
+        if not registry.store.writer.has_capacity():
+            logger.warning("⚠️ Write queue full, rejecting sensor data")
+            return jsonify({'status': 'error', 'message': 'Ingest queue full, retry later'}), 503, {'Retry-After': '1'}
+        
+        # Compact binary frames take the batch path without any JSON parsing
+        if request.mimetype == BINARY_CONTENT_TYPE:
+            return _ingest_binary(registry)
+        
         data = request.get_json()
-        logger.info(f"📡 Received sensor data: {data}")
+        if not isinstance(data, dict):
+            return jsonify({'status': 'error', 'message': 'Expected an object of sensor readings'}), 400
         
-        results = []
+        # Same checks as batch frames: finite numbers in range, bounded raw sample arrays
+        errors = [problem for sensor in SENSOR_SERVICES if sensor in data
+                  for problem in validate_readings(sensor, data[sensor])]
+        if errors:
+            return jsonify({'status': 'error', 'message': '; '.join(errors), 'errors': errors}), 400
+        
+        # Sensor names only: raw sample arrays would make every request pay for formatting them
+        logger.info(f"📡 Received sensor data ({registry.device_id}): {', '.join(data)}")
         
-        # Update each sensor service
-        if 'heart_rate' in data:
-            result = heart_rate_service.update_data(data['heart_rate'])
-            results.append(result)
+        results = []
         
-        if 'breathing' in data:
-            result = breathing_service.update_data(data['breathing'])
-            results.append(result)
-            
-        if 'gyroscope' in data:
-            result = gyroscope_service.update_data(data['gyroscope'])
-            results.append(result)
-            
-        if 'weight' in data:
-            result = weight_service.update_data(data['weight'])
-            results.append(result)
-            
-        if 'snore' in data:
-            result = snore_service.update_data(data['snore'])
-            results.append(result)
+        # Update each sensor service; the batch takes its queue slot before any state changes
+        with registry.store.writer.batch():
+            for sensor in SENSOR_SERVICES:
+                if sensor in data:
+                    results.append(registry[sensor].update_data(data[sensor]))
         
         return jsonify({'status': 'success', 'message': 'Data received successfully', 'results': results})
     
+    except WriteQueueFull as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify({'status': 'error', 'message': 'Ingest queue full, retry later'}), 503, {'Retry-After': '1'}
     except Exception as e:
         logger.error(f"Error processing sensor data: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 400
+
+@sensor_bp.route('/sensor-data/batch', methods=['POST'])
+def receive_sensor_batch():
+    """Receive buffered, timestamped multi-sensor frames from ESP32"""
+    return _receive_sensor_batch(get_registry())
+
+def _receive_sensor_batch(registry):
+    """Apply a batch of timestamped frames to a device's services"""
+    try:
+        if not registry.store.writer.has_capacity():
+            logger.warning("⚠️ Write queue full, rejecting sensor batch")
+            return jsonify({'status': 'error', 'message': 'Ingest queue full, retry later'}), 503, {'Retry-After': '1'}
+        
+        if request.mimetype == BINARY_CONTENT_TYPE:
+            return _ingest_binary(registry)
+        
+        data = request.get_json()
+        frames = data.get('frames') if isinstance(data, dict) else data
+        if not isinstance(frames, list) or not frames:
+            return jsonify({'status': 'error', 'message': 'Expected a non-empty list of frames'}), 400
+        if len(frames) > Config.MAX_BATCH_FRAMES:
+            return jsonify({'status': 'error', 'message': f'Too many frames (max {Config.MAX_BATCH_FRAMES})'}), 413
+        
+        valid, results = validate_frames(frames)
+        return _apply_frames(registry, valid, results)
+    
+    except WriteQueueFull as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify({'status': 'error', 'message': 'Ingest queue full, retry later'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        logger.error(f"Error processing sensor batch: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+def _ingest_binary(registry):
+    """Decode a binary frame payload straight into the service update path"""
+    try:
+        frames = decode_frames(request.get_data(cache=False))
+    except FrameDecodeError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if not frames:
+        return jsonify({'status': 'error', 'message': 'Expected a non-empty list of frames'}), 400
+    if len(frames) > Config.MAX_BATCH_FRAMES:
+        return jsonify({'status': 'error', 'message': f'Too many frames (max {Config.MAX_BATCH_FRAMES})'}), 413
+    
+    valid, results = validate_decoded(frames)
+    return _apply_frames(registry, valid, results)
+
+def _apply_frames(registry, valid, results):
+    """Apply validated frames to a device's services and build the per-frame response"""
+    # All rows from this upload are written in one transaction. The batch takes its queue
+    # slot up front, so a full queue answers 503 before any frame is applied and the
+    # device's retry isn't counted twice.
+    with registry.store.writer.batch():
+        for index, timestamp, readings in valid:
+            for sensor, reading in readings.items():
+                if not registry[sensor].update_data(reading, timestamp):
+                    results[index]['status'] = 'error'
+                    results[index].setdefault('errors', []).append(f'{sensor}: update failed')
+    
+    accepted = sum(1 for result in results if result['status'] == 'ok')
+    rejected = len(results) - accepted
+    status = 'success' if not rejected else ('partial' if accepted else 'error')
+    logger.info(f"📦 Received sensor batch ({registry.device_id}): {accepted} frames accepted, {rejected} rejected")
+    
+    return jsonify({
+        'status': status,
+        'accepted': accepted,
+        'rejected': rejected,
+        'results': results
+    }), (200 if accepted else 400)
+
+@sensor_bp.route('/audio', methods=['POST'])
+def receive_audio():
+    """Receive raw microphone PCM for the server-side snore detector"""
+    return _receive_audio(get_registry())
+
+def _receive_audio(registry):
+    """Run one audio/L16 upload through a device's snore detector"""
+    if not registry.store.writer.has_capacity():
+        logger.warning("⚠️ Write queue full, rejecting audio")
+        return jsonify({'status': 'error', 'message': 'Ingest queue full, retry later'}), 503, {'Retry-After': '1'}
+    if request.mimetype != AUDIO_CONTENT_TYPE.lower():  # mimetypes arrive lowercased
+        return jsonify({'status': 'error', 'message': f'Expected {AUDIO_CONTENT_TYPE} audio'}), 415
+    
+    try:
+        samples, sample_rate, timestamp = decode_pcm(request.get_data(cache=False),
+                                                     request.mimetype_params.get('rate'),
+                                                     request.headers.get('X-Timestamp'))
+    except AudioDecodeError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    try:
+        reading = registry['snore'].update_audio(samples, sample_rate, timestamp)
+    except WriteQueueFull as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify({'status': 'error', 'message': 'Ingest queue full, retry later'}), 503, {'Retry-After': '1'}
+    if reading is None:
+        return jsonify({'status': 'error', 'message': 'Audio processing failed'}), 500
+    return jsonify({'status': 'success', 'samples': len(samples), 'snore': reading})
+
+def _device_registry(device_id, create=False):
+    """Services of one bed; returns (registry, error response)"""
+    try:
+        return get_registry(device_id, create), None
+    except UnknownDevice as e:
+        return None, (jsonify({'status': 'error', 'message': str(e)}), 400 if create else 404)
+
+@sensor_bp.route('/devices')
+def get_devices():
+    """Beds known to this server (default plus every device with stored data)"""
+    return jsonify({'devices': list_devices()})
+
+@sensor_bp.route('/devices/<device_id>/sensor-data', methods=['GET'])
+def get_device_sensor_data(device_id):
+    """Latest state of every sensor of one bed"""
+    registry, error = _device_registry(device_id)
+    if error:
+        return error
+    return jsonify({
+        'device': device_id,
+        'sensors': {name: service.json_cache.data() for name, service in registry.sensors().items()}
+    })
+
+@sensor_bp.route('/devices/<device_id>/sensor-data', methods=['POST'])
+def receive_device_sensor_data(device_id):
+    """Receive sensor data from one bed's ESP32 (first upload registers the bed)"""
+    registry, error = _device_registry(device_id, create=True)
+    if error:
+        return error
+    return _receive_sensor_data(registry)
+
+@sensor_bp.route('/devices/<device_id>/sensor-data/batch', methods=['POST'])
+def receive_device_sensor_batch(device_id):
+    """Receive buffered, timestamped frames from one bed's ESP32"""
+    registry, error = _device_registry(device_id, create=True)
+    if error:
+        return error
+    return _receive_sensor_batch(registry)
+
+@sensor_bp.route('/devices/<device_id>/audio', methods=['POST'])
+def receive_device_audio(device_id):
+    """Receive raw microphone PCM from one bed"""
+    registry, error = _device_registry(device_id, create=True)
+    if error:
+        return error
+    return _receive_audio(registry)
+
+@sensor_bp.route('/devices/<device_id>/history/<sensor>')
+def get_device_sensor_history(device_id, sensor):
+    """Sensor history of one bed (same parameters as /history/<sensor>)"""
+    registry, error = _device_registry(device_id)
+    if error:
+        return error
+    return _sensor_history(registry, sensor)
+
+@sensor_bp.route('/devices/<device_id>/history/<sensor>/export')
+def export_device_sensor_history(device_id, sensor):
+    """Raw history export of one bed (same parameters as /history/<sensor>/export)"""
+    registry, error = _device_registry(device_id)
+    if error:
+        return error
+    return _export_history(registry, sensor)
+
+@sensor_bp.route('/devices/<device_id>/hrv/report')
+def get_device_hrv_report(device_id):
+    """HRV report of one bed (same parameters as /api/hrv/report)"""
+    registry, error = _device_registry(device_id)
+    if error:
+        return error
+    return _hrv_report(registry)
+
+@sensor_bp.route('/devices/<device_id>/pressure-map')
+def get_device_pressure_map(device_id):
+    """Pressure map of one bed (same parameters as /api/pressure-map)"""
+    registry, error = _device_registry(device_id)
+    if error:
+        return error
+    return _pressure_map(registry)
+
+@sensor_bp.route('/devices/<device_id>/sleep-stage')
+def get_device_sleep_stage(device_id):
+    """Latest sleep stage of one bed"""
+    registry, error = _device_registry(device_id)
+    if error:
+        return error
+    return _cached_json(registry['sleep'])
+
+@sensor_bp.route('/devices/<device_id>/sleep-history')
+def get_device_sleep_history(device_id):
+    """Finished sleep sessions of one bed"""
+    registry, error = _device_registry(device_id)
+    if error:
+        return error
+    return _sleep_history(registry)
+
+@sensor_bp.route('/devices/<device_id>/alerts')
+def get_device_alerts(device_id):
+    """Active alerts of one bed"""
+    registry, error = _device_registry(device_id)
+    if error:
+        return error
+    return _cached_json(registry['alerts'])
+
+@sensor_bp.route('/devices/<device_id>/alerts/history')
+def get_device_alert_history(device_id):
+    """Alert history of one bed (same parameters as /api/alerts/history)"""
+    registry, error = _device_registry(device_id)
+    if error:
+        return error
+    return _alert_history(registry)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+routes/stream_routes.py - Live Sensor Stream
+Server-Sent Events and snapshot endpoints fed by the push hub (replace per-sensor polling)
+"""
+
+from flask import Blueprint, Response, jsonify, request
+from datetime import datetime
+import json
+import logging
+
+from realtime import SENSOR_TOPICS, HubFull, get_hub
+from services import get_registry
+from config import Config
+
+logger = logging.getLogger(__name__)
+stream_bp = Blueprint('stream', __name__, url_prefix='/api')
+
+@stream_bp.route('/stream')
+def stream_sensor_data():
+    """Stream sensor updates as SSE events named after their topic
+
+    Query: topics=heart_rate,gyroscope (default: all sensors),
+           interval=seconds between updates of one topic (throttle, default STREAM_MIN_INTERVAL)
+    """
+    topics = [topic for topic in request.args.get('topics', '').split(',') if topic] or list(SENSOR_TOPICS)
+    unknown = set(topics) - set(SENSOR_TOPICS)
+    if unknown:
+        return jsonify({'status': 'error', 'message': f"Unknown topics: {', '.join(sorted(unknown))}"}), 400
+
+    try:
+        interval = float(request.args.get('interval', Config.STREAM_MIN_INTERVAL))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'interval must be a number'}), 400
+    # Never let a client ask for faster than the server-wide floor
+    interval = max(interval, Config.STREAM_MIN_INTERVAL)
+
+    try:
+        subscription = get_hub().subscribe(topics, interval)
+    except HubFull as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify({'status': 'error', 'message': 'Too many live streams, retry later'}), 503, {'Retry-After': '5'}
+
+    def events():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                updates = subscription.get(timeout=Config.STREAM_HEARTBEAT_SECONDS)
+                if not updates:
+                    # Comment line keeps proxies from closing the connection and
+                    # surfaces a disconnected client on the next write
+                    yield ': keep-alive\n\n'
+                    continue
+                yield ''.join(
+                    f"event: {topic}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+                    for topic, payload in updates
+                )
+        finally:
+            subscription.close()
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@stream_bp.route('/snapshot')
+def get_snapshot():
+    """All current sensor state in one response, versioned with an ETag
+
+    Send the last ETag as If-None-Match to get 304 when nothing changed. Add
+    ?wait=seconds to long-poll: the request is held until a newer version
+    exists (or the wait ends) instead of returning 304 straight away.
+    """
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), Config.SNAPSHOT_MAX_WAIT)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'wait must be a number of seconds'}), 400
+    
+    hub = get_hub()
+    version, latest = hub.snapshot()
+    if wait and request.if_none_match.contains(_snapshot_etag(hub, version)):
+        hub.wait_for_change(version, wait)
+        version, latest = hub.snapshot()
+    
+    etag = _snapshot_etag(hub, version)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        # Sensors that haven't reported since startup fall back to their service defaults
+        response = jsonify({
+            'version': version,
+            'timestamp': datetime.now().isoformat(),
+            'sensors': {
+                topic: latest[topic] if topic in latest else service.json_cache.data()
+                for topic, service in get_registry().sensors().items()
+            }
+        })
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _snapshot_etag(hub, version):
+    return f'{hub.boot_id}-{version}'
+
+@stream_bp.route('/stream/stats')
+def stream_stats():
+    """Push hub statistics"""
+    return jsonify(get_hub().get_stats())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+serve.py - Production Server
+Runs the backend under a production WSGI server instead of Flask's development server
+
+    python serve.py                                  # waitress, SERVER_THREADS request threads
+    python serve.py --server gunicorn                # gunicorn gthread worker (Linux / Pi)
+    python serve.py --server gunicorn --workers 4    # ingest owner + 4 reader workers
+    python serve.py --server dev                     # Flask development server, as app.py does
+
+Ingest never waits on SQLite (the write-behind writer commits in the background)
+and history queries run on the read executor, so request threads only do cheap
+work. Ingest must have a single owner process: the derived state (snore day stats,
+HRV windows, sleep stages and sessions, alerts) lives in the process that ingests.
+With more than one gunicorn worker (SHARED_STATE_ENABLED required), serve.py starts
+that owner as its own waitress process on INGEST_PORT; the gunicorn workers become
+readers that serve the latest state from shared memory and forward every write to
+it (routes/forwarding.py).
+"""
+
+import argparse
+import fcntl
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import logging
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger('serve')
+
+SERVERS = ('waitress', 'gunicorn', 'dev')
+
+_simulator_lock = None
+
+def parse_args():
+    # Config is imported only after the environment is final (see main)
+    parser = argparse.ArgumentParser(description='Run the Sleep Monitoring Backend')
+    parser.add_argument('--server', choices=SERVERS, default=os.getenv('SERVER', 'waitress'))
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 5000)))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('SERVER_THREADS', 48)),
+                        help='request threads per worker')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVER_WORKERS', 1)),
+                        help='worker processes (gunicorn only; above 1 adds a separate ingest owner)')
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.workers > 1:
+        # Readers serve the latest state from shared memory; the owner alone ingests
+        if args.server != 'gunicorn':
+            parser.error('--workers above 1 needs --server gunicorn')
+        if os.getenv('SHARED_STATE_ENABLED', 'False').lower() != 'true':
+            parser.error('--workers above 1 needs SHARED_STATE_ENABLED=true')
+    return args
+
+def start_simulator():
+    """Run the sensor simulator in at most one process: whichever takes its lock first"""
+    global _simulator_lock
+    from config import Config
+    if not Config.SIMULATION_MODE or _simulator_lock is not None:
+        return
+
+    lock = open(os.path.join(tempfile.gettempdir(), f'{Config.SHARED_STATE_NAME}.simulator.lock'), 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return
+    _simulator_lock = lock  # held for the life of the process
+
+    from app import simulate_sensor_data
+    threading.Thread(target=simulate_sensor_data, name='simulator', daemon=True).start()
+    logger.info(f"🎭 Simulator running in process {os.getpid()}")
+
+def check_threads(threads):
+    from config import Config
+    reserved = Config.STREAM_MAX_SUBSCRIBERS + Config.SNAPSHOT_MAX_WAITERS
+    if threads <= reserved:
+        logger.warning(f"⚠️ {threads} threads can all be held by SSE streams and long-polls "
+                       f"({reserved} allowed); raise SERVER_THREADS")
+
+def run_dev(args):
+    from app import app, init_database
+    init_database()
+    start_simulator()
+    app.run(host=args.host, port=args.port, debug=False, threaded=True)
+
+def run_waitress(args):
+    from waitress import serve
+    from app import app, init_database
+    from config import Config
+
+    init_database()
+    start_simulator()
+    check_threads(args.threads)
+    logger.info(f"🚀 waitress on http://{args.host}:{args.port} ({args.threads} threads)")
+    serve(app, host=args.host, port=args.port, threads=args.threads,
+          connection_limit=Config.SERVER_CONNECTION_LIMIT,
+          channel_timeout=max(120, Config.STREAM_HEARTBEAT_SECONDS * 4),  # idle SSE streams still send heartbeats
+          ident=None)
+
+def start_ingest_owner(args):
+    """Start the process that owns ingest (waitress on a local port); returns it once it answers"""
+    from config import Config
+    port = Config.INGEST_PORT or args.port + 1
+    url = f'http://127.0.0.1:{port}'
+    owner = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--server', 'waitress',
+                              '--host', '127.0.0.1', '--port', str(port), '--threads', str(args.threads),
+                              '--workers', '1'])
+    deadline = time.monotonic() + 30
+    while True:
+        if owner.poll() is not None:
+            raise SystemExit(f'❌ Ingest owner exited on start ({owner.returncode})')
+        try:
+            urllib.request.urlopen(f'{url}/api/health', timeout=1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                owner.kill()
+                raise SystemExit(f'❌ Ingest owner did not answer on {url}')
+            time.sleep(0.2)
+
+    # Forked workers inherit this and become readers (routes/forwarding.py)
+    Config.INGEST_OWNER_URL = url
+    logger.info(f"📮 Ingest owner on {url} (process {owner.pid})")
+    return owner
+
+def stop_ingest_owner(owner):
+    # SIGINT, so the owner drains its write queue to disk before exiting
+    if owner.poll() is None:
+        owner.send_signal(signal.SIGINT)
+        try:
+            owner.wait(15)
+        except subprocess.TimeoutExpired:
+            owner.kill()
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+    from config import Config
+    from database.connection import get_db
+    from database_init import init_all_databases
+
+    # Create the schema once, before forking, and don't hand the connection to the workers
+    init_all_databases()
+    get_db().close_all()
+    check_threads(args.threads)
+    owner = start_ingest_owner(args) if args.workers > 1 else None
+
+    def post_worker_init(worker):
+        if owner is None:
+            start_simulator()  # with an ingest owner, the simulator runs there
+
+    def on_exit(server):
+        if owner is not None:
+            stop_ingest_owner(owner)
+        if Config.SHARED_STATE_ENABLED:
+            from realtime.shared_state import SharedStateStore
+            SharedStateStore().unlink()
+
+    class GunicornServer(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                'bind': f'{args.host}:{args.port}',
+                'workers': args.workers,
+                'worker_class': 'gthread',
+                'threads': args.threads,
+                'keepalive': 5,
+                'timeout': 60,
+                'graceful_timeout': 15,
+                'post_worker_init': post_worker_init,
+                'on_exit': on_exit,
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Imported in each worker after the fork, never in the master
+            from app import app
+            return app
+
+    logger.info(f"🚀 gunicorn on http://{args.host}:{args.port} "
+                f"({args.workers} {'reader ' if owner else ''}workers x {args.threads} threads)")
+    try:
+        GunicornServer().run()
+    finally:
+        if owner is not None:
+            stop_ingest_owner(owner)
+
+def main():
+    load_dotenv()
+    args = parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        datefmt='%H:%M:%S')
+    runners = {'waitress': run_waitress, 'gunicorn': run_gunicorn, 'dev': run_dev}
+    try:
+        runners[args.server](args)
+    except KeyboardInterrupt:
+        logger.info("🛑 Server stopped by user")
+    finally:
+        if args.server != 'gunicorn':
+            # Drain queued readings to disk before exiting (gunicorn workers do it at exit)
+            from database.writer import get_writer
+            get_writer().stop()
+
+if __name__ == '__main__':
+    main()
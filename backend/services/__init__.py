@@ -9,8 +9,12 @@ from .heartFan.heart_rate import HeartRateService
 from .neckAdjust.gyroscope import GyroscopeService
 from .snoreAlarm.weight import WeightService
 from .snoreAlarm.snore import SnoreService
+from .sleepTracking.stages import SleepStageService
+from .sleepTracking.sessions import SleepSessionService
+from .alerts.alerts import AlertService, get_alerts
 from .heartFan.fan import FanService
 from .lightLCD.led import SimpleWS2812BController, LEDService
+from .registry import SENSOR_SERVICES, ServiceRegistry, get_registry, get_service
 
 __all__ = [
     'BreathingService',
@@ -18,7 +22,15 @@ __all__ = [
     'GyroscopeService',
     'WeightService',
     'SnoreService',
+    'SleepStageService',
+    'SleepSessionService',
+    'AlertService',
+    'get_alerts',
     'FanService',
     'SimpleWS2812BController',
     'LEDService',
+    'SENSOR_SERVICES',
+    'ServiceRegistry',
+    'get_registry',
+    'get_service',
 ]
\ No newline at end of file
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+services/alerts/alerts.py - Alert Service
+Evaluates every alert rule once per published sensor reading and keeps the set of
+active alerts, so reads never re-run the rules
+
+Each rule watches one value of one sensor topic. It raises after the value has
+stayed past its threshold for min_seconds. It clears only once the value is back
+past the threshold by the hysteresis margin, so a reading hovering at the threshold
+doesn't flap. A cleared rule can't raise again until its cooldown has passed. A lower
+tier (moderate neck strain, moderate snoring) stays quiet while its higher tier is
+active.
+Raised and cleared alerts go to system_events through the write-behind writer, which
+stores them in batches. Changes to the active set are pushed on the `alerts` topic.
+"""
+
+from datetime import datetime
+import threading
+import logging
+import json
+
+from database.connection import db_timestamp
+from database.devices import DEFAULT_DEVICE, get_device_store
+from database.queries import range_scan, hours_ago_ms
+from realtime.hub import get_hub
+from realtime.shared_state import shared_slot
+from config import Config
+from services.json_cache import CachedJSON
+from services.sleepTracking.stages import reading_time_ms
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = {'error': 0, 'warning': 1, 'info': 2}
+
+class AlertRule:
+    """One alert condition on one value of one sensor topic"""
+
+    def __init__(self, name, topic, severity, message, value, threshold, above=True, clear_at=None,
+                 min_seconds=0, cooldown_seconds=0, suppressed_by=None):
+        self.name = name
+        self.topic = topic
+        self.severity = severity
+        self.message = message  # format string; {value} is the reading that raised it
+        self.value = value  # payload -> number, or None when the reading doesn't apply
+        self.threshold = threshold
+        self.above = above
+        self.clear_at = threshold if clear_at is None else clear_at
+        self.min_ms = min_seconds * 1000
+        self.cooldown_ms = cooldown_seconds * 1000
+        self.suppressed_by = suppressed_by  # name of a higher tier rule that replaces this one
+
+    def breached(self, value):
+        return value > self.threshold if self.above else value < self.threshold
+
+    def cleared(self, value):
+        return value <= self.clear_at if self.above else value >= self.clear_at
+
+def _flag(test):
+    """Value function for yes/no conditions (1 when true)"""
+    return lambda payload: 1.0 if test(payload) else 0.0
+
+def _snoring(field):
+    """A snore reading's field while snoring is detected, else 0"""
+    return lambda payload: (payload.get(field) or 0) if payload.get('isDetected') else 0
+
+def _left_bed():
+    """1 while the bed is empty within SLEEP_SESSION_EXIT_SECONDS of someone lying in it
+
+    An empty bed in the daytime isn't an alert; the rule clears when the sleeper is
+    back or once they have been gone long enough to end the session.
+    """
+    occupied_ms = [None]
+
+    def value(payload):
+        time_ms = reading_time_ms('weight', payload)
+        if payload.get('is_in_bed'):
+            occupied_ms[0] = time_ms
+            return 0.0
+        since = occupied_ms[0]
+        return 1.0 if since is not None and time_ms - since <= Config.SLEEP_SESSION_EXIT_SECONDS * 1000 else 0.0
+    return value
+
+def default_rules():
+    """The alert rules, with thresholds from Config"""
+    margin = Config.ALERT_HYSTERESIS
+    timing = {'min_seconds': Config.ALERT_MIN_SECONDS, 'cooldown_seconds': Config.ALERT_COOLDOWN_SECONDS}
+    heart = lambda payload: payload.get('rate') or None  # 0 means no signal
+
+    def above(name, topic, severity, message, value, threshold, **kwargs):
+        return AlertRule(name, topic, severity, message, value, threshold,
+                         clear_at=threshold * (1 - margin), **dict(timing, **kwargs))
+
+    def flag(name, topic, severity, message, test, **kwargs):
+        return AlertRule(name, topic, severity, message, _flag(test), 0.5, **dict(timing, **kwargs))
+
+    return [
+        above('high_heart_rate', 'heart_rate', 'warning', 'High heart rate detected: {value:.0f} BPM',
+              heart, Config.HIGH_HEART_RATE_THRESHOLD),
+        AlertRule('low_heart_rate', 'heart_rate', 'warning', 'Low heart rate detected: {value:.0f} BPM',
+                  heart, Config.LOW_HEART_RATE_THRESHOLD, above=False,
+                  clear_at=Config.LOW_HEART_RATE_THRESHOLD * (1 + margin), **timing),
+        flag('no_signal', 'heart_rate', 'error', 'Heart rate sensor has no signal',
+             lambda payload: payload.get('rate') == 0),
+        above('bad_neck_posture', 'gyroscope', 'warning', 'Poor neck posture detected: {value:.1f}° angle',
+              lambda payload: payload.get('neckAngle'), Config.NECK_ALERT_ANGLE),
+        above('moderate_neck_strain', 'gyroscope', 'info', 'Moderate neck strain: {value:.1f}° angle',
+              lambda payload: payload.get('neckAngle'), Config.BAD_POSTURE_ANGLE, suppressed_by='bad_neck_posture'),
+        flag('bad_posture', 'gyroscope', 'warning', 'Bad sleeping posture detected',
+             lambda payload: payload.get('postureSeverity') == 'Bad'),
+        flag('restless_sleep', 'weight', 'warning', 'Very restless sleep detected',
+             lambda payload: payload.get('stability') == 'Very Restless'),
+        # A sleeper getting up also reads 0 kg: out_of_bed comes first and takes priority
+        AlertRule('out_of_bed', 'weight', 'info', 'User has left the bed', _left_bed(), 0.5, **timing),
+        flag('weight_no_signal', 'weight', 'error', 'Weight sensor not connected',
+             lambda payload: payload.get('weight') == 0, suppressed_by='out_of_bed'),
+        above('loud_snoring', 'snore', 'warning', 'Loud snoring detected: {value:.0f}% intensity',
+              _snoring('intensity'), Config.LOUD_SNORE_INTENSITY),
+        above('moderate_snoring', 'snore', 'info', 'Moderate snoring: {value:.0f}% intensity',
+              _snoring('intensity'), Config.MODERATE_SNORE_INTENSITY, suppressed_by='loud_snoring'),
+        above('high_frequency_snoring', 'snore', 'info', 'High frequency snoring: {value:.0f}Hz',
+              _snoring('frequency'), Config.HIGH_SNORE_FREQUENCY),
+        above('frequent_snoring', 'snore', 'info', 'Frequent snoring: {value:.0f} snores/min',
+              _snoring('rate'), Config.HIGH_SNORE_RATE),
+        flag('extended_snoring', 'snore', 'warning', 'Extended snoring session',
+             lambda payload: payload.get('isDetected'), min_seconds=Config.EXTENDED_SNORING_MINUTES * 60),
+    ]
+
+class AlertService:
+    def __init__(self, device_id=None, rules=None):
+        # Which bed this instance serves; its events go to that bed's storage
+        self.device_id = device_id or DEFAULT_DEVICE
+        self.store = get_device_store(self.device_id)
+        self.rules = {}  # topic -> rules on it
+        for rule in rules or default_rules():
+            self.rules.setdefault(rule.topic, []).append(rule)
+        self.active = {}  # rule name -> alert
+        self._pending = {}  # rule name -> ms the condition has held since
+        self._cleared = {}  # rule name -> ms it last cleared
+        self._lock = threading.Lock()
+
+        # Serialized get_data() for the hot GET endpoint, rebuilt after each change
+        self.json_cache = CachedJSON(self.get_data, shared_slot(self.device_id, 'alerts'))
+        get_hub(self.device_id).listen(self.observe)
+
+    def observe(self, topic, payload):
+        """Hub listener: run the rules of the reading's topic"""
+        rules = self.rules.get(topic)
+        if not rules:
+            return
+        time_ms = reading_time_ms(topic, payload)
+        if time_ms is None:
+            return
+        with self._lock:
+            events = [event for event in (self._evaluate(rule, payload, time_ms) for rule in rules) if event]
+        if events:
+            self._apply_events(events, time_ms)
+
+    def _evaluate(self, rule, payload, time_ms):
+        """Step one rule; returns ('raised'|'cleared', alert) on a change, else None"""
+        value = rule.value(payload)
+        if value is None:
+            return None
+
+        suppressed = rule.suppressed_by in self.active
+        alert = self.active.get(rule.name)
+        if alert is not None:
+            if suppressed:
+                # The higher tier replaces it; no cooldown, so it can return when that clears
+                del self.active[rule.name]
+                return 'cleared', dict(alert, value=value)
+            if rule.cleared(value):
+                del self.active[rule.name]
+                self._cleared[rule.name] = time_ms
+                return 'cleared', dict(alert, value=value)
+            return None
+
+        if not rule.breached(value):
+            self._pending.pop(rule.name, None)
+            return None
+        since = self._pending.setdefault(rule.name, time_ms)
+        if suppressed or time_ms - since < rule.min_ms:
+            return None
+        cleared = self._cleared.get(rule.name)
+        if cleared is not None and time_ms - cleared < rule.cooldown_ms:
+            return None
+
+        del self._pending[rule.name]
+        alert = self.active[rule.name] = {
+            'type': rule.name,
+            'sensor': rule.topic,
+            'severity': rule.severity,
+            'message': rule.message.format(value=value),
+            'value': value,
+            'since': datetime.fromtimestamp(since / 1000).isoformat(timespec='seconds'),
+        }
+        return 'raised', alert
+
+    def _apply_events(self, events, time_ms):
+        """Store and publish raised/cleared alerts"""
+        when = datetime.fromtimestamp(time_ms / 1000)
+        for kind, alert in events:
+            try:
+                self.store.writer.submit('''
+                    INSERT INTO system_events (event_type, description, severity, data, timestamp, ts_ms)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    f'alert_{kind}', alert['message'], alert['severity'],
+                    json.dumps({'type': alert['type'], 'sensor': alert['sensor'], 'value': alert['value']}),
+                    db_timestamp(when), int(time_ms)
+                ))
+            except Exception as e:
+                logger.error(f"❌ Alert database error: {e}")
+            logger.info(f"🚨 Alert {kind}: {alert['message']}")
+
+        # Push to pollers and live dashboards
+        self.json_cache.invalidate()
+        get_hub(self.device_id).publish('alerts', self.get_data())
+
+    def get_active(self, sensor=None):
+        """Active alerts (of one sensor), most severe first"""
+        with self._lock:
+            alerts = [alert.copy() for alert in self.active.values() if sensor in (None, alert['sensor'])]
+        return sorted(alerts, key=lambda alert: (SEVERITY_ORDER.get(alert['severity'], 3), alert['since']))
+
+    def get_alert_history(self, hours=24):
+        """Raised and cleared alerts in the range, newest first"""
+        try:
+            rows = range_scan('system_events', ('event_type', 'description', 'severity', 'data', 'timestamp'),
+                              start_ms=hours_ago_ms(hours), limit=Config.HISTORY_RAW_LIMIT,
+                              where="event_type LIKE 'alert_%'", db=self.store.db)
+            history = []
+            for event_type, description, severity, data, timestamp in rows:
+                details = json.loads(data) if data else {}
+                history.append({
+                    'event': event_type[len('alert_'):],
+                    'type': details.get('type'),
+                    'sensor': details.get('sensor'),
+                    'severity': severity,
+                    'message': description,
+                    'value': details.get('value'),
+                    'timestamp': timestamp
+                })
+            return history
+
+        except Exception as e:
+            logger.error(f"❌ Alert history error: {e}")
+            return []
+
+    def get_data(self):
+        """The active alert set"""
+        active = self.get_active()
+        return {'active': active, 'count': len(active)}
+
+_services = {}
+_services_lock = threading.Lock()
+
+def get_alerts(device_id=None):
+    """The alert service of one bed (created on first use)"""
+    device_id = device_id or DEFAULT_DEVICE
+    service = _services.get(device_id)
+    if service is None:
+        with _services_lock:
+            service = _services.get(device_id)
+            if service is None:
+                service = _services[device_id] = AlertService(device_id)
+    return service
+
+__all__ = [
+    'AlertRule',
+    'AlertService',
+    'default_rules',
+    'get_alerts',
+]
@@ -4,43 +4,111 @@ services/breathingVibration/breathing.py - Breathing Pattern Monitoring Service
 Handles ONLY breathing sensor data and respiratory analysis
 """
 
-import sqlite3
 from datetime import datetime
 import logging
+import sqlite3
+import threading
+
+from database.connection import db_timestamp
+from database.writer import WriteQueueFull
+from database.devices import DEFAULT_DEVICE, get_device_store
+from database.queries import range_scan, epoch_ms, hours_ago_ms
+from realtime.hub import get_hub
+from realtime.ring import get_ring
+from realtime.shared_state import shared_slot
+from database.rollups import choose_resolution, get_rollup_history
+from config import Config
+from dsp.breathing import BreathingEstimator
+from services.json_cache import CachedJSON
 
 logger = logging.getLogger(__name__)
 
 class BreathingService:
-    def __init__(self):
+    def __init__(self, device_id=None):
+        # Which bed this instance serves; its readings go to that bed's storage
+        self.device_id = device_id or DEFAULT_DEVICE
+        self.store = get_device_store(self.device_id)
         self.current_data = {
             'rate': 0,
             'rhythm': 'Normal',
             'apneaEvents': 0,
+            'apnea': None,
             'timestamp': None,
             'isConnected': False
         }
+        
+        # Server-side estimate from the raw piezo waveform, when the device sends it
+        self._estimator = None
+        self._lock = threading.Lock()  # guards the estimator and current_data
+        self._latest = None  # reading time of current_data; older frames don't replace it
+        
+        # Serialized get_data() for the hot GET endpoint, rebuilt after each update
+        self.json_cache = CachedJSON(self.get_data, shared_slot(self.device_id, 'breathing'))
     
-    def update_data(self, data):
-        """Update breathing data from sensor"""
-        try:
-            self.current_data = {
-                'rate': data.get('rate', 0),
-                'rhythm': data.get('rhythm', 'Normal'),
-                'apneaEvents': data.get('apneaEvents', 0),
-                'timestamp': datetime.now().isoformat(),
-                'isConnected': True
-            }
-            
-            # Store in database
-            self._store_in_database(data)
-            
-            logger.debug(f"🫁 Breathing: {self.current_data['rate']}/min ({self.current_data['rhythm']})")
-            return True
-            
-        except Exception as e:
-            logger.error(f"❌ Breathing update failed: {e}")
-            self.current_data['isConnected'] = False
-            return False
+    def update_data(self, data, timestamp=None):
+        """Update breathing data from sensor (timestamp: device reading time, default now)"""
+        with self._lock:
+            try:
+                timestamp = timestamp or datetime.now()
+                if 'piezo' in data:
+                    data = self._from_waveform(data, timestamp)
+                reading = {
+                    'rate': data.get('rate', 0),
+                    'rhythm': data.get('rhythm', 'Normal'),
+                    'apneaEvents': data.get('apneaEvents', 0),
+                    'apnea': data.get('apnea'),
+                    'timestamp': timestamp.isoformat(),
+                    'isConnected': True
+                }
+                
+                # Store in database
+                self._store_in_database(data, timestamp)
+                
+                # Keep for short-range history reads
+                get_ring('breathing', self.device_id).append(epoch_ms(timestamp), reading)
+                
+                if self._latest is not None and timestamp < self._latest:
+                    return True  # a retried or late frame: stored, but the newer reading stays live
+                self._latest = timestamp
+                self.current_data = reading
+                
+                # Push to pollers and live dashboards
+                self.json_cache.invalidate()
+                get_hub(self.device_id).publish('breathing', self.get_data())
+                
+                logger.debug(f"🫁 Breathing: {self.current_data['rate']}/min ({self.current_data['rhythm']})")
+                return True
+                
+            except WriteQueueFull:
+                raise  # the ingest route answers 503 so the device retries
+            except Exception as e:
+                logger.error(f"❌ Breathing update failed: {e}")
+                self.current_data['isConnected'] = False
+                self.json_cache.invalidate()
+                return False
+    
+    def _from_waveform(self, data, timestamp):
+        """Reading derived from raw piezo samples instead of device values"""
+        sample_rate = data.get('piezoRate') or Config.PIEZO_SAMPLE_RATE
+        if self._estimator is None or self._estimator.sample_rate != sample_rate:
+            self._estimator = BreathingEstimator(
+                sample_rate,
+                window_seconds=Config.BREATHING_WINDOW_SECONDS,
+                hop_seconds=Config.BREATHING_HOP_SECONDS,
+                min_rate=Config.BREATHING_RATE_MIN,
+                max_rate=Config.BREATHING_RATE_MAX,
+                apnea_ratio=Config.APNEA_AMPLITUDE_RATIO,
+                apnea_seconds=Config.APNEA_MIN_SECONDS
+            )
+        # apneaEvents counts events that began in this reading, so rollup sums stay event counts
+        events = self._estimator.add(data['piezo'], epoch_ms(timestamp))
+        if events:
+            logger.warning(f"🫁 Apnea detected on {self.device_id}")
+        
+        estimate = self._estimator.estimate()
+        if estimate is None:
+            return {'rate': 0, 'rhythm': 'Normal', 'apneaEvents': 0}  # first window still filling
+        return dict(estimate, apneaEvents=events)
     
     def get_current_data(self):
         """Get current breathing data"""
@@ -48,43 +116,38 @@ class BreathingService:
         data['lastMeasured'] = data.pop('timestamp', None)
         return data
     
-    def _store_in_database(self, data):
+    def _store_in_database(self, data, timestamp=None):
         """Store breathing data in database"""
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO breathing_data (rate, rhythm, apnea_events, timestamp)
-                VALUES (?, ?, ?, ?)
+            self.store.writer.submit('''
+                INSERT INTO breathing (rate, rhythm, apnea_events, timestamp, ts_ms)
+                VALUES (?, ?, ?, ?, ?)
             ''', (
                 data.get('rate', 0),
                 data.get('rhythm', 'Normal'),
                 data.get('apneaEvents', 0),
-                datetime.now().isoformat()
+                db_timestamp(timestamp),
+                epoch_ms(timestamp)
             ))
             
-            conn.commit()
-            conn.close()
+            rate = data.get('rate', 0)
+            self.store.rollups.record('breathing', timestamp, {
+                'rate': rate if rate > 0 else None,  # 0 means no signal
+                'apneaEvents': data.get('apneaEvents', 0)
+            })
             
-        except Exception as e:
+        except sqlite3.Error as e:
             logger.error(f"Database error: {e}")
     
     def get_recent_data(self, limit=10):
         """Get recent breathing measurements"""
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT rate, rhythm, apnea_events, timestamp 
-                FROM breathing_data 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            ''', (limit,))
+            recent = get_ring('breathing', self.device_id).query(limit=limit)
+            if recent is not None:
+                return recent
             
-            rows = cursor.fetchall()
-            conn.close()
+            rows = range_scan('breathing', ('rate', 'rhythm', 'apnea_events', 'timestamp'), limit=limit,
+                              db=self.store.db)
             
             return [{
                 'rate': row[0],
@@ -96,3 +159,34 @@ class BreathingService:
         except Exception as e:
             logger.error(f"Database query error: {e}")
             return []
+    
+    def get_breathing_history(self, hours=24):
+        """Get breathing history for specified hours (minute/hour rollups for long ranges)"""
+        resolution = choose_resolution(hours)
+        if resolution != 'raw':
+            return get_rollup_history('breathing', hours, resolution, db=self.store.db)
+        
+        try:
+            start_ms = hours_ago_ms(hours)
+            recent = get_ring('breathing', self.device_id).query(start_ms, limit=Config.HISTORY_RAW_LIMIT)
+            if recent is not None:
+                return recent
+            
+            rows = range_scan('breathing', ('rate', 'rhythm', 'apnea_events', 'timestamp'),
+                              start_ms=start_ms, limit=Config.HISTORY_RAW_LIMIT, db=self.store.db)
+            
+            return [{
+                'rate': row[0],
+                'rhythm': row[1],
+                'apneaEvents': row[2],
+                'timestamp': row[3]
+            } for row in rows]
+            
+        except Exception as e:
+            logger.error(f"Breathing history error: {e}")
+            return []
+    
+    # Consistent interface methods
+    def get_data(self):
+        """Get breathing data - consistent interface"""
+        return self.get_current_data()
@@ -3,14 +3,33 @@
 services/heart_rate_service.py - Heart Rate Monitoring Service
 Handles ONLY heart rate sensor data and processing
 """
-import sqlite3
 from datetime import datetime
 import logging
+import sqlite3
+import threading
+
+import numpy as np
+
+from database.connection import db_timestamp
+from database.writer import WriteQueueFull
+from database.devices import DEFAULT_DEVICE, get_device_store
+from database.queries import range_scan, epoch_ms, hours_ago_ms
+from realtime.hub import get_hub
+from realtime.ring import get_ring
+from realtime.shared_state import shared_slot
+from database.rollups import choose_resolution, get_rollup_history
+from config import Config
+from dsp.hrv import HRVEngine, PPGBeatDetector, hrv_report
+from services.json_cache import CachedJSON
+from services.alerts.alerts import get_alerts
 
 logger = logging.getLogger(__name__)
 
 class HeartRateService:
-    def __init__(self):
+    def __init__(self, device_id=None):
+        # Which bed this instance serves; its readings go to that bed's storage
+        self.device_id = device_id or DEFAULT_DEVICE
+        self.store = get_device_store(self.device_id)
         self.current_data = {
             'rate': 0,
             'status': 'Normal',
@@ -18,34 +37,112 @@ class HeartRateService:
             'max': 0,
             'average': 0,
             'variability': 0,
+            'hrv': None,
             'timestamp': None,
             'isConnected': False
         }
+        
+        # Server-side HRV from raw beat intervals / PPG samples, when the device sends them
+        self.hrv = HRVEngine(Config.HRV_WINDOW_SECONDS)
+        self._ppg = None
+        self._lock = threading.Lock()  # HRV window and PPG detector take one block at a time
+        self._latest = None  # reading time of current_data; older frames don't replace it
+        
+        # Serialized get_data() for the hot GET endpoint, rebuilt after each update
+        self.json_cache = CachedJSON(self.get_data, shared_slot(self.device_id, 'heart_rate'))
+    
+    def update_heart_rate(self, data, timestamp=None):
+        """Update heart rate data from sensor (timestamp: device reading time, default now)"""
+        with self._lock:
+            try:
+                timestamp = timestamp or datetime.now()
+                if 'rr' in data or 'ppg' in data:
+                    data = self._from_beats(data, timestamp)
+                reading = {
+                    'rate': data.get('rate', 0),
+                    'status': self._determine_status(data.get('rate', 0)),
+                    'min': data.get('min', 0),
+                    'max': data.get('max', 0),
+                    'average': data.get('average', 0),
+                    'variability': data.get('variability', 0),
+                    'hrv': self.hrv.metrics(),
+                    'timestamp': timestamp.isoformat(),
+                    'isConnected': True
+                }
+                
+                # Store in database
+                self._store_in_database(reading, timestamp)
+                
+                # Keep for short-range history reads
+                get_ring('heart_rate', self.device_id).append(epoch_ms(timestamp), reading)
+                
+                if self._latest is not None and timestamp < self._latest:
+                    return True  # a retried or late frame: stored, but the newer reading stays live
+                self._latest = timestamp
+                self.current_data = reading
+                
+                # Push to pollers and live dashboards
+                self.json_cache.invalidate()
+                get_hub(self.device_id).publish('heart_rate', self.get_data())
+                
+                logger.info(f"💓 Heart Rate: {self.current_data['rate']} BPM ({self.current_data['status']})")
+                return True
+                
+            except WriteQueueFull:
+                raise  # the ingest route answers 503 so the device retries
+            except Exception as e:
+                logger.error(f"❌ Heart rate update failed: {e}")
+                self.current_data['isConnected'] = False
+                self.json_cache.invalidate()
+                return False
+    
+    def _from_beats(self, data, timestamp):
+        """Reading derived from raw RR intervals or PPG samples instead of device values"""
+        end_ms = epoch_ms(timestamp)
+        if 'rr' in data:
+            beats, intervals = self.hrv.add_rr(data['rr'], end_ms)
+        else:
+            sample_rate = data.get('ppgRate') or Config.PPG_SAMPLE_RATE
+            if self._ppg is None or self._ppg.sample_rate != sample_rate:
+                self._ppg = PPGBeatDetector(sample_rate)
+            beats, intervals = self.hrv.add_beats(*self._ppg.add(data['ppg'], end_ms))
+        self._store_beats(beats, intervals)
+        
+        metrics = self.hrv.metrics()
+        if metrics is None:
+            return {'rate': round(60000 / intervals.mean()) if len(intervals) else 0}
+        return {
+            # Rate of this block's beats; min/max/average over the HRV window
+            'rate': round(60000 / intervals.mean()) if len(intervals) else round(metrics['rate']),
+            'min': round(metrics['minRate']),
+            'max': round(metrics['maxRate']),
+            'average': metrics['rate'],
+            'variability': metrics['rmssd'] or 0
+        }
+    
+    def _store_beats(self, beats, intervals):
+        """Queue accepted beats for the night report (one transaction per block)"""
+        with self.store.writer.batch():
+            for beat_ms, interval in zip(beats.tolist(), intervals.tolist()):
+                self.store.writer.submit(
+                    'INSERT INTO heart_beats (rr_ms, timestamp, ts_ms) VALUES (?, ?, ?)',
+                    (interval, db_timestamp(datetime.fromtimestamp(beat_ms / 1000)), beat_ms)
+                )
     
-    def update_heart_rate(self, data):
-        """Update heart rate data from sensor"""
+    def get_hrv_report(self, hours=8, window_seconds=None):
+        """HRV per window and for the whole range, from the stored beats"""
+        window_seconds = window_seconds or Config.HRV_WINDOW_SECONDS
         try:
-            self.current_data = {
-                'rate': data.get('rate', 0),
-                'status': self._determine_status(data.get('rate', 0)),
-                'min': data.get('min', 0),
-                'max': data.get('max', 0),
-                'average': data.get('average', 0),
-                'variability': data.get('variability', 0),
-                'timestamp': datetime.now().isoformat(),
-                'isConnected': True
-            }
-            
-            # Store in database
-            self._store_in_database(data)
-            
-            logger.info(f"💓 Heart Rate: {self.current_data['rate']} BPM ({self.current_data['status']})")
-            return True
-            
+            rows = range_scan('heart_beats', ('ts_ms', 'rr_ms'), start_ms=hours_ago_ms(hours),
+                              order='ASC', db=self.store.db)
+            beats = np.array(rows, dtype=np.float64).reshape(-1, 2)
+            report = hrv_report(beats[:, 0], beats[:, 1], window_seconds)
         except Exception as e:
-            logger.error(f"❌ Heart rate update failed: {e}")
-            self.current_data['isConnected'] = False
-            return False
+            logger.error(f"❌ HRV report error: {e}")
+            report = {'windows': [], 'overall': None}
+        with self._lock:
+            report['current'] = self.hrv.metrics()
+        return report
     
     def get_heart_rate_data(self):
         """Get current heart rate data"""
@@ -64,98 +161,74 @@ class HeartRateService:
         else:
             return 'Normal'
     
-    def _store_in_database(self, data):
+    def _store_in_database(self, data, timestamp=None):
         """Store heart rate data in database"""
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO heart_rate (rate, status, min_rate, max_rate, average_rate, variability)
-                VALUES (?, ?, ?, ?, ?, ?)
+            self.store.writer.submit('''
+                INSERT INTO heart_rate (rate, status, min_rate, max_rate, average_rate, variability, timestamp, ts_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 data.get('rate', 0),
-                self.current_data['status'],
+                data['status'],
                 data.get('min', 0),
                 data.get('max', 0),
                 data.get('average', 0),
-                data.get('variability', 0)
+                data.get('variability', 0),
+                db_timestamp(timestamp),
+                epoch_ms(timestamp)
             ))
             
-            conn.commit()
-            conn.close()
+            rate = data.get('rate', 0)
+            self.store.rollups.record('heart_rate', timestamp, {
+                'rate': rate if rate > 0 else None,  # 0 means no signal
+                'variability': data.get('variability', 0)
+            })
             
-        except Exception as e:
+        except sqlite3.Error as e:
             logger.error(f"❌ Heart rate database error: {e}")
     
     def get_heart_rate_history(self, hours=24):
-        """Get heart rate history for specified hours"""
+        """Get heart rate history for specified hours (minute/hour rollups for long ranges)"""
+        resolution = choose_resolution(hours)
+        if resolution != 'raw':
+            return get_rollup_history('heart_rate', hours, resolution, db=self.store.db)
+        
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
+            start_ms = hours_ago_ms(hours)
+            recent = get_ring('heart_rate', self.device_id).query(start_ms, limit=Config.HISTORY_RAW_LIMIT)
+            if recent is not None:
+                return recent
             
-            cursor.execute('''
-                SELECT rate, status, timestamp 
-                FROM heart_rate 
-                WHERE timestamp > datetime('now', '-{} hours')
-                ORDER BY timestamp DESC
-                LIMIT 100
-            '''.format(hours))
+            rows = range_scan('heart_rate', ('rate', 'status', 'timestamp'),
+                              start_ms=start_ms, limit=Config.HISTORY_RAW_LIMIT, db=self.store.db)
             
             history = []
-            for row in cursor.fetchall():
+            for row in rows:
                 history.append({
                     'rate': row[0],
                     'status': row[1],
                     'timestamp': row[2]
                 })
             
-            conn.close()
             return history
             
         except Exception as e:
             logger.error(f"❌ Heart rate history error: {e}")
             return []
     
-    def check_heart_rate_alerts(self):
-        """Check if heart rate needs alerts"""
-        rate = self.current_data['rate']
-        alerts = []
-        
-        if rate > 120:
-            alerts.append({
-                'type': 'high_heart_rate',
-                'message': f'High heart rate detected: {rate} BPM',
-                'severity': 'warning'
-            })
-        elif rate < 50 and rate > 0:
-            alerts.append({
-                'type': 'low_heart_rate', 
-                'message': f'Low heart rate detected: {rate} BPM',
-                'severity': 'warning'
-            })
-        elif rate == 0:
-            alerts.append({
-                'type': 'no_signal',
-                'message': 'Heart rate sensor not connected',
-                'severity': 'error'
-            })
-        
-        return alerts
-    
     def get_heart_rate_stats(self):
         """Get heart rate statistics"""
         return {
             'current': self.current_data,
             'connected': self.current_data['isConnected'],
             'last_update': self.current_data['timestamp'],
-            'alerts': self.check_heart_rate_alerts()
+            'alerts': get_alerts(self.device_id).get_active('heart_rate')
         }
     
     # Consistent interface methods
-    def update_data(self, data):
+    def update_data(self, data, timestamp=None):
         """Update heart rate data - consistent interface"""
-        return self.update_heart_rate(data)
+        return self.update_heart_rate(data, timestamp)
     
     def get_data(self):
         """Get heart rate data - consistent interface"""
@@ -165,10 +238,6 @@ class HeartRateService:
         """Initialize database - consistent interface"""
         # Database initialization is handled in _store_in_database
         pass
-    
-    def get_sleep_history(self):
-        """Get sleep history - placeholder for consistent interface"""
-        return []
 
 __all__ = [
     'HeartRateService',
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+services/json_cache.py - Pre-serialized Service State
+Keeps a service's current state as ready-to-send JSON bytes, so hot GET endpoints
+don't copy and jsonify the same dict on every poll
+
+With a shared slot (SHARED_STATE_ENABLED) the body is written through to shared
+memory on every change and read back from there, so every worker process serves
+the newest state no matter which worker ingested it.
+"""
+
+import json
+import threading
+import zlib
+
+class CachedJSON:
+    """Versioned JSON body of a service's state, serialized at most once per version"""
+
+    def __init__(self, build, shared=None):
+        self._build = build  # returns the dict to serialize (the service's get_data)
+        self.shared = shared  # realtime.shared_state.SharedSlot, or None
+        self._lock = threading.Lock()
+        self.version = 0
+        self._built = (-1, None, None)  # (version, body, etag)
+
+    def invalidate(self):
+        """Mark the state changed; the body is rebuilt on the next read"""
+        with self._lock:
+            self.version += 1
+            if self.shared is not None:
+                # Other workers can't rebuild it, so publish the new body right away
+                self.shared.write(self._serialize())
+
+    def _serialize(self):
+        return json.dumps(self._build(), separators=(',', ':')).encode()
+
+    def get(self):
+        """(body bytes, etag) for the current state"""
+        if self.shared is not None:
+            state = self.shared.read()
+            if state is not None and state[1] is not None:
+                return state[1], format(state[2], '08x')
+
+        version, body, etag = self._built
+        if version == self.version:
+            return body, etag
+
+        with self._lock:
+            if self._built[0] != self.version:
+                body = self._serialize()
+                # Content hash, so the ETag stays valid across restarts
+                self._built = (self.version, body, format(zlib.crc32(body), '08x'))
+            return self._built[1], self._built[2]
+
+    def data(self):
+        """The current state as a dict (from shared memory when shared)"""
+        if self.shared is None:
+            return self._build()
+        return json.loads(self.get()[0])
+
+__all__ = [
+    'CachedJSON',
+]
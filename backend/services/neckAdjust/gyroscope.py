@@ -5,15 +5,32 @@ services/gyroscope_service.py - Gyroscope and Position Monitoring Service
 Handles ONLY gyroscope sensor data and sleep position detection
 """
 
-import sqlite3
 from datetime import datetime
 import logging
+import sqlite3
+import threading
 import math
 
+from database.connection import db_timestamp
+from database.writer import WriteQueueFull
+from database.devices import DEFAULT_DEVICE, get_device_store
+from database.queries import range_scan, epoch_ms, hours_ago_ms, day_range_ms
+from realtime.hub import get_hub
+from realtime.ring import get_ring
+from realtime.shared_state import shared_slot
+from database.rollups import choose_resolution, get_rollup_history
+from config import Config
+from dsp.imu import ImuFusion
+from services.json_cache import CachedJSON
+from services.alerts.alerts import get_alerts
+
 logger = logging.getLogger(__name__)
 
 class GyroscopeService:
-    def __init__(self):
+    def __init__(self, device_id=None):
+        # Which bed this instance serves; its readings go to that bed's storage
+        self.device_id = device_id or DEFAULT_DEVICE
+        self.store = get_device_store(self.device_id)
         self.current_data = {
             'pitch': 0,
             'roll': 0,
@@ -23,42 +40,83 @@ class GyroscopeService:
             'timestamp': None,
             'isConnected': False
         }
+        
+        # Fusion of raw accelerometer/gyro batches, when the device sends them
+        self._fusion = None
+        self._lock = threading.Lock()  # one IMU batch at a time through the fusion filter
+        self._latest = None  # reading time of current_data; older frames don't replace it
+        
+        # Serialized get_data() for the hot GET endpoint, rebuilt after each update
+        self.json_cache = CachedJSON(self.get_data, shared_slot(self.device_id, 'gyroscope'))
     
-    def update_gyroscope(self, data):
-        """Update gyroscope data from sensor"""
-        try:
-            pitch = data.get('pitch', 0)
-            roll = data.get('roll', 0)
-            
-            # Calculate neck angle (absolute pitch)
-            neck_angle = abs(pitch)
-            
-            # Determine sleep position
-            position = self._determine_position(roll)
-            
-            # Determine posture severity
-            posture_severity = self._determine_posture_severity(neck_angle)
-            
-            self.current_data = {
-                'pitch': pitch,
-                'roll': roll,
-                'neckAngle': neck_angle,
-                'position': position,
-                'postureSeverity': posture_severity,
-                'timestamp': datetime.now().isoformat(),
-                'isConnected': True
-            }
-            
-            # Store in database
-            self._store_in_database(data)
-            
-            logger.info(f"🔄 Position: {position} (Neck: {neck_angle:.1f}°, Posture: {posture_severity})")
-            return True
-            
-        except Exception as e:
-            logger.error(f"❌ Gyroscope update failed: {e}")
-            self.current_data['isConnected'] = False
-            return False
+    def update_gyroscope(self, data, timestamp=None):
+        """Update gyroscope data from sensor (timestamp: device reading time, default now)"""
+        with self._lock:
+            try:
+                timestamp = timestamp or datetime.now()
+                if 'accel' in data:
+                    return self._update_from_imu(data, timestamp)
+                self._apply_orientation(data.get('pitch', 0), data.get('roll', 0), timestamp)
+                return True
+                
+            except WriteQueueFull:
+                raise  # the ingest route answers 503 so the device retries
+            except Exception as e:
+                logger.error(f"❌ Gyroscope update failed: {e}")
+                self.current_data['isConnected'] = False
+                self.json_cache.invalidate()
+                return False
+    
+    def _update_from_imu(self, data, timestamp):
+        """Fuse a raw IMU batch; only the downsampled orientations are stored and pushed"""
+        sample_rate = data.get('imuRate') or Config.IMU_SAMPLE_RATE
+        if self._fusion is None or self._fusion.sample_rate != sample_rate:
+            self._fusion = ImuFusion(sample_rate, Config.IMU_OUTPUT_RATE, Config.IMU_TIME_CONSTANT)
+        
+        outputs = self._fusion.add(data['accel'], data.get('gyro'), epoch_ms(timestamp))
+        for output_ms, pitch, roll, motion in outputs:
+            self._apply_orientation(pitch, roll, datetime.fromtimestamp(output_ms / 1000), motion)
+        return True
+    
+    def _apply_orientation(self, pitch, roll, timestamp, motion=None):
+        """Classify one orientation, then store and publish it"""
+        # Calculate neck angle (absolute pitch)
+        neck_angle = abs(pitch)
+        
+        # Determine sleep position
+        position = self._determine_position(roll)
+        
+        # Determine posture severity
+        posture_severity = self._determine_posture_severity(neck_angle)
+        
+        reading = {
+            'pitch': pitch,
+            'roll': roll,
+            'neckAngle': neck_angle,
+            'position': position,
+            'postureSeverity': posture_severity,
+            'timestamp': timestamp.isoformat(),
+            'isConnected': True
+        }
+        if motion is not None:
+            reading['motion'] = motion  # mean angular speed, deg/s
+        
+        # Store in database
+        self._store_in_database(reading, timestamp)
+        
+        # Keep for short-range history reads
+        get_ring('gyroscope', self.device_id).append(epoch_ms(timestamp), reading)
+        
+        if self._latest is not None and timestamp < self._latest:
+            return  # a retried or late frame: stored, but the newer reading stays live
+        self._latest = timestamp
+        self.current_data = reading
+        
+        # Push to pollers and live dashboards
+        self.json_cache.invalidate()
+        get_hub(self.device_id).publish('gyroscope', self.get_data())
+        
+        logger.info(f"🔄 Position: {position} (Neck: {neck_angle:.1f}°, Posture: {posture_severity})")
     
     def get_gyroscope_data(self):
         """Get current gyroscope data"""
@@ -68,7 +126,9 @@ class GyroscopeService:
     
     def _determine_position(self, roll):
         """Determine sleep position based on roll angle"""
-        if roll > 45:
+        if abs(roll) > 135:
+            return 'Stomach'
+        elif roll > 45:
             return 'Right Side'
         elif roll < -45:
             return 'Left Side'
@@ -90,45 +150,48 @@ class GyroscopeService:
         else:
             return 'Bad'
     
-    def _store_in_database(self, data):
+    def _store_in_database(self, reading, timestamp=None):
         """Store gyroscope data in database"""
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO gyroscope (pitch, roll, neck_angle, position, posture_severity)
-                VALUES (?, ?, ?, ?, ?)
+            self.store.writer.submit('''
+                INSERT INTO gyroscope (pitch, roll, neck_angle, position, posture_severity, timestamp, ts_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (
-                self.current_data['pitch'],
-                self.current_data['roll'],
-                self.current_data['neckAngle'],
-                self.current_data['position'],
-                self.current_data['postureSeverity']
+                reading['pitch'],
+                reading['roll'],
+                reading['neckAngle'],
+                reading['position'],
+                reading['postureSeverity'],
+                db_timestamp(timestamp),
+                epoch_ms(timestamp)
             ))
             
-            conn.commit()
-            conn.close()
+            self.store.rollups.record('gyroscope', timestamp, {
+                'pitch': reading['pitch'],
+                'roll': reading['roll'],
+                'neckAngle': reading['neckAngle']
+            })
             
-        except Exception as e:
+        except sqlite3.Error as e:
             logger.error(f"❌ Gyroscope database error: {e}")
     
     def get_gyroscope_history(self, hours=24):
-        """Get gyroscope history for specified hours"""
+        """Get gyroscope history for specified hours (minute/hour rollups for long ranges)"""
+        resolution = choose_resolution(hours)
+        if resolution != 'raw':
+            return get_rollup_history('gyroscope', hours, resolution, db=self.store.db)
+        
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
+            start_ms = hours_ago_ms(hours)
+            recent = get_ring('gyroscope', self.device_id).query(start_ms, limit=Config.HISTORY_RAW_LIMIT)
+            if recent is not None:
+                return recent
             
-            cursor.execute('''
-                SELECT pitch, roll, neck_angle, position, posture_severity, timestamp 
-                FROM gyroscope 
-                WHERE timestamp > datetime('now', '-{} hours')
-                ORDER BY timestamp DESC
-                LIMIT 100
-            '''.format(hours))
+            rows = range_scan('gyroscope', ('pitch', 'roll', 'neck_angle', 'position', 'posture_severity', 'timestamp'),
+                              start_ms=start_ms, limit=Config.HISTORY_RAW_LIMIT, db=self.store.db)
             
             history = []
-            for row in cursor.fetchall():
+            for row in rows:
                 history.append({
                     'pitch': row[0],
                     'roll': row[1],
@@ -138,7 +201,6 @@ class GyroscopeService:
                     'timestamp': row[5]
                 })
             
-            conn.close()
             return history
             
         except Exception as e:
@@ -148,21 +210,15 @@ class GyroscopeService:
     def get_position_stats(self):
         """Get sleep position statistics for today"""
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT position, COUNT(*) as count
-                FROM gyroscope 
-                WHERE date(timestamp) = date('now')
-                GROUP BY position
-                ORDER BY count DESC
-            ''')
+            start_ms, end_ms = day_range_ms()
+            rows = range_scan('gyroscope', ('position', 'COUNT(*)'), start_ms, end_ms,
+                              group_by='position', db=self.store.db)
+            rows = sorted(rows, key=lambda row: row[1], reverse=True)
             
             position_counts = {}
             total_readings = 0
             
-            for row in cursor.fetchall():
+            for row in rows:
                 position_counts[row[0]] = row[1]
                 total_readings += row[1]
             
@@ -172,8 +228,6 @@ class GyroscopeService:
                 percentage = (count / total_readings * 100) if total_readings > 0 else 0
                 position_percentages[position] = round(percentage, 1)
             
-            conn.close()
-            
             return {
                 'position_counts': position_counts,
                 'position_percentages': position_percentages,
@@ -185,41 +239,6 @@ class GyroscopeService:
             logger.error(f"❌ Position stats error: {e}")
             return {}
     
-    def check_posture_alerts(self):
-        """Check if posture needs alerts"""
-        neck_angle = self.current_data['neckAngle']
-        posture = self.current_data['postureSeverity']
-        alerts = []
-        
-        if neck_angle > 40:
-            alerts.append({
-                'type': 'bad_neck_posture',
-                'message': f'Poor neck posture detected: {neck_angle:.1f}° angle',
-                'severity': 'warning'
-            })
-        elif neck_angle > 30:
-            alerts.append({
-                'type': 'moderate_neck_strain',
-                'message': f'Moderate neck strain: {neck_angle:.1f}° angle',
-                'severity': 'info'
-            })
-        
-        if posture == 'Bad':
-            alerts.append({
-                'type': 'bad_posture',
-                'message': 'Bad sleeping posture detected',
-                'severity': 'warning'
-            })
-        
-        if not self.current_data['isConnected']:
-            alerts.append({
-                'type': 'sensor_disconnected',
-                'message': 'Gyroscope sensor not connected',
-                'severity': 'error'
-            })
-        
-        return alerts
-    
     def calibrate_sensor(self):
         """Calibrate gyroscope sensor to neutral position"""
         try:
@@ -241,13 +260,13 @@ class GyroscopeService:
             'connected': self.current_data['isConnected'],
             'last_update': self.current_data['timestamp'],
             'position_stats': self.get_position_stats(),
-            'alerts': self.check_posture_alerts()
+            'alerts': get_alerts(self.device_id).get_active('gyroscope')
         }
     
     # Consistent interface methods
-    def update_data(self, data):
+    def update_data(self, data, timestamp=None):
         """Update gyroscope data - consistent interface"""
-        return self.update_gyroscope(data)
+        return self.update_gyroscope(data, timestamp)
     
     def get_data(self):
         """Get gyroscope data - consistent interface"""
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+services/registry.py - Service Registry
+Owns the one instance of every service in the process; the simulator, app.py
+endpoints and all route blueprints share it, so they all see the same state
+
+Each extra bed (device) gets its own registry of sensor services, with its own
+in-memory state and storage partition, plus the sleep stage, session and alert
+services fed by them. Actuators (fan, LED) belong to the default device only, which
+is the Pi the hardware is wired to.
+"""
+
+import threading
+import logging
+
+from database.devices import DEFAULT_DEVICE, get_device_store
+from .breathingVibration.breathing import BreathingService
+from .heartFan.heart_rate import HeartRateService
+from .neckAdjust.gyroscope import GyroscopeService
+from .snoreAlarm.weight import WeightService
+from .snoreAlarm.snore import SnoreService
+from .sleepTracking.stages import SleepStageService
+from .sleepTracking.sessions import SleepSessionService
+from .alerts.alerts import get_alerts
+from .heartFan.fan import FanService
+from .lightLCD.led import LEDService
+
+logger = logging.getLogger(__name__)
+
+SENSOR_SERVICES = ('heart_rate', 'breathing', 'gyroscope', 'weight', 'snore')
+
+class ServiceRegistry:
+    """Name -> service instance for one device (read like a dict)"""
+
+    def __init__(self, device_id=DEFAULT_DEVICE):
+        self.device_id = device_id
+        self.store = get_device_store(device_id)
+        self._services = {
+            'heart_rate': HeartRateService(device_id),
+            'breathing': BreathingService(device_id),
+            'gyroscope': GyroscopeService(device_id),
+            'weight': WeightService(device_id),
+            'snore': SnoreService(device_id),
+            'sleep': SleepStageService(device_id),
+            'session': SleepSessionService(device_id),
+            'alerts': get_alerts(device_id)
+        }
+        if device_id == DEFAULT_DEVICE:
+            self._services['fan'] = FanService()
+            self._services['led'] = LEDService()
+        logger.info(f"📦 Services ready for device {device_id}: {', '.join(self._services)}")
+
+    def __getitem__(self, name):
+        return self._services[name]
+
+    def __contains__(self, name):
+        return name in self._services
+
+    def __iter__(self):
+        return iter(self._services)
+
+    def __len__(self):
+        return len(self._services)
+
+    def keys(self):
+        return self._services.keys()
+
+    def items(self):
+        return self._services.items()
+
+    def sensors(self):
+        """Sensor services only, in SENSOR_SERVICES order"""
+        return {name: self._services[name] for name in SENSOR_SERVICES}
+
+_registries = {}
+_registry_lock = threading.Lock()
+
+def get_registry(device_id=None, create=True):
+    """Get the service registry of one device (default: the default device)
+
+    create=False raises UnknownDevice for a device that has never sent data.
+    """
+    device_id = device_id or DEFAULT_DEVICE
+    registry = _registries.get(device_id)
+    if registry is None:
+        with _registry_lock:
+            registry = _registries.get(device_id)
+            if registry is None:
+                get_device_store(device_id, create)  # validates the id and opens its partition
+                registry = _registries[device_id] = ServiceRegistry(device_id)
+    return registry
+
+def get_service(name, device_id=None):
+    """Get the shared instance of one service"""
+    return get_registry(device_id)[name]
+
+__all__ = [
+    'SENSOR_SERVICES',
+    'ServiceRegistry',
+    'get_registry',
+    'get_service',
+]
@@ -4,10 +4,13 @@ services/sensor_service.py - Sensor Data Management Service
 Handles all sensor data processing and storage
 """
 
-import sqlite3
 from datetime import datetime
 import logging
 
+from database.connection import get_db, db_timestamp
+from database.writer import get_writer
+from database.queries import epoch_ms
+
 logger = logging.getLogger(__name__)
 
 class SensorService:
@@ -73,10 +76,7 @@ class SensorService:
     
     def get_sleep_history(self):
         """Get historical sleep session data"""
-        conn = sqlite3.connect('sensor_data.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        rows = get_db().query('''
             SELECT id, start_time, end_time, duration_minutes, sleep_score, 
                    total_snore_events, avg_heart_rate, status
             FROM sleep_sessions 
@@ -85,7 +85,7 @@ class SensorService:
         ''')
         
         sessions = []
-        for row in cursor.fetchall():
+        for row in rows:
             sessions.append({
                 'id': str(row[0]),
                 'date': row[1][:10] if row[1] else 'Unknown',
@@ -96,7 +96,6 @@ class SensorService:
                 'status': row[7] or 'Unknown'
             })
         
-        conn.close()
         return sessions
     
     def process_sensor_data(self, data):
@@ -138,15 +137,11 @@ class SensorService:
         }
         
         # Store in database
-        conn = sqlite3.connect('sensor_data.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO heart_rate (rate, status, min_rate, max_rate, average_rate, variability)
-            VALUES (?, ?, ?, ?, ?, ?)
+        get_writer().submit('''
+            INSERT INTO heart_rate (rate, status, min_rate, max_rate, average_rate, variability, timestamp, ts_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (data.get('rate', 0), data.get('status', 'Normal'), data.get('min', 0),
-              data.get('max', 0), data.get('average', 0), data.get('variability', 0)))
-        conn.commit()
-        conn.close()
+              data.get('max', 0), data.get('average', 0), data.get('variability', 0), db_timestamp(), epoch_ms()))
     
     def update_breathing(self, data):
         """Update breathing data"""
@@ -159,14 +154,10 @@ class SensorService:
         }
         
         # Store in database
-        conn = sqlite3.connect('sensor_data.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO breathing (rate, rhythm, apnea_events)
-            VALUES (?, ?, ?)
-        ''', (data.get('rate', 0), data.get('rhythm', 'Normal'), data.get('apneaEvents', 0)))
-        conn.commit()
-        conn.close()
+        get_writer().submit('''
+            INSERT INTO breathing (rate, rhythm, apnea_events, timestamp, ts_ms)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (data.get('rate', 0), data.get('rhythm', 'Normal'), data.get('apneaEvents', 0), db_timestamp(), epoch_ms()))
     
     def update_gyroscope(self, data):
         """Update gyroscope/posture data"""
@@ -199,14 +190,10 @@ class SensorService:
         }
         
         # Store in database
-        conn = sqlite3.connect('sensor_data.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO gyroscope (pitch, roll, neck_angle, position, posture_severity)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (pitch, roll, neck_angle, position, posture_severity))
-        conn.commit()
-        conn.close()
+        get_writer().submit('''
+            INSERT INTO gyroscope (pitch, roll, neck_angle, position, posture_severity, timestamp, ts_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (pitch, roll, neck_angle, position, posture_severity, db_timestamp(), epoch_ms()))
     
     def update_weight(self, data):
         """Update weight data"""
@@ -217,11 +204,8 @@ class SensorService:
         }
         
         # Store in database
-        conn = sqlite3.connect('sensor_data.db')
-        cursor = conn.cursor()
-        cursor.execute('INSERT INTO weight (weight) VALUES (?)', (data.get('weight', 0),))
-        conn.commit()
-        conn.close()
+        get_writer().submit('INSERT INTO weight (weight, timestamp, ts_ms) VALUES (?, ?, ?)',
+                            (data.get('weight', 0), db_timestamp(), epoch_ms()))
     
     def update_snore(self, data):
         """Update snore detection data"""
@@ -234,15 +218,11 @@ class SensorService:
         }
         
         # Store in database
-        conn = sqlite3.connect('sensor_data.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO snore_detection (is_detected, frequency, duration_minutes)
-            VALUES (?, ?, ?)
+        get_writer().submit('''
+            INSERT INTO snore_detection (is_detected, frequency, duration_minutes, timestamp, ts_ms)
+            VALUES (?, ?, ?, ?, ?)
         ''', (data.get('isDetected', False), data.get('frequency', 0), 
-              data.get('duration_minutes', 0)))
-        conn.commit()
-        conn.close()
+              data.get('duration_minutes', 0), db_timestamp(), epoch_ms()))
     
     def get_all_sensor_status(self):
         """Get status of all sensors"""
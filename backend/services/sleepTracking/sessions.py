@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+services/sleepTracking/sessions.py - Sleep Session Service
+Opens a sleep session when someone gets into bed and closes it when they leave,
+keeping the night's summary as running aggregates and writing one sleep_sessions
+row per finished session
+
+Like the stage service, it listens to the bed's push hub, so every ingest path
+feeds it. A weight reading of at least SLEEP_DETECTION_WEIGHT_THRESHOLD kg opens a
+session. The sleeper counts as asleep from the last movement once they have lain
+still for INACTIVITY_SLEEP_THRESHOLD seconds. The session closes when the bed has
+been empty, or the readings have stopped, for SLEEP_SESSION_EXIT_SECONDS; a short
+trip out of bed stays in the same session.
+
+The open session is checkpointed to sleep_session_checkpoint with each writer batch
+and restored on start, so a restart continues the night. Like the stage service, it
+relies on the single process that ingests the bed.
+"""
+
+from datetime import datetime
+import threading
+import logging
+import sqlite3
+
+from database.connection import db_timestamp
+from database.devices import DEFAULT_DEVICE, get_device_store
+from realtime.hub import get_hub
+from config import Config
+from .stages import gyroscope_moving, reading_time_ms
+
+logger = logging.getLogger(__name__)
+
+class SleepSession:
+    """Running aggregates of one open session (times in epoch ms)"""
+
+    FIELDS = ('start_ms', 'last_ms', 'occupied_ms', 'motion_ms', 'asleep_since', 'asleep_ms',
+              'heart_sum', 'heart_count', 'snore_events', 'snoring')
+
+    def __init__(self, start_ms):
+        self.start_ms = start_ms
+        self.last_ms = start_ms  # newest reading
+        self.occupied_ms = start_ms  # newest reading with someone in bed
+        self.motion_ms = start_ms  # newest movement
+        self.asleep_since = None  # start of the current sleep stretch
+        self.asleep_ms = 0  # finished sleep stretches
+        self.heart_sum = 0.0
+        self.heart_count = 0
+        self.snore_events = 0
+        self.snoring = False
+
+    @classmethod
+    def from_row(cls, row):
+        session = cls(row[0])
+        for field, value in zip(cls.FIELDS, row):
+            setattr(session, field, value)
+        session.snoring = bool(session.snoring)
+        return session
+
+    def to_row(self):
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+    def moved(self, time_ms):
+        """End the current sleep stretch at a movement"""
+        if self.asleep_since is not None:
+            self.asleep_ms += max(time_ms - self.asleep_since, 0)
+            self.asleep_since = None
+        self.motion_ms = max(self.motion_ms, time_ms)
+
+    def still(self, time_ms):
+        """Start a sleep stretch once the sleeper has been still long enough"""
+        if self.asleep_since is None and time_ms - self.motion_ms >= Config.INACTIVITY_SLEEP_THRESHOLD * 1000:
+            self.asleep_since = self.motion_ms
+
+    def asleep_total(self, end_ms):
+        return self.asleep_ms + (max(end_ms - self.asleep_since, 0) if self.asleep_since is not None else 0)
+
+def sleep_score(in_bed_ms, asleep_ms, snore_events):
+    """0-100 from sleep efficiency (50), hours asleep up to 7 (30) and snore events per hour (20)"""
+    if in_bed_ms <= 0:
+        return 0
+    hours_asleep = asleep_ms / 3.6e6
+    efficiency = asleep_ms / in_bed_ms
+    snores_per_hour = snore_events / max(hours_asleep, 1.0)
+    score = 50 * efficiency + 30 * min(hours_asleep / 7, 1.0) + 20 * (1 - min(snores_per_hour / 30, 1.0))
+    return int(round(score))
+
+def session_status(score):
+    if score >= 70:
+        return 'Good'
+    if score >= 50:
+        return 'Fair'
+    return 'Poor'
+
+class SleepSessionService:
+    def __init__(self, device_id=None):
+        # Which bed this instance serves; its sessions go to that bed's storage
+        self.device_id = device_id or DEFAULT_DEVICE
+        self.store = get_device_store(self.device_id)
+        self.session = None
+        self._lock = threading.Lock()
+        self._last_roll = None
+        self._dirty = False  # session changed since the last checkpoint
+        self._restored = False  # the checkpoint is read on first use, once the tables exist
+        self.store.writer.add_flush_hook(self._checkpoint)
+        get_hub(self.device_id).listen(self.observe)
+
+    def _restore(self):
+        """Reopen the session checkpointed before a restart, unless it was already stored"""
+        if self._restored:
+            return
+        self._restored = True
+        try:
+            row = self.store.db.query_one(f'''
+                SELECT {', '.join(SleepSession.FIELDS)}, last_roll FROM sleep_session_checkpoint
+            ''')
+            if row is None:
+                return
+            session = SleepSession.from_row(row)
+            start = db_timestamp(datetime.fromtimestamp(session.start_ms / 1000))
+            if self.store.db.query_one('SELECT 1 FROM sleep_sessions WHERE start_time = ?', (start,)):
+                self._dirty = True  # closed just before the checkpoint was cleared
+                return
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Sleep session checkpoint not restored: {e}")
+            return
+        self.session, self._last_roll = session, row[-1]
+        logger.info(f"🛌 Sleep session since {start} restored")
+
+    def _checkpoint(self, conn):
+        """Writer flush hook: save the open session, or clear the checkpoint once it closed"""
+        with self._lock:
+            if not self._restored or not self._dirty:
+                return
+            self._dirty = False
+            row = self.session.to_row() + (self._last_roll,) if self.session is not None else None
+        try:
+            conn.execute('DELETE FROM sleep_session_checkpoint')
+            if row is not None:
+                conn.execute(f'''
+                    INSERT INTO sleep_session_checkpoint ({', '.join(SleepSession.FIELDS)}, last_roll, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', row)
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            raise
+
+    def observe(self, topic, payload):
+        """Hub listener: open, update or close the session from one published reading"""
+        time_ms = reading_time_ms(topic, payload)
+        if time_ms is None:
+            return
+        with self._lock:
+            self._restore()
+            active = self.session is not None
+            finished = self._update(topic, payload, time_ms)
+            # A closed session's checkpoint stays until its row is queued
+            self._dirty = finished is None and (self._dirty or active or self.session is not None)
+        if finished is not None:
+            self._store(finished)
+            with self._lock:
+                self._dirty = True
+
+    def _update(self, topic, payload, time_ms):
+        """Apply one reading; returns the row of a session it closed, or None"""
+        exit_ms = Config.SLEEP_SESSION_EXIT_SECONDS * 1000
+        finished = None
+        if self.session is not None and time_ms - self.session.last_ms > exit_ms:
+            finished = self._close()  # the readings stopped long enough to end the night
+
+        session = self.session
+        if topic == 'weight':
+            occupied = (payload.get('weight') or 0) >= Config.SLEEP_DETECTION_WEIGHT_THRESHOLD
+            if occupied and session is None:
+                session = self.session = SleepSession(time_ms)
+                logger.info(f"🛌 Sleep session started at {datetime.fromtimestamp(time_ms / 1000):%H:%M:%S}")
+            if session is None:
+                return finished
+            if occupied:
+                session.occupied_ms = max(session.occupied_ms, time_ms)
+            elif time_ms - session.occupied_ms > exit_ms:
+                return self._close()
+            moving = not occupied or payload.get('stability', 'Stable') != 'Stable'
+        elif session is None:
+            return finished
+        elif topic == 'gyroscope':
+            moving, self._last_roll = gyroscope_moving(payload, self._last_roll)
+        else:
+            moving = False
+            if topic == 'heart_rate' and payload.get('rate'):
+                session.heart_sum += payload['rate']
+                session.heart_count += 1
+            elif topic == 'snore':
+                detected = bool(payload.get('isDetected'))
+                session.snore_events += detected and not session.snoring
+                session.snoring = detected
+
+        session.last_ms = max(session.last_ms, time_ms)
+        if moving:
+            session.moved(time_ms)
+        else:
+            session.still(time_ms)
+        return finished
+
+    def _close(self):
+        """Summarize the open session; returns the row to store, or None if nobody fell asleep"""
+        session, self.session = self.session, None
+        end_ms = session.occupied_ms
+        asleep_ms = session.asleep_total(end_ms)
+        if asleep_ms <= 0:
+            logger.info("🛌 Sleep session ended without sleep; not stored")
+            return None
+
+        score = sleep_score(end_ms - session.start_ms, asleep_ms, session.snore_events)
+        start = datetime.fromtimestamp(session.start_ms / 1000)
+        end = datetime.fromtimestamp(end_ms / 1000)
+        avg_heart_rate = round(session.heart_sum / session.heart_count, 1) if session.heart_count else None
+        logger.info(f"🛌 Sleep session {start:%H:%M}-{end:%H:%M}: "
+                    f"{asleep_ms / 3.6e6:.1f} h asleep, score {score}")
+        return (db_timestamp(start), db_timestamp(end), int(round(asleep_ms / 60000)), score,
+                session.snore_events, avg_heart_rate, session_status(score))
+
+    def _store(self, row):
+        try:
+            self.store.writer.submit('''
+                INSERT INTO sleep_sessions (start_time, end_time, duration_minutes, sleep_score,
+                                            total_snore_events, avg_heart_rate, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', row)
+        except Exception as e:
+            logger.error(f"❌ Sleep session database error: {e}")
+
+    def get_sleep_history(self, limit=30):
+        """Finished sessions, newest first"""
+        try:
+            rows = self.store.db.query('''
+                SELECT id, start_time, end_time, duration_minutes, sleep_score,
+                       total_snore_events, avg_heart_rate, status
+                FROM sleep_sessions
+                ORDER BY start_time DESC
+                LIMIT ?
+            ''', (limit,))
+        except Exception as e:
+            logger.error(f"❌ Sleep history error: {e}")
+            return []
+
+        return [
+            {
+                'id': str(row[0]),
+                'date': row[1][:10] if row[1] else 'Unknown',
+                'startTime': row[1],
+                'endTime': row[2],
+                'duration': f"{row[3] // 60}h {row[3] % 60}m" if row[3] else '0h 0m',
+                'durationMinutes': row[3] or 0,
+                'sleepScore': row[4] or 0,
+                'snoreEvents': row[5] or 0,
+                'avgHR': row[6] or 0,
+                'status': row[7] or 'Unknown'
+            }
+            for row in rows
+        ]
+
+    def get_data(self):
+        """The open session so far"""
+        with self._lock:
+            self._restore()
+            session = self.session
+            if session is None:
+                return {'status': 'Empty', 'startTime': None, 'inBedMinutes': 0, 'asleepMinutes': 0,
+                        'avgHR': None, 'snoreEvents': 0}
+            return {
+                'status': 'Asleep' if session.asleep_since is not None else 'In Bed',
+                'startTime': datetime.fromtimestamp(session.start_ms / 1000).isoformat(),
+                'inBedMinutes': int((session.last_ms - session.start_ms) // 60000),
+                'asleepMinutes': int(session.asleep_total(session.last_ms) // 60000),
+                'avgHR': round(session.heart_sum / session.heart_count, 1) if session.heart_count else None,
+                'snoreEvents': session.snore_events,
+            }
+
+__all__ = [
+    'SleepSession',
+    'SleepSessionService',
+    'sleep_score',
+]
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+services/sleepTracking/stages.py - Sleep Stage Service
+Classifies 30-second epochs of one bed as Wake, Light, Deep or REM as its sensor
+readings arrive
+
+The service listens to the bed's push hub, so it sees every reading each sensor
+service publishes, whatever the ingest path (JSON, batch, binary, audio or the
+simulator). A reading only updates the open epoch's running sums; scored epochs
+are stored in sleep_stages and pushed on the `sleep` topic.
+
+Hub listeners only see readings published in their own process, so the epochs are
+complete only in the single process that ingests the bed (serve.py refuses more
+than one worker).
+"""
+
+from datetime import datetime, timezone
+import threading
+import logging
+
+from database.connection import db_timestamp
+from database.devices import DEFAULT_DEVICE, get_device_store
+from database.queries import range_scan, hours_ago_ms
+from realtime.hub import get_hub
+from realtime.shared_state import shared_slot
+from database.rollups import RESOLUTIONS, choose_resolution
+from config import Config
+from dsp.stages import STAGES, SleepStager
+from services.json_cache import CachedJSON
+
+logger = logging.getLogger(__name__)
+
+# Published payload field holding the reading time, per sensor topic
+READING_TIME_FIELDS = {
+    'heart_rate': 'lastUpdated',
+    'breathing': 'lastMeasured',
+    'gyroscope': 'lastUpdated',
+    'weight': 'lastMeasured',
+    'snore': 'lastDetected',
+}
+
+def gyroscope_moving(payload, last_roll):
+    """Whether a published IMU reading moved; returns (moving, roll to compare the next one with)
+
+    Fused IMU readings carry their angular speed; plain ones are compared with the last roll.
+    """
+    if 'motion' in payload:
+        return payload['motion'] > Config.SLEEP_MOTION_THRESHOLD, last_roll
+    roll = payload.get('roll', 0)
+    return last_roll is not None and abs(roll - last_roll) > Config.SLEEP_MOTION_THRESHOLD, roll
+
+def reading_time_ms(topic, payload):
+    """Reading time (epoch ms) of a published sensor payload, or None"""
+    field = READING_TIME_FIELDS.get(topic)
+    if field is None or not payload.get('isConnected', True):
+        return None
+    try:
+        return datetime.fromisoformat(payload[field]).timestamp() * 1000
+    except (KeyError, TypeError, ValueError):
+        return None  # no reading yet
+
+class SleepStageService:
+    def __init__(self, device_id=None):
+        # Which bed this instance serves; its epochs go to that bed's storage
+        self.device_id = device_id or DEFAULT_DEVICE
+        self.store = get_device_store(self.device_id)
+        self.current_data = {
+            'stage': None,
+            'confidence': None,
+            'inBed': None,
+            'heartRate': None,
+            'breathingRate': None,
+            'activity': None,
+            'snoring': None,
+            'epochStart': None
+        }
+        self.stager = SleepStager(Config.SLEEP_EPOCH_SECONDS)
+        self._lock = threading.Lock()
+        self._last_roll = None
+
+        # Serialized get_data() for the hot GET endpoint, rebuilt after each epoch
+        self.json_cache = CachedJSON(self.get_data, shared_slot(self.device_id, 'sleep'))
+        get_hub(self.device_id).listen(self.observe)
+
+    def observe(self, topic, payload):
+        """Hub listener: fold one published sensor reading into the open epoch"""
+        time_ms = reading_time_ms(topic, payload)
+        if time_ms is None:
+            return
+
+        with self._lock:
+            if topic == 'heart_rate':
+                epoch = self.stager.add(time_ms, heart_rate=payload.get('rate'))
+            elif topic == 'breathing':
+                epoch = self.stager.add(time_ms, breathing_rate=payload.get('rate'))
+            elif topic == 'gyroscope':
+                moving, self._last_roll = gyroscope_moving(payload, self._last_roll)
+                epoch = self.stager.add(time_ms, moving=moving)
+            elif topic == 'weight':
+                epoch = self.stager.add(time_ms, moving=payload.get('stability', 'Stable') != 'Stable',
+                                        in_bed=payload.get('is_in_bed'))
+            else:
+                epoch = self.stager.add(time_ms, snoring=payload.get('isDetected'))
+
+        if epoch is not None:
+            self._apply_epoch(epoch)
+
+    def _apply_epoch(self, epoch):
+        """Store and publish one scored epoch"""
+        start = datetime.fromtimestamp(epoch['epochStart'] / 1000)
+        self.current_data = dict(epoch, epochStart=start.isoformat())
+
+        try:
+            self.store.writer.submit('''
+                INSERT INTO sleep_stages (stage, confidence, in_bed, heart_rate, breathing_rate, activity,
+                                          timestamp, ts_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                epoch['stage'], epoch['confidence'], epoch['inBed'], epoch['heartRate'],
+                epoch['breathingRate'], epoch['activity'], db_timestamp(start), epoch['epochStart']
+            ))
+        except Exception as e:
+            logger.error(f"❌ Sleep stage database error: {e}")
+
+        # Push to pollers and live dashboards
+        self.json_cache.invalidate()
+        get_hub(self.device_id).publish('sleep', self.get_data())
+        logger.info(f"🌙 Sleep stage {start:%H:%M:%S}: {epoch['stage']} ({epoch['confidence']:.0%})")
+
+    def get_stage_history(self, hours=24):
+        """Scored epochs for short ranges; minutes per stage per minute/hour bucket for long ones"""
+        try:
+            resolution = choose_resolution(hours)
+            if resolution == 'raw':
+                rows = range_scan('sleep_stages', ('stage', 'confidence', 'in_bed', 'heart_rate',
+                                                   'breathing_rate', 'activity', 'timestamp'),
+                                  start_ms=hours_ago_ms(hours), limit=Config.HISTORY_RAW_LIMIT, db=self.store.db)
+                return [
+                    {'stage': row[0], 'confidence': row[1], 'inBed': row[2], 'heartRate': row[3],
+                     'breathingRate': row[4], 'activity': row[5], 'timestamp': row[6]}
+                    for row in rows
+                ]
+
+            step_ms = RESOLUTIONS[resolution] * 1000
+            rows = range_scan('sleep_stages', (f'ts_ms / {step_ms} AS bucket', 'stage', 'COUNT(*)'),
+                              start_ms=hours_ago_ms(hours), group_by='bucket, stage', db=self.store.db)
+            buckets = {}
+            for bucket, stage, count in rows:
+                entry = buckets.get(bucket)
+                if entry is None:
+                    start = datetime.fromtimestamp(bucket * step_ms / 1000, timezone.utc)
+                    entry = buckets[bucket] = {'timestamp': start.strftime('%Y-%m-%d %H:%M:%S'),
+                                               'resolution': resolution, **{name: 0.0 for name in STAGES}}
+                entry[stage] += count * Config.SLEEP_EPOCH_SECONDS / 60  # minutes
+            return [buckets[bucket] for bucket in sorted(buckets, reverse=True)]
+
+        except Exception as e:
+            logger.error(f"❌ Sleep stage history error: {e}")
+            return []
+
+    def get_data(self):
+        """Latest scored epoch"""
+        return self.current_data.copy()
+
+__all__ = [
+    'READING_TIME_FIELDS',
+    'gyroscope_moving',
+    'reading_time_ms',
+    'SleepStageService',
+]
@@ -5,17 +5,112 @@ services/snore_service.py - Snore Detection Service
 Handles ONLY snore detection sensor data and audio analysis
 """
 
-import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
+import threading
 import logging
+import sqlite3
+
+from database.connection import db_timestamp
+from database.writer import WriteQueueFull
+from database.devices import DEFAULT_DEVICE, get_device_store
+from database.queries import range_scan, epoch_ms, hours_ago_ms, day_range_ms
+from realtime.hub import get_hub
+from realtime.ring import get_ring
+from realtime.shared_state import shared_slot
+from database.rollups import choose_resolution, get_rollup_history
+from config import Config
+from dsp.snore import SnoreDetector
+from services.json_cache import CachedJSON
+from services.alerts.alerts import get_alerts
 
 logger = logging.getLogger(__name__)
 
+class SnoreDayStats:
+    """Running snore aggregates for one UTC day, folded in one reading at a time"""
+
+    FIELDS = ('samples', 'snore_events', 'snore_minutes', 'frequency_sum',
+              'frequency_count', 'last_detected', 'snore_start', 'last_epoch')
+
+    def __init__(self, day):
+        self.day = day
+        self.samples = 0
+        self.snore_events = 0
+        self.snore_minutes = 0.0
+        self.frequency_sum = 0.0
+        self.frequency_count = 0
+        self.last_detected = False
+        self.snore_start = None  # epoch seconds of the open snore event
+        self.last_epoch = None  # epoch seconds of the newest reading folded in
+
+    @classmethod
+    def from_row(cls, day, row):
+        stats = cls(day)
+        for field, value in zip(cls.FIELDS, row):
+            setattr(stats, field, value)
+        stats.last_detected = bool(stats.last_detected)
+        return stats
+
+    def to_row(self):
+        return (self.day,) + tuple(getattr(self, field) for field in self.FIELDS)
+
+    def record(self, is_detected, frequency, epoch):
+        """Fold one reading into the aggregates
+
+        A late reading (older than the newest one folded in) still counts as a sample,
+        but can't open or close a snore event: its edge would be out of order.
+        """
+        self.samples += 1
+        if is_detected and frequency > 0:
+            self.frequency_sum += frequency
+            self.frequency_count += 1
+        if self.last_epoch is not None and epoch < self.last_epoch:
+            return
+        self.last_epoch = epoch
+
+        if is_detected and not self.last_detected:
+            # Start of snore event
+            self.snore_events += 1
+            self.snore_start = epoch
+        elif not is_detected and self.last_detected and self.snore_start is not None:
+            # End of snore event
+            self.snore_minutes += (epoch - self.snore_start) / 60
+            self.snore_start = None
+        self.last_detected = bool(is_detected)
+
+    def carry_over(self, previous, start_epoch):
+        """Continue a snore event still open when the previous day ended (start_epoch: midnight)"""
+        if not previous.last_detected or previous.snore_start is None:
+            return False
+        previous.snore_minutes += max(start_epoch - previous.snore_start, 0) / 60
+        previous.snore_start = None  # its minutes end at midnight; it was counted on that day
+        self.last_detected = True
+        self.snore_start = start_epoch
+        self.last_epoch = start_epoch
+        return True
+
+    def summary(self):
+        avg_frequency = self.frequency_sum / self.frequency_count if self.frequency_count > 0 else 0
+        total_time_minutes = self.samples * 2  # Assuming 2-minute intervals
+        snore_percentage = (self.snore_minutes / total_time_minutes * 100) if total_time_minutes > 0 else 0
+
+        hours = int(self.snore_minutes // 60)
+        minutes = int(self.snore_minutes % 60)
+        return {
+            'total_snore_time': f"{hours}h {minutes}m",
+            'snore_events': self.snore_events,
+            'avg_frequency': round(avg_frequency, 1),
+            'snore_percentage': round(snore_percentage, 1)
+        }
+
 class SnoreService:
-    def __init__(self):
+    def __init__(self, device_id=None):
+        # Which bed this instance serves; its readings go to that bed's storage
+        self.device_id = device_id or DEFAULT_DEVICE
+        self.store = get_device_store(self.device_id)
         self.current_data = {
             'isDetected': False,
-            'frequency': 0,
+            'frequency': 0,  # snore pitch, Hz
+            'rate': 0,  # snores per minute
             'duration': '0h 0m',
             'intensity': 0,
             'timestamp': None,
@@ -23,47 +118,118 @@ class SnoreService:
         }
         self.snore_session_start = None
         self.total_snore_events = 0
+        
+        # Running statistics per UTC day, loaded lazily from the checkpoint table
+        self._day_stats = {}  # day -> SnoreDayStats
+        self._stats_dirty = set()  # days changed since the last checkpoint
+        self._stats_lock = threading.Lock()
+        self.store.writer.add_flush_hook(self._checkpoint_stats)
+        
+        # Server-side detector for raw microphone audio, when the device streams it
+        self._detector = None
+        self._last_report = None  # reading time of the last reading stored from audio
+        self._peak_intensity = 0  # loudest snore since then
+        # Request threads of one bed update the detector concurrently; update_audio
+        # calls update_snore under it, hence reentrant
+        self._lock = threading.RLock()
+        self._latest = None  # reading time of current_data; older frames don't replace it
+        
+        # Serialized get_data() for the hot GET endpoint, rebuilt after each update
+        self.json_cache = CachedJSON(self.get_data, shared_slot(self.device_id, 'snore'))
     
-    def update_snore(self, data):
-        """Update snore detection data from sensor"""
-        try:
-            is_detected = data.get('isDetected', False)
-            frequency = data.get('frequency', 0)
-            duration_minutes = data.get('duration_minutes', 0)
-            intensity = data.get('intensity', 0)
-            
-            # Format duration
-            hours = duration_minutes // 60
-            minutes = duration_minutes % 60
-            duration_str = f"{hours}h {minutes}m"
-            
-            self.current_data = {
-                'isDetected': is_detected,
-                'frequency': frequency,
-                'duration': duration_str,
-                'intensity': intensity,
-                'timestamp': datetime.now().isoformat(),
-                'isConnected': True
-            }
-            
-            # Track snore events
-            if is_detected and self.snore_session_start is None:
-                self.snore_session_start = datetime.now()
-                self.total_snore_events += 1
-            elif not is_detected and self.snore_session_start is not None:
-                self.snore_session_start = None
-            
-            # Store in database
-            self._store_in_database(data)
-            
-            status = "SNORING" if is_detected else "Quiet"
-            logger.info(f"😴 Snore: {status} (Freq: {frequency}Hz, Intensity: {intensity}%)")
-            return True
-            
-        except Exception as e:
-            logger.error(f"❌ Snore update failed: {e}")
-            self.current_data['isConnected'] = False
-            return False
+    def update_snore(self, data, timestamp=None):
+        """Update snore detection data from sensor (timestamp: device reading time, default now)"""
+        with self._lock:
+            try:
+                timestamp = timestamp or datetime.now()
+                is_detected = data.get('isDetected', False)
+                frequency = data.get('frequency', 0)
+                rate = data.get('rate', 0)
+                duration_minutes = data.get('duration_minutes', 0)
+                intensity = data.get('intensity', 0)
+                
+                # Format duration
+                hours = duration_minutes // 60
+                minutes = duration_minutes % 60
+                duration_str = f"{hours}h {minutes}m"
+                
+                # Store in database and fold into today's statistics
+                self._store_in_database(data, timestamp)
+                self._record_stats(is_detected, frequency, timestamp)
+                
+                # Keep for short-range history reads
+                get_ring('snore', self.device_id).append(epoch_ms(timestamp), {
+                    'isDetected': is_detected,
+                    'frequency': frequency,
+                    'duration_minutes': duration_minutes
+                })
+                
+                if self._latest is not None and timestamp < self._latest:
+                    return True  # a retried or late frame: stored, but the newer reading stays live
+                self._latest = timestamp
+                self.current_data = {
+                    'isDetected': is_detected,
+                    'frequency': frequency,
+                    'rate': rate,
+                    'duration': duration_str,
+                    'intensity': intensity,
+                    'timestamp': timestamp.isoformat(),
+                    'isConnected': True
+                }
+                
+                # Track snore events
+                if is_detected and self.snore_session_start is None:
+                    self.snore_session_start = timestamp
+                    self.total_snore_events += 1
+                elif not is_detected and self.snore_session_start is not None:
+                    self.snore_session_start = None
+                
+                # Push to pollers and live dashboards
+                self.json_cache.invalidate()
+                get_hub(self.device_id).publish('snore', self.get_data())
+                
+                status = "SNORING" if is_detected else "Quiet"
+                logger.info(f"😴 Snore: {status} (Freq: {frequency}Hz, {rate}/min, Intensity: {intensity}%)")
+                return True
+                
+            except WriteQueueFull:
+                raise  # the ingest route answers 503 so the device retries
+            except Exception as e:
+                logger.error(f"❌ Snore update failed: {e}")
+                self.current_data['isConnected'] = False
+                self.json_cache.invalidate()
+                return False
+    
+    def update_audio(self, samples, sample_rate, timestamp=None):
+        """Run a PCM block through the snore detector; returns its reading (None on failure)
+        
+        A reading is stored and pushed when the snoring state changes and otherwise every
+        SNORE_REPORT_SECONDS, not for every block.
+        """
+        with self._lock:
+            try:
+                timestamp = timestamp or datetime.now()
+                if self._detector is None or self._detector.sample_rate != sample_rate:
+                    self._detector = SnoreDetector(sample_rate, on_db=Config.SNORE_ON_DB)
+                reading = self._detector.add(samples, epoch_ms(timestamp))
+                self._peak_intensity = max(self._peak_intensity, reading['intensity'])
+                
+                changed = reading['isDetected'] != self.current_data['isDetected']
+                due = (self._last_report is None or
+                       (timestamp - self._last_report).total_seconds() >= Config.SNORE_REPORT_SECONDS)
+                if changed or due:
+                    reading['intensity'] = self._peak_intensity
+                    self._last_report = timestamp
+                    self._peak_intensity = 0
+                    if not self.update_snore(reading, timestamp):
+                        return None
+                return reading
+                
+            except WriteQueueFull:
+                raise  # the ingest route answers 503 so the device retries
+            except Exception as e:
+                logger.error(f"❌ Snore audio processing failed: {e}")
+                return None
     
     def get_snore_data(self):
         """Get current snore detection data"""
@@ -71,43 +237,46 @@ class SnoreService:
         data['lastDetected'] = data.pop('timestamp', 'Never')
         return data
     
-    def _store_in_database(self, data):
+    def _store_in_database(self, data, timestamp=None):
         """Store snore detection data in database"""
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO snore_detection (is_detected, frequency, duration_minutes)
-                VALUES (?, ?, ?)
+            self.store.writer.submit('''
+                INSERT INTO snore_detection (is_detected, frequency, rate, duration_minutes, timestamp, ts_ms)
+                VALUES (?, ?, ?, ?, ?, ?)
             ''', (
                 data.get('isDetected', False),
                 data.get('frequency', 0),
-                data.get('duration_minutes', 0)
+                data.get('rate'),
+                data.get('duration_minutes', 0),
+                db_timestamp(timestamp),
+                epoch_ms(timestamp)
             ))
             
-            conn.commit()
-            conn.close()
+            self.store.rollups.record('snore', timestamp, {
+                'frequency': data.get('frequency', 0),
+                'isDetected': 1 if data.get('isDetected', False) else 0
+            })
             
-        except Exception as e:
+        except sqlite3.Error as e:
             logger.error(f"❌ Snore database error: {e}")
     
-    def get_snore_history(self, hours=24):
-        """Get snore detection history for specified hours"""
+    def get_snore_history(self, hours=24, resolution=None):
+        """Get snore detection history for specified hours (minute/hour rollups for long ranges)"""
+        resolution = resolution or choose_resolution(hours)
+        if resolution != 'raw':
+            return get_rollup_history('snore', hours, resolution, db=self.store.db)
+        
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
+            start_ms = hours_ago_ms(hours)
+            recent = get_ring('snore', self.device_id).query(start_ms, limit=Config.HISTORY_RAW_LIMIT)
+            if recent is not None:
+                return recent
             
-            cursor.execute('''
-                SELECT is_detected, frequency, duration_minutes, timestamp 
-                FROM snore_detection 
-                WHERE timestamp > datetime('now', '-{} hours')
-                ORDER BY timestamp DESC
-                LIMIT 100
-            '''.format(hours))
+            rows = range_scan('snore_detection', ('is_detected', 'frequency', 'duration_minutes', 'timestamp'),
+                              start_ms=start_ms, limit=Config.HISTORY_RAW_LIMIT, db=self.store.db)
             
             history = []
-            for row in cursor.fetchall():
+            for row in rows:
                 history.append({
                     'isDetected': bool(row[0]),
                     'frequency': row[1],
@@ -115,135 +284,96 @@ class SnoreService:
                     'timestamp': row[3]
                 })
             
-            conn.close()
             return history
             
         except Exception as e:
             logger.error(f"❌ Snore history error: {e}")
             return []
     
-    def get_snore_stats(self):
-        """Get snoring statistics for today"""
+    def _record_stats(self, is_detected, frequency, timestamp):
+        """Fold one reading into the running aggregates of its day"""
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
-            
-            # Get today's snoring data
-            cursor.execute('''
-                SELECT is_detected, frequency, timestamp 
-                FROM snore_detection 
-                WHERE date(timestamp) = date('now')
-                ORDER BY timestamp ASC
-            ''')
-            
-            data = cursor.fetchall()
-            conn.close()
-            
-            if not data:
-                return {
-                    'total_snore_time': '0h 0m',
-                    'snore_events': 0,
-                    'avg_frequency': 0,
-                    'snore_percentage': 0
-                }
-            
-            # Calculate snoring statistics
-            total_snore_minutes = 0
-            snore_events = 0
-            frequency_sum = 0
-            frequency_count = 0
-            last_was_snoring = False
-            snore_start = None
-            
-            for is_detected, frequency, timestamp in data:
-                current_time = datetime.fromisoformat(timestamp)
-                
-                if is_detected and not last_was_snoring:
-                    # Start of snore event
-                    snore_events += 1
-                    snore_start = current_time
-                elif not is_detected and last_was_snoring and snore_start:
-                    # End of snore event
-                    snore_duration = (current_time - snore_start).total_seconds() / 60
-                    total_snore_minutes += snore_duration
+            day = db_timestamp(timestamp)[:10]
+            with self._stats_lock:
+                self._load_stats(day).record(is_detected, frequency, timestamp.timestamp())
+                self._stats_dirty.add(day)
                 
-                if is_detected and frequency > 0:
-                    frequency_sum += frequency
-                    frequency_count += 1
-                
-                last_was_snoring = is_detected
-            
-            # Calculate averages
-            avg_frequency = frequency_sum / frequency_count if frequency_count > 0 else 0
-            total_time_minutes = len(data) * 2  # Assuming 2-minute intervals
-            snore_percentage = (total_snore_minutes / total_time_minutes * 100) if total_time_minutes > 0 else 0
-            
-            hours = int(total_snore_minutes // 60)
-            minutes = int(total_snore_minutes % 60)
-            
-            return {
-                'total_snore_time': f"{hours}h {minutes}m",
-                'snore_events': snore_events,
-                'avg_frequency': round(avg_frequency, 1),
-                'snore_percentage': round(snore_percentage, 1),
-                'currently_snoring': self.current_data['isDetected']
-            }
-            
         except Exception as e:
-            logger.error(f"❌ Snore stats error: {e}")
-            return {}
+            logger.error(f"❌ Snore stats update error: {e}")
     
-    def check_snore_alerts(self):
-        """Check if snoring needs alerts"""
-        alerts = []
+    def _load_stats(self, day):
+        """Return one day's running stats, restoring them from its checkpoint on first use"""
+        stats = self._day_stats.get(day)
+        if stats is not None:
+            return stats
         
-        if self.current_data['isDetected']:
-            intensity = self.current_data['intensity']
-            frequency = self.current_data['frequency']
-            
-            if intensity > 80:
-                alerts.append({
-                    'type': 'loud_snoring',
-                    'message': f'Loud snoring detected: {intensity}% intensity',
-                    'severity': 'warning'
-                })
-            elif intensity > 60:
-                alerts.append({
-                    'type': 'moderate_snoring',
-                    'message': f'Moderate snoring: {intensity}% intensity',
-                    'severity': 'info'
-                })
-            
-            if frequency > 50:
-                alerts.append({
-                    'type': 'high_frequency_snoring',
-                    'message': f'High frequency snoring: {frequency}Hz',
-                    'severity': 'info'
-                })
-        
-        # Check for extended snoring sessions
-        if self.snore_session_start:
-            session_duration = (datetime.now() - self.snore_session_start).total_seconds() / 60
-            if session_duration > 30:  # 30 minutes of continuous snoring
-                alerts.append({
-                    'type': 'extended_snoring',
-                    'message': f'Extended snoring session: {session_duration:.0f} minutes',
-                    'severity': 'warning'
-                })
+        stats = self._read_checkpoint(day)
+        if stats is None:
+            # No checkpoint for this day yet: rebuild once from its raw rows
+            stats = SnoreDayStats(day)
+            start_ms, end_ms = day_range_ms(day)
+            for is_detected, frequency, ts_ms in range_scan('snore_detection', ('is_detected', 'frequency', 'ts_ms'),
+                                                            start_ms, end_ms, order='ASC', db=self.store.db):
+                stats.record(is_detected, frequency or 0, ts_ms / 1000)
+            if stats.samples == 0:
+                # A new day: a snore event running at midnight continues into it
+                previous_day = (datetime.strptime(day, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+                previous = self._day_stats.get(previous_day) or self._read_checkpoint(previous_day)
+                if previous is not None and stats.carry_over(previous, start_ms / 1000):
+                    self._day_stats[previous_day] = previous
+                    self._stats_dirty.add(previous_day)
+            if stats.samples > 0 or stats.last_detected:
+                self._stats_dirty.add(day)
         
-        if not self.current_data['isConnected']:
-            alerts.append({
-                'type': 'sensor_disconnected',
-                'message': 'Snore detection sensor not connected',
-                'severity': 'error'
-            })
+        self._day_stats[day] = stats
+        return stats
+    
+    def _read_checkpoint(self, day):
+        row = self.store.db.query_one(f'''
+            SELECT {', '.join(SnoreDayStats.FIELDS)}
+            FROM snore_stats_checkpoints WHERE day = ?
+        ''', (day,))
+        return SnoreDayStats.from_row(day, row) if row is not None else None
+    
+    def _checkpoint_stats(self, conn):
+        """Writer flush hook: persist the running stats in the same transaction as the rows"""
+        with self._stats_lock:
+            days, self._stats_dirty = self._stats_dirty, set()
+            rows = [self._day_stats[day].to_row() for day in sorted(days)]
+            # Keep the newest two days cached; older ones reload from their checkpoint
+            for day in sorted(self._day_stats)[:-2]:
+                if day not in days:
+                    del self._day_stats[day]
         
-        return alerts
+        try:
+            conn.executemany(f'''
+                INSERT OR REPLACE INTO snore_stats_checkpoints
+                    (day, {', '.join(SnoreDayStats.FIELDS)}, updated_at)
+                VALUES ({', '.join('?' * (len(SnoreDayStats.FIELDS) + 1))}, CURRENT_TIMESTAMP)
+            ''', rows)
+        except Exception:
+            with self._stats_lock:
+                self._stats_dirty |= days
+            raise
+    
+    def get_snore_stats(self):
+        """Get snoring statistics for today (served from running aggregates)"""
+        try:
+            today = db_timestamp()[:10]
+            with self._stats_lock:
+                summary = self._load_stats(today).summary()
+            
+            summary['currently_snoring'] = self.current_data['isDetected']
+            return summary
+            
+        except Exception as e:
+            logger.error(f"❌ Snore stats error: {e}")
+            return {}
     
     def analyze_snore_pattern(self):
         """Analyze snoring patterns for insights"""
         try:
-            history = self.get_snore_history(24)  # Last 24 hours
+            history = self.get_snore_history(24, resolution='raw')  # Last 24 hours
             
             if not history:
                 return {'pattern': 'No data available'}
@@ -258,10 +388,10 @@ class SnoreService:
             max_freq = max(frequencies)
             min_freq = min(frequencies)
             
-            # Determine pattern type
-            if avg_freq < 20:
+            # Determine pattern type (frequency is the snore pitch in Hz)
+            if avg_freq < Config.HIGH_SNORE_FREQUENCY / 2:
                 pattern_type = 'Low frequency snoring'
-            elif avg_freq < 40:
+            elif avg_freq < Config.HIGH_SNORE_FREQUENCY:
                 pattern_type = 'Moderate frequency snoring'
             else:
                 pattern_type = 'High frequency snoring'
@@ -287,14 +417,14 @@ class SnoreService:
             'last_update': self.current_data['timestamp'],
             'daily_stats': self.get_snore_stats(),
             'pattern_analysis': self.analyze_snore_pattern(),
-            'alerts': self.check_snore_alerts(),
+            'alerts': get_alerts(self.device_id).get_active('snore'),
             'total_events_today': self.total_snore_events
         }
     
     # Consistent interface methods
-    def update_data(self, data):
+    def update_data(self, data, timestamp=None):
         """Update snore data - consistent interface"""
-        return self.update_snore(data)
+        return self.update_snore(data, timestamp)
     
     def get_data(self):
         """Get snore data - consistent interface"""
@@ -4,51 +4,207 @@ services/weight_service.py - Weight Monitoring Service
 Handles ONLY weight sensor data and bed occupancy detection
 """
 
-import sqlite3
 from datetime import datetime
 import logging
+import sqlite3
+import threading
+
+from database.connection import db_timestamp
+from database.writer import WriteQueueFull
+from database.devices import DEFAULT_DEVICE, get_device_store
+from database.queries import range_scan, epoch_ms, hours_ago_ms
+from realtime.hub import get_hub
+from realtime.ring import get_ring
+from realtime.shared_state import shared_slot
+from database.rollups import choose_resolution, get_rollup_history
+from config import Config
+from dsp.loadcell import LoadCellEngine, stability_label
+from dsp.pressure import PressureMap
+from services.json_cache import CachedJSON
+from services.alerts.alerts import get_alerts
 
 logger = logging.getLogger(__name__)
 
 class WeightService:
-    def __init__(self):
+    def __init__(self, device_id=None):
+        # Which bed this instance serves; its readings go to that bed's storage
+        self.device_id = device_id or DEFAULT_DEVICE
+        self.store = get_device_store(self.device_id)
         self.current_data = {
             'weight': 0,
             'is_in_bed': False,
             'pressure_points': [],
+            'copX': None,
+            'copY': None,
+            'turns': 0,
             'stability': 'Stable',
+            'restlessness': None,
+            'movement': None,
+            'since': None,
             'timestamp': None,
             'isConnected': False
         }
         self.baseline_weight = 0
-        self.weight_threshold = 20  # kg threshold for bed occupancy
+        self.weight_threshold = Config.SLEEP_DETECTION_WEIGHT_THRESHOLD  # kg threshold for bed occupancy (as sessions)
+        
+        # Windowed load statistics and debounced occupancy, fed by every reading
+        self.engine = LoadCellEngine(threshold_kg=self.weight_threshold,
+                                     window_seconds=Config.RESTLESSNESS_WINDOW_SECONDS,
+                                     debounce_seconds=Config.BED_DEBOUNCE_SECONDS,
+                                     movement_kg=Config.MOVEMENT_THRESHOLD_KG)
+        
+        # Pressure mat frames, when the device has one
+        self._pressure = None
+        self._lock = threading.Lock()  # load-cell and pressure engines take one reading at a time
+        self._latest = None  # reading time of current_data; older frames don't replace it
+        
+        # Serialized get_data() for the hot GET endpoint, rebuilt after each update
+        self.json_cache = CachedJSON(self.get_data, shared_slot(self.device_id, 'weight'))
     
-    def update_weight(self, data):
-        """Update weight data from sensor"""
+    def update_weight(self, data, timestamp=None):
+        """Update weight data from sensor (timestamp: device reading time, default now)"""
+        with self._lock:
+            try:
+                timestamp = timestamp or datetime.now()
+                if 'pressure' in data:
+                    self._update_pressure(data, timestamp)
+                    if 'load' not in data and 'weight' not in data:
+                        return True
+                
+                if 'load' in data:
+                    # Raw load-cell samples: the reading is the block mean
+                    load = data['load']
+                    weight = round(sum(load) / len(load), 2)
+                    transitions = self.engine.add(load, epoch_ms(timestamp),
+                                                  data.get('loadRate') or Config.LOADCELL_SAMPLE_RATE)
+                else:
+                    weight = data.get('weight', 0)
+                    transitions = self.engine.add([weight], epoch_ms(timestamp))
+                
+                for since_ms, in_bed in transitions:
+                    at = datetime.fromtimestamp(since_ms / 1000).strftime('%H:%M:%S')
+                    logger.info(f"🛏️ {'Got into' if in_bed else 'Left'} bed at {at}")
+                    if in_bed and self._pressure is not None:
+                        self._pressure.reset()  # turns and the night heatmap start with the night
+                
+                stats = self.engine.stats()
+                is_in_bed = self.engine.in_bed
+                reading = {
+                    'weight': weight,
+                    'is_in_bed': is_in_bed,
+                    **self._pressure_fields(),
+                    'stability': self._determine_stability(stats['restlessness'], data.get('movement', 0)),
+                    'restlessness': stats['restlessness'],
+                    'movement': stats['movement'] if stats['movement'] is not None else data.get('movement'),
+                    'since': datetime.fromtimestamp(self.engine.since_ms / 1000).isoformat(),
+                    'timestamp': timestamp.isoformat(),
+                    'isConnected': True
+                }
+                
+                # Store in database
+                self._store_in_database(reading, timestamp)
+                
+                # Keep for short-range history reads
+                get_ring('weight', self.device_id).append(epoch_ms(timestamp), reading)
+                
+                if self._latest is not None and timestamp < self._latest:
+                    return True  # a retried or late frame: stored, but the newer reading stays live
+                self._latest = timestamp
+                self.current_data = reading
+                
+                # Push to pollers and live dashboards
+                self.json_cache.invalidate()
+                get_hub(self.device_id).publish('weight', self.get_data())
+                
+                status = "In Bed" if is_in_bed else "Out of Bed"
+                logger.info(f"⚖️ Weight: {weight:.1f}kg ({status}, {reading['stability']})")
+                return True
+                
+            except WriteQueueFull:
+                raise  # the ingest route answers 503 so the device retries
+            except Exception as e:
+                logger.error(f"❌ Weight update failed: {e}")
+                self.current_data['isConnected'] = False
+                self.json_cache.invalidate()
+                return False
+    
+    def _update_pressure(self, data, timestamp):
+        """Reduce a batch of pressure mat frames; only the output buckets are stored"""
+        rows = data.get('pressureRows', Config.PRESSURE_GRID_ROWS)
+        cols = data.get('pressureCols', Config.PRESSURE_GRID_COLS)
+        sample_rate = data.get('pressureRate') or Config.PRESSURE_SAMPLE_RATE
+        engine = self._pressure
+        if engine is None or (engine.rows, engine.cols, engine.sample_rate) != (rows, cols, sample_rate):
+            engine = self._pressure = PressureMap(
+                rows, cols, sample_rate, Config.PRESSURE_OUTPUT_RATE,
+                Config.PRESSURE_HEATMAP_ROWS, Config.PRESSURE_HEATMAP_COLS,
+                Config.PRESSURE_CONTACT_LEVEL, Config.TURN_SHIFT)
+        
+        outputs = engine.add(data['pressure'], epoch_ms(timestamp))
+        if not outputs:
+            return
+        
+        for output_ms, cop_x, cop_y, load, turned in outputs:
+            self.store.writer.submit('''
+                INSERT INTO pressure_map (cop_x, cop_y, load, turned, timestamp, ts_ms)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (cop_x, cop_y, load, turned, db_timestamp(datetime.fromtimestamp(output_ms / 1000)), output_ms))
+            self.store.rollups.record('pressure', output_ms / 1000, {'copX': cop_x, 'copY': cop_y, 'turned': turned})
+            if turned:
+                logger.info(f"🔄 Turn #{engine.turns} on the pressure mat (COP {cop_x:.2f}, {cop_y:.2f})")
+        
+        if self._latest is not None and timestamp < self._latest:
+            return  # a retried or late frame: stored, but the newer reading stays live
+        self._latest = timestamp
+        self.current_data.update(self._pressure_fields(), timestamp=timestamp.isoformat(), isConnected=True)
+        self.json_cache.invalidate()
+        get_hub(self.device_id).publish('weight', self.get_data())
+    
+    def _pressure_fields(self):
+        """Live pressure mat state merged into the weight data"""
+        engine = self._pressure
+        if engine is None:
+            return {'pressure_points': [], 'copX': None, 'copY': None, 'turns': 0}
+        cop_x, cop_y = engine.cop or (None, None)
+        return {'pressure_points': engine.heatmap or [], 'copX': cop_x, 'copY': cop_y, 'turns': engine.turns}
+    
+    def get_pressure_map(self, hours=8):
+        """Live and night heatmaps, center of pressure, and the turns stored over `hours`"""
         try:
-            weight = data.get('weight', 0)
-            is_in_bed = weight > self.weight_threshold
-            
-            self.current_data = {
-                'weight': weight,
-                'is_in_bed': is_in_bed,
-                'pressure_points': data.get('pressure_points', []),
-                'stability': self._determine_stability(data.get('movement', 0)),
-                'timestamp': datetime.now().isoformat(),
-                'isConnected': True
-            }
-            
-            # Store in database
-            self._store_in_database(data)
-            
-            status = "In Bed" if is_in_bed else "Out of Bed"
-            logger.info(f"⚖️ Weight: {weight:.1f}kg ({status}, {self.current_data['stability']})")
-            return True
-            
+            rows = range_scan('pressure_map', ('timestamp',), start_ms=hours_ago_ms(hours), order='ASC',
+                              where='turned = 1', db=self.store.db)
+        except Exception as e:
+            logger.error(f"❌ Pressure map error: {e}")
+            rows = []
+        with self._lock:
+            fields = self._pressure_fields()
+            engine = self._pressure
+            night_heatmap = engine.night_heatmap() if engine is not None else None
+        return {
+            'heatmap': fields['pressure_points'],
+            'nightHeatmap': night_heatmap,
+            'copX': fields['copX'],
+            'copY': fields['copY'],
+            'turns': fields['turns'],
+            'turnTimes': [row[0] for row in rows]
+        }
+    
+    def get_pressure_history(self, hours=24):
+        """Center of pressure and turns for specified hours (minute/hour rollups for long ranges)"""
+        resolution = choose_resolution(hours)
+        if resolution != 'raw':
+            return get_rollup_history('pressure', hours, resolution, db=self.store.db)
+        
+        try:
+            rows = range_scan('pressure_map', ('cop_x', 'cop_y', 'load', 'turned', 'timestamp'),
+                              start_ms=hours_ago_ms(hours), limit=Config.HISTORY_RAW_LIMIT, db=self.store.db)
+            return [
+                {'copX': row[0], 'copY': row[1], 'load': row[2], 'turned': row[3], 'timestamp': row[4]}
+                for row in rows
+            ]
         except Exception as e:
-            logger.error(f"❌ Weight update failed: {e}")
-            self.current_data['isConnected'] = False
-            return False
+            logger.error(f"❌ Pressure history error: {e}")
+            return []
     
     def get_weight_data(self):
         """Get current weight data"""
@@ -56,8 +212,10 @@ class WeightService:
         data['lastMeasured'] = data.pop('timestamp', 'Never')
         return data
     
-    def _determine_stability(self, movement):
-        """Determine bed stability based on movement"""
+    def _determine_stability(self, restlessness, movement=0):
+        """Determine bed stability from measured restlessness, else the device's movement value"""
+        if restlessness is not None:
+            return stability_label(restlessness)
         if movement == 0:
             return 'Stable'
         elif movement < 5:
@@ -67,100 +225,73 @@ class WeightService:
         else:
             return 'Very Restless'
     
-    def _store_in_database(self, data):
+    def _store_in_database(self, reading, timestamp=None):
         """Store weight data in database"""
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO weight (weight, is_in_bed)
-                VALUES (?, ?)
+            self.store.writer.submit('''
+                INSERT INTO weight (weight, is_in_bed, timestamp, ts_ms)
+                VALUES (?, ?, ?, ?)
             ''', (
-                data.get('weight', 0),
-                self.current_data['is_in_bed']
+                reading['weight'],
+                reading['is_in_bed'],
+                db_timestamp(timestamp),
+                epoch_ms(timestamp)
             ))
             
-            conn.commit()
-            conn.close()
+            self.store.rollups.record('weight', timestamp, {'weight': reading['weight']})
             
-        except Exception as e:
+        except sqlite3.Error as e:
             logger.error(f"❌ Weight database error: {e}")
     
     def get_weight_history(self, hours=24):
-        """Get weight history for specified hours"""
+        """Get weight history for specified hours (minute/hour rollups for long ranges)"""
+        resolution = choose_resolution(hours)
+        if resolution != 'raw':
+            return get_rollup_history('weight', hours, resolution, db=self.store.db)
+        
         try:
-            conn = sqlite3.connect('sensor_data.db')
-            cursor = conn.cursor()
+            start_ms = hours_ago_ms(hours)
+            recent = get_ring('weight', self.device_id).query(start_ms, limit=Config.HISTORY_RAW_LIMIT)
+            if recent is not None:
+                return recent
             
-            cursor.execute('''
-                SELECT weight, is_in_bed, timestamp 
-                FROM weight 
-                WHERE timestamp > datetime('now', '-{} hours')
-                ORDER BY timestamp DESC
-                LIMIT 100
-            '''.format(hours))
+            rows = range_scan('weight', ('weight', 'is_in_bed', 'timestamp'),
+                              start_ms=start_ms, limit=Config.HISTORY_RAW_LIMIT, db=self.store.db)
             
             history = []
-            for row in cursor.fetchall():
+            for row in rows:
                 history.append({
                     'weight': row[0],
                     'is_in_bed': row[1],
                     'timestamp': row[2]
                 })
             
-            conn.close()
             return history
             
         except Exception as e:
             logger.error(f"❌ Weight history error: {e}")
             return []
     
-    def check_weight_alerts(self):
-        """Check if weight needs alerts"""
-        weight = self.current_data['weight']
-        stability = self.current_data['stability']
-        alerts = []
-        
-        if weight == 0:
-            alerts.append({
-                'type': 'no_signal',
-                'message': 'Weight sensor not connected',
-                'severity': 'error'
-            })
-        elif stability == 'Very Restless':
-            alerts.append({
-                'type': 'restless_sleep',
-                'message': 'Very restless sleep detected',
-                'severity': 'warning'
-            })
-        elif not self.current_data['is_in_bed'] and weight > 0:
-            alerts.append({
-                'type': 'out_of_bed',
-                'message': 'User has left the bed',
-                'severity': 'info'
-            })
-        
-        return alerts
-    
     def get_weight_stats(self):
         """Get weight statistics"""
         return {
             'current': self.current_data,
             'connected': self.current_data['isConnected'],
             'last_update': self.current_data['timestamp'],
-            'alerts': self.check_weight_alerts()
+            'alerts': get_alerts(self.device_id).get_active('weight')
         }
     
     def set_weight_threshold(self, threshold):
         """Set weight threshold for bed occupancy detection"""
-        self.weight_threshold = threshold
+        with self._lock:
+            self.weight_threshold = threshold
+            self.engine.threshold_kg = threshold
         logger.info(f"Weight threshold set to {threshold}kg")
     
     # Consistent interface methods
-    def update_data(self, data):
+    def update_data(self, data, timestamp=None):
         """Update weight data - consistent interface"""
-        return self.update_weight(data)
+        return self.update_weight(data, timestamp)
     
     def get_data(self):
         """Get weight data - consistent interface"""
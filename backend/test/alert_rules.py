@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Alert Rule Check - Alert State Machine
+Steps services/alerts/alerts.py through timed readings on a scratch bed and fails
+if a rule raises before min_seconds, flaps inside its hysteresis band, raises again
+inside its cooldown, or a lower tier stays up beside its higher tier.
+
+Run from backend/: python test/alert_rules.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config import Config
+from database.devices import get_device_store
+from services.alerts.alerts import AlertRule, AlertService, default_rules
+
+START_MS = 1_700_000_000_000
+
+def heart(service, second, rate):
+    """Feed one heart rate reading `second` seconds after START_MS; returns the active rule names"""
+    time_ms = START_MS + second * 1000
+    service.observe('heart_rate', {'rate': rate, 'lastUpdated': datetime.fromtimestamp(time_ms / 1000).isoformat()})
+    return sorted(alert['type'] for alert in service.get_active())
+
+def high_rule(**kwargs):
+    return AlertRule('high', 'heart_rate', 'warning', 'High: {value:.0f}', lambda payload: payload.get('rate'),
+                     100, clear_at=90, **kwargs)
+
+def check_min_seconds(device):
+    service = AlertService(device, [high_rule(min_seconds=30)])
+    steps = [heart(service, 0, 120), heart(service, 20, 120), heart(service, 25, 80),  # a dip restarts the wait
+             heart(service, 30, 120), heart(service, 50, 120), heart(service, 60, 120)]
+    return steps == [[], [], [], [], [], ['high']]
+
+def check_hysteresis(device):
+    service = AlertService(device, [high_rule()])
+    steps = [heart(service, 0, 120), heart(service, 1, 95), heart(service, 2, 101), heart(service, 3, 90)]
+    return steps == [['high'], ['high'], ['high'], []]
+
+def check_cooldown(device):
+    service = AlertService(device, [high_rule(cooldown_seconds=60)])
+    steps = [heart(service, 0, 120), heart(service, 10, 80), heart(service, 30, 120), heart(service, 69, 120),
+             heart(service, 70, 120)]
+    return steps == [['high'], [], [], [], ['high']]
+
+def check_tiers(device):
+    moderate = AlertRule('moderate', 'heart_rate', 'info', 'Moderate: {value:.0f}', lambda payload: payload.get('rate'),
+                         100, clear_at=90, suppressed_by='high')
+    high = AlertRule('high', 'heart_rate', 'warning', 'High: {value:.0f}', lambda payload: payload.get('rate'),
+                     140, clear_at=130)
+    service = AlertService(device, [high, moderate])
+    steps = [heart(service, 0, 110), heart(service, 1, 150), heart(service, 2, 135), heart(service, 3, 120),
+             heart(service, 4, 80)]
+    return steps == [['moderate'], ['high'], ['high'], ['moderate'], []]
+
+def check_events_stored(device):
+    service = AlertService(device, [high_rule()])
+    heart(service, 0, 120)
+    heart(service, 1, 80)
+    service.store.writer.flush(5)
+    rows = service.store.db.query('SELECT event_type, data FROM system_events ORDER BY id')
+    return [(event, json.loads(data)['type']) for event, data in rows] == [('alert_raised', 'high'),
+                                                                          ('alert_cleared', 'high')]
+
+def check_out_of_bed(device):
+    """out_of_bed needs someone in bed first, and clears once the session would have ended"""
+    service = AlertService(device, [rule for rule in default_rules() if rule.name == 'out_of_bed'])
+    hold = Config.ALERT_MIN_SECONDS
+    exit_seconds = Config.SLEEP_SESSION_EXIT_SECONDS
+
+    def bed(second, in_bed):
+        time_ms = START_MS + second * 1000
+        service.observe('weight', {'weight': 70 if in_bed else 5, 'is_in_bed': in_bed,
+                                   'lastMeasured': datetime.fromtimestamp(time_ms / 1000).isoformat()})
+        return [alert['type'] for alert in service.get_active()]
+
+    steps = [bed(0, False), bed(hold + 1, False), bed(hold + 2, True), bed(hold + 3, False),
+             bed(2 * hold + 4, False), bed(hold + 4 + exit_seconds, False)]
+    return steps == [[], [], [], [], ['out_of_bed'], []]
+
+def check_left_bed_not_no_signal(device):
+    """A sleeper getting up reads 0 kg: out_of_bed is raised, weight_no_signal stays quiet"""
+    names = ('out_of_bed', 'weight_no_signal')
+    service = AlertService(device, [rule for rule in default_rules() if rule.name in names])
+    hold = Config.ALERT_MIN_SECONDS
+
+    def bed(second, kg):
+        time_ms = START_MS + second * 1000
+        service.observe('weight', {'weight': kg, 'is_in_bed': kg > 0,
+                                   'lastMeasured': datetime.fromtimestamp(time_ms / 1000).isoformat()})
+        return sorted(alert['type'] for alert in service.get_active())
+
+    steps = [bed(0, 70), bed(1, 0), bed(hold + 1, 0), bed(hold + 2, 0), bed(hold + 3, 70)]
+    return steps == [[], [], ['out_of_bed'], ['out_of_bed'], []]
+
+def check_history_past_other_events(device):
+    """Alert history filters in SQL, so other events don't use up the row limit"""
+    service = AlertService(device, [high_rule()])
+    heart(service, 0, 120)
+    service.store.writer.flush(5)
+    with service.store.db.transaction() as conn:
+        now_ms = int(datetime.now().timestamp() * 1000)
+        conn.executemany('INSERT INTO system_events (event_type, description, severity, timestamp, ts_ms) '
+                         'VALUES (?, ?, ?, ?, ?)',
+                         [('startup', 'Server started', 'info', '', now_ms)] * (Config.HISTORY_RAW_LIMIT + 1))
+    return [event['type'] for event in service.get_alert_history(hours=24 * 365 * 30)] == ['high']
+
+CHECKS = [
+    ('raises only after min_seconds', check_min_seconds),
+    ('clears only past the hysteresis margin', check_hysteresis),
+    ('no raise inside the cooldown', check_cooldown),
+    ('higher tier replaces the lower one', check_tiers),
+    ('raised and cleared events are stored', check_events_stored),
+    ('out of bed only after lying in bed', check_out_of_bed),
+    ('leaving the bed is not a lost weight signal', check_left_bed_not_no_signal),
+    ('alert history is not crowded out by other events', check_history_past_other_events),
+]
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DEVICE_DATA_DIR = tmp  # every check gets its own scratch bed
+        for number, (description, check) in enumerate(CHECKS):
+            device = f'alert-check-{number}'
+            try:
+                ok = bool(check(device))
+            except Exception as e:
+                print(f"      {type(e).__name__}: {e}")
+                ok = False
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {description}")
+
+            store = get_device_store(device)
+            store.writer.stop()
+            store.db.close_all()
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} alert checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
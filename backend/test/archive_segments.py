@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Archive Check - Cold Storage Round Trip
+Archives scripted rows from a scratch database with database/archive.py and fails if
+a row changes on the way into its day segment, if archived rows stay in SQLite (or
+recent ones leave), or if re-archiving a day after an interrupted run duplicates or
+reorders rows in the merged segment.
+
+Run from backend/: python test/archive_segments.py
+"""
+
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database.archive import ArchiveReader, _write_segment, archive_old_data, device_archive_dir
+from database.connection import ConnectionManager, db_timestamp
+from database.devices import UnknownDevice
+from database_init import init_all_databases
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+OLD_DAY = (NOW - timedelta(days=10)).replace(hour=6, minute=0, second=0)
+HEART_COLUMNS = ('rate', 'status', 'min_rate', 'max_rate', 'average_rate', 'variability')
+
+def insert_heart(db, rows):
+    """rows: (datetime, rate, status, min, max, average, variability)"""
+    with db.transaction() as conn:
+        for when, *values in rows:
+            conn.execute(f'''
+                INSERT INTO heart_rate ({', '.join(HEART_COLUMNS)}, timestamp, ts_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (*values, db_timestamp(when), int(when.timestamp() * 1000)))
+
+def insert_events(db, rows):
+    """rows: (datetime, event type, description, severity, data)"""
+    with db.transaction() as conn:
+        for when, *values in rows:
+            conn.execute('''
+                INSERT INTO system_events (event_type, description, severity, data, timestamp, ts_ms)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (*values, db_timestamp(when), int(when.timestamp() * 1000)))
+
+HEART_ROWS = [
+    (OLD_DAY, 58, 'Normal', 55, 61, 58.5, 32.25),
+    (OLD_DAY + timedelta(minutes=1), 0, None, None, None, None, None),  # no signal
+    (OLD_DAY + timedelta(days=1), 101, 'High', 90, 110, 100.5, 12.5),
+    (NOW - timedelta(hours=1), 64, 'Normal', 60, 70, 65.0, 40.0),  # recent: stays in SQLite
+]
+EVENT_ROWS = [
+    (OLD_DAY, 'alert_heart_rate_high', 'Heart rate high: 101 BPM', 'warning', '{"rate": 101}'),
+    (OLD_DAY + timedelta(seconds=30), 'sleep_session', None, 'info', None),
+]
+
+def scratch(check):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ConnectionManager(os.path.join(tmp, 'archive.db'))
+        init_all_databases(db)
+        try:
+            return check(db, os.path.join(tmp, 'archive'))
+        finally:
+            db.close_all()
+
+def segment_rows(reader, table, names):
+    rows = []
+    for chunk in reader.scan(table, columns=['id', 'timestamp_ms', *names]):
+        rows.extend(zip(*(chunk[name].tolist() for name in ['id', 'timestamp_ms', *names])))
+    return rows
+
+def check_round_trip(db, archive_dir):
+    """Old rows come back from their day segments unchanged; NULLs stay NULL"""
+    insert_heart(db, HEART_ROWS)
+    insert_events(db, EVENT_ROWS)
+    ids = [row[0] for row in db.query('SELECT id FROM heart_rate ORDER BY id')]
+    result = archive_old_data(days_to_keep=7, archive_dir=archive_dir, db=db)
+
+    reader = ArchiveReader(archive_dir)
+    heart = segment_rows(reader, 'heart_rate', HEART_COLUMNS)
+    events = segment_rows(reader, 'system_events', ('event_type', 'description', 'severity', 'data'))
+    expected_heart = [(row_id, int(when.timestamp() * 1000), *values)
+                      for row_id, (when, *values) in zip(ids, HEART_ROWS[:3])]
+    no_signal = heart[1]
+    return (result['success'] and result['archived_counts']['heart_rate'] == 3
+            and result['archived_counts']['system_events'] == 2
+            and reader.list_days('heart_rate') == [OLD_DAY.strftime('%Y-%m-%d'),
+                                                   (OLD_DAY + timedelta(days=1)).strftime('%Y-%m-%d')]
+            and [heart[0], heart[2]] == [expected_heart[0], expected_heart[2]]
+            and no_signal[:6] == (ids[1], expected_heart[1][1], 0, None, 0, 0)  # int columns store NULL as 0
+            and all(math.isnan(value) for value in no_signal[6:])
+            and [row[2:] for row in events] == [tuple(values) for _, *values in EVENT_ROWS])
+
+def check_sqlite_keeps_recent(db, archive_dir):
+    insert_heart(db, HEART_ROWS)
+    archive_old_data(days_to_keep=7, archive_dir=archive_dir, db=db)
+    return db.query('SELECT rate FROM heart_rate') == [(64,)]
+
+def check_narrow_columns(db, archive_dir):
+    insert_heart(db, HEART_ROWS)
+    archive_old_data(days_to_keep=7, archive_dir=archive_dir, db=db)
+    segment = ArchiveReader(archive_dir).open_segment('heart_rate', OLD_DAY.strftime('%Y-%m-%d'))
+    dtypes = {name: str(segment.column(name).dtype) for name in ('rate', 'status', 'average_rate')}
+    return dtypes == {'rate': 'int16', 'status': 'int16', 'average_rate': 'float32'}
+
+def check_rerun_merges(db, archive_dir):
+    """A day archived again (the last run died before its DELETE) keeps each id once, in time order"""
+    insert_heart(db, HEART_ROWS[:2])
+    archive_old_data(days_to_keep=7, archive_dir=archive_dir, db=db)
+    day = OLD_DAY.strftime('%Y-%m-%d')
+    first = segment_rows(ArchiveReader(archive_dir), 'heart_rate', ('rate',))
+
+    # Put the archived rows back as if the DELETE never ran, plus a later and an earlier row of that day
+    with db.transaction() as conn:
+        for row_id, ts_ms, rate in first:
+            when = datetime.fromtimestamp(ts_ms / 1000, timezone.utc)
+            conn.execute('INSERT INTO heart_rate (id, rate, timestamp, ts_ms) VALUES (?, ?, ?, ?)',
+                         (row_id, rate, db_timestamp(when), ts_ms))
+    insert_heart(db, [(OLD_DAY + timedelta(hours=2), 70, 'Normal', 65, 75, 70.0, 20.0),
+                      (OLD_DAY - timedelta(hours=1), 52, 'Low', 50, 54, 52.0, 25.0)])
+    result = archive_old_data(days_to_keep=7, archive_dir=archive_dir, db=db)
+
+    reader = ArchiveReader(archive_dir)
+    merged = segment_rows(reader, 'heart_rate', ('rate',))
+    ids = [row[0] for row in merged]
+    summary = reader.summary()['heart_rate']
+    return (result['archived_counts']['heart_rate'] == 4 and len(ids) == len(set(ids)) == 4
+            and [row[2] for row in merged] == [52, 58, 0, 70]
+            and [row[1] for row in merged] == sorted(row[1] for row in merged)
+            and (summary['days'], summary['rows']) == (1, 4) and reader.list_days('heart_rate') == [day])
+
+def check_merge_orders_tied_times(db, archive_dir):
+    """Rows with the same time are kept in id order when a segment is merged"""
+    path = os.path.join(archive_dir, 'weight', 'day')
+    os.makedirs(os.path.dirname(path))
+    _write_segment(path, 'weight', {'id': [5, 9], 'timestamp_ms': [1000, 2000],
+                                    'weight': [70.5, 71.0], 'is_in_bed': [1, 1]})
+    rows = _write_segment(path, 'weight', {'id': [9, 7, 3], 'timestamp_ms': [2000, 2000, 3000],
+                                           'weight': [0.0, 72.5, 73.0], 'is_in_bed': [0, 1, 1]})
+    segment = ArchiveReader(archive_dir).open_segment('weight', 'day')
+    return (rows == 4 and segment.decoded('id').tolist() == [5, 7, 9, 3]
+            and segment.decoded('weight').tolist() == [70.5, 72.5, 71.0, 73.0]
+            and not os.path.exists(path + '.new') and not os.path.exists(path + '.old'))
+
+def check_segment_before_new_column(db, archive_dir):
+    """A snore segment from before the rate column reads its rate as NULL and still merges"""
+    path = os.path.join(archive_dir, 'snore_detection', 'day')
+    os.makedirs(os.path.dirname(path))
+    columns = {'id': [1], 'timestamp_ms': [1000], 'is_detected': [1], 'frequency': [120.0], 'duration_minutes': [3]}
+    _write_segment(path, 'snore_detection', dict(columns, rate=[None]))
+    for name in ('rate.npy', 'meta.json'):
+        os.remove(os.path.join(path, name))
+    spec = [('id', 'int64'), ('timestamp_ms', 'int64'), ('is_detected', 'uint8'), ('frequency', 'float32'),
+            ('duration_minutes', 'int16')]
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'table': 'snore_detection', 'rows': 1, 'dictionaries': {},
+                   'columns': {name: dtype for name, dtype in spec}}, f)
+
+    old = ArchiveReader(archive_dir).open_segment('snore_detection', 'day')
+    before = old.decoded('rate').tolist() == [None]
+    _write_segment(path, 'snore_detection', {'id': [2], 'timestamp_ms': [2000], 'is_detected': [1],
+                                             'frequency': [125.0], 'rate': [15.0], 'duration_minutes': [4]})
+    rates = ArchiveReader(archive_dir).open_segment('snore_detection', 'day').decoded('rate').tolist()
+    return before and math.isnan(rates[0]) and rates[1] == 15.0
+
+def check_time_range_scan(db, archive_dir):
+    insert_heart(db, HEART_ROWS)
+    archive_old_data(days_to_keep=7, archive_dir=archive_dir, db=db)
+    start_ms = int((OLD_DAY + timedelta(seconds=30)).timestamp() * 1000)
+    end_ms = int((OLD_DAY + timedelta(days=1)).timestamp() * 1000)
+    chunks = list(ArchiveReader(archive_dir).scan('heart_rate', start_ms, end_ms, columns=['rate']))
+    return [chunk['rate'].tolist() for chunk in chunks] == [[0]]
+
+def check_device_dirs(db, archive_dir):
+    try:
+        device_archive_dir('../etc', archive_dir)
+        return False
+    except UnknownDevice:
+        pass
+    return (device_archive_dir('default', archive_dir) == archive_dir
+            and device_archive_dir('bed-2', archive_dir) == os.path.join(archive_dir, 'devices', 'bed-2'))
+
+CHECKS = [
+    ('old rows round trip through day segments', check_round_trip),
+    ('archived rows leave SQLite, recent rows stay', check_sqlite_keeps_recent),
+    ('columns are stored narrow and dictionary-encoded', check_narrow_columns),
+    ('re-archiving a day merges without duplicates', check_rerun_merges),
+    ('merged segments order tied times by id', check_merge_orders_tied_times),
+    ('segments from before a new column still read and merge', check_segment_before_new_column),
+    ('time range scan reads only its rows', check_time_range_scan),
+    ('each bed archives into its own directory', check_device_dirs),
+]
+
+def main():
+    logging.getLogger('database.archive').setLevel(logging.WARNING)
+    failures = 0
+    for description, check in CHECKS:
+        try:
+            ok = bool(scratch(check))
+        except Exception as e:
+            print(f"      {type(e).__name__}: {e}")
+            ok = False
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} archive checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
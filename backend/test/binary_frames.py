@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Binary Frame Check - Encode/Decode Round Trip
+Encodes frames with every sensor combination through ingest/binary.py, decodes them
+back and fails if any field changes, a malformed payload decodes, or the decoded
+frames validate differently from their JSON form.
+
+Run from backend/: python test/binary_frames.py
+"""
+
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ingest import FrameDecodeError, decode_frames, encode_frames, validate_decoded, validate_frames
+
+NOW_MS = int(time.time() * 1000)
+
+# One reading per sensor; floats are exact in float32 so they survive the round trip
+READINGS = {
+    'heart_rate': {'rate': 64, 'min': 58, 'max': 71, 'average': 63.5, 'variability': 42.25},
+    'breathing': {'rate': 14, 'rhythm': 'Shallow', 'apneaEvents': 2},
+    'gyroscope': {'pitch': 12.5, 'roll': -30.25},
+    'weight': {'weight': 71.5, 'movement': 0.75},
+    'snore': {'isDetected': True, 'frequency': 8.5, 'duration_minutes': 12, 'intensity': 55},
+}
+
+def sample_frames():
+    """Frames with every subset of sensors, one second apart, the last without a timestamp"""
+    sensors = list(READINGS)
+    frames = []
+    for mask in range(1, 1 << len(sensors)):
+        readings = {sensor: dict(READINGS[sensor]) for bit, sensor in enumerate(sensors) if mask & (1 << bit)}
+        frames.append((NOW_MS - (1 << len(sensors)) * 1000 + mask * 1000, readings))
+    frames.append((None, {'weight': dict(READINGS['weight'])}))
+    return frames
+
+def check_round_trip():
+    frames = sample_frames()
+    return decode_frames(encode_frames(frames)) == frames
+
+def check_unknown_rhythm():
+    frames = [(NOW_MS, {'breathing': dict(READINGS['breathing'], rhythm='Gasping')})]
+    return decode_frames(encode_frames(frames))[0][1]['breathing']['rhythm'] == 'Normal'
+
+def decode_fails(payload, expected):
+    try:
+        decode_frames(payload)
+    except FrameDecodeError as e:
+        return expected in str(e)
+    return False
+
+def check_same_validation():
+    """Binary and JSON uploads of the same frames validate alike"""
+    frames = sample_frames()[:-1] + [(NOW_MS, {'heart_rate': dict(READINGS['heart_rate'], rate=400)})]
+    binary_valid, binary_results = validate_decoded(decode_frames(encode_frames(frames)))
+    json_valid, json_results = validate_frames([dict(readings, timestamp=timestamp) for timestamp, readings in frames])
+    return ([result['status'] for result in binary_results] == [result['status'] for result in json_results]
+            and [entry[0] for entry in binary_valid] == [entry[0] for entry in json_valid])
+
+CHECKS = [
+    ('every sensor combination round-trips', check_round_trip),
+    ('empty batch round-trips', lambda: decode_frames(encode_frames([])) == []),
+    ('unknown rhythm decodes as Normal', check_unknown_rhythm),
+    ('truncated payload', lambda: decode_fails(encode_frames(sample_frames())[:-3], 'truncated payload')),
+    ('trailing bytes', lambda: decode_fails(encode_frames(sample_frames()) + b'\0', 'trailing bytes')),
+    ('unsupported version', lambda: decode_fails(struct.pack('<BH', 9, 0), 'unsupported format version 9')),
+    ('binary and JSON frames validate alike', check_same_validation),
+]
+
+def main():
+    failures = 0
+    for description, check in CHECKS:
+        try:
+            ok = bool(check())
+        except Exception as e:
+            print(f"      {type(e).__name__}: {e}")
+            ok = False
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} binary frame checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Device Isolation Check - One Partition per Bed
+Posts different readings for two scratch beds through the /api/devices routes and
+fails if one bed's latest state, history, database file or push hub shows the other
+bed's readings, or if unknown, malformed or surplus device ids are accepted.
+
+Run from backend/: python test/device_isolation.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask
+
+from config import Config
+from database.connection import configure_database
+from database.devices import device_db_path, get_device_store
+from realtime import get_hub
+
+BEDS = {'bed-a': 58, 'bed-b': 104}  # device -> heart rate it reports
+
+def devices_client():
+    from routes.sensor_routes import sensor_bp
+    app = Flask('devices')
+    app.register_blueprint(sensor_bp)
+    return app.test_client()
+
+def post_heart(client, device, rate):
+    return client.post(f'/api/devices/{device}/sensor-data', json={'heart_rate': {'rate': rate, 'status': 'Normal'}})
+
+def flush(device):
+    get_device_store(device).writer.flush(timeout=5)
+
+def check_latest_state(client):
+    posted = [post_heart(client, device, rate).status_code for device, rate in BEDS.items()]
+    latest = {device: client.get(f'/api/devices/{device}/sensor-data').get_json() for device in BEDS}
+    return posted == [200, 200] and all(
+        latest[device]['device'] == device and latest[device]['sensors']['heart_rate']['rate'] == rate
+        for device, rate in BEDS.items())
+
+def check_own_database_file(client):
+    """Each bed's rows are in its own file, and only there"""
+    for device in BEDS:
+        flush(device)
+    stored = {device: get_device_store(device).db.query('SELECT DISTINCT rate FROM heart_rate') for device in BEDS}
+    paths = {get_device_store(device).db.db_path for device in BEDS}
+    return (stored == {device: [(rate,)] for device, rate in BEDS.items()}
+            and paths == {device_db_path(device) for device in BEDS}
+            and get_device_store().db.query('SELECT COUNT(*) FROM heart_rate') == [(0,)])
+
+def check_history(client):
+    histories = {device: client.get(f'/api/devices/{device}/history/heart_rate', query_string={'hours': 1}).get_json()
+                 for device in BEDS}
+    return all({row['rate'] for row in histories[device]['history']} == {rate} for device, rate in BEDS.items())
+
+def check_push_hubs(client):
+    """Each bed publishes to its own hub; /api/stream's default hub hears neither"""
+    return (all(get_hub(device).latest('heart_rate')['rate'] == rate for device, rate in BEDS.items())
+            and get_hub().latest('heart_rate') is None)
+
+def check_device_list(client):
+    return client.get('/api/devices').get_json()['devices'] == ['bed-a', 'bed-b', 'default']
+
+def check_unknown_and_malformed(client):
+    """Reads of a bed that never posted are 404; malformed ids are refused before any file exists"""
+    unknown = client.get('/api/devices/bed-z/sensor-data')
+    malformed = post_heart(client, 'bed.z', 60)
+    too_long = post_heart(client, 'b' * 33, 60)
+    return ((unknown.status_code, malformed.status_code, too_long.status_code) == (404, 400, 400)
+            and not os.path.exists(device_db_path('bed-z')))
+
+def check_device_limit(client):
+    Config.MAX_DEVICES, limit = len(BEDS), Config.MAX_DEVICES
+    try:
+        refused = post_heart(client, 'bed-c', 60)
+    finally:
+        Config.MAX_DEVICES = limit
+    return refused.status_code == 400 and 'limit' in refused.get_json()['message']
+
+CHECKS = [
+    ('each bed reports its own latest state', check_latest_state),
+    ('each bed writes only its own database file', check_own_database_file),
+    ('each bed\'s history holds only its readings', check_history),
+    ('each bed publishes to its own push hub', check_push_hubs),
+    ('both beds are listed', check_device_list),
+    ('unknown and malformed device ids are refused', check_unknown_and_malformed),
+    ('beds past MAX_DEVICES are refused', check_device_limit),
+]
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db = configure_database(os.path.join(tmp, 'default.db'))  # the default bed stays off the real database
+        from database_init import init_all_databases
+        init_all_databases()
+        Config.DEVICE_DATA_DIR = os.path.join(tmp, 'devices')
+        client = devices_client()
+
+        for description, check in CHECKS:
+            try:
+                ok = bool(check(client))
+            except Exception as e:
+                print(f"      {type(e).__name__}: {e}")
+                ok = False
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {description}")
+
+        for device in BEDS:
+            store = get_device_store(device)
+            store.writer.stop()
+            store.db.close_all()
+        db.close_all()
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} device isolation checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+DSP Engine Check - Known Answers from Synthetic Signals
+Feeds the streaming engines in dsp/ synthetic signals whose answer is known in
+advance and fails if an engine reports anything else, or if a late block upsets the
+output buckets.
+
+Run from backend/: python test/dsp_engines.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+
+from dsp.breathing import BreathingEstimator
+from dsp.buckets import close_buckets
+from dsp.hrv import HRVEngine, PPGBeatDetector, hrv_report
+from dsp.imu import ImuFusion
+from dsp.loadcell import LoadCellEngine
+from dsp.pressure import PressureMap
+from dsp.snore import SnoreDetector
+from dsp.stages import SleepStager
+
+# Output buckets: [bucket id, sum, last ms]
+
+def check_bucket_continued():
+    completed, open_bucket = close_buckets([[5, 3.0, 5900], [6, 1.0, 6100]], [5, 2.0, 5400])
+    return completed == [[5, 5.0, 5900]] and open_bucket == [6, 1.0, 6100]
+
+def check_bucket_closed_by_newer_block():
+    completed, open_bucket = close_buckets([[7, 1.0, 7500]], [5, 2.0, 5900])
+    return completed == [[5, 2.0, 5900]] and open_bucket == [7, 1.0, 7500]
+
+def check_late_block_keeps_open_bucket():
+    """A block older than the open bucket completes its own buckets and nothing is lost"""
+    completed, open_bucket = close_buckets([[2, 1.0, 2500], [3, 4.0, 3900]], [5, 2.0, 5400])
+    late = completed == [[2, 1.0, 2500], [3, 4.0, 3900]] and open_bucket == [5, 2.0, 5400]
+    completed, open_bucket = close_buckets([[5, 3.0, 5300], [6, 1.0, 6100]], open_bucket)
+    return late and completed == [[5, 5.0, 5400]] and open_bucket == [6, 1.0, 6100]
+
+# Heart rate variability: RR alternating 800/900 ms has every successive difference
+# 100 ms (RMSSD 100, pNN50 100%), mean 850 ms (70.6 BPM) and SDNN 50 * sqrt(n / (n - 1))
+
+START_MS = 1_700_000_000_000
+ALTERNATING_RR = np.tile([800.0, 900.0], 50)
+
+def check_hrv_known_series():
+    engine = HRVEngine()
+    end_ms = START_MS
+    for block in ALTERNATING_RR.reshape(10, 10):
+        end_ms += block.sum()
+        engine.add_rr(block, end_ms)
+    metrics = engine.metrics()
+    return ((metrics['rate'], metrics['rmssd'], metrics['sdnn'], metrics['pnn50'], metrics['beats'])
+            == (70.6, 100.0, round(50 * np.sqrt(100 / 99), 1), 100.0, 100)
+            and (metrics['minRate'], metrics['maxRate']) == (66.7, 75.0))
+
+def check_hrv_artifacts_dropped():
+    """A 150 ms double beat and a 2500 ms missed beat leave 800/900/800/900/800"""
+    engine = HRVEngine()
+    _, rr = engine.add_rr([800, 150, 900, 800, 2500, 900, 800], START_MS)
+    metrics = engine.metrics()
+    return (rr.tolist() == [800, 900, 800, 900, 800] and metrics['beats'] == 5 and metrics['rmssd'] == 100.0
+            and metrics['sdnn'] == round(np.sqrt(3000), 1))
+
+def check_hrv_window():
+    """400 s of steady 60 BPM: only the last 300 s stay in the window"""
+    engine = HRVEngine(window_seconds=300)
+    for second in range(400):
+        engine.add_rr([1000.0], START_MS + second * 1000)
+    metrics = engine.metrics()
+    return (metrics['rate'], metrics['rmssd'], metrics['sdnn'], metrics['beats']) == (60.0, 0.0, 0.0, 300)
+
+def check_hrv_report_matches():
+    ts = START_MS + np.cumsum(ALTERNATING_RR)
+    overall = hrv_report(ts, ALTERNATING_RR)['overall']
+    return (overall['rmssd'], overall['sdnn'], overall['pnn50']) == (100.0, round(50 * np.sqrt(100 / 99), 1), 100.0)
+
+def check_ppg_beats():
+    """A 60 BPM pulse wave sampled at 50 Hz gives 1000 ms intervals"""
+    detector = PPGBeatDetector(sample_rate=50)
+    t = np.arange(0, 20, 1 / 50)
+    pulse = np.exp(-((t % 1) - 0.3) ** 2 / (2 * 0.05 ** 2))
+    intervals = []
+    for second in range(20):
+        _, rr = detector.add(pulse[second * 50:(second + 1) * 50], START_MS + second * 1000 + 980)
+        intervals.extend(rr)
+    return len(intervals) >= 15 and np.allclose(intervals, 1000, atol=5)
+
+# Breathing: a piezo sine at the breathing rate, 50 Hz, in one-second blocks
+
+def breathe(estimator, wave, start_second=0):
+    events = 0
+    for second in range(len(wave) // 50):
+        events += estimator.add(wave[second * 50:(second + 1) * 50], START_MS + (start_second + second) * 1000 + 980)
+    return events
+
+def breathing_wave(per_minute, seconds, amplitude=1.0):
+    t = np.arange(0, seconds, 1 / 50)
+    return amplitude * np.sin(2 * np.pi * per_minute / 60 * t)
+
+def near(value, expected, tolerance):
+    return value is not None and abs(value - expected) <= tolerance
+
+def check_breathing_rates():
+    """15, 24 and 8 breaths/min, on an offset with slow drift"""
+    estimates = []
+    for per_minute in (15, 24, 8):
+        estimator = BreathingEstimator(50)
+        breathe(estimator, 2 + breathing_wave(per_minute, 60) + 0.002 * np.arange(3000) / 50)
+        estimates.append((estimator.estimate()['rate'], estimator.estimate()['rhythm']))
+    return estimates == [(15, 'Normal'), (24, 'Normal'), (8, 'Normal')]
+
+def check_breathing_apnea():
+    """20 s without breathing after a minute at 15/min: one apnea, rate 0"""
+    estimator = BreathingEstimator(50)
+    breathe(estimator, breathing_wave(15, 60))
+    events = breathe(estimator, np.zeros(20 * 50), start_second=60)
+    estimate = estimator.estimate()
+    return (events, estimate['rate'], estimate['rhythm'], estimate['apnea']) == (
+        1, 0, 'Apnea', {'active': True, 'seconds': 20.0, 'events': 1})
+
+def check_breathing_shallow():
+    estimator = BreathingEstimator(50)
+    breathe(estimator, breathing_wave(15, 60))
+    breathe(estimator, breathing_wave(15, 10, amplitude=0.4), start_second=60)
+    return (estimator.estimate()['rate'], estimator.estimate()['rhythm']) == (15, 'Shallow')
+
+# Snoring: 1.5 s tone bursts every 4 s (15 per minute) over a quiet noise floor, 16 kHz
+
+AUDIO_RATE = 16000
+
+def snore_audio(seconds, tone_hz, seed=1):
+    t = np.arange(seconds * AUDIO_RATE) / AUDIO_RATE
+    bursts = (t % 4 >= 2) & (t % 4 < 3.5)
+    noise = 0.001 * np.random.default_rng(seed).standard_normal(len(t))
+    return noise + np.where(bursts, 0.3 * np.sin(2 * np.pi * tone_hz * t), 0.0)
+
+def listen(audio):
+    detector = SnoreDetector(AUDIO_RATE)
+    for second in range(len(audio) // AUDIO_RATE):
+        reading = detector.add(audio[second * AUDIO_RATE:(second + 1) * AUDIO_RATE], START_MS + second * 1000 + 999)
+    return reading
+
+def check_snore_rate_and_pitch():
+    """125 Hz snores: rate 15/min, pitch 125 Hz, and the same from int16 PCM"""
+    readings = [listen(snore_audio(60, 125)), listen((snore_audio(60, 125) * 32767).astype(np.int16))]
+    return all(reading['isDetected'] and reading['rate'] == 15.0 and near(reading['frequency'], 125, 5)
+               for reading in readings)
+
+def check_snore_rejects_other_sounds():
+    """Bursts at 2 kHz (speech, TV) and plain room noise are not snoring"""
+    readings = [listen(snore_audio(60, 2000)), listen(snore_audio(60, 0))]  # a 0 Hz tone is noise only
+    return all((reading['isDetected'], reading['rate'], reading['frequency']) == (False, 0.0, 0)
+               for reading in readings)
+
+# IMU: the gravity vector of a pillow held at a constant tilt, 50 Hz, one output a second
+
+def gravity(pitch, roll, count=50):
+    pitch, roll = np.radians(pitch), np.radians(roll)
+    vector = [-np.sin(pitch), np.cos(pitch) * np.sin(roll), np.cos(pitch) * np.cos(roll)]
+    return np.tile(vector, (count, 1)) * 9.81
+
+def check_imu_constant_tilt():
+    fusion = ImuFusion(50)
+    outputs = []
+    for second in range(5):
+        outputs += fusion.add(gravity(30, 20), None, START_MS + second * 1000 + 980)
+    return outputs == [(START_MS + second * 1000 + 980, 30.0, 20.0, 0.0) for second in range(4)]
+
+def check_imu_roll_across_180():
+    """Lying on the stomach, wobbling across +-180: roll stays near 180, never averages to 0"""
+    fusion = ImuFusion(50)
+    outputs = []
+    for second in range(5):
+        outputs += fusion.add(gravity(0, 179.5 if second % 2 else -179.5), np.zeros((50, 3)),
+                              START_MS + second * 1000 + 980)
+    return len(outputs) == 4 and all(abs(roll) >= 179 for _, _, roll, _ in outputs)
+
+def check_imu_gyro_bias():
+    """A 1 deg/s gyro bias only offsets the fused pitch by time constant x bias (0.5 deg)"""
+    fusion = ImuFusion(50, time_constant=0.5)
+    for second in range(30):
+        outputs = fusion.add(gravity(30, 20), np.tile([0.0, 1.0, 0.0], (50, 1)), START_MS + second * 1000 + 980)
+    return outputs[-1][1:] == (30.5, 20.0, 1.0)
+
+def check_imu_late_block():
+    fusion = ImuFusion(50)
+    fusion.add(gravity(30, 20), None, START_MS + 980)
+    fusion.add(gravity(30, 20), None, START_MS + 1980)  # bucket 1 stays open
+    late = fusion.add(gravity(10, 0), None, START_MS + 500)  # -480 to 500 ms: buckets -1 and 0
+    after = fusion.add(gravity(30, 20), None, START_MS + 2980)
+    return ([output[0] for output in late] == [START_MS - 20, START_MS + 500]
+            and after == [(START_MS + 1980, 30.0, 20.0, 0.0)])
+
+# Load cell: bed load in kg at 10 Hz
+
+def weigh(engine, load, block=10):
+    transitions = []
+    for start in range(0, len(load), block):
+        samples = load[start:start + block]
+        transitions += engine.add(samples, START_MS + (start + len(samples) - 1) * 100, sample_rate=10)
+    return transitions
+
+def check_load_steady():
+    engine = LoadCellEngine()
+    transitions = weigh(engine, np.full(600, 70.0))
+    return (transitions, engine.in_bed, engine.stats()) == ([], True, {
+        'mean': 70.0, 'std': 0.0, 'movement': 0.0, 'restlessness': 0.0, 'seconds': 60})
+
+def check_load_restless():
+    """Load swinging 68/72 kg: a 2 kg movement every second, all of them restless"""
+    engine = LoadCellEngine(movement_kg=1.0)
+    weigh(engine, np.tile([68.0, 72.0], 300))
+    return engine.stats() == {'mean': 70.0, 'std': round(2 * np.sqrt(600 / 599), 3), 'movement': 2.0,
+                              'restlessness': 100.0, 'seconds': 60}
+
+def check_load_window_moments():
+    """Merged per-second moments equal the mean and std of the last 60 s of samples"""
+    load = 70 + 3 * np.random.default_rng(2).standard_normal(900)
+    engine = LoadCellEngine(window_seconds=60)
+    weigh(engine, load, block=7)
+    stats = engine.stats()
+    return (stats['mean'], stats['std']) == (round(load[-600:].mean(), 2), round(load[-600:].std(ddof=1), 3))
+
+def check_load_debounce():
+    """A 3 s dip is not leaving the bed, 10 s is (dated from its start); 16 kg doesn't re-enter"""
+    engine = LoadCellEngine(threshold_kg=20, debounce_seconds=5)
+    load = np.concatenate((np.full(100, 70.0), np.zeros(30), np.full(50, 70.0), np.zeros(100), np.full(30, 16.0)))
+    return weigh(engine, load) == [(START_MS + 18000, False)] and not engine.in_bed
+
+# Pressure mat: 4 x 4 cells at 10 Hz, one output a second
+
+def pressure_frames(seconds, row, col, level=10.0):
+    frames = np.zeros((int(seconds * 10), 4, 4))
+    frames[:, row, col] = level
+    return frames
+
+def check_pressure_cop():
+    """All load on the head-end, right-edge cell: COP at that cell's center"""
+    mat = PressureMap(4, 4, 10)
+    outputs = mat.add(pressure_frames(3, 0, 3), 2900)
+    return ([output[1:4] for output in outputs] == [(0.875, 0.125, 10.0)] * 2
+            and mat.heatmap[0][3] == 100.0)
+
+def check_pressure_empty():
+    mat = PressureMap(4, 4, 10)
+    outputs = mat.add(np.zeros((20, 4, 4)), 2900)
+    return outputs == [(1900, None, None, 0.0, False)] and mat.cop is None
+
+def check_pressure_turn():
+    """Settled on the left half, then on the right: one turn"""
+    mat = PressureMap(4, 4, 10)
+    outputs = mat.add(pressure_frames(6, 1, 0), 5900) + mat.add(pressure_frames(6, 1, 3), 11900)
+    return mat.turns == 1 and sum(output[4] for output in outputs) == 1
+
+def check_pressure_late_block():
+    """A late block is reported on its own and the open bucket still collects its frames"""
+    mat = PressureMap(4, 4, 10)
+    mat.add(pressure_frames(1.5, 0, 0), 2400)  # 1000-2400 ms: bucket 2 stays open with 5 frames
+    late = mat.add(pressure_frames(1, 3, 3, level=4.0), 900)
+    after = mat.add(pressure_frames(1, 0, 0, level=20.0), 3400)  # 2500-3400 ms: bucket 2 gets 5 more frames
+    return (late == [(900, 0.875, 0.875, 4.0, False)]
+            and [output[:4] for output in after] == [(2900, 0.125, 0.125, 15.0)])
+
+# Sleep stages: six readings per 30 s epoch; spread alternates the heart rate by
+# +-5 bpm and the breathing rate by +-2 per minute for each unit
+
+NIGHT_MS = START_MS - START_MS % 30000  # epoch aligned
+
+def stage_epochs(stager, first, count, heart, breath, moving=False, snoring=False, spread=0.0, in_bed=True):
+    results = []
+    for epoch in range(first, first + count):
+        for reading in range(6):
+            sign = 1 if reading % 2 else -1
+            result = stager.add(NIGHT_MS + epoch * 30000 + reading * 5000, heart_rate=heart + sign * spread * 5,
+                                breathing_rate=breath + sign * spread * 2, moving=moving and reading % 2 == 0,
+                                snoring=snoring, in_bed=in_bed)
+            if result:
+                results.append(result)
+    return results
+
+def stage_runs(results):
+    runs = []
+    for result in results:
+        if runs and runs[-1][0] == result['stage']:
+            runs[-1][1] += 1
+        else:
+            runs.append([result['stage'], 1])
+    return runs
+
+def check_stage_epoch_summary():
+    """An epoch reports its means and shares when the next one opens; late readings are ignored"""
+    stager = SleepStager()
+    stager.add(NIGHT_MS, heart_rate=60, breathing_rate=14, moving=True, snoring=False)
+    stager.add(NIGHT_MS + 10000, heart_rate=62, breathing_rate=0, moving=False, snoring=True)
+    stager.add(NIGHT_MS + 20000, heart_rate=64, moving=False)
+    result = stager.add(NIGHT_MS + 30000, heart_rate=70)
+    late = stager.add(NIGHT_MS + 29000, heart_rate=200)
+    return late is None and {key: result[key] for key in ('epochStart', 'heartRate', 'breathingRate', 'activity',
+                                                          'snoring', 'inBed')} == {
+        'epochStart': NIGHT_MS, 'heartRate': 62.0, 'breathingRate': 14.0, 'activity': 0.33, 'snoring': 0.5,
+        'inBed': True}
+
+def check_stage_wake_then_deep():
+    """Moving with a raised heart rate is Wake; then still, slow and steady early in the night is Deep"""
+    stager = SleepStager()
+    results = stage_epochs(stager, 0, 20, 75, 16, moving=True) + stage_epochs(stager, 20, 40, 56, 12, snoring=True)
+    return stage_runs(results) == [['Wake', 20], ['Deep', 39]]
+
+def check_stage_rem_late():
+    """Six hours of light sleep, then still with an irregular heart and breathing rhythm: REM"""
+    stager = SleepStager()
+    results = stage_epochs(stager, 0, 720, 60, 14, spread=0.2) + stage_epochs(stager, 720, 20, 64, 15, spread=1.2)
+    return stage_runs(results) == [['Light', 720], ['REM', 19]]
+
+def check_stage_out_of_bed():
+    stager = SleepStager()
+    results = stage_epochs(stager, 0, 5, 60, 14) + stage_epochs(stager, 5, 3, 0, 0, in_bed=False)
+    return all((result['stage'], result['confidence'], result['inBed']) == ('Wake', 1.0, False)
+               for result in results[-2:])
+
+CHECKS = [
+    ('a block continuing the open bucket adds to it', check_bucket_continued),
+    ('a newer block completes the open bucket', check_bucket_closed_by_newer_block),
+    ('a late block leaves the open bucket open', check_late_block_keeps_open_bucket),
+    ('HRV of a known RR series', check_hrv_known_series),
+    ('HRV drops double and missed beats', check_hrv_artifacts_dropped),
+    ('HRV window keeps only its last 300 s', check_hrv_window),
+    ('night HRV report matches the known series', check_hrv_report_matches),
+    ('PPG pulse wave gives its beat intervals', check_ppg_beats),
+    ('breathing rate of 15, 24 and 8 per minute sines', check_breathing_rates),
+    ('breathing stopped for 20 s is one apnea', check_breathing_apnea),
+    ('breathing at 0.4x amplitude is shallow', check_breathing_shallow),
+    ('snores every 4 s at 125 Hz: rate 15/min, pitch 125 Hz', check_snore_rate_and_pitch),
+    ('2 kHz bursts and room noise are not snoring', check_snore_rejects_other_sounds),
+    ('IMU at a constant 30/20 degree tilt', check_imu_constant_tilt),
+    ('IMU roll across 180 degrees stays near 180', check_imu_roll_across_180),
+    ('IMU gyro bias offsets pitch by the time constant only', check_imu_gyro_bias),
+    ('late IMU block leaves the open bucket whole', check_imu_late_block),
+    ('steady 70 kg: in bed, no movement', check_load_steady),
+    ('load swinging by 4 kg is restless', check_load_restless),
+    ('load window mean and std match the samples', check_load_window_moments),
+    ('bed exits are debounced and dated from their start', check_load_debounce),
+    ('pressure COP of a single loaded cell', check_pressure_cop),
+    ('empty mat reports no COP and no load', check_pressure_empty),
+    ('pressure turn from the left to the right half', check_pressure_turn),
+    ('late pressure block loses no frames', check_pressure_late_block),
+    ('sleep epoch means and shares', check_stage_epoch_summary),
+    ('moving is Wake, still and slow early is Deep', check_stage_wake_then_deep),
+    ('irregular rhythm late in the night is REM', check_stage_rem_late),
+    ('out of bed is Wake with full confidence', check_stage_out_of_bed),
+]
+
+def main():
+    failures = 0
+    for description, check in CHECKS:
+        try:
+            ok = bool(check())
+        except Exception as e:
+            print(f"      {type(e).__name__}: {e}")
+            ok = False
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} dsp engine checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
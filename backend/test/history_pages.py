@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+History Page Check - Keyset Cursors and Streamed Export
+Fills a scratch database with weight rows that share ts_ms values, then walks the
+`cursor` pages and the NDJSON/CSV export and fails if any row is skipped, repeated
+or out of (ts_ms, id) order.
+
+Run from backend/: python test/history_pages.py
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask
+
+from config import Config
+from database.connection import configure_database
+from database.queries import fetch_page, iter_rows
+
+ROWS = 250
+TIED = 4  # rows sharing each ts_ms, so page boundaries fall inside ties
+STEP_MS = 1000
+
+def fill(db):
+    """Insert ROWS weight rows, TIED per ts_ms, ending a minute ago; returns their weights (unique per row) in (ts_ms, id) order"""
+    base_ms = int(time.time() * 1000) - 60_000 - (ROWS // TIED) * STEP_MS
+    with db.transaction() as conn:
+        # Ties are inserted newest first, so id order differs from time order
+        for index in reversed(range(ROWS)):
+            ts_ms = base_ms + (index // TIED) * STEP_MS
+            conn.execute('INSERT INTO weight (weight, is_in_bed, timestamp, ts_ms) VALUES (?, 1, ?, ?)',
+                         (float(index), time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts_ms / 1000)), ts_ms))
+    return [row[0] for row in db.query('SELECT weight FROM weight ORDER BY ts_ms, id')]
+
+def walk(order, limit, db):
+    """Follow fetch_page cursors to the end; returns (row weights, pages)"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = fetch_page('weight', cursor=cursor, limit=limit, order=order, db=db)
+        ids.extend(row['weight'] for row in rows)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+def walk_route(client, order):
+    """Follow nextCursor through /api/history/weight"""
+    ids, cursor = [], None
+    while True:
+        query = {'hours': 24, 'limit': 9, 'order': order}
+        if cursor:
+            query['cursor'] = cursor
+        body = client.get('/api/history/weight', query_string=query).get_json()
+        ids.extend(row['weight'] for row in body['history'])
+        cursor = body['nextCursor']
+        if cursor is None:
+            return ids
+
+def main():
+    failures = checks = 0
+
+    def report(ok, description):
+        nonlocal failures, checks
+        checks += 1
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = configure_database(os.path.join(tmp, 'pages.db'))
+        from database_init import init_all_databases
+        init_all_databases()
+        expected = fill(db)
+
+        for limit in (1, TIED - 1, TIED, 7, ROWS, ROWS + 10):
+            ids, pages = walk('ASC', limit, db)
+            report(ids == expected and pages == -(-ROWS // limit),
+                   f"ascending pages of {limit} cover {len(ids)}/{ROWS} rows once, in order")
+        ids, _ = walk('DESC', 7, db)
+        report(ids == expected[::-1], "descending pages of 7 return the reverse order")
+
+        ids = [row['weight'] for row in iter_rows('weight', order='ASC', page_size=TIED + 1, db=db)]
+        report(ids == expected, f"iter_rows across {TIED + 1}-row pages yields every row once")
+
+        try:
+            fetch_page('weight', cursor='not-a-cursor', db=db)
+            report(False, "malformed cursor is refused")
+        except ValueError:
+            report(True, "malformed cursor is refused")
+
+        from routes.sensor_routes import sensor_bp
+        app = Flask(__name__)
+        app.register_blueprint(sensor_bp)
+        client = app.test_client()
+
+        report(walk_route(client, 'asc') == expected, "/api/history/weight nextCursor walk matches the table")
+        report(client.get('/api/history/weight?cursor=x.y').status_code == 400, "route answers 400 to a bad cursor")
+
+        Config.EXPORT_PAGE_SIZE = 7  # several keyset pages behind one streamed response
+        response = client.get('/api/history/weight/export?hours=24')
+        streamed = response.is_streamed  # reading the body below buffers it
+        lines = response.get_data(as_text=True).splitlines()
+        ids = [json.loads(line)['weight'] for line in lines]
+        report(response.mimetype == 'application/x-ndjson' and streamed and ids == expected,
+               f"NDJSON export streams {len(ids)}/{ROWS} rows oldest first")
+
+        response = client.get('/api/history/weight/export?hours=24&format=csv')
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        ts = [int(row['ts_ms']) for row in rows]
+        report(response.mimetype == 'text/csv' and len(rows) == ROWS and ts == sorted(ts)
+               and 'filename=weight-history.csv' in response.headers['Content-Disposition'],
+               f"CSV export has a header and {len(rows)}/{ROWS} rows oldest first")
+
+        report(client.get('/api/history/weight/export?format=xml').status_code == 400, "unknown export format is refused")
+
+        db.close_all()
+
+    print(f"\n{checks - failures}/{checks} history page checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
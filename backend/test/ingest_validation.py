@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Ingest Validation Check - JSON Frames and Readings
+Feeds valid and malformed frames through ingest/frames.py and fails if a bad
+reading gets through or a good one is refused.
+
+Run from backend/: python test/ingest_validation.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config import Config
+from ingest import FrameValidationError, validate_frame, validate_frames, validate_readings
+
+NOW = time.time()
+NOW_MS = int(NOW * 1000)
+
+def frame_errors(frame):
+    """Problems validate_frame reports for a frame (empty when accepted)"""
+    try:
+        validate_frame(frame, NOW)
+    except FrameValidationError as e:
+        return e.errors
+    return []
+
+def rejects(frame, expected):
+    errors = frame_errors(frame)
+    return any(expected in error for error in errors)
+
+def check_batch_order():
+    frames = [
+        {'timestamp': NOW_MS - 1000, 'heart_rate': {'rate': 62}},
+        {'timestamp': NOW_MS - 5000, 'weight': {'weight': 71.5}},
+        {'heart_rate': {'rate': -3}},
+    ]
+    valid, results = validate_frames(frames, NOW)
+    return ([index for index, _, _ in valid] == [1, 0]
+            and [result['status'] for result in results] == ['ok', 'ok', 'error'])
+
+# (description, check) for each rule of the validator
+CHECKS = [
+    ('full frame is accepted', lambda: frame_errors({
+        'timestamp': NOW_MS,
+        'heart_rate': {'rate': 64, 'rr': [910, 905, 930]},
+        'breathing': {'rate': 14, 'rhythm': 'Normal'},
+        'gyroscope': {'pitch': 5.0, 'roll': -12.5, 'accel': [0, 0, 1] * 4, 'gyro': [0.1, 0, 0] * 4},
+        'weight': {'weight': 70.2, 'movement': 0.3},
+        'snore': {'isDetected': True, 'frequency': 12, 'intensity': 55},
+    }) == []),
+    ('frame without a timestamp uses server time',
+     lambda: abs(validate_frame({'weight': {'weight': 70}}, NOW)[0].timestamp() - NOW) < 0.001),
+    ('NaN is not a number', lambda: rejects({'heart_rate': {'rate': float('nan')}}, 'heart_rate.rate: must be a number')),
+    ('infinity is not a number', lambda: rejects({'weight': {'weight': float('inf')}}, 'weight.weight: must be a number')),
+    ('boolean is not a number', lambda: rejects({'breathing': {'rate': True}}, 'breathing.rate: must be a number')),
+    ('out of range value', lambda: rejects({'heart_rate': {'rate': Config.HEART_RATE_MAX + 1}}, 'out of range')),
+    ('unknown key', lambda: rejects({'heart_rate': {'rate': 60}, 'temperature': 21}, 'unknown keys: temperature')),
+    ('future timestamp', lambda: rejects({'timestamp': NOW_MS + (Config.MAX_CLOCK_SKEW_SECONDS + 60) * 1000,
+                                          'heart_rate': {'rate': 60}}, 'timestamp is in the future')),
+    ('frame without readings', lambda: rejects({'timestamp': NOW_MS}, 'frame contains no sensor readings')),
+    ('reading that is not an object', lambda: validate_readings('snore', [1, 2]) == ['snore: reading must be an object']),
+    ('snore isDetected must be a boolean', lambda: rejects({'snore': {'isDetected': 1}}, 'snore.isDetected')),
+    ('empty sample array', lambda: rejects({'heart_rate': {'rr': []}}, 'heart_rate.rr: must be a non-empty list')),
+    ('NaN in a sample array', lambda: rejects({'breathing': {'piezo': [1.0, float('nan')]}},
+                                              'breathing.piezo: must be a non-empty list')),
+    ('oversized sample array', lambda: rejects({'weight': {'load': [70.0] * (Config.MAX_RAW_SAMPLES + 1)}},
+                                               f'more than {Config.MAX_RAW_SAMPLES} samples')),
+    ('gyro samples without accel', lambda: rejects({'gyroscope': {'gyro': [0, 0, 0]}}, 'gyroscope.gyro: requires accel')),
+    ('accel not in triples', lambda: rejects({'gyroscope': {'accel': [0, 0, 1, 0]}}, 'must hold x, y, z triples')),
+    ('pressure not in whole frames', lambda: rejects({'weight': {'pressure': [1.0] * 5, 'pressureRows': 2,
+                                                                 'pressureCols': 2}}, 'whole frames of 4 cells')),
+    ('pressure grid size must be whole', lambda: rejects({'weight': {'pressure': [1.0] * 18, 'pressureRows': 4.5,
+                                                                     'pressureCols': 4}}, 'weight.pressureRows: must be an integer')),
+    ('batch is sorted by time with per-frame results', check_batch_order),
+]
+
+def main():
+    failures = 0
+    for description, check in CHECKS:
+        try:
+            ok = bool(check())
+        except Exception as e:
+            print(f"      {type(e).__name__}: {e}")
+            ok = False
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} validation checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
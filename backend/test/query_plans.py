@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Query Plan Check - Sensor Range Scans
+Runs EXPLAIN QUERY PLAN for every history/stats range query on a scratch database
+and fails if any of them stops using its ts_ms index (i.e. falls back to a table scan).
+
+Run from backend/: python test/query_plans.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database.connection import configure_database
+from database.queries import explain_range, hours_ago_ms, day_range_ms
+
+# (table, columns, range kwargs) for each query the services issue
+QUERIES = [
+    ('heart_rate', ('rate', 'status', 'timestamp'), {'start_ms': hours_ago_ms(1), 'limit': 1000}),
+    ('breathing', ('rate', 'rhythm', 'apnea_events', 'timestamp'), {'start_ms': hours_ago_ms(1), 'limit': 1000}),
+    ('breathing', ('rate', 'rhythm', 'apnea_events', 'timestamp'), {'limit': 10}),
+    ('gyroscope', ('pitch', 'roll', 'neck_angle', 'position', 'posture_severity', 'timestamp'),
+     {'start_ms': hours_ago_ms(1), 'limit': 1000}),
+    ('gyroscope', ('position', 'COUNT(*)'), dict(zip(('start_ms', 'end_ms'), day_range_ms()), group_by='position')),
+    ('weight', ('weight', 'is_in_bed', 'timestamp'), {'start_ms': hours_ago_ms(1), 'limit': 1000}),
+    ('snore_detection', ('is_detected', 'frequency', 'duration_minutes', 'timestamp'),
+     {'start_ms': hours_ago_ms(1), 'limit': 1000}),
+    ('snore_detection', ('is_detected', 'frequency', 'ts_ms'),
+     dict(zip(('start_ms', 'end_ms'), day_range_ms()), order='ASC')),
+    ('heart_beats', ('ts_ms', 'rr_ms'), {'start_ms': hours_ago_ms(8), 'order': 'ASC'}),
+    ('pressure_map', ('cop_x', 'cop_y', 'load', 'turned', 'timestamp'), {'start_ms': hours_ago_ms(1), 'limit': 1000}),
+    ('pressure_map', ('timestamp',), {'start_ms': hours_ago_ms(8), 'order': 'ASC', 'where': 'turned = 1'}),
+    ('sleep_stages', ('ts_ms / 3600000 AS bucket', 'stage', 'COUNT(*)'),
+     {'start_ms': hours_ago_ms(48), 'group_by': 'bucket, stage'}),
+    ('system_events', ('event_type', 'description', 'severity', 'data', 'timestamp'),
+     {'start_ms': hours_ago_ms(24), 'limit': 1000}),
+]
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = configure_database(os.path.join(tmp, 'plans.db'))
+        from database_init import init_all_databases
+        init_all_databases()
+
+        failures = 0
+        for table, columns, kwargs in QUERIES:
+            plan = explain_range(table, columns, db=db, **kwargs)
+            uses_index = any(f'idx_{table}_ts_ms' in step for step in plan)
+            full_scan = any(step.startswith('SCAN') and 'INDEX' not in step for step in plan)
+            ok = uses_index and not full_scan
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {table} {', '.join(columns)}")
+            for step in plan:
+                print(f"      {step}")
+
+        db.close_all()
+
+    print(f"\n{len(QUERIES) - failures}/{len(QUERIES)} range queries use their ts_ms index")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Ring Buffer Check - Recent History in Memory
+Fills realtime/ring.py buffers in and out of order and fails if a query is answered
+from memory without every row of its range, if a late frame pushes out newer readings,
+or if more beds make the buffers use more than RING_BUFFER_MEMORY_MB.
+
+Run from backend/: python test/ring_buffers.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config import Config
+from realtime import ring as rings
+from realtime.ring import RING_FIELDS, SensorRing, get_ring, ring_capacity
+
+FIELDS = RING_FIELDS['weight']
+START_MS = 1_700_000_000_000
+
+def weight_ring(capacity):
+    ring = SensorRing('weight', FIELDS, capacity)
+    ring.complete_since_ms = 0  # as if the server had always been running
+    return ring
+
+def fill(ring, seconds):
+    for second in seconds:
+        ring.append(START_MS + second * 1000, {'weight': float(second), 'is_in_bed': 1})
+
+def weights(rows):
+    return [row['weight'] for row in rows] if rows is not None else None
+
+def check_in_order():
+    ring = weight_ring(5)
+    fill(ring, range(8))
+    return (weights(ring.query(limit=5)) == [7, 6, 5, 4, 3] and ring.complete_since_ms == START_MS + 2000 + 1
+            and ring.query(START_MS + 1000) is None)
+
+def check_late_frame_dropped_when_oldest():
+    """A frame older than everything held doesn't evict a newer reading"""
+    ring = weight_ring(4)
+    fill(ring, [10, 11, 12, 13, 3])
+    return (weights(ring.query(START_MS)) is None and weights(ring.query(START_MS + 4000)) == [13, 12, 11, 10]
+            and ring.complete_since_ms == START_MS + 3000 + 1)
+
+def check_late_frame_evicts_oldest_by_time():
+    """With a late frame held, the next eviction takes the oldest timestamp, not the oldest slot"""
+    ring = weight_ring(4)
+    fill(ring, [10, 11, 13, 12, 14])  # 12 arrives late, then 14 evicts 10
+    fill(ring, [15])  # evicts 11, not the late 12
+    return (weights(ring.query(START_MS + 12000)) == [15, 14, 13, 12]
+            and ring.complete_since_ms == START_MS + 11000 + 1)
+
+def check_ties_newest_inserted_first():
+    ring = weight_ring(4)
+    for value in (1.0, 2.0, 3.0):
+        ring.append(START_MS, {'weight': value, 'is_in_bed': 1})
+    return weights(ring.query(START_MS)) == [3.0, 2.0, 1.0]
+
+def check_resize_keeps_newest():
+    ring = weight_ring(6)
+    fill(ring, [1, 2, 5, 3, 6, 4])
+    ring.resize(3)
+    return (weights(ring.query(START_MS + 4000)) == [6, 5, 4] and ring.complete_since_ms == START_MS + 3000 + 1
+            and ring.capacity == 3)
+
+def check_global_budget():
+    """The budget is for all beds: a second bed halves every buffer"""
+    rings._rings.clear()
+    memory_mb = Config.RING_BUFFER_MEMORY_MB
+    try:
+        first = [get_ring(sensor, 'ring-check-a') for sensor in RING_FIELDS]
+        alone = sum(ring.nbytes for ring in first)
+        for sensor in RING_FIELDS:
+            get_ring(sensor, 'ring-check-b')
+        total = sum(ring.nbytes for ring in rings._rings.values())
+        halved = all(ring.capacity == ring_capacity(ring.sensor, memory_mb / 2) for ring in rings._rings.values())
+        budget = memory_mb * 1024 * 1024
+        return alone <= budget and total <= budget and halved
+    finally:
+        rings._rings.clear()
+
+CHECKS = [
+    ('in-order readings evict the oldest', check_in_order),
+    ('late frame older than the buffer is dropped', check_late_frame_dropped_when_oldest),
+    ('eviction takes the oldest timestamp held', check_late_frame_evicts_oldest_by_time),
+    ('tied timestamps come newest inserted first', check_ties_newest_inserted_first),
+    ('shrinking keeps the newest readings', check_resize_keeps_newest),
+    ('RING_BUFFER_MEMORY_MB covers every bed together', check_global_budget),
+]
+
+def main():
+    failures = 0
+    for description, check in CHECKS:
+        try:
+            ok = bool(check())
+        except Exception as e:
+            print(f"      {type(e).__name__}: {e}")
+            ok = False
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} ring buffer checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
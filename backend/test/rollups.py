@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Rollup Check - Minute/Hour History Buckets
+Folds scripted readings into database/rollups.py on a scratch database and fails if
+repeated flushes into the same bucket don't add up, if a failed flush loses readings,
+if the history read back has the wrong mean/min/max/stddev, or if a rebuild from the
+raw rows disagrees with the rollups kept as readings arrive.
+
+Run from backend/: python test/rollups.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config import Config
+from database.connection import ConnectionManager, db_timestamp
+from database.rollups import RollupAccumulator, backfill_rollups, choose_resolution, get_rollup_history
+from database_init import init_all_databases
+
+SELECT_ROLLUPS = '''
+    SELECT series, field, resolution, bucket, count, min_value, max_value, sum_value, sum_squares
+    FROM sensor_rollups ORDER BY series, field, resolution, bucket
+'''
+
+def recent_minute(minutes_ago=2):
+    """Start of a minute a little while ago (epoch seconds), so history ranges include it"""
+    return int(time.time() // 60 - minutes_ago) * 60
+
+def flush(rollups, db):
+    with db.transaction() as conn:
+        rollups.flush(conn)
+
+def scratch_check(check):
+    """Run check(db) on a fresh database with the full schema"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ConnectionManager(os.path.join(tmp, 'rollups.db'))
+        init_all_databases(db)
+        try:
+            return check(db)
+        finally:
+            db.close_all()
+
+def check_upsert_adds_up(db):
+    """Two flushes into the same minute and hour buckets merge into one row each"""
+    rollups = RollupAccumulator()
+    minute = recent_minute()
+    rollups.record('heart_rate', minute + 5, {'rate': 60})
+    rollups.record('heart_rate', minute + 10, {'rate': 70})
+    flush(rollups, db)
+    rollups.record('heart_rate', minute + 50, {'rate': 80, 'variability': None})
+    flush(rollups, db)
+    rows = db.query(SELECT_ROLLUPS)
+    return [tuple(row[2:]) for row in rows] == [
+        (60, minute, 3, 60.0, 80.0, 210.0, 14900.0),
+        (3600, minute - minute % 3600, 3, 60.0, 80.0, 210.0, 14900.0),
+    ]
+
+class FailingConnection:
+    def executemany(self, sql, rows):
+        raise RuntimeError('disk I/O error')
+
+def check_failed_flush_retried(db):
+    """A failed flush keeps its buckets and merges them with readings that come after"""
+    rollups = RollupAccumulator()
+    minute = recent_minute()
+    rollups.record('breathing', minute, {'rate': 12})
+    try:
+        rollups.flush(FailingConnection())
+        return False
+    except RuntimeError:
+        pass
+    rollups.record('breathing', minute + 1, {'rate': 18})
+    flush(rollups, db)
+    rows = db.query(SELECT_ROLLUPS)
+    return [tuple(row[2:]) for row in rows if row[2] == 60] == [(60, minute, 2, 12.0, 18.0, 30.0, 468.0)]
+
+def check_history_stats(db):
+    rollups = RollupAccumulator()
+    minute = recent_minute()
+    for second, rate in ((1, 60), (2, 70), (3, 80)):
+        rollups.record('heart_rate', minute + second, {'rate': rate})
+    rollups.record('heart_rate', minute + 60, {'rate': 90})  # the next minute
+    flush(rollups, db)
+    history = get_rollup_history('heart_rate', 1, 'minute', db=db)
+    stamp = datetime.fromtimestamp(minute, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    return [entry['count'] for entry in history] == [1, 3] and history[1] == {
+        'timestamp': stamp, 'resolution': 'minute', 'count': 3, 'rate': 70.0, 'rate_min': 60.0,
+        'rate_max': 80.0, 'rate_stddev': round((200 / 3) ** 0.5, 3)}
+
+def check_backfill_matches(db):
+    """Rebuilding from raw rows gives the rollups kept as readings arrived (no-signal 0s skipped)"""
+    rollups = RollupAccumulator()
+    start = recent_minute(90)
+    with db.transaction() as conn:
+        for index, rate in enumerate((58, 0, 61, 64, 0, 70, 66)):
+            when = datetime.fromtimestamp(start + index * 1000, timezone.utc)
+            conn.execute('INSERT INTO heart_rate (rate, status, variability, timestamp, ts_ms) VALUES (?, ?, ?, ?, ?)',
+                         (rate, 'Normal', index * 1.5, db_timestamp(when), int(when.timestamp() * 1000)))
+            rollups.record('heart_rate', when, {'rate': rate if rate > 0 else None, 'variability': index * 1.5})
+    flush(rollups, db)
+    incremental = db.query(SELECT_ROLLUPS)
+    backfill_rollups(db)
+    return len(incremental) > 4 and db.query(SELECT_ROLLUPS) == incremental
+
+def check_resolution_choice(db):
+    raw_hours = Config.ROLLUP_RAW_MAX_SECONDS / 3600
+    minute_hours = Config.ROLLUP_MAX_POINTS / 60
+    return ([choose_resolution(hours) for hours in (raw_hours, raw_hours * 1.01, minute_hours, minute_hours * 1.01)]
+            == ['raw', 'minute', 'minute', 'hour'])
+
+CHECKS = [
+    ('flushes into the same bucket add up', check_upsert_adds_up),
+    ('a failed flush is retried with later readings', check_failed_flush_retried),
+    ('history reads back mean, min, max and stddev', check_history_stats),
+    ('rebuild from raw rows matches the live rollups', check_backfill_matches),
+    ('long ranges switch from raw to minute to hour', check_resolution_choice),
+]
+
+def main():
+    failures = 0
+    for description, check in CHECKS:
+        try:
+            ok = bool(scratch_check(check))
+        except Exception as e:
+            print(f"      {type(e).__name__}: {e}")
+            ok = False
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} rollup checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
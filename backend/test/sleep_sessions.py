@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Sleep Session Check - Session State Machine
+Steps services/sleepTracking/sessions.py through a scripted night on scratch beds
+and fails if a session opens, falls asleep, survives a short trip out of bed, closes,
+or restores from its checkpoint differently from the documented rules.
+
+Run from backend/: python test/sleep_sessions.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from config import Config
+from database.devices import get_device_store
+from services.sleepTracking.sessions import SleepSessionService
+
+START_MS = 1_700_000_000_000
+ASLEEP = Config.INACTIVITY_SLEEP_THRESHOLD
+EXIT = Config.SLEEP_SESSION_EXIT_SECONDS
+IN_BED = Config.SLEEP_DETECTION_WEIGHT_THRESHOLD + 40
+
+class Night:
+    """Feeds one bed's session service readings at offsets in seconds"""
+
+    def __init__(self, device):
+        self.device = device
+        self.service = SleepSessionService(device)
+
+    def at(self, second):
+        return datetime.fromtimestamp((START_MS + second * 1000) / 1000).isoformat()
+
+    def weight(self, second, kg=IN_BED, stability='Stable'):
+        self.service.observe('weight', {'weight': kg, 'stability': stability, 'lastMeasured': self.at(second)})
+        return self.service.get_data()['status']
+
+    def snore(self, second, detected):
+        self.service.observe('snore', {'isDetected': detected, 'lastDetected': self.at(second)})
+
+    def lie_still(self, start, end, step=60):
+        for second in range(start, end, step):
+            self.weight(second)
+
+    def stored(self):
+        store = self.service.store
+        store.writer.flush(5)
+        return store.db.query('SELECT duration_minutes, total_snore_events FROM sleep_sessions')
+
+def check_opens_on_weight(night):
+    return [night.weight(0, kg=IN_BED - 45), night.weight(60), night.weight(120)] == ['Empty', 'In Bed', 'In Bed']
+
+def check_falls_asleep(night):
+    night.lie_still(0, ASLEEP)
+    before = night.weight(ASLEEP - 1)
+    after = night.weight(ASLEEP)
+    moved = night.weight(ASLEEP + 60, stability='Restless')
+    return (before, after, moved) == ('In Bed', 'Asleep', 'In Bed')
+
+def check_short_trip(night):
+    night.lie_still(0, 2 * ASLEEP)
+    night.weight(2 * ASLEEP, kg=0)
+    night.weight(2 * ASLEEP + EXIT // 2, kg=0)
+    night.lie_still(2 * ASLEEP + EXIT // 2 + 60, 4 * ASLEEP)
+    return night.service.session.start_ms == START_MS and night.stored() == []
+
+def check_closes_and_stores(night):
+    night.lie_still(0, 2 * ASLEEP + 1)
+    for second in (ASLEEP, ASLEEP + 30, ASLEEP + 60):
+        night.snore(second, True)
+        night.snore(second + 10, False)
+    left = 2 * ASLEEP
+    night.weight(left + 60, kg=0)
+    closed = night.weight(left + EXIT + 120, kg=0)
+    # Asleep from the first reading until the empty bed counts as movement
+    return closed == 'Empty' and night.stored() == [((left + 60) // 60, 3)]
+
+def check_no_sleep_dropped(night):
+    for second in range(0, ASLEEP, 60):
+        night.weight(second, stability='Restless')
+    night.weight(ASLEEP + EXIT + 120, kg=0)
+    return night.service.session is None and night.stored() == []
+
+def check_restored(night):
+    night.lie_still(0, 2 * ASLEEP)
+    # The writer runs this hook with each batch of sensor rows; none are stored here
+    with night.service.store.db.transaction() as conn:
+        night.service._checkpoint(conn)
+    restarted = Night(night.device)
+    restored = restarted.service.get_data()
+    return restored['status'] == 'Asleep' and restored == night.service.get_data()
+
+CHECKS = [
+    ('opens at the in-bed weight', check_opens_on_weight),
+    ('asleep after lying still, awake on movement', check_falls_asleep),
+    ('short trip out of bed keeps the session', check_short_trip),
+    ('closes after the exit time and stores one row', check_closes_and_stores),
+    ('session without sleep is not stored', check_no_sleep_dropped),
+    ('open session is restored after a restart', check_restored),
+]
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DEVICE_DATA_DIR = tmp  # every check gets its own scratch bed
+        for number, (description, check) in enumerate(CHECKS):
+            device = f'session-check-{number}'
+            try:
+                ok = bool(check(Night(device)))
+            except Exception as e:
+                print(f"      {type(e).__name__}: {e}")
+                ok = False
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {description}")
+
+            store = get_device_store(device)
+            store.writer.stop()
+            store.db.close_all()
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} session checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Snapshot Check - ETag, 304 and Long-Poll
+Requests /api/snapshot from routes/stream_routes.py while publishing to the push hub,
+and fails if an unchanged snapshot isn't answered 304, a changed one is, a long-poll
+misses a publish or outlives its wait, or waiting clients can pile up past the cap.
+
+Run from backend/: python test/snapshot_polling.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask
+
+from config import Config
+from realtime import get_hub
+
+def snapshot_client():
+    from routes.stream_routes import stream_bp
+    app = Flask('snapshot')
+    app.register_blueprint(stream_bp)
+    return app.test_client()
+
+def publish_later(topic, payload, delay):
+    timer = threading.Timer(delay, get_hub().publish, (topic, payload))
+    timer.start()
+    return timer
+
+def timed_get(client, path, etag=None):
+    started = time.monotonic()
+    response = client.get(path, headers={'If-None-Match': etag} if etag else {})
+    return response, time.monotonic() - started
+
+def check_full_snapshot(client):
+    get_hub().publish('heart_rate', {'rate': 61, 'status': 'Normal'})
+    response = client.get('/api/snapshot')
+    body = response.get_json()
+    version = get_hub().version
+    return (response.status_code == 200 and response.headers['ETag'] == f'"{get_hub().boot_id}-{version}"'
+            and body['version'] == version and body['sensors']['heart_rate'] == {'rate': 61, 'status': 'Normal'}
+            and response.headers['Cache-Control'] == 'no-cache')
+
+def check_unchanged_304(client):
+    etag = client.get('/api/snapshot').headers['ETag']
+    response = client.get('/api/snapshot', headers={'If-None-Match': etag})
+    return response.status_code == 304 and response.get_data() == b'' and response.headers['ETag'] == etag
+
+def check_changed_200(client):
+    etag = client.get('/api/snapshot').headers['ETag']
+    get_hub().publish('breathing', {'rate': 14})
+    response = client.get('/api/snapshot', headers={'If-None-Match': etag})
+    return (response.status_code == 200 and response.headers['ETag'] != etag
+            and response.get_json()['sensors']['breathing'] == {'rate': 14})
+
+def check_other_boot_200(client):
+    """An ETag from before a restart never matches, even when the version number does"""
+    stale = f'"0-{get_hub().version}"'
+    return client.get('/api/snapshot', headers={'If-None-Match': stale}).status_code == 200
+
+def check_long_poll_wakes(client):
+    """A held request answers as soon as something is published"""
+    etag = client.get('/api/snapshot').headers['ETag']
+    timer = publish_later('snore', {'isDetected': True}, 0.3)
+    response, elapsed = timed_get(client, '/api/snapshot?wait=5', etag)
+    timer.join()
+    return (response.status_code == 200 and 0.25 <= elapsed < 2
+            and response.get_json()['sensors']['snore'] == {'isDetected': True})
+
+def check_long_poll_times_out(client):
+    etag = client.get('/api/snapshot').headers['ETag']
+    response, elapsed = timed_get(client, '/api/snapshot?wait=0.4', etag)
+    return response.status_code == 304 and 0.35 <= elapsed < 2
+
+def check_wait_capped(client):
+    etag = client.get('/api/snapshot').headers['ETag']
+    Config.SNAPSHOT_MAX_WAIT, max_wait = 0.3, Config.SNAPSHOT_MAX_WAIT
+    try:
+        response, elapsed = timed_get(client, '/api/snapshot?wait=600', etag)
+    finally:
+        Config.SNAPSHOT_MAX_WAIT = max_wait
+    bad = client.get('/api/snapshot?wait=soon')
+    return response.status_code == 304 and elapsed < 2 and bad.status_code == 400
+
+def check_waiters_capped(client):
+    """Past SNAPSHOT_MAX_WAITERS held requests, a long-poll answers at once"""
+    hub = get_hub()
+    etag = client.get('/api/snapshot').headers['ETag']
+    holders = [threading.Thread(target=hub.wait_for_change, args=(hub.version, 1.0)) for _ in range(hub.max_waiters)]
+    for holder in holders:
+        holder.start()
+    deadline = time.monotonic() + 2
+    while hub.get_stats()['waiters'] < hub.max_waiters and time.monotonic() < deadline:
+        time.sleep(0.01)
+    response, elapsed = timed_get(client, '/api/snapshot?wait=5', etag)
+    for holder in holders:
+        holder.join()
+    return response.status_code == 304 and elapsed < 0.5 and hub.get_stats()['waiters'] == 0
+
+CHECKS = [
+    ('snapshot carries its version as the ETag', check_full_snapshot),
+    ('unchanged snapshot answers 304', check_unchanged_304),
+    ('a publish makes the same ETag answer 200', check_changed_200),
+    ('an ETag from another boot answers 200', check_other_boot_200),
+    ('long-poll returns as soon as something is published', check_long_poll_wakes),
+    ('long-poll with no publish ends in 304 after its wait', check_long_poll_times_out),
+    ('wait is capped at SNAPSHOT_MAX_WAIT and must be a number', check_wait_capped),
+    ('long-polls past SNAPSHOT_MAX_WAITERS answer at once', check_waiters_capped),
+]
+
+def main():
+    client = snapshot_client()
+
+    failures = 0
+    for description, check in CHECKS:
+        try:
+            ok = bool(check(client))
+        except Exception as e:
+            print(f"      {type(e).__name__}: {e}")
+            ok = False
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} snapshot checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Snore Stats Check - Daily Snore Aggregates
+Folds scripted readings into services/snoreAlarm/snore.py's SnoreDayStats and fails
+if snore events or minutes come out wrong, including for late (out of order) frames
+and for checkpoints written before last_epoch was stored.
+
+Run from backend/: python test/snore_stats.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database.connection import ConnectionManager
+from database_init import init_all_databases
+from services.snoreAlarm.snore import SnoreDayStats
+
+DAY = '2023-11-14'
+START = 1_700_000_000  # epoch seconds, inside DAY
+
+def fold(readings):
+    """readings: (seconds after START, detected, snores/min)"""
+    stats = SnoreDayStats(DAY)
+    for second, detected, frequency in readings:
+        stats.record(detected, frequency, START + second)
+    return stats
+
+def check_in_order():
+    stats = fold([(0, False, 0), (60, True, 10), (120, True, 14), (300, False, 0),
+                  (600, True, 12), (720, False, 0)])
+    return (stats.snore_events, stats.snore_minutes, stats.summary()['avg_frequency']) == (2, 6.0, 12.0)
+
+def check_late_end():
+    """A late 'not snoring' frame from before the event doesn't close it with negative minutes"""
+    stats = fold([(600, True, 10), (540, False, 0), (900, False, 0)])
+    return (stats.snore_events, stats.snore_minutes, stats.samples) == (1, 5.0, 3)
+
+def check_late_start():
+    """A late 'snoring' frame after the event ended doesn't reopen it"""
+    stats = fold([(0, True, 10), (300, False, 0), (200, True, 10), (600, False, 0)])
+    return (stats.snore_events, stats.snore_minutes, stats.last_detected, stats.frequency_count) == (1, 5.0, False, 2)
+
+def check_minutes_never_drop():
+    stats = fold([(0, True, 10), (120, False, 0)])
+    before = stats.snore_minutes
+    for second in (60, 30, 119):
+        stats.record(False, 0, START + second)
+    return before == stats.snore_minutes == 2.0
+
+def check_checkpoint_round_trip():
+    stats = fold([(0, True, 10), (60, True, 10)])
+    restored = SnoreDayStats.from_row(DAY, stats.to_row()[1:])
+    restored.record(False, 0, START + 30)  # late: the restored newest reading still counts
+    restored.record(False, 0, START + 180)
+    return (restored.last_epoch, restored.snore_minutes) == (START + 180, 3.0)
+
+def check_old_checkpoint_table():
+    """A checkpoint table from before last_epoch gains the column on start"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ConnectionManager(os.path.join(tmp, 'old.db'))
+        with db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE snore_stats_checkpoints (
+                    day TEXT PRIMARY KEY, samples INTEGER NOT NULL, snore_events INTEGER NOT NULL,
+                    snore_minutes REAL NOT NULL, frequency_sum REAL NOT NULL, frequency_count INTEGER NOT NULL,
+                    last_detected INTEGER NOT NULL, snore_start REAL, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute('INSERT INTO snore_stats_checkpoints VALUES (?, 4, 1, 2.5, 20, 2, 0, NULL, NULL)', (DAY,))
+        init_all_databases(db)
+        row = db.query_one(f"SELECT {', '.join(SnoreDayStats.FIELDS)} FROM snore_stats_checkpoints WHERE day = ?", (DAY,))
+        db.close_all()
+    stats = SnoreDayStats.from_row(DAY, row)
+    return (stats.samples, stats.snore_minutes, stats.last_epoch) == (4, 2.5, None)
+
+CHECKS = [
+    ('in-order readings count events, minutes and frequency', check_in_order),
+    ('late frame does not close an event early', check_late_end),
+    ('late frame does not reopen an event', check_late_start),
+    ('snore minutes never go down', check_minutes_never_drop),
+    ('restored checkpoint keeps the newest reading time', check_checkpoint_round_trip),
+    ('checkpoints from before last_epoch still load', check_old_checkpoint_table),
+]
+
+def main():
+    failures = 0
+    for description, check in CHECKS:
+        try:
+            ok = bool(check())
+        except Exception as e:
+            print(f"      {type(e).__name__}: {e}")
+            ok = False
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} snore stats checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Worker Role Check - Reader Workers and the Ingest Owner
+Puts routes/forwarding.py in front of the sensor routes with a stand-in ingest owner
+on a local port, and fails if a reader answers a write itself, forwards a read it can
+serve, changes a forwarded request or answer, or hangs when the owner is down.
+
+Run from backend/: python test/worker_roles.py
+"""
+
+import logging
+import os
+import socket
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask, Response, request
+from werkzeug.serving import make_server
+
+from config import Config
+from routes.forwarding import READER_ENDPOINTS, forward_to_owner
+
+seen = []  # (method, full path, body, content type) of each request the owner got
+
+def stand_in_owner():
+    owner = Flask('owner')
+
+    @owner.route('/<path:path>', methods=['GET', 'POST'])
+    def anything(path):
+        seen.append((request.method, request.full_path, request.get_data(), request.content_type))
+        return Response('{"owner":true}', status=202, mimetype='application/json', headers={'Retry-After': '7'})
+
+    server = make_server('127.0.0.1', 0, owner, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def reader_app():
+    from routes.sensor_routes import sensor_bp
+    from routes.stream_routes import stream_bp
+    app = Flask('reader')
+    app.register_blueprint(sensor_bp)
+    app.register_blueprint(stream_bp)
+    app.before_request(forward_to_owner)
+    return app.test_client()
+
+def check_reads_stay_local(client):
+    seen.clear()
+    statuses = [client.get(path).status_code for path in ('/api/heart-rate', '/api/alerts', '/api/stream/stats')]
+    return statuses == [200, 200, 200] and seen == []
+
+def check_write_forwarded(client):
+    seen.clear()
+    body = b'{"heart_rate": {"rate": 61}}'
+    response = client.post('/api/sensor-data?source=test', data=body, content_type='application/json')
+    return (seen == [('POST', '/api/sensor-data?source=test', body, 'application/json')]
+            and response.status_code == 202 and response.get_json() == {'owner': True}
+            and response.headers['Retry-After'] == '7')
+
+def check_owner_state_forwarded(client):
+    seen.clear()
+    response = client.get('/api/pressure-map?hours=2')
+    return response.status_code == 202 and seen == [('GET', '/api/pressure-map?hours=2', b'', None)]
+
+def check_owner_down(client):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]  # nothing listens here once the probe closes
+    Config.INGEST_OWNER_URL, url = f'http://127.0.0.1:{port}', Config.INGEST_OWNER_URL
+    try:
+        response = client.post('/api/sensor-data', json={'heart_rate': {'rate': 61}})
+    finally:
+        Config.INGEST_OWNER_URL = url
+    return response.status_code == 503 and response.headers['Retry-After'] == '1'
+
+def check_endpoint_list(client):
+    """Every reader endpoint exists and none of them takes writes"""
+    from app import app
+    rules = {rule.endpoint: rule.methods for rule in app.url_map.iter_rules()}
+    return all(name in rules and 'POST' not in rules[name] for name in READER_ENDPOINTS)
+
+CHECKS = [
+    ('latest state, alerts and stream stats stay local', check_reads_stay_local),
+    ('a write is forwarded unchanged, with the owner\'s answer', check_write_forwarded),
+    ('owner-only state (pressure map) is forwarded', check_owner_state_forwarded),
+    ('owner down answers 503 with Retry-After', check_owner_down),
+    ('reader endpoints exist and take no writes', check_endpoint_list),
+]
+
+def main():
+    logging.getLogger('routes.forwarding').setLevel(logging.CRITICAL)  # the owner is down on purpose
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    owner = stand_in_owner()
+    Config.INGEST_OWNER_URL = f'http://127.0.0.1:{owner.server_port}'
+    client = reader_app()
+
+    failures = 0
+    for description, check in CHECKS:
+        try:
+            ok = bool(check(client))
+        except Exception as e:
+            print(f"      {type(e).__name__}: {e}")
+            ok = False
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+    owner.shutdown()
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} worker role checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
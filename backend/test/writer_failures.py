@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Write-Behind Writer Check - Failure Paths
+Drives database/writer.py against a scratch database and fails if a full queue
+doesn't refuse writes up front, or if one bad statement or flush hook costs the
+other rows of its batch.
+
+Run from backend/: python test/writer_failures.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database.connection import ConnectionManager
+from database.writer import WriteBehindWriter, WriteQueueFull
+
+INSERT = 'INSERT INTO readings (value) VALUES (?)'
+
+def scratch_writer(tmp, name, **options):
+    db = ConnectionManager(os.path.join(tmp, f'{name}.db'))
+    with db.transaction() as conn:
+        conn.execute('CREATE TABLE readings (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)')
+    return db, WriteBehindWriter(db=db, batch_size=50, flush_interval=0.05, **options)
+
+def values(db):
+    return [row[0] for row in db.query('SELECT value FROM readings ORDER BY value')]
+
+def refused(write):
+    try:
+        write()
+    except WriteQueueFull:
+        return True
+    return False
+
+def check_full_queue(tmp):
+    """An open batch holds the only slot: other threads' submits and batches are refused up front"""
+    db, writer = scratch_writer(tmp, 'full', max_queue=1, enqueue_timeout=0.05)
+    entered = []
+    outcomes = []
+
+    def second_batch():
+        with writer.batch():
+            entered.append(True)
+
+    def other_thread():
+        outcomes.append(refused(lambda: writer.submit(INSERT, (3,))))
+        outcomes.append(refused(second_batch))
+
+    with writer.batch():
+        writer.submit(INSERT, (1,))
+        writer.submit(INSERT, (2,))  # joins the open batch, needs no slot
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+    writer.flush(5)
+    stats = writer.get_stats()
+    writer.stop()
+    ok = outcomes == [True, True] and not entered and values(db) == [1, 2]
+    ok = ok and stats['rejected'] == 1 and stats['queued'] == 2
+    db.close_all()
+    return ok
+
+def check_bad_statement(tmp):
+    """A failing statement group is dropped alone; the rest of the batch is written"""
+    db, writer = scratch_writer(tmp, 'bad')
+    with writer.batch():
+        writer.submit(INSERT, (1,))
+        writer.submit('INSERT INTO missing_table (value) VALUES (?)', (2,))
+        writer.submit(INSERT, (3,))
+    writer.flush(5)
+    stats = writer.get_stats()
+    writer.stop()
+    ok = values(db) == [1, 3] and stats['written'] == 2 and stats['failed'] == 1
+    db.close_all()
+    return ok
+
+def check_failing_hook(tmp):
+    """A flush hook that raises doesn't lose the batch's rows"""
+    db, writer = scratch_writer(tmp, 'hook')
+
+    def hook(conn):
+        raise RuntimeError('checkpoint failed')
+
+    writer.add_flush_hook(hook)
+    writer.submit(INSERT, (1,))
+    writer.submit(INSERT, (2,))
+    writer.flush(5)
+    stats = writer.get_stats()
+    writer.stop()
+    ok = values(db) == [1, 2] and stats['written'] == 2 and stats['failed'] == 0
+    db.close_all()
+    return ok
+
+def check_queue_released(tmp):
+    """Slots come back once rows are written, so a refused writer recovers"""
+    db, writer = scratch_writer(tmp, 'release', max_queue=2, enqueue_timeout=1)
+    for value in range(10):
+        writer.submit(INSERT, (value,))
+    writer.flush(5)
+    capacity = writer.has_capacity()
+    writer.stop()
+    ok = capacity and values(db) == list(range(10))
+    db.close_all()
+    return ok
+
+CHECKS = [
+    ('full queue refuses writes before any work', check_full_queue),
+    ('bad statement drops only its own rows', check_bad_statement),
+    ('failing flush hook keeps the rows', check_failing_hook),
+    ('written rows free their queue slots', check_queue_released),
+]
+
+def main():
+    logging.getLogger('database.writer').setLevel(logging.CRITICAL)  # the failures below are on purpose
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for description, check in CHECKS:
+            try:
+                ok = bool(check(tmp))
+            except Exception as e:
+                print(f"      {type(e).__name__}: {e}")
+                ok = False
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {description}")
+
+    print(f"\n{len(CHECKS) - failures}/{len(CHECKS)} writer checks pass")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
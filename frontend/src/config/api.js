@@ -17,6 +17,10 @@ export const API_CONFIG = {
     WEIGHT: '/api/weight-data',
     SNORE: '/api/snore-data',
     SLEEP_HISTORY: '/api/sleep-history',
+    SLEEP_STAGE: '/api/sleep-stage', // Latest scored 30-second epoch (Wake/Light/Deep/REM)
+    ALERTS: '/api/alerts', // Active alerts; also pushed on the 'alerts' stream topic
+    STREAM: '/api/stream', // Server-Sent Events: live updates for all sensors
+    SNAPSHOT: '/api/snapshot', // All sensors at once; ETag + ?wait= long-poll
     
     // Device controls
     FAN_CONTROL: '/api/control/fan',
@@ -27,7 +31,10 @@ export const API_CONFIG = {
   // WebSocket URL for real-time updates
   WEBSOCKET_URL: 'ws://192.168.1.100:5000',
   
-  // Update intervals (milliseconds)
+  // Minimum seconds between live updates of one sensor on the stream
+  STREAM_INTERVAL: 0.5,
+  
+  // Update intervals (milliseconds) - polling fallback when EventSource is unavailable
   UPDATE_INTERVALS: {
     HEART_RATE: 2000,
     BREATHING: 2000,
@@ -1,6 +1,7 @@
 // src/shared/hooks/input/useBreathingDetection.js
 import { useState, useEffect } from 'react';
 import { useSystemState } from '@/shared/hooks/useSystemState';
+import { streamSupported, subscribeSensor } from '@/shared/utils/sensorStream';
 
 // Configuration
 const USE_REAL_DATA = true;
@@ -28,32 +29,45 @@ export function useBreathingDetection() {
     }
 
     let interval;
+    let unsubscribe;
     
     if (USE_REAL_DATA) {
       // REAL DATA: Connect to Raspberry Pi
-      const fetchBreathingData = async () => {
-        try {
-          const response = await fetch(API_ENDPOINT);
-          
-          if (!response.ok) throw new Error('Failed to fetch breathing data');
-          
-          const data = await response.json();
-          setBreathingData({
-            ...data,
-            isConnected: true,
-            lastMeasured: new Date().toLocaleTimeString()
-          });
-        } catch (error) {
-          console.error('Error fetching breathing data:', error);
-          setBreathingData(prev => ({
-            ...prev,
-            isConnected: false
-          }));
-        }
+      const applyBreathingData = (data) => {
+        setBreathingData({
+          ...data,
+          isConnected: true,
+          lastMeasured: new Date().toLocaleTimeString()
+        });
       };
       
-      fetchBreathingData(); // Initial fetch
-      interval = setInterval(fetchBreathingData, 2000);
+      const setDisconnected = () => setBreathingData(prev => ({
+        ...prev,
+        isConnected: false
+      }));
+      
+      if (streamSupported) {
+        // Pushed by the backend as readings arrive
+        unsubscribe = subscribeSensor('breathing', applyBreathingData, (connected) => {
+          if (!connected) setDisconnected();
+        });
+      } else {
+        const fetchBreathingData = async () => {
+          try {
+            const response = await fetch(API_ENDPOINT);
+            
+            if (!response.ok) throw new Error('Failed to fetch breathing data');
+            
+            applyBreathingData(await response.json());
+          } catch (error) {
+            console.error('Error fetching breathing data:', error);
+            setDisconnected();
+          }
+        };
+        
+        fetchBreathingData(); // Initial fetch
+        interval = setInterval(fetchBreathingData, 2000);
+      }
     } else {
       // DUMMY DATA: Generate realistic breathing patterns
       interval = setInterval(() => {
@@ -86,7 +100,10 @@ export function useBreathingDetection() {
       }, 2000);
     }
 
-    return () => clearInterval(interval);
+    return () => {
+      clearInterval(interval);
+      if (unsubscribe) unsubscribe();
+    };
   }, [isInBed, breathingData.apneaEvents]);
 
   return breathingData;
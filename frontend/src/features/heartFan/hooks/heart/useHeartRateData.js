@@ -1,6 +1,7 @@
 // src/shared/hooks/input/useHeartRateData.js
 import { useState, useEffect } from 'react';
 import { useSystemState } from '@/features/useSystemState';
+import { streamSupported, subscribeSensor } from '@/shared/utils/sensorStream';
 
 // Configuration
 const USE_REAL_DATA = true;
@@ -32,73 +33,85 @@ export function useHeartRateData() {
     }
 
     let interval;
+    let unsubscribe;
     let heartRateHistory = [];
     
     if (USE_REAL_DATA) {
       // REAL DATA: Connect to Raspberry Pi
-      const fetchHeartRateData = async () => {
-        try {
-          const response = await fetch(API_ENDPOINT);
-          
-          if (!response.ok) throw new Error('Failed to fetch heart rate data');
-          
-          const data = await response.json();
-          
-          // Update history for variability and averages
-          if (data.rate) {
-            heartRateHistory.push(data.rate);
-            // Keep history to last 10 readings
-            if (heartRateHistory.length > 10) {
-              heartRateHistory.shift();
-            }
-          }
-          
-          // Calculate derived metrics if not provided
-          const min = data.min || Math.min(...heartRateHistory, data.rate);
-          const max = data.max || Math.max(...heartRateHistory, data.rate);
-          const average = data.average || 
-            heartRateHistory.reduce((sum, rate) => sum + rate, 0) / heartRateHistory.length;
-            
-          // Calculate heart rate variability (difference between consecutive beats)
-          let variability = data.variability;
-          if (!variability && heartRateHistory.length > 1) {
-            const differences = [];
-            for (let i = 1; i < heartRateHistory.length; i++) {
-              differences.push(Math.abs(heartRateHistory[i] - heartRateHistory[i-1]));
-            }
-            variability = differences.reduce((sum, diff) => sum + diff, 0) / differences.length;
+      const applyHeartRateData = (data) => {
+        // Update history for variability and averages
+        if (data.rate) {
+          heartRateHistory.push(data.rate);
+          // Keep history to last 10 readings
+          if (heartRateHistory.length > 10) {
+            heartRateHistory.shift();
           }
+        }
+        
+        // Calculate derived metrics if not provided
+        const min = data.min || Math.min(...heartRateHistory, data.rate);
+        const max = data.max || Math.max(...heartRateHistory, data.rate);
+        const average = data.average || 
+          heartRateHistory.reduce((sum, rate) => sum + rate, 0) / heartRateHistory.length;
           
-          // Determine status
-          let status = data.status;
-          if (!status) {
-            const rate = data.rate;
-            if (rate < 50) status = "Low";
-            else if (rate > 100) status = "High";
-            else status = "Normal";
+        // Calculate heart rate variability (difference between consecutive beats)
+        let variability = data.variability;
+        if (!variability && heartRateHistory.length > 1) {
+          const differences = [];
+          for (let i = 1; i < heartRateHistory.length; i++) {
+            differences.push(Math.abs(heartRateHistory[i] - heartRateHistory[i-1]));
           }
-          
-          setHeartRateData({
-            rate: data.rate,
-            status,
-            min,
-            max,
-            average: Math.round(average),
-            variability: variability ? Math.round(variability) : 0,
-            lastUpdated: new Date().toLocaleTimeString(),
-            isConnected: true
-          });
-        } catch (error) {
-          console.error('Error fetching heart rate data:', error);
-          setHeartRateData(prev => ({
-            ...prev,
-            isConnected: false
-          }));
+          variability = differences.reduce((sum, diff) => sum + diff, 0) / differences.length;
         }
+        
+        // Determine status
+        let status = data.status;
+        if (!status) {
+          const rate = data.rate;
+          if (rate < 50) status = "Low";
+          else if (rate > 100) status = "High";
+          else status = "Normal";
+        }
+        
+        setHeartRateData({
+          rate: data.rate,
+          status,
+          min,
+          max,
+          average: Math.round(average),
+          variability: variability ? Math.round(variability) : 0,
+          lastUpdated: new Date().toLocaleTimeString(),
+          isConnected: true
+        });
       };
       
-      fetchHeartRateData(); // Initial fetch
-      interval = setInterval(fetchHeartRateData, 2000);
+      const setDisconnected = () => setHeartRateData(prev => ({
+        ...prev,
+        isConnected: false
+      }));
+      
+      if (streamSupported) {
+        // Pushed by the backend as readings arrive
+        unsubscribe = subscribeSensor('heart_rate', applyHeartRateData, (connected) => {
+          if (!connected) setDisconnected();
+        });
+      } else {
+        const fetchHeartRateData = async () => {
+          try {
+            const response = await fetch(API_ENDPOINT);
+            
+            if (!response.ok) throw new Error('Failed to fetch heart rate data');
+            
+            applyHeartRateData(await response.json());
+          } catch (error) {
+            console.error('Error fetching heart rate data:', error);
+            setDisconnected();
+          }
+        };
+        
+        fetchHeartRateData(); // Initial fetch
+        interval = setInterval(fetchHeartRateData, 2000);
+      }
     } else {
       // DUMMY DATA: Enhanced simulation with realistic patterns
       interval = setInterval(() => {
@@ -146,7 +159,10 @@ export function useHeartRateData() {
       }, 2000);
     }
 
-    return () => clearInterval(interval);
+    return () => {
+      clearInterval(interval);
+      if (unsubscribe) unsubscribe();
+    };
   }, [isInBed]);
 
   return heartRateData;
@@ -1,6 +1,7 @@
 // src/shared/hooks/input/useGyroscopeData.js
 import { useState, useEffect } from 'react';
 import { useSystemState } from '@/features/useSystemState';
+import { streamSupported, subscribeSensor } from '@/shared/utils/sensorStream';
 
 // Configuration
 const USE_REAL_DATA = true;
@@ -30,56 +31,68 @@ export function useGyroscopeData() {
     }
 
     let interval;
+    let unsubscribe;
     
     if (USE_REAL_DATA) {
       // REAL DATA: Connect to Raspberry Pi for MPU6050 data
-      const fetchGyroData = async () => {
-        try {
-          const response = await fetch(API_ENDPOINT);
-          
-          if (!response.ok) throw new Error('Failed to fetch gyroscope data');
-          
-          const data = await response.json();
-          
-          // Calculate neck angle and position from raw data if not provided
-          const neckAngle = data.neckAngle || Math.abs(data.pitch);
-          let position = data.position;
-          let postureSeverity = data.postureSeverity;
-          
-          if (!position) {
-            // Calculate position from roll if not provided
-            if (data.roll > 30) position = 'Right Side';
-            else if (data.roll < -30) position = 'Left Side';
-            else position = 'Back';
-          }
-          
-          if (!postureSeverity) {
-            // Determine posture severity from neck angle
-            if (neckAngle < 15) postureSeverity = 'Good';
-            else if (neckAngle < 30) postureSeverity = 'Poor';
-            else postureSeverity = 'Bad';
-          }
-          
-          setGyroData({
-            pitch: data.pitch,
-            roll: data.roll,
-            neckAngle,
-            position,
-            postureSeverity,
-            lastUpdated: new Date().toLocaleTimeString(),
-            isConnected: true
-          });
-        } catch (error) {
-          console.error('Error fetching gyroscope data:', error);
-          setGyroData(prev => ({
-            ...prev,
-            isConnected: false
-          }));
+      const applyGyroData = (data) => {
+        // Calculate neck angle and position from raw data if not provided
+        const neckAngle = data.neckAngle || Math.abs(data.pitch);
+        let position = data.position;
+        let postureSeverity = data.postureSeverity;
+        
+        if (!position) {
+          // Calculate position from roll if not provided
+          if (data.roll > 30) position = 'Right Side';
+          else if (data.roll < -30) position = 'Left Side';
+          else position = 'Back';
+        }
+        
+        if (!postureSeverity) {
+          // Determine posture severity from neck angle
+          if (neckAngle < 15) postureSeverity = 'Good';
+          else if (neckAngle < 30) postureSeverity = 'Poor';
+          else postureSeverity = 'Bad';
         }
+        
+        setGyroData({
+          pitch: data.pitch,
+          roll: data.roll,
+          neckAngle,
+          position,
+          postureSeverity,
+          lastUpdated: new Date().toLocaleTimeString(),
+          isConnected: true
+        });
       };
       
-      fetchGyroData(); // Initial fetch
-      interval = setInterval(fetchGyroData, 500); // Match 500ms delay from Arduino
+      const setDisconnected = () => setGyroData(prev => ({
+        ...prev,
+        isConnected: false
+      }));
+      
+      if (streamSupported) {
+        // Pushed by the backend as readings arrive
+        unsubscribe = subscribeSensor('gyroscope', applyGyroData, (connected) => {
+          if (!connected) setDisconnected();
+        });
+      } else {
+        const fetchGyroData = async () => {
+          try {
+            const response = await fetch(API_ENDPOINT);
+            
+            if (!response.ok) throw new Error('Failed to fetch gyroscope data');
+            
+            applyGyroData(await response.json());
+          } catch (error) {
+            console.error('Error fetching gyroscope data:', error);
+            setDisconnected();
+          }
+        };
+        
+        fetchGyroData(); // Initial fetch
+        interval = setInterval(fetchGyroData, 500); // Match 500ms delay from Arduino
+      }
     } else {
       // DUMMY DATA: Simulate realistic MPU6050 readings
       interval = setInterval(() => {
@@ -110,7 +123,10 @@ export function useGyroscopeData() {
       }, 500); // Match the 500ms delay in Arduino code
     }
 
-    return () => clearInterval(interval);
+    return () => {
+      clearInterval(interval);
+      if (unsubscribe) unsubscribe();
+    };
   }, [isInBed]);
 
   return gyroData;
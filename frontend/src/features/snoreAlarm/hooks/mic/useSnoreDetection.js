@@ -1,6 +1,7 @@
 // src/shared/hooks/input/useSnoreDetection.js
 import { useState, useEffect } from 'react';
 import { useSystemState } from '@/features/useSystemState';
+import { streamSupported, subscribeSensor } from '@/shared/utils/sensorStream';
 
 // Configuration - Toggle between real and dummy data
 const USE_REAL_DATA = true; // Set to true when ready for production
@@ -27,31 +28,44 @@ export function useSnoreDetection() {
     }
 
     let interval;
+    let unsubscribe;
     
     if (USE_REAL_DATA) {
       // REAL DATA: Connect to Raspberry Pi
-      const fetchSnoreData = async () => {
-        try {
-          const response = await fetch(API_ENDPOINT);
-          
-          if (!response.ok) throw new Error('Failed to fetch snore data');
-          
-          const data = await response.json();
-          setSnoreData({
-            ...data,
-            isConnected: true
-          });
-        } catch (error) {
-          console.error('Error fetching snore data:', error);
-          setSnoreData(prev => ({
-            ...prev,
-            isConnected: false
-          }));
-        }
+      const applySnoreData = (data) => {
+        setSnoreData({
+          ...data,
+          isConnected: true
+        });
       };
       
-      fetchSnoreData(); // Initial fetch
-      interval = setInterval(fetchSnoreData, 3000);
+      const setDisconnected = () => setSnoreData(prev => ({
+        ...prev,
+        isConnected: false
+      }));
+      
+      if (streamSupported) {
+        // Pushed by the backend as readings arrive
+        unsubscribe = subscribeSensor('snore', applySnoreData, (connected) => {
+          if (!connected) setDisconnected();
+        });
+      } else {
+        const fetchSnoreData = async () => {
+          try {
+            const response = await fetch(API_ENDPOINT);
+            
+            if (!response.ok) throw new Error('Failed to fetch snore data');
+            
+            applySnoreData(await response.json());
+          } catch (error) {
+            console.error('Error fetching snore data:', error);
+            setDisconnected();
+          }
+        };
+        
+        fetchSnoreData(); // Initial fetch
+        interval = setInterval(fetchSnoreData, 3000);
+      }
     } else {
       // DUMMY DATA: Same as your current implementation
       interval = setInterval(() => {
@@ -66,7 +80,10 @@ export function useSnoreDetection() {
       }, 3000);
     }
 
-    return () => clearInterval(interval);
+    return () => {
+      clearInterval(interval);
+      if (unsubscribe) unsubscribe();
+    };
   }, [isSleeping]);
 
   return snoreData;
@@ -1,9 +1,27 @@
+import { useEffect, useState } from 'react';
 import { useBodyWeight } from './weightLCD/hooks/weight/useBodyWeight';
 import { useSleepMonitor } from './snoreAlarm/hooks/mic/useSnoreMonitor';
+import { streamSupported, subscribeSensor } from '@/shared/utils/sensorStream';
 
 export function useSystemState() {
   const { weight } = useBodyWeight();
   const { status: sleepStatus } = useSleepMonitor();
+  const [sleepStage, setSleepStage] = useState(null); // latest scored epoch from the backend
+
+  useEffect(() => {
+    if (!streamSupported) return undefined;
+    return subscribeSensor('sleep', setSleepStage);
+  }, []);
+
+  // Prefer the backend's stage classifier; fall back to the weight/snore guess until it has scored an epoch
+  if (sleepStage && sleepStage.stage) {
+    return {
+      isInBed: Boolean(sleepStage.inBed),
+      isSleeping: Boolean(sleepStage.inBed) && sleepStage.stage !== 'Wake',
+      isAwake: Boolean(sleepStage.inBed) && sleepStage.stage === 'Wake',
+      sleepStage: sleepStage.stage,
+    };
+  }
 
   const isInBed = weight > 30;
   const isSleeping = isInBed && sleepStatus === 'Sleeping';
@@ -13,5 +31,6 @@ export function useSystemState() {
     isInBed,
     isSleeping,
     isAwake,
+    sleepStage: null,
   };
-}
\ No newline at end of file
+}
@@ -0,0 +1,54 @@
+// src/shared/utils/sensorStream.js
+// One shared Server-Sent Events connection for every live sensor hook.
+// The backend pushes each sensor update as an event named after its topic
+// (heart_rate, breathing, gyroscope, weight, snore, sleep, alerts), so hooks no longer poll.
+import { API_CONFIG, getApiUrl } from '@/config/api';
+
+export const streamSupported = typeof window !== 'undefined' && 'EventSource' in window;
+
+const listeners = new Map(); // topic -> Set of { onData, onStatus }
+let source = null;
+let topicsKey = '';
+
+function notifyStatus(connected) {
+  listeners.forEach(set => set.forEach(({ onStatus }) => onStatus && onStatus(connected)));
+}
+
+function connect() {
+  const topics = [...listeners.keys()].sort();
+  const key = topics.join(',');
+  if (source && key === topicsKey) return;
+
+  if (source) source.close();
+  source = null;
+  topicsKey = key;
+  if (!topics.length) return;
+
+  const url = `${getApiUrl(API_CONFIG.ENDPOINTS.STREAM)}?topics=${key}&interval=${API_CONFIG.STREAM_INTERVAL}`;
+  source = new EventSource(url);
+  source.onopen = () => notifyStatus(true);
+  source.onerror = () => notifyStatus(false); // EventSource reconnects on its own
+
+  topics.forEach(topic => {
+    source.addEventListener(topic, (event) => {
+      const data = JSON.parse(event.data);
+      (listeners.get(topic) || []).forEach(({ onData }) => onData(data));
+    });
+  });
+}
+
+// Subscribe to one sensor topic; returns an unsubscribe function
+export function subscribeSensor(topic, onData, onStatus) {
+  const entry = { onData, onStatus };
+  if (!listeners.has(topic)) listeners.set(topic, new Set());
+  listeners.get(topic).add(entry);
+  connect();
+
+  return () => {
+    const set = listeners.get(topic);
+    if (!set) return;
+    set.delete(entry);
+    if (!set.size) listeners.delete(topic);
+    connect();
+  };
+}